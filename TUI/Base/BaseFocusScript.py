@@ -147,15 +147,19 @@ import traceback
 import sys
 import math
 import random # for debug
+import time
 import numpy
 import tkinter
 import RO.Wdg
 import RO.Constants
 import RO.StringUtil
+from RO.TkUtil import Timer
 import TUI.TUIModel
 import TUI.TCC.TCCModel
 import TUI.Inst.ExposeModel
 import TUI.Guide.GuideModel
+import TUI.Guide.StarFinder
+from TUI.Base.PolyFit import polyfitw
 
 import matplotlib
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
@@ -239,6 +243,234 @@ def makeStarData(
     fwhm = float(fwhm)
     return [[typeChar, 1, xyPos[0], xyPos[1], 1.0, 1.0, fwhm * 5, 1, fwhm, fwhm, 0, 0, ampl, sky, ampl]]
 
+class _PipelinedFocusMove(object):
+    """A focus move that starts as soon as the shutter closes on the current exposure
+
+    Used by BaseFocusScript.waitFocusSweep to overlap the move to the next focus position
+    with the readout and centroid of the current exposure.
+
+    Inputs:
+    - focusScript: the focus script (a BaseFocusScript)
+    - focPos: focus position to move to (um)
+
+    Call arm just before issuing the expose or centroid command for the current focus position.
+    The move then starts when the exposure state keyword (see BaseFocusScript.getExpStateKeyVar)
+    reports that a new exposure has started (a change to an integrating state)
+    and then that it is no longer integrating, or when start is called, whichever comes first.
+    If the keyword includes a commander, exposures by other commanders are ignored.
+    In debug mode the shutter is assumed to close DebugShutterCloseMS after arm is called.
+    """
+    IntegratingStates = frozenset(("flushing", "integrating", "paused"))
+
+    def __init__(self, focusScript, focPos):
+        self.focusScript = focusScript
+        self.focPos = float(focPos)
+        self.cmdVar = None
+        self.endTime = None # time at which the move finished
+        self._isArmed = False
+        self._wasIntegrating = None # was the previous exposure state an integrating state?
+        self._sawNewIntegrating = False # did an exposure start after arm was called?
+        self._debugTimer = Timer()
+        self.expStateKeyVar, self.stateInd, self.cmdrInd = focusScript.getExpStateKeyVar()
+
+    @property
+    def isStarted(self):
+        return self.cmdVar is not None
+
+    def arm(self):
+        """Start monitoring the exposure state; call just before issuing the expose or centroid command
+
+        Exposures that started before this is called are ignored.
+        """
+        if self._isArmed or self.isStarted:
+            return
+        self._isArmed = True
+        if self.focusScript.sr.debug:
+            self._debugTimer.start(self.focusScript.DebugShutterCloseMS / 1000.0, self.start)
+            return
+        # an exposure already in progress is not this step's exposure
+        self._wasIntegrating = self._getIntegrating(*self.expStateKeyVar.get())
+        self.expStateKeyVar.addCallback(self._expStateCallback, callNow=False)
+
+    def start(self):
+        """Start the move now, if not already started
+        """
+        self.cleanup()
+        if self.cmdVar is not None:
+            return
+        self.cmdVar = self.focusScript.sr.startCmd(
+            callFunc = self._cmdCallback,
+            checkFail = False,
+            **self.focusScript.getSetFocusCmdDict(self.focPos)
+        )
+
+    def cleanup(self):
+        """Stop monitoring the exposure state (without starting the move)
+        """
+        self._debugTimer.cancel()
+        self.expStateKeyVar.removeCallback(self._expStateCallback, doRaise=False)
+
+    def _cmdCallback(self, *args, **kargs):
+        """Record the time at which the move finished
+        """
+        self.endTime = time.time()
+
+    def _getIntegrating(self, expState, isCurrent):
+        """Return True if expState reports that an exposure by this commander is integrating,
+        False if it reports some other state, or None if unknown or not this commander's exposure
+        """
+        if not isCurrent:
+            return None
+        if self.cmdrInd is not None and expState[self.cmdrInd] != self.focusScript.tuiModel.getCmdr():
+            return None
+        state = expState[self.stateInd]
+        if not state:
+            return None
+        return state.lower() in self.IntegratingStates
+
+    def _expStateCallback(self, expState, isCurrent, keyVar=None):
+        isIntegrating = self._getIntegrating(expState, isCurrent)
+        if isIntegrating is None:
+            return
+        if isIntegrating:
+            if self._wasIntegrating is not True:
+                self._sawNewIntegrating = True
+        elif self._sawNewIntegrating:
+            self.start()
+        self._wasIntegrating = isIntegrating
+
+
+class _IncrementalFocusFit(object):
+    """Least squares fit of FWHM = c0 + c1 focPos + c2 focPos^2, updated one measurement at a time
+
+    Used by BaseFocusScript.waitFocusSweep for adaptive sweeps.
+    Each measurement is a rank-1 update of the normal equations (as used by polyfitw),
+    so refitting after each measurement costs a 3x3 solve, regardless of the number of measurements.
+    Focus positions are internally scaled to -1 to 1 over the sweep range to keep the equations well conditioned.
+
+    Inputs:
+    - centerFocPos: center of sweep range (um)
+    - focusRange: sweep range (um)
+    """
+    def __init__(self, centerFocPos, focusRange):
+        self.centerFocPos = float(centerFocPos)
+        self.halfRange = max(abs(float(focusRange)) / 2.0, 1.0)
+        self.normArr = numpy.zeros([3, 3], dtype=float) # normal matrix: sum of w phi phi^T
+        self.rhsArr = numpy.zeros(3, dtype=float) # sum of w y phi
+        self.sumWYSq = 0.0 # sum of w y^2, for the residuals
+        self.focPosList = []
+
+    def _getPhi(self, focPos):
+        """Return the basis functions [1, u, u^2] for scaled focus position(s) u; shape [3] + shape of focPos
+        """
+        uArr = (numpy.asarray(focPos, dtype=float) - self.centerFocPos) / self.halfRange
+        return numpy.array([numpy.ones_like(uArr), uArr, uArr**2])
+
+    def addMeas(self, focPos, fwhm, weight=1.0):
+        """Add a measurement
+
+        Inputs:
+        - focPos: focus position (um)
+        - fwhm: measured FWHM
+        - weight: weight of measurement
+        """
+        phiArr = self._getPhi(focPos)
+        self.normArr += weight * numpy.outer(phiArr, phiArr)
+        self.rhsArr += (weight * fwhm) * phiArr
+        self.sumWYSq += weight * fwhm**2
+        self.focPosList.append(float(focPos))
+
+    @property
+    def numMeas(self):
+        return len(self.focPosList)
+
+    def _getScaledCoeffs(self):
+        """Return the fit coefficients for scaled focus position, or None if they cannot be computed
+        """
+        if self.numMeas < 3:
+            return None
+        try:
+            return numpy.linalg.solve(self.normArr, self.rhsArr)
+        except numpy.linalg.LinAlgError:
+            return None
+
+    def getFit(self):
+        """Return the current fit as a tuple, or None if fewer than 3 distinct focus positions have been measured
+
+        The tuple contains:
+        - coeffs: fit coefficients [c0, c1, c2] for focus position in um (as returned by polyfitw)
+        - fwhmSigma: standard deviation of the FWHM residuals; None if only 3 measurements
+        - bestFocPos: focus position at minimum FWHM (um); None if the fit has no minimum
+        - focSigma: estimated standard deviation of best focus, computed as in waitFocusSweep;
+            None if fwhmSigma or bestFocPos is None
+        """
+        scaledCoeffs = self._getScaledCoeffs()
+        if scaledCoeffs is None:
+            return None
+        s0, s1, s2 = scaledCoeffs
+        x0 = self.centerFocPos
+        hr = self.halfRange
+        coeffs = numpy.array((
+            s0 - (s1 * x0 / hr) + (s2 * x0**2 / hr**2),
+            (s1 / hr) - (2.0 * s2 * x0 / hr**2),
+            s2 / hr**2,
+        ))
+
+        fwhmSigma = None
+        if self.numMeas > 3:
+            residSq = max(self.sumWYSq - numpy.dot(scaledCoeffs, self.rhsArr), 0.0)
+            fwhmSigma = math.sqrt(residSq / (self.numMeas - 3))
+
+        bestFocPos = None
+        focSigma = None
+        if coeffs[2] > 0.0:
+            bestFocPos = -coeffs[1] / (2.0 * coeffs[2])
+            if fwhmSigma is not None:
+                focSigma = math.sqrt(fwhmSigma / coeffs[2])
+        return coeffs, fwhmSigma, bestFocPos, focSigma
+
+    def getNextFocPos(self, candFocPosArr, pendingFocPosList=()):
+        """Return the candidate focus position that most reduces the uncertainty in best focus
+
+        Inputs:
+        - candFocPosArr: array of candidate focus positions (um)
+        - pendingFocPosList: focus positions already chosen but not yet measured (um)
+
+        The variance of best focus u* = -s1/(2 s2) is estimated to first order as
+        g^T N^-1 g (times the FWHM variance, which does not affect the choice),
+        where g is the gradient of u* with respect to the coefficients and N is the normal matrix.
+        Measuring at a new position phi is a rank-1 update of N, which by the Sherman-Morrison formula
+        reduces the variance by (g^T N^-1 phi)^2 / (1 + phi^T N^-1 phi); the best candidate maximizes this.
+        The coefficients are those of the current fit; a pending position updates N but not the coefficients
+        (N does not depend on the measured FWHM).
+
+        If the fit has no minimum yet, returns the candidate farthest from all measured and pending positions.
+        """
+        candFocPosArr = numpy.asarray(candFocPosArr, dtype=float)
+        knownFocPosArr = numpy.array(self.focPosList + list(pendingFocPosList), dtype=float)
+        scaledCoeffs = self._getScaledCoeffs()
+        if scaledCoeffs is not None and scaledCoeffs[2] > 0.0:
+            normArr = self.normArr.copy()
+            for focPos in pendingFocPosList:
+                phiArr = self._getPhi(focPos)
+                normArr += numpy.outer(phiArr, phiArr)
+            try:
+                invNormArr = numpy.linalg.inv(normArr)
+            except numpy.linalg.LinAlgError:
+                invNormArr = None
+            if invNormArr is not None:
+                s0, s1, s2 = scaledCoeffs
+                gradArr = numpy.array((0.0, -1.0 / (2.0 * s2), s1 / (2.0 * s2**2)))
+                candPhiArr = self._getPhi(candFocPosArr) # shape [3, numCand]
+                gnpArr = numpy.dot(numpy.dot(gradArr, invNormArr), candPhiArr)
+                pnpArr = numpy.sum(candPhiArr * numpy.dot(invNormArr, candPhiArr), axis=0)
+                return float(candFocPosArr[numpy.argmax(gnpArr**2 / (1.0 + pnpArr))])
+        if len(knownFocPosArr) == 0:
+            return float(candFocPosArr[len(candFocPosArr) // 2])
+        minDistArr = numpy.min(numpy.abs(candFocPosArr[:, numpy.newaxis] - knownFocPosArr[numpy.newaxis, :]), axis=1)
+        return float(candFocPosArr[numpy.argmax(minDistArr)])
+
+
 class BaseFocusScript(object):
     """Basic focus script object.
     
@@ -261,6 +493,12 @@ class BaseFocusScript(object):
     FocGraphMargin = 5 # margin on graph for x axis limits, in um
     MaxFocSigmaFac = 0.5 # maximum allowed sigma of best fit focus as a multiple of focus range
     MinFocusIncr = 10 # minimum focus increment, in um
+    PipelineSweep = False # default for "Overlap Focus Moves": start each sweep move when the shutter closes
+    DebugShutterCloseMS = 500 # in debug mode: time from the start of an exposure to shutter close (ms)
+    AdaptiveSweep = False # default for "Adaptive Sweep": choose each sweep position from the fit so far
+    AdaptiveFocSigmaFac = 0.05 # adaptive sweep: stop when sigma of best focus < this multiple of focus range
+    AdaptiveNumCand = 41 # adaptive sweep: number of equally spaced candidate focus positions
+    AdaptiveMinMeas = 6 # adaptive sweep: minimum number of measurements before stopping early
     def __init__(self,
         sr,
         gcamActor,
@@ -472,6 +710,29 @@ class BaseFocusScript(object):
             helpURL = self.helpURL,
         )
         self.gr.gridWdg(None, self.moveBestFocus, colSpan = 3, sticky="w")
+
+        # create the overlap focus moves checkbox
+        self.pipelineSweepWdg = RO.Wdg.Checkbutton(
+            master = self.sr.master,
+            text = "Overlap Focus Moves",
+            defValue = self.PipelineSweep,
+            relief = "flat",
+            helpText = "During a sweep, move focus while the previous exposure is read out and measured?",
+            helpURL = self.helpURL,
+        )
+        self.gr.gridWdg(None, self.pipelineSweepWdg, colSpan = 3, sticky="w")
+
+        # create the adaptive sweep checkbox
+        self.adaptiveSweepWdg = RO.Wdg.Checkbutton(
+            master = self.sr.master,
+            text = "Adaptive Sweep",
+            defValue = self.AdaptiveSweep,
+            relief = "flat",
+            helpText = "Choose each focus position from the fit so far and stop once best focus is known? " \
+                "(Focus Positions is then the maximum)",
+            helpURL = self.helpURL,
+        )
+        self.gr.gridWdg(None, self.adaptiveSweepWdg, colSpan = 3, sticky="w")
         
         graphCol =  self.gr.getNextCol()
         graphRowSpan = self.gr.getNextRow()
@@ -562,6 +823,7 @@ class BaseFocusScript(object):
         self.plotAxis.set_autoscale_on(False)
         self.figCanvas.draw()
         self.plotLine = None
+        self.interimFitLine = None
     
     def doClear(self, wdg=None):
         self.logWdg.clearOutput()
@@ -733,6 +995,24 @@ class BaseFocusScript(object):
             abortCmdStr = "abort",
         )
     
+    def getExpStateKeyVar(self):
+        """Return (exposure state keyword variable, index of state, index of commander)
+        for the camera used to measure stars; used to detect when the shutter closes during a pipelined focus sweep.
+        The index of commander is None if the keyword has no commander.
+        """
+        return self.guideModel.expState, 0, None
+
+    def getSetFocusCmdDict(self, focPos):
+        """Return a dict of actor and cmdStr for a command to set focus
+
+        Inputs:
+        - focPos: focus position (um)
+        """
+        return dict(
+            actor = "tcc",
+            cmdStr = "set focus=%0.0f" % (focPos,),
+        )
+
     def graphFocusMeas(self, focPosFWHMList, extremeFocPos=None, extremeFWHM=None):
         """Graph measured fwhm vs focus.
         
@@ -759,6 +1039,30 @@ class BaseFocusScript(object):
         
         self.setGraphRange(extremeFocPos=extremeFocPos, extremeFWHM=extremeFWHM)
         
+    def graphInterimFit(self, focPosFWHMList):
+        """Graph a preliminary fit of FWHM vs focus during a sweep, as a dashed line.
+
+        Inputs:
+        - focPosFWHMList: list of (focus position (um), measured FWHM (binned pixels));
+            if None or fewer than 3 measurements, the interim fit is removed
+        """
+        if self.interimFitLine:
+            self.interimFitLine.remove()
+            self.interimFitLine = None
+        if focPosFWHMList and len(focPosFWHMList) >= 3:
+            focList, fwhmList = list(zip(*focPosFWHMList))
+            focPosArr = numpy.array(focList, dtype=float)
+            fwhmArr = numpy.array(fwhmList, dtype=float)
+            try:
+                coeffs = polyfitw(focPosArr, fwhmArr, numpy.ones(len(focPosArr), dtype=float), 2, False)
+            except numpy.linalg.LinAlgError:
+                coeffs = None
+            if coeffs is not None:
+                fitFocArr = numpy.linspace(min(focPosArr), max(focPosArr), 50)
+                fitFWHMArr = coeffs[0] + coeffs[1]*fitFocArr + coeffs[2]*(fitFocArr**2.0)
+                self.interimFitLine = self.plotAxis.plot(fitFocArr, fitFWHMArr, '--', color="gray")[0]
+        self.figCanvas.draw()
+
     def initAll(self):
         """Initialize variables, table and graph.
         """
@@ -1150,6 +1454,19 @@ class BaseFocusScript(object):
         if self.maxFindAmpl is None:
             raise RuntimeError("Find disabled; maxFindAmpl=None")
         
+        if not self.sr.debug:
+            # skip stars that are clearly unusable in the local copy of the image (if any),
+            # to avoid centroid commands that will fail; read the image in a background thread
+            yield self.sr.waitThread(
+                TUI.Guide.StarFinder.prescreenWithLocalImage,
+                guideModel = self.guideModel,
+                filePath = filePath,
+                starDataList = starDataList,
+                maxAmpl = self.maxFindAmpl,
+                matchRad = self.centroidRadPix,
+            )
+            starDataList = self.sr.value
+
         for starData in starDataList:
             starXYPos = starData[2:4]
             starAmpl = starData[14]
@@ -1207,25 +1524,83 @@ class BaseFocusScript(object):
             self.setGraphRange(extremeFocPos=extremeFocPos)
             numMeas = 0
             self.focPosToRestore = centerFocPos
-            for focInd in range(numFocPos):
-                focPos = float(startFocPos + (focInd*focusIncr))
-    
-                doBacklashComp = (focInd == 0)
-                yield self.waitSetFocus(focPos, doBacklashComp)
-                self.sr.showMsg("Exposing for %s sec at focus %0.0f %s" % \
-                    (self.expTime, focPos, MicronStr))
-                yield self.waitCentroid()
-                starMeas = self.sr.value
-                if self.sr.debug:
-                    starMeas.fwhm = 0.0001 * (focPos - centerFocPos) ** 2
-                    starMeas.fwhm += random.gauss(1.0, 0.25)
-                extremeFWHM.addVal(starMeas.fwhm)
-    
-                self.logStarMeas("Sw %d" % (focInd+1,), focPos, starMeas)
-                
-                if starMeas.fwhm is not None:
-                    focPosFWHMList.append((focPos, starMeas.fwhm))
-                    self.graphFocusMeas(focPosFWHMList, extremeFWHM=extremeFWHM)
+            doPipeline = self.pipelineSweepWdg.getBool()
+            doAdaptive = self.adaptiveSweepWdg.getBool()
+            if doAdaptive:
+                # measure the ends and center of the range, then choose each position from the fit so far
+                # (numFocPos is the maximum number of positions)
+                focPosList = [startFocPos, centerFocPos, endFocPos]
+                candFocPosArr = numpy.linspace(startFocPos, endFocPos, self.AdaptiveNumCand)
+                maxAdaptiveFocSigma = self.AdaptiveFocSigmaFac * focusRange
+            else:
+                focPosList = [float(startFocPos + (focInd*focusIncr)) for focInd in range(numFocPos)]
+            focusFit = _IncrementalFocusFit(centerFocPos, focusRange)
+            prevFocPos = None
+            nextMove = None
+            try:
+                focInd = 0
+                while focInd < len(focPosList): # an adaptive sweep adds positions as it goes
+                    focPos = focPosList[focInd]
+
+                    if nextMove:
+                        # this move was started when the shutter closed on the previous exposure
+                        yield self.waitPipelinedFocusMove(nextMove)
+                        nextMove = None
+                    else:
+                        # compensate for backlash on the first move and any move against the sweep direction
+                        doBacklashComp = (prevFocPos is None) or ((focPos > prevFocPos) != self.focDir)
+                        yield self.waitSetFocus(focPos, doBacklashComp)
+                    prevFocPos = focPos
+                    if doAdaptive and doPipeline and focInd + 1 == len(focPosList) and len(focPosList) < numFocPos:
+                        # the next position must be chosen before this exposure is measured
+                        focPosList.append(focusFit.getNextFocPos(candFocPosArr, pendingFocPosList=[focPos]))
+                    if doPipeline and focInd + 1 < len(focPosList):
+                        nextFocPos = focPosList[focInd + 1]
+                        if ((nextFocPos > focPos) == self.focDir) or not self.BacklashComp:
+                            # a move that needs no backlash compensation can start as soon as the shutter closes
+                            nextMove = _PipelinedFocusMove(self, nextFocPos)
+                    self.sr.showMsg("Exposing for %s sec at focus %0.0f %s" % \
+                        (self.expTime, focPos, MicronStr))
+                    if nextMove:
+                        # waitCentroid issues its first command before returning control to the event loop
+                        nextMove.arm()
+                    yield self.waitCentroid()
+                    starMeas = self.sr.value
+                    if self.sr.debug:
+                        starMeas.fwhm = 0.0001 * (focPos - centerFocPos) ** 2
+                        starMeas.fwhm += random.gauss(1.0, 0.25)
+                    extremeFWHM.addVal(starMeas.fwhm)
+
+                    self.logStarMeas("Sw %d" % (focInd+1,), focPos, starMeas)
+
+                    if starMeas.fwhm is not None:
+                        focusFit.addMeas(focPos, starMeas.fwhm)
+                        focPosFWHMList.append((focPos, starMeas.fwhm))
+                        self.graphFocusMeas(focPosFWHMList, extremeFWHM=extremeFWHM)
+                        self.graphInterimFit(focPosFWHMList)
+                    focInd += 1
+
+                    if doAdaptive and focInd >= 3:
+                        # with only a few measurements the fit sigma is too poorly determined to trust
+                        fitData = None
+                        if len(focusFit.focPosList) >= self.AdaptiveMinMeas:
+                            fitData = focusFit.getFit()
+                        if fitData and fitData[3] is not None and fitData[3] < maxAdaptiveFocSigma \
+                            and min(focusFit.focPosList) <= fitData[2] <= max(focusFit.focPosList):
+                            self.logWdg.addMsg("Adaptive sweep done after %d positions" % (focInd,))
+                            del focPosList[focInd:]
+                            if nextMove:
+                                nextMove.cleanup()
+                                if nextMove.isStarted:
+                                    # let the unneeded move finish before focus is moved again
+                                    yield self.sr.waitCmdVars(nextMove.cmdVar, checkFail=False)
+                                nextMove = None
+                        elif focInd == len(focPosList) and len(focPosList) < numFocPos:
+                            focPosList.append(focusFit.getNextFocPos(candFocPosArr))
+            finally:
+                if nextMove:
+                    nextMove.cleanup()
+            self.graphInterimFit(None)
             
             # Fit a curve to the data
             numMeas = len(focPosFWHMList)
@@ -1350,20 +1725,33 @@ class BaseFocusScript(object):
         if doBacklashComp and self.BacklashComp:
             backlashFocPos = focPos - (abs(self.BacklashComp) * self.focDir)
             self.sr.showMsg("Backlash comp: moving focus to %0.0f %s" % (backlashFocPos, MicronStr))
-            yield self.sr.waitCmd(
-               actor = "tcc",
-               cmdStr = "set focus=%0.0f" % (backlashFocPos,),
-            )
+            yield self.sr.waitCmd(**self.getSetFocusCmdDict(backlashFocPos))
             yield self.sr.waitMS(self.FocusWaitMS)
         
         # move to desired focus position
         self.sr.showMsg("Moving focus to %0.0f %s" % (focPos, MicronStr))
-        yield self.sr.waitCmd(
-           actor = "tcc",
-           cmdStr = "set focus=%0.0f" % (focPos,),
-        )
+        yield self.sr.waitCmd(**self.getSetFocusCmdDict(focPos))
         yield self.sr.waitMS(self.FocusWaitMS)
 
+    def waitPipelinedFocusMove(self, focusMove):
+        """Wait for a pipelined focus move to finish, then for the rest of FocusWaitMS
+
+        To use: yield waitPipelinedFocusMove(...)
+
+        Inputs:
+        - focusMove: a _PipelinedFocusMove; if it has not started (e.g. because the shutter
+            close was not seen) then it is started now
+        """
+        if not focusMove.isStarted:
+            focusMove.start()
+        self.sr.showMsg("Moving focus to %0.0f %s" % (focusMove.focPos, MicronStr))
+        yield self.sr.waitCmdVars(focusMove.cmdVar)
+        # the settling time started when the move finished, which may have been a while ago
+        remWaitMS = self.FocusWaitMS
+        if focusMove.endTime is not None:
+            remWaitMS -= (time.time() - focusMove.endTime) * 1000.0
+        yield self.sr.waitMS(max(1, remWaitMS))
+
     def _printDiagnostics(self):
         """Print diagnostics to stderr in an attempt to diagnose a rare problem
         """
@@ -1722,6 +2110,11 @@ class ImagerFocusScript(BaseFocusScript):
         else:
             self.sr.value = StarMeas()
     
+    def getExpStateKeyVar(self):
+        """Return (exposure state keyword variable, index of state, index of commander) for the instrument
+        """
+        return self.exposeModel.expState, 1, 0
+
     def getExposeCmdDict(self, doWindow=True, isFinal=False):
         """Get basic command arument dict for an expose command
         
@@ -1789,85 +2182,3 @@ class ImagerFocusScript(BaseFocusScript):
             return
         
         yield self.waitFindStarInList(filePath, starDataList)
-
-
-def polyfitw(x, y, w, ndegree, return_fit=False):
-    """
-    Performs a weighted least-squares polynomial fit with optional error estimates.
-
-    Inputs:
-        x: 
-            The independent variable vector.
-
-        y: 
-            The dependent variable vector.  This vector should be the same 
-            length as X.
-
-        w: 
-            The vector of weights.  This vector should be same length as 
-            X and Y.
-
-        ndegree: 
-            The degree of polynomial to fit.
-
-    Outputs:
-        If return_fit is false (the default) then polyfitw returns only C, a vector of 
-        coefficients of length ndegree+1.
-        If return_fit is true then polyfitw returns a tuple (c, yfit, yband, sigma, a)
-            yfit:   
-            The vector of calculated Y's.  Has an error of + or - yband.
-
-            yband: 
-            Error estimate for each point = 1 sigma.
-
-            sigma: 
-            The standard deviation in Y units.
-
-            a: 
-            Correlation matrix of the coefficients.
-
-    Written by:  George Lawrence, LASP, University of Colorado,
-                    December, 1981 in IDL.
-                    Weights added, April, 1987,  G. Lawrence
-                    Fixed bug with checking number of params, November, 1998, 
-                    Mark Rivers.  
-                    Python version, May 2002, Mark Rivers
-    """
-    n = min(len(x), len(y)) # size = smaller of x,y
-    m = ndegree + 1             # number of elements in coeff vector
-    a = numpy.zeros((m,m), float)  # least square matrix, weighted matrix
-    b = numpy.zeros(m, float)  # will contain sum w*y*x^j
-    z = numpy.ones(n, float)   # basis vector for constant term
-
-    a[0,0] = numpy.sum(w)
-    b[0] = numpy.sum(w*y)
-
-    for p in range(1, 2*ndegree+1):      # power loop
-        z = z*x # z is now x^p
-        if (p < m):  b[p] = numpy.sum(w*y*z)  # b is sum w*y*x^j
-        sum = numpy.sum(w*z)
-        for j in range(max(0,(p-ndegree)), min(ndegree,p)+1):
-            a[j,p-j] = sum
-
-    a = numpy.linalg.inv(a)
-    c = numpy.dot(b, a)
-    if not return_fit:
-        return c         # exit if only fit coefficients are wanted
-
-    # compute optional output parameters.
-    yfit = numpy.zeros(n, float)+c[0]  # one-sigma error estimates, init
-    for k in range(1, ndegree +1):
-        yfit = yfit + c[k]*(x**k)  # sum basis vectors
-    var = numpy.sum((yfit-y)**2 )/(n-m)  # variance estimate, unbiased
-    sigma = numpy.sqrt(var)
-    yband = numpy.zeros(n, float) + a[0,0]
-    z = numpy.ones(n, float)
-    for p in range(1,2*ndegree+1):      # compute correlated error estimates on y
-        z = z*x      # z is now x^p
-        sum = 0.
-        for j in range(max(0, (p - ndegree)), min(ndegree, p)+1):
-            sum = sum + a[j,p-j]
-        yband = yband + sum * z      # add in all the error sources
-    yband = yband*var
-    yband = numpy.sqrt(yband)
-    return c, yfit, yband, sigma, a
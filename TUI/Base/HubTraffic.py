@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+"""Record hub traffic and replay it, for benchmarks and tests that run without a hub.
+
+HubRecorder saves every line read from the hub, with the time it was read, to a file.
+To record from a running TUI, type the following in the Python window:
+    import TUI.Base.HubTraffic
+    rec = TUI.Base.HubTraffic.HubRecorder("/path/to/tracking.hub.gz")
+    # ...wait a while...
+    rec.close()
+
+A recording is a text file (gzip-compressed if the name ends in .gz);
+the first line is a header that starts with "#", each remaining line is:
+    <msec since previous line> <line read from the hub>
+Hand-written recordings are fine; lines that start with "#" are ignored.
+
+HubReplayer feeds a recording through the keyword dispatcher's doRead method
+(just like lines read from the hub) at the recorded speed, N times faster,
+or as fast as possible, and measures:
+- dispatch throughput: lines per second and the fraction of time spent in doRead
+- Tk event loop latency: how late a heartbeat timer fires
+- memory use at the start and end of the replay and the peak
+
+benchHubTraffic.py (in the same directory as the TUI package) uses these
+to benchmark the standard TUI windows.
+"""
+__all__ = ["HubRecorder", "HubReplayer", "ReplayStats", "readRecording", "writeRecording", "getMemoryMB"]
+
+import gzip
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from RO.TkUtil import Timer
+import TUI.TUIModel
+
+_HeaderPrefix = "# TUI hub traffic"
+
+def _openRecording(filePath, mode):
+    """Open a recording file for reading ("r") or writing ("w") as text,
+    using gzip if the name ends in .gz
+    """
+    if filePath.endswith(".gz"):
+        return gzip.open(filePath, mode + "t", encoding="utf-8")
+    return open(filePath, mode, encoding="utf-8")
+
+def readRecording(filePath):
+    """Read a recording; return a list of (time since start of recording (sec), line)
+    """
+    msgList = []
+    currMS = 0
+    with _openRecording(filePath, "r") as inFile:
+        for lineNum, line in enumerate(inFile):
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("#"):
+                continue
+            try:
+                dtMSStr, msgStr = line.split(" ", 1)
+                currMS += int(dtMSStr)
+            except ValueError:
+                raise RuntimeError("Cannot parse line %d of recording %r: %r" % (lineNum + 1, filePath, line))
+            msgList.append((currMS * 0.001, msgStr))
+    return msgList
+
+def writeRecording(filePath, msgList):
+    """Write a recording
+
+    Inputs:
+    - filePath: path of file; if it ends in .gz then the file is compressed
+    - msgList: a sequence of (time since start of recording (sec), line), in time order
+    """
+    prevMS = 0
+    with _openRecording(filePath, "w") as outFile:
+        outFile.write("%s; start %s\n" % (_HeaderPrefix, time.strftime("%Y-%m-%dT%H:%M:%S")))
+        for msgTime, msgStr in msgList:
+            currMS = int(round(msgTime * 1000))
+            outFile.write("%d %s\n" % (currMS - prevMS, msgStr))
+            prevMS = currMS
+
+def getMemoryMB():
+    """Return (current, peak) memory use (resident set size) of this process, in MB;
+    each is None if unknown.
+    """
+    currMB = None
+    try:
+        # Linux
+        with open("/proc/self/statm") as statmFile:
+            currMB = int(statmFile.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1.0e6
+    except Exception:
+        pass
+
+    peakMB = None
+    if resource:
+        maxRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peakMB = maxRSS / 1.0e6 # bytes
+        else:
+            peakMB = maxRSS * 1024 / 1.0e6 # KiB
+        if currMB is not None:
+            # the kernel updates the peak lazily
+            peakMB = max(peakMB, currMB)
+    return currMB, peakMB
+
+
+class HubRecorder(object):
+    """Record lines read from the hub
+
+    Inputs:
+    - filePath: path of recording; if it ends in .gz then the file is compressed
+    - connection: hub connection (an RO.Comm.HubConnection);
+        if None then the TUI model's connection is used
+
+    Recording starts immediately; call close to stop.
+    """
+    def __init__(self, filePath, connection=None):
+        if connection is None:
+            connection = TUI.TUIModel.getModel().getConnection()
+        self.filePath = filePath
+        self.connection = connection
+        self.numLines = 0
+        self._outFile = _openRecording(filePath, "w")
+        self._outFile.write("%s; start %s\n" % (_HeaderPrefix, time.strftime("%Y-%m-%dT%H:%M:%S")))
+        self._startTime = time.time()
+        self._prevMS = 0
+        self.connection.addReadCallback(self._readCallback)
+
+    @property
+    def isRecording(self):
+        return self._outFile is not None
+
+    def close(self):
+        """Stop recording and close the file
+        """
+        if self._outFile is None:
+            return
+        self.connection.removeReadCallback(self._readCallback)
+        self._outFile.close()
+        self._outFile = None
+
+    def _readCallback(self, sock, msgStr):
+        """Record one line read from the hub
+        """
+        if self._outFile is None:
+            return
+        currMS = int(round((time.time() - self._startTime) * 1000))
+        self._outFile.write("%d %s\n" % (currMS - self._prevMS, msgStr))
+        self._prevMS = currMS
+        self.numLines += 1
+
+
+class ReplayStats(object):
+    """Statistics about a replay; see HubReplayer
+    """
+    def __init__(self):
+        self.numMsgs = 0
+        self.dispatchTime = 0.0
+        self.startTime = time.time()
+        self.endTime = None
+        self.maxLag = 0.0
+        self.latencyList = []
+        self.startMemMB, self.startPeakMemMB = getMemoryMB()
+        self.endMemMB = None
+        self.peakMemMB = None
+
+    def end(self):
+        """Record the end of the replay"""
+        self.endTime = time.time()
+        self.endMemMB, self.peakMemMB = getMemoryMB()
+
+    @property
+    def elapsedTime(self):
+        """Duration of the replay (sec), so far"""
+        return (self.endTime or time.time()) - self.startTime
+
+    def getLatencyPercentile(self, percent):
+        """Return the given percentile of Tk event loop latency (sec); None if no data
+        """
+        if not self.latencyList:
+            return None
+        sortedList = sorted(self.latencyList)
+        ind = min(int(len(sortedList) * percent / 100.0), len(sortedList) - 1)
+        return sortedList[ind]
+
+    def getReport(self):
+        """Return a report as a string
+        """
+        elapsedTime = max(self.elapsedTime, 1.0e-9)
+        lineList = [
+            "Replayed %d lines in %.2f sec = %.0f lines/sec" % \
+                (self.numMsgs, elapsedTime, self.numMsgs / elapsedTime),
+            "Dispatch (doRead): %.2f sec = %.1f%% of elapsed time; %.3f msec/line" % \
+                (self.dispatchTime, 100.0 * self.dispatchTime / elapsedTime,
+                1000.0 * self.dispatchTime / max(self.numMsgs, 1)),
+        ]
+        if self.maxLag > 0:
+            lineList.append("Maximum lag behind recorded time: %.3f sec" % (self.maxLag,))
+        if self.latencyList:
+            lineList.append("Tk event loop latency (msec): median %.1f; 95%% %.1f; 99%% %.1f; max %.1f" % \
+                tuple(1000.0 * self.getLatencyPercentile(pct) for pct in (50, 95, 99, 100)))
+
+        def fmtMB(memMB):
+            return "?" if memMB is None else "%.1f" % (memMB,)
+        lineList.append("Memory (MB): start %s; end %s; peak %s" % \
+            (fmtMB(self.startMemMB), fmtMB(self.endMemMB), fmtMB(self.peakMemMB)))
+        return "\n".join(lineList)
+
+
+class HubReplayer(object):
+    """Replay a recording of hub traffic through a keyword dispatcher
+
+    Inputs:
+    - msgList: a sequence of (time since start of recording (sec), line), in time order,
+        e.g. as returned by readRecording
+    - dispatcher: keyword dispatcher; if None then the TUI model's dispatcher is used
+    - speed: replay speed: 1 for the recorded speed, N for N times faster,
+        or 0 or None for as fast as possible
+    - callFunc: function to call when the replay finishes (or is cancelled);
+        it receives one argument: this replayer
+    - heartbeatInterval: interval between Tk event loop latency measurements (sec)
+    - maxBatchTime: maximum time to dispatch lines before giving Tk's event loop a chance to run (sec)
+
+    Call start to start replaying; the statistics are in the stats attribute.
+    """
+    def __init__(self,
+        msgList,
+        dispatcher = None,
+        speed = 1,
+        callFunc = None,
+        heartbeatInterval = 0.05,
+        maxBatchTime = 0.05,
+    ):
+        if dispatcher is None:
+            dispatcher = TUI.TUIModel.getModel().dispatcher
+        self.msgList = msgList
+        self.dispatcher = dispatcher
+        self.speed = float(speed or 0)
+        self.callFunc = callFunc
+        self.heartbeatInterval = float(heartbeatInterval)
+        self.maxBatchTime = float(maxBatchTime)
+        self.stats = None
+        self._nextInd = 0
+        self._replayTimer = Timer()
+        self._heartbeatTimer = Timer()
+        self._heartbeatDueTime = None
+
+    @property
+    def isDone(self):
+        return self.stats is not None and self.stats.endTime is not None
+
+    def start(self):
+        """Start (or restart) the replay
+        """
+        self._replayTimer.cancel()
+        self._heartbeatTimer.cancel()
+        self._nextInd = 0
+        self.stats = ReplayStats()
+        self._startHeartbeat()
+        self._replayTimer.start(0, self._replayNext)
+
+    def cancel(self):
+        """Stop the replay
+        """
+        if self.stats is None or self.isDone:
+            return
+        self._finish()
+
+    def _finish(self):
+        self._replayTimer.cancel()
+        self._heartbeatTimer.cancel()
+        self.stats.end()
+        if self.callFunc:
+            self.callFunc(self)
+
+    def _replayNext(self):
+        """Dispatch the lines that are due (up to maxBatchTime), then reschedule
+        """
+        stats = self.stats
+        batchStartTime = time.time()
+        batchEndTime = batchStartTime + self.maxBatchTime
+        numMsgs = len(self.msgList)
+        doRead = self.dispatcher.doRead
+        currTime = batchStartTime
+        while self._nextInd < numMsgs:
+            msgTime, msgStr = self.msgList[self._nextInd]
+            if self.speed > 0:
+                replayTime = (currTime - stats.startTime) * self.speed
+                if msgTime > replayTime:
+                    break
+                stats.maxLag = max(stats.maxLag, (replayTime - msgTime) / self.speed)
+            doRead(None, msgStr)
+            self._nextInd += 1
+            stats.numMsgs += 1
+            prevTime = currTime
+            currTime = time.time()
+            stats.dispatchTime += currTime - prevTime
+            if currTime > batchEndTime:
+                break
+
+        if self._nextInd >= numMsgs:
+            # let Tk catch up (e.g. run pending redraws) before recording the end
+            self._replayTimer.start(self.heartbeatInterval, self._finish)
+            return
+
+        if self.speed > 0:
+            nextTime = self.msgList[self._nextInd][0] / self.speed
+            delay = max(0.0, nextTime - (time.time() - stats.startTime))
+        else:
+            delay = 0.0
+        self._replayTimer.start(delay, self._replayNext)
+
+    def _startHeartbeat(self):
+        self._heartbeatDueTime = time.time() + self.heartbeatInterval
+        self._heartbeatTimer.start(self.heartbeatInterval, self._heartbeat)
+
+    def _heartbeat(self):
+        """Record the latency of the heartbeat timer and reschedule it
+        """
+        self.stats.latencyList.append(max(0.0, time.time() - self._heartbeatDueTime))
+        self._startHeartbeat()
+
+
+if __name__ == "__main__":
+    tuiModel = TUI.TUIModel.getModel(True)
+    msgList = [(ind * 0.01, "TU01.me 11 tcc i AxePos=%.3f, 45, NaN" % (ind * 0.001,)) for ind in range(500)]
+
+    def printReport(replayer):
+        print(replayer.stats.getReport())
+        tuiModel.tkRoot.quit()
+
+    replayer = HubReplayer(msgList, speed=2, callFunc=printReport)
+    replayer.start()
+    tuiModel.tkRoot.mainloop()
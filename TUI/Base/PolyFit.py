@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""Weighted least-squares polynomial fits, e.g. of FWHM vs. focus for the focus scripts.
+
+polyfitw has the interface of Mark Rivers' python version of George Lawrence's IDL polyfitw,
+but solves the least squares problem by QR decomposition of the weighted Vandermonde matrix
+of x shifted and scaled to [-1, 1], rather than by inverting the normal matrix of sums of powers of x.
+That avoids the loss of precision when x has a large offset from 0 (e.g. focus in microns,
+whose 4th powers exceed 1e13), and uses no python loops over data points or powers,
+so many fits can be computed at once by passing 2-d (or higher) arrays.
+"""
+__all__ = ["polyfitw"]
+
+import numpy
+
+_binomDict = {} # dict of m: array of binomial coefficients binom(k, j) indexed by [j, k]
+
+def _getBinomArr(m):
+    """Return an m x m array of binomial coefficients binom(k, j), indexed by [j, k]
+    """
+    binomArr = _binomDict.get(m)
+    if binomArr is None:
+        binomArr = numpy.zeros((m, m), dtype=float)
+        binomArr[0, :] = 1.0
+        for k in range(1, m):
+            binomArr[1:k+1, k] = binomArr[0:k, k-1] + binomArr[1:k+1, k-1]
+        _binomDict[m] = binomArr
+    return binomArr
+
+def _getTransformArr(xCenter, xScale, m):
+    """Return the matrix that converts polynomial coefficients for u = (x - xCenter) / xScale
+    to coefficients for x
+
+    Inputs:
+    - xCenter, xScale: arrays of shape [...]
+    - m: number of coefficients
+
+    Returns an array of shape [..., m, m] such that xCoeffs = transformArr . uCoeffs
+    (u^k = sum over j <= k of binom(k, j) (-xCenter)^(k-j) x^j / xScale^k).
+    """
+    powArr = numpy.arange(m)
+    diffPowArr = numpy.maximum(powArr[numpy.newaxis, :] - powArr[:, numpy.newaxis], 0) # k - j
+    negCenterArr = -xCenter[..., numpy.newaxis, numpy.newaxis]
+    scaleArr = xScale[..., numpy.newaxis, numpy.newaxis]
+    return _getBinomArr(m) * negCenterArr**diffPowArr / scaleArr**powArr
+
+def polyfitw(x, y, w, ndegree, return_fit=False):
+    """
+    Performs a weighted least-squares polynomial fit with optional error estimates.
+
+    Inputs:
+        x:
+            The independent variable vector.
+
+        y:
+            The dependent variable vector.  This vector should be the same
+            length as X.
+
+        w:
+            The vector of weights.  This vector should be same length as
+            X and Y.
+
+        ndegree:
+            The degree of polynomial to fit.
+
+        To compute several fits at once, x, y and w may be arrays of shape [..., n]
+        (or any shapes that broadcast to that); the outputs then have matching leading dimensions.
+
+    Outputs:
+        If return_fit is false (the default) then polyfitw returns only C, a vector of
+        coefficients of length ndegree+1.
+        If return_fit is true then polyfitw returns a tuple (c, yfit, yband, sigma, a)
+            yfit:
+            The vector of calculated Y's.  Has an error of + or - yband.
+
+            yband:
+            Error estimate for each point = 1 sigma.
+
+            sigma:
+            The standard deviation in Y units.
+
+            a:
+            Correlation matrix of the coefficients
+            (the inverse of the weighted normal matrix; multiply by sigma^2 for the covariance).
+
+    Raises numpy.linalg.LinAlgError if the fit is singular
+    (e.g. fewer than ndegree+1 distinct x values with nonzero weight).
+
+    Written by:  George Lawrence, LASP, University of Colorado,
+                    December, 1981 in IDL.
+                    Weights added, April, 1987,  G. Lawrence
+                    Fixed bug with checking number of params, November, 1998,
+                    Mark Rivers.
+                    Python version, May 2002, Mark Rivers
+    """
+    x, y, w = numpy.broadcast_arrays(
+        numpy.asarray(x, dtype=float),
+        numpy.asarray(y, dtype=float),
+        numpy.asarray(w, dtype=float),
+    )
+    n = x.shape[-1]
+    m = ndegree + 1             # number of elements in coeff vector
+
+    # shift and scale x to [-1, 1] so the columns of the Vandermonde matrix are of similar size
+    xMin = x.min(axis=-1)
+    xMax = x.max(axis=-1)
+    xCenter = (xMax + xMin) / 2.0
+    xScale = (xMax - xMin) / 2.0
+    xScale = numpy.where(xScale > 0.0, xScale, 1.0)
+    u = (x - xCenter[..., numpy.newaxis]) / xScale[..., numpy.newaxis]
+    vander = u[..., numpy.newaxis] ** numpy.arange(m) # shape [..., n, m]
+
+    # solve sqrt(w) vander . uCoeffs = sqrt(w) y by QR decomposition
+    sqrtW = numpy.sqrt(w)
+    q, r = numpy.linalg.qr(sqrtW[..., numpy.newaxis] * vander)
+    rDiag = numpy.abs(numpy.diagonal(r, axis1=-2, axis2=-1))
+    if numpy.any(rDiag <= max(n, m) * numpy.finfo(float).eps * rDiag.max(axis=-1, keepdims=True)):
+        raise numpy.linalg.LinAlgError("Singular matrix")
+    rInv = numpy.linalg.inv(r)
+    qty = numpy.matmul((sqrtW * y)[..., numpy.newaxis, :], q) # shape [..., 1, m]
+    uCoeffs = numpy.matmul(qty, numpy.swapaxes(rInv, -1, -2))[..., 0, :]
+
+    transformArr = _getTransformArr(xCenter, xScale, m)
+    c = numpy.matmul(transformArr, uCoeffs[..., numpy.newaxis])[..., 0]
+    if not return_fit:
+        return c         # exit if only fit coefficients are wanted
+
+    # compute optional output parameters.
+    yfit = numpy.matmul(vander, uCoeffs[..., numpy.newaxis])[..., 0]
+    var = numpy.sum((yfit-y)**2, axis=-1)/(n-m)  # variance estimate, unbiased
+    sigma = numpy.sqrt(var)
+
+    # the inverse of the normal matrix (for u) is rInv rInv^T, so yband^2 = var * |vander_i . rInv|^2
+    vanderRInv = numpy.matmul(vander, rInv)
+    yband = numpy.sqrt(numpy.sum(vanderRInv**2, axis=-1) * var[..., numpy.newaxis])
+    transformRInv = numpy.matmul(transformArr, rInv)
+    a = numpy.matmul(transformRInv, numpy.swapaxes(transformRInv, -1, -2))
+    return c, yfit, yband, sigma, a
+
+
+if __name__ == "__main__":
+    focPosArr = numpy.array([2900.0, 2950.0, 3000.0, 3050.0, 3100.0])
+    fwhmArr = 0.0001 * (focPosArr - 3020.0)**2 + numpy.array([1.1, 0.9, 1.0, 1.05, 0.95])
+    c, yfit, yband, sigma, a = polyfitw(focPosArr, fwhmArr, numpy.ones(len(focPosArr)), 2, True)
+    print("coeffs =", c)
+    print("best focus =", -c[1] / (2.0 * c[2]))
+    print("sigma =", sigma)
+    print("yband =", yband)
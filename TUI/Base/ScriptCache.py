@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""A cache of compiled user scripts, so script windows open (and reopen at startup) faster.
+
+getCode returns the compiled code for a script file. Code is cached in memory and on disk
+(in the directory returned by TUI.TUIPaths.getScriptCacheDir), keyed by the script's
+absolute path, modification time and size; a script is only compiled again if it changes.
+The cache is an optimization: if it cannot be read or written the script is simply compiled.
+"""
+__all__ = ["getCode", "clearCache"]
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+
+import TUI.TUIPaths
+
+# in-memory cache: dict of absolute path: ((mtime, size), code)
+_codeDict = {}
+# disk cache directory; None if not yet determined; "" if unavailable
+_cacheDir = None
+
+def _getCacheDir():
+    """Return the disk cache directory, creating it if necessary; return "" if unavailable
+    """
+    global _cacheDir
+    if _cacheDir is None:
+        try:
+            cacheDir = TUI.TUIPaths.getScriptCacheDir()
+            if not os.path.isdir(cacheDir):
+                os.makedirs(cacheDir)
+            _cacheDir = cacheDir
+        except Exception as e:
+            sys.stderr.write("Script cache disabled: %s\n" % (e,))
+            _cacheDir = ""
+    return _cacheDir
+
+def _getCachePath(cacheDir, fullPath):
+    """Return the path of the disk cache file for a script
+    """
+    pathHash = hashlib.sha1(fullPath.encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(cacheDir, "%s-%s.pyc" % (os.path.splitext(os.path.basename(fullPath))[0], pathHash[0:16]))
+
+def _readCache(cachePath, fullPath, key):
+    """Return code from a disk cache file, or None if missing or stale
+    """
+    try:
+        with open(cachePath, "rb") as cacheFile:
+            header = marshal.load(cacheFile)
+            if header != (importlib.util.MAGIC_NUMBER, fullPath) + key:
+                return None
+            return marshal.load(cacheFile)
+    except Exception:
+        return None
+
+def _writeCache(cachePath, fullPath, key, code):
+    """Write code to a disk cache file; errors are reported but otherwise ignored
+    """
+    tempPath = "%s.%s.tmp" % (cachePath, os.getpid())
+    try:
+        with open(tempPath, "wb") as cacheFile:
+            marshal.dump((importlib.util.MAGIC_NUMBER, fullPath) + key, cacheFile)
+            marshal.dump(code, cacheFile)
+        # replace atomically, so another TUI never reads a partial file
+        os.replace(tempPath, cachePath)
+    except Exception as e:
+        sys.stderr.write("Could not write script cache %r: %s\n" % (cachePath, e))
+        try:
+            os.remove(tempPath)
+        except OSError:
+            pass
+
+def getCode(filePath):
+    """Return the compiled code for a python script file
+
+    Inputs:
+    - filePath: path of script file
+
+    Raises OSError if the file cannot be read and SyntaxError if it cannot be compiled.
+    """
+    fullPath = os.path.abspath(filePath)
+    fileStat = os.stat(fullPath)
+    key = (fileStat.st_mtime_ns, fileStat.st_size)
+
+    cachedKey, code = _codeDict.get(fullPath, (None, None))
+    if cachedKey == key:
+        return code
+
+    cacheDir = _getCacheDir()
+    cachePath = _getCachePath(cacheDir, fullPath) if cacheDir else None
+    code = _readCache(cachePath, fullPath, key) if cachePath else None
+    if code is None:
+        with open(fullPath, "rb") as scriptFile:
+            source = scriptFile.read()
+        code = compile(source, fullPath, "exec", dont_inherit=True)
+        if cachePath:
+            _writeCache(cachePath, fullPath, key, code)
+    _codeDict[fullPath] = (key, code)
+    return code
+
+def clearCache():
+    """Clear the in-memory and disk caches
+    """
+    _codeDict.clear()
+    cacheDir = _getCacheDir()
+    if not cacheDir:
+        return
+    for fileName in os.listdir(cacheDir):
+        if fileName.endswith(".pyc"):
+            try:
+                os.remove(os.path.join(cacheDir, fileName))
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    import time
+    scriptPath = TUI.TUIPaths.getResourceDir("Scripts", "Telescope", "Pointing Data.py")
+    for desc in ("compile (or disk cache)", "memory cache"):
+        startTime = time.time()
+        getCode(scriptPath)
+        print("%s: %.2f msec" % (desc, (time.time() - startTime) * 1000))
+    _codeDict.clear()
+    startTime = time.time()
+    getCode(scriptPath)
+    print("disk cache: %.2f msec" % ((time.time() - startTime) * 1000,))
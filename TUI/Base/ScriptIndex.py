@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""A cache of the contents of script directories, for the Scripts menu.
+
+Listing a directory and testing whether each entry is a file or directory
+can be slow on network-mounted TUIAdditions directories, so ScriptIndex caches
+the listing of each directory and only lists a directory again if its modification time
+has changed (adding, removing or renaming an entry changes the modification time
+of the directory that contains it; editing a script does not, but that does not affect the menu).
+
+Checking the modification times can also be slow, so call startBackgroundRefresh
+to check them in a background thread; getListing then never blocks on a directory
+that has already been listed.
+"""
+__all__ = ["ScriptIndex", "DirListing", "getScriptIndex"]
+
+import os
+import sys
+import threading
+import time
+
+_theIndex = None
+
+def getScriptIndex():
+    """Return the shared script index, creating it if necessary
+    """
+    global _theIndex
+    if _theIndex is None:
+        _theIndex = ScriptIndex()
+    return _theIndex
+
+
+class DirListing(object):
+    """The scripts and subdirectories in one directory
+
+    Attributes:
+    - dirPath: path of directory
+    - mtime: modification time of directory (ns) when it was listed; None if it could not be listed
+    - scanTime: time at which the directory was listed (sec, as returned by time.time())
+    - itemDict: dict of script name (without the .py extension): full path
+    - subDict: dict of subdirectory name: full path
+    """
+    def __init__(self, dirPath):
+        self.dirPath = dirPath
+        self.scanTime = time.time()
+        self.itemDict = {}
+        self.subDict = {}
+        try:
+            self.mtime = os.stat(dirPath).st_mtime_ns
+            baseNameList = os.listdir(dirPath)
+        except OSError:
+            self.mtime = None
+            return
+
+        for baseName in baseNameList:
+            # reject files that would be invisible on unix
+            # and any directories named __pycache__.
+            if baseName.startswith("."):
+                continue
+            elif baseName == "__pycache__":
+                continue
+
+            baseBody, baseExt = os.path.splitext(baseName)
+
+            fullPath = os.path.normpath(os.path.join(dirPath, baseName))
+
+            if baseExt.lower() == ".py":
+                if os.path.isfile(fullPath):
+                    self.itemDict[baseBody] = fullPath
+            elif os.path.isdir(fullPath):
+                self.subDict[baseName] = fullPath
+
+    def isCurrent(self, mtime):
+        """Return True if this listing is current, given the directory's present modification time (ns)
+
+        A listing made less than 2 seconds after the directory was modified is not trusted,
+        since a later change may not alter a coarse-grained modification time.
+        """
+        if mtime != self.mtime:
+            return False
+        return mtime is None or self.scanTime - (mtime * 1.0e-9) > 2.0
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.dirPath)
+
+
+class ScriptIndex(object):
+    """Cache of DirListing objects, keyed by directory path
+
+    A listing is only replaced when its directory changes, so callers
+    can tell if a directory has changed by testing the identity of its listing.
+    """
+    def __init__(self):
+        self._listingDict = {} # dict of dirPath: DirListing
+        self._lock = threading.Lock()
+        self._refreshThread = None
+        self._stopEvent = threading.Event()
+
+    def getListing(self, dirPath):
+        """Return the DirListing for a directory
+
+        If the directory has not been listed then it is listed now;
+        otherwise the cached listing is returned (see refresh).
+        """
+        dirPath = os.path.normpath(dirPath)
+        with self._lock:
+            listing = self._listingDict.get(dirPath)
+        if listing is None:
+            listing = DirListing(dirPath)
+            with self._lock:
+                self._listingDict.setdefault(dirPath, listing)
+        return listing
+
+    def refresh(self):
+        """List again each cached directory that has changed; return a list of the changed paths
+
+        Directories that no longer exist are forgotten.
+        """
+        with self._lock:
+            listingList = list(self._listingDict.values())
+
+        changedPathList = []
+        for listing in listingList:
+            try:
+                mtime = os.stat(listing.dirPath).st_mtime_ns
+            except OSError:
+                mtime = None
+            if listing.isCurrent(mtime):
+                continue
+            newListing = DirListing(listing.dirPath)
+            if newListing.mtime is None:
+                with self._lock:
+                    self._listingDict.pop(listing.dirPath, None)
+            elif (newListing.itemDict, newListing.subDict) == (listing.itemDict, listing.subDict):
+                # contents unchanged; keep the old listing so callers see no change
+                listing.mtime = newListing.mtime
+                listing.scanTime = newListing.scanTime
+                continue
+            else:
+                with self._lock:
+                    self._listingDict[listing.dirPath] = newListing
+            changedPathList.append(listing.dirPath)
+        return changedPathList
+
+    def startBackgroundRefresh(self, interval=5.0):
+        """Call refresh every interval seconds in a background thread
+
+        Does nothing if already refreshing in the background.
+        """
+        if self._refreshThread and self._refreshThread.is_alive():
+            return
+        self._stopEvent.clear()
+        self._refreshThread = threading.Thread(
+            target = self._refreshLoop,
+            args = (float(interval),),
+            name = "ScriptIndex refresh",
+        )
+        self._refreshThread.daemon = True
+        self._refreshThread.start()
+
+    def stopBackgroundRefresh(self):
+        """Stop refreshing in the background
+        """
+        self._stopEvent.set()
+
+    def _refreshLoop(self, interval):
+        while not self._stopEvent.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # keep refreshing; a transient error (e.g. a network glitch) should not stop updates
+                sys.stderr.write("ScriptIndex refresh failed: %s\n" % (e,))
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    dirPath = tempfile.mkdtemp()
+    index = ScriptIndex()
+    print("listing =", index.getListing(dirPath).itemDict)
+    open(os.path.join(dirPath, "test.py"), "w").close()
+    os.mkdir(os.path.join(dirPath, "Sub"))
+    print("changed =", index.refresh())
+    print("listing =", index.getListing(dirPath).itemDict, index.getListing(dirPath).subDict)
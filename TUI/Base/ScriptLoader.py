@@ -13,8 +13,9 @@ import RO.Wdg
 from RO.StringUtil import strFromException
 import TUI.TUIPaths
 import TUI.TUIModel
+from . import ScriptCache
 
-__all__ = ("getScriptDirs", "ScriptLoader", "reopenScriptWindows", "ScriptWindowNamePrefix")
+__all__ = ("getScriptDirs", "ScriptLoader", "CachedScriptFileWdg", "reopenScriptWindows", "ScriptWindowNamePrefix")
 
 ScriptWindowNamePrefix = "ScriptNone"
 
@@ -38,6 +39,41 @@ def getScriptDirs():
     return scriptDirs
 
 
+class CachedScriptFileWdg(RO.Wdg.ScriptFileWdg):
+    """A ScriptFileWdg that gets the script's compiled code from TUI.Base.ScriptCache,
+    so the script is only compiled again if it has changed since it was last compiled
+    (even by a previous run of TUI).
+
+    Inputs are the same as RO.Wdg.ScriptFileWdg.
+    """
+    def _getScriptFuncs(self, isFirst=None):
+        """Return a dictionary containing either scriptClass
+        or one or more of initFunc, runFunc, endFunc;
+        it may also contain HelpURL.
+        """
+        scriptLocals = {"__file__": self.fullPath}
+        exec(ScriptCache.getCode(self.fullPath), scriptLocals)
+
+        retDict = {}
+        helpURL = scriptLocals.get("HelpURL")
+        if helpURL:
+            retDict["HelpURL"] = helpURL
+
+        scriptClass = scriptLocals.get("ScriptClass")
+        if scriptClass:
+            retDict["scriptClass"] = scriptClass
+            return retDict
+
+        for attrName in ("run", "init", "end"):
+            attr = scriptLocals.get(attrName)
+            if attr:
+                retDict["%sFunc" % attrName] = attr
+            elif attrName == "run":
+                raise RuntimeError("%r has no %s function" % (self.filename, attrName))
+
+        return retDict
+
+
 class ScriptLoader:
     """An object that will load a specific script when called
     """
@@ -82,7 +118,7 @@ class ScriptLoader:
 
     def makeWdg(self, master):
 #       print "ScriptLoader.makeWdg(%r); tlName=%s" % (master, tlName,)
-        return RO.Wdg.ScriptFileWdg(
+        return CachedScriptFileWdg(
             master=master,
             filename = self.fullPath,
             dispatcher = self.tuiModel.dispatcher,
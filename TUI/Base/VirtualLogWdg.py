@@ -0,0 +1,493 @@
+#!/usr/bin/env python
+"""A log widget that can display a very long list of log entries quickly.
+
+The entries to display are held as a list of sequence numbers of entries in a TUI.LogSource.LogStore
+(each element of the list is a "row"). Only the rows near the visible region are rendered
+into the Tk Text widget; more are rendered as the user scrolls. Thus changing the list of rows,
+scrolling, searching and tagging all take time that is independent of the number of rows.
+
+Lines are tagged with the store's tags for the entry (see TUI.LogSource.LogStore.getTags),
+a severity tag and the tags returned by lineTagFunc (if specified).
+"""
+import bisect
+import re
+import tkinter
+import RO.Constants
+import RO.Wdg
+import TUI.TUIModel
+
+__all__ = ["VirtualLogWdg"]
+
+SevTagPrefix = "sev_"
+
+# dict of severity: name of color preference; None for the default foreground color
+_SevColorPrefNameDict = {
+    RO.Constants.sevDebug: "Debug Color",
+    RO.Constants.sevNormal: None,
+    RO.Constants.sevWarning: "Warning Color",
+    RO.Constants.sevError: "Error Color",
+    RO.Constants.sevCritical: "Error Color",
+}
+
+class VirtualLogWdg(tkinter.Frame):
+    """A log widget that renders only the visible part of a long list of log entries
+
+    Useful attributes:
+    - text: the Text widget
+    - seqList: sequence numbers of the displayed log entries, in increasing order
+    - lineTagFunc: a function that returns extra tags for a line, or None;
+        see setLineTagFunc for details
+    """
+    def __init__(self,
+        master,
+        store,
+        maxLines = 20000,
+        marginLines = 100,
+        helpText = None,
+        helpURL = None,
+    **kargs):
+        """
+        Inputs:
+        - master: master widget
+        - store: log store; a TUI.LogSource.LogStore
+        - maxLines: the max number of log entries to display; older entries are discarded
+        - marginLines: number of lines to render above and below the visible lines
+        - helpText: help text for the text widget
+        - helpURL: URL of help for the text widget
+        - **kargs: additional keyword arguments for Frame
+        """
+        tkinter.Frame.__init__(self, master, **kargs)
+        self.store = store
+        self.maxLines = int(maxLines)
+        self.marginLines = int(marginLines)
+        self.seqList = []
+        self.lineTagFunc = None
+
+        # rows [self._renderStart, self._renderEnd) are rendered in the text widget
+        self._renderStart = 0
+        self._renderEnd = 0
+        # text widget line number (1-based) of the first line of each rendered row
+        self._lineList = []
+        # row most recently found by search or findLineTag; the starting point of the next search
+        self._navRow = None
+        self._renderPending = False
+
+        self.yscroll = tkinter.Scrollbar(
+            self,
+            orient = "vertical",
+            command = self._doScroll,
+        )
+        self.text = RO.Wdg.Text(
+            master = self,
+            yscrollcommand = self._textScrolled,
+            wrap = "word",
+            readOnly = True,
+            helpText = helpText,
+            helpURL = helpURL,
+        )
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.yscroll.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        prefs = TUI.TUIModel.getModel().prefs
+        for severity, prefName in _SevColorPrefNameDict.items():
+            colorPref = prefs.getPrefVar(prefName) if prefName else None
+            if colorPref:
+                def updSevColor(newColor, colorPrefVar=None, sevTag=self._getSevTag(severity)):
+                    self.text.tag_configure(sevTag, foreground=newColor)
+                colorPref.addCallback(updSevColor, callNow=True)
+
+    def appendSeqs(self, seqList):
+        """Append log entries to the end of the display
+
+        If the display was scrolled to the end, it remains scrolled to the end
+        (and the new entries are rendered), else the view does not change.
+
+        Inputs:
+        - seqList: sequence numbers of the new entries, in increasing order;
+            all must be larger than the last sequence number already displayed
+        """
+        if not seqList:
+            return
+        wasAtEnd = self.isScrolledToEnd()
+        self.seqList.extend(seqList)
+        self._trim()
+        if not wasAtEnd:
+            self._updScrollbar()
+            return
+
+        chunkLines = self._getChunkLines()
+        if len(self.seqList) - self._renderEnd > chunkLines:
+            self.scrollToEnd()
+            return
+        self._renderRows(self._renderEnd, len(self.seqList))
+        numExtra = self._renderEnd - self._renderStart - (chunkLines + self.marginLines)
+        if numExtra > 0:
+            # discard old rendered rows in batches, to reduce the number of deletions
+            self._dropRenderedRows(numExtra + self.marginLines)
+        self.text.see("end")
+
+    def clearOutput(self):
+        """Remove all entries from the display
+        """
+        self.seqList = []
+        self._navRow = None
+        self._render(0)
+
+    def findLineTag(self, tag, backwards=False):
+        """Show the next (or previous) entry that has the specified tag in its lineTagFunc tags
+
+        Inputs:
+        - tag: tag to search for
+        - backwards: search backwards?
+
+        Return True if found, else ring the bell and return False
+        """
+        if not self.lineTagFunc:
+            self.bell()
+            return False
+        lineTagFunc = self.lineTagFunc
+        for row in self._iterSearchRows(backwards):
+            tagSpanList = lineTagFunc(self.seqList[row])
+            if tagSpanList and any(tagSpan[0] == tag for tagSpan in tagSpanList):
+                self._navRow = row
+                self.showRow(row)
+                return True
+        self.bell()
+        return False
+
+    def getBottomRow(self):
+        """Return the index (in seqList) of the last visible row, or None if no rows
+        """
+        if not self.seqList:
+            return None
+        lineNum = int(self.text.index("@0,%d" % (self.text.winfo_height(),)).split(".")[0])
+        return self._getRowFromLine(lineNum)
+
+    def getSeverityTags(self, minSeverity):
+        """Return the list of severity tags for severities >= minSeverity
+        """
+        return [self._getSevTag(sev) for sev in _SevColorPrefNameDict if sev >= minSeverity]
+
+    def getTopRow(self):
+        """Return the index (in seqList) of the first visible row, or None if no rows
+        """
+        if not self.seqList:
+            return None
+        lineNum = int(self.text.index("@0,0").split(".")[0])
+        return self._getRowFromLine(lineNum)
+
+    def getTopSeq(self):
+        """Return the sequence number of the first visible entry, or None if no entries
+        """
+        row = self.getTopRow()
+        if row is None:
+            return None
+        return self.seqList[row]
+
+    def isScrolledToEnd(self):
+        """Return True if the last entry is visible (or there are no entries)
+        """
+        if self._renderEnd < len(self.seqList):
+            return False
+        return self.text.yview()[1] >= 1.0
+
+    def refreshLineTags(self, removeTags=()):
+        """Remove the specified tags from the rendered text, then reapply lineTagFunc to the rendered rows
+
+        Call this after changing the behavior of lineTagFunc.
+        """
+        for tag in removeTags:
+            self.text.tag_remove(tag, "1.0", "end")
+        if self.lineTagFunc:
+            for row in range(self._renderStart, self._renderEnd):
+                self._applyLineTags(row)
+
+    def scrollToEnd(self):
+        """Render the last entries and scroll to the end
+        """
+        self._render(len(self.seqList) - self._getChunkLines())
+        self.text.see("end")
+
+    def search(self, searchStr, backwards=False, noCase=True):
+        """Search for a regular expression; show and select the first match.
+
+        The search starts after (or before, if backwards) the most recent match
+        or, if none, the visible region.
+
+        Inputs:
+        - searchStr: regular expression to search for
+        - backwards: search backwards?
+        - noCase: ignore case?
+
+        Return True if found, else ring the bell and return False
+        """
+        if not searchStr:
+            return False
+        try:
+            compiledRegExp = re.compile(searchStr, re.I if noCase else 0)
+        except re.error:
+            self.bell()
+            return False
+        store = self.store
+        for row in self._iterSearchRows(backwards):
+            match = compiledRegExp.search(store.getStr(self.seqList[row]))
+            if match:
+                self._navRow = row
+                self.showRow(row)
+                startInd = self._getTextIndex(row, match.start())
+                endInd = self._getTextIndex(row, match.end())
+                self.text.tag_remove("sel", "1.0", "end")
+                self.text.tag_add("sel", startInd, endInd)
+                self.text.see(startInd)
+                return True
+        self.bell()
+        return False
+
+    def setLineTagFunc(self, lineTagFunc, removeTags=()):
+        """Set the function that supplies extra tags for each line and retag the rendered lines.
+
+        Inputs:
+        - lineTagFunc: a function that accepts one argument: a sequence number,
+            and returns a collection of (tag, startChar, endChar), where startChar and endChar
+            are character offsets into the line string (as returned by store.getStr),
+            or None for the start and end of the line. None to not add extra tags.
+            It is called often (as lines are rendered and searched), so it should be fast.
+        - removeTags: tags to remove from the rendered text before applying the new function
+        """
+        self.lineTagFunc = lineTagFunc
+        self.refreshLineTags(removeTags=removeTags)
+
+    def setSeqs(self, seqList, topSeq=None):
+        """Replace the displayed entries
+
+        Inputs:
+        - seqList: sequence numbers of the entries to display, in increasing order
+        - topSeq: the entry with this sequence number, or the next one displayed, is shown at the top;
+            if None then scroll to the end
+        """
+        self.seqList = list(seqList)
+        self._navRow = None
+        self._trim()
+        if topSeq is None:
+            self.scrollToEnd()
+            return
+        row = min(bisect.bisect_left(self.seqList, topSeq), max(0, len(self.seqList) - 1))
+        self._render(row - self.marginLines)
+        self._scrollRowToTop(row)
+
+    def setStore(self, store):
+        """Display entries from a different log store; clears the display
+
+        Inputs:
+        - store: log store; a TUI.LogSource.LogStore
+        """
+        self.store = store
+        self.clearOutput()
+
+    def showRow(self, row):
+        """Make the specified row (index into seqList) visible, rendering as needed
+        """
+        if self._needRender(row):
+            self._render(row - (self._getChunkLines() // 2))
+        self.text.see("%d.0" % (self._lineList[row - self._renderStart],))
+
+    def _applyLineTags(self, row):
+        """Apply tags from lineTagFunc to a rendered row
+        """
+        tagSpanList = self.lineTagFunc(self.seqList[row])
+        if not tagSpanList:
+            return
+        for tag, startChar, endChar in tagSpanList:
+            startInd = self._getTextIndex(row, startChar)
+            if endChar is None:
+                endInd = self._getTextIndex(row + 1, None)
+            else:
+                endInd = self._getTextIndex(row, endChar)
+            self.text.tag_add(tag, startInd, endInd)
+
+    def _doScroll(self, *args):
+        """Handle a scrollbar command
+
+        Scrollbar commands are ("moveto", fraction) or ("scroll", number, "units" or "pages")
+        """
+        if not self.seqList:
+            return
+        if args[0] == "moveto":
+            row = int(float(args[1]) * len(self.seqList))
+            row = max(0, min(row, len(self.seqList) - 1))
+            if self._needRender(row):
+                self._render(row - self.marginLines)
+            self._scrollRowToTop(row)
+        else:
+            self.text.yview(*args)
+
+    def _dropRenderedRows(self, numRows):
+        """Remove the first numRows rendered rows from the text widget
+        """
+        numRows = min(numRows, len(self._lineList))
+        if numRows <= 0:
+            return
+        if numRows == len(self._lineList):
+            self.text.delete("1.0", "end")
+            self._lineList = []
+        else:
+            firstKeptLine = self._lineList[numRows]
+            self.text.delete("1.0", "%d.0" % (firstKeptLine,))
+            self._lineList = [lineNum - (firstKeptLine - 1) for lineNum in self._lineList[numRows:]]
+        self._renderStart += numRows
+
+    def _getChunkLines(self):
+        """Return the number of rows to render: an overestimate of the number of visible rows plus margins
+        """
+        return 2 * self.marginLines + max(50, self.text.winfo_height() // 10)
+
+    def _getRowFromLine(self, lineNum):
+        """Return the row displayed on the specified line of the text widget
+        """
+        if not self._lineList:
+            return 0
+        ind = bisect.bisect_right(self._lineList, lineNum) - 1
+        return self._renderStart + max(0, min(ind, len(self._lineList) - 1))
+
+    def _getSevTag(self, severity):
+        """Return the tag for a given severity
+        """
+        return "%s%s" % (SevTagPrefix, severity)
+
+    def _getTextIndex(self, row, charOffset):
+        """Return the text widget index of a character of a rendered row
+
+        Inputs:
+        - row: a rendered row, or self._renderEnd for the end of the text
+        - charOffset: offset of character in the row's line string; None for the start of the row
+        """
+        if row >= self._renderEnd:
+            return "end - 1 chars"
+        lineNum = self._lineList[row - self._renderStart]
+        if not charOffset:
+            return "%d.0" % (lineNum,)
+        return "%d.0 + %d chars" % (lineNum, charOffset)
+
+    def _iterSearchRows(self, backwards):
+        """Return an iterator over the rows to search, from the starting point to the beginning or end
+        """
+        if not self.seqList:
+            return iter(())
+        if self._navRow is not None and 0 <= self._navRow < len(self.seqList):
+            startRow = self._navRow
+        elif backwards:
+            startRow = self.getBottomRow() + 1
+        else:
+            startRow = self.getTopRow() - 1
+        if backwards:
+            return iter(range(startRow - 1, -1, -1))
+        return iter(range(startRow + 1, len(self.seqList)))
+
+    def _needRender(self, row):
+        """Return True if rendering is required to show the specified row with a margin around it
+        """
+        halfMargin = self.marginLines // 2
+        if not (self._renderStart <= row < self._renderEnd):
+            return True
+        if self._renderStart > 0 and row < self._renderStart + halfMargin:
+            return True
+        return self._renderEnd < len(self.seqList) and row >= self._renderEnd - halfMargin
+
+    def _render(self, startRow):
+        """Render a chunk of rows starting at startRow (which is adjusted to be in range)
+        """
+        startRow = max(0, min(startRow, len(self.seqList) - self._getChunkLines()))
+        self.text.delete("1.0", "end")
+        self._renderStart = startRow
+        self._renderEnd = startRow
+        self._lineList = []
+        self._renderRows(startRow, min(len(self.seqList), startRow + self._getChunkLines()))
+
+    def _renderRows(self, startRow, endRow):
+        """Append rows [startRow, endRow) to the text widget; startRow must be self._renderEnd
+        """
+        store = self.store
+        insertArgs = []
+        lineNum = int(self.text.index("end - 1 chars").split(".")[0])
+        for row in range(startRow, endRow):
+            seq = self.seqList[row]
+            lineStr = store.getStr(seq)
+            tags = store.getTags(seq)
+            tags.append(self._getSevTag(store.getSeverity(seq)))
+            insertArgs += [lineStr, tuple(tags)]
+            self._lineList.append(lineNum)
+            lineNum += lineStr.count("\n")
+        if insertArgs:
+            self.text.insert("end", *insertArgs)
+        self._renderEnd = endRow
+        if self.lineTagFunc:
+            for row in range(startRow, endRow):
+                self._applyLineTags(row)
+        self._updScrollbar()
+
+    def _scheduleRender(self):
+        """Re-render around the visible region when next idle
+        """
+        if self._renderPending:
+            return
+        self._renderPending = True
+        self.after_idle(self._doScheduledRender)
+
+    def _doScheduledRender(self):
+        self._renderPending = False
+        topRow = self.getTopRow()
+        if topRow is None:
+            return
+        self._render(topRow - self.marginLines)
+        self._scrollRowToTop(topRow)
+
+    def _scrollRowToTop(self, row):
+        """Scroll so the specified rendered row is at the top
+        """
+        if not self._lineList:
+            return
+        self.text.yview("%d.0" % (self._lineList[row - self._renderStart],))
+
+    def _textScrolled(self, first, last):
+        """Handle the text widget's yscrollcommand: update the scrollbar and render more rows if needed
+        """
+        numRows = len(self.seqList)
+        if not numRows:
+            self.yscroll.set(0.0, 1.0)
+            return
+        first = float(first)
+        last = float(last)
+        numRendered = self._renderEnd - self._renderStart
+        topRow = self._renderStart + first * numRendered
+        bottomRow = self._renderStart + last * numRendered
+        self.yscroll.set(topRow / numRows, bottomRow / numRows)
+        halfMargin = self.marginLines // 2
+        if (self._renderStart > 0 and topRow < self._renderStart + halfMargin) \
+            or (self._renderEnd < numRows and bottomRow > self._renderEnd - halfMargin):
+            self._scheduleRender()
+
+    def _trim(self):
+        """Discard rows beyond maxLines and rows whose entries are no longer in the store
+        """
+        numToDrop = max(
+            len(self.seqList) - self.maxLines,
+            bisect.bisect_left(self.seqList, self.store.firstSeq),
+        )
+        if numToDrop <= 0:
+            return
+        del self.seqList[0:numToDrop]
+        if self._navRow is not None:
+            self._navRow = max(0, self._navRow - numToDrop)
+        self._renderStart -= numToDrop
+        self._renderEnd -= numToDrop
+        if self._renderEnd <= 0:
+            self._render(0)
+        elif self._renderStart < 0:
+            self._dropRenderedRows(-self._renderStart)
+
+    def _updScrollbar(self):
+        """Update the scrollbar based on the text widget's current view
+        """
+        self._textScrolled(*self.text.yview())
@@ -0,0 +1,696 @@
+#!/usr/bin/env python
+"""Shared scheduler for http file downloads (guide images and instrument images)
+
+All of TUI's image downloads go through one DownloadScheduler, which offers:
+- Per-host connection reuse: each worker thread keeps one HTTP/1.1 (keep-alive) connection
+  per host, so a stream of small images from the hub's http server does not pay
+  for a new TCP connection per file.
+- Bounded concurrency: at most maxConnections downloads run at once;
+  the rest wait in a queue.
+- Priorities: queued downloads are started in priority order (lowest value first),
+  then in the order they were requested. The standard priorities are, from most to least urgent:
+    - PriorityDisplay: an image that is displayed (or about to be), e.g. the current guide image
+    - PriorityCurrent: the current science image
+    - PriorityBackfill: older images, e.g. guide image history
+  The priority of a queued download may be changed (e.g. demoted to backfill
+  when a newer image arrives).
+- Cancellation: call abort on a Download to remove it from the queue or stop it while running;
+  the partial file is deleted.
+
+The data is transferred in worker threads; state changes are reported in the event loop
+by polling with a Timer, so callback functions are only called from the main thread.
+
+Download has the same interface as RO.Comm.HTTPGet.HTTPGet, so a Download may be used
+anywhere an HTTPGet is, including the Downloads window.
+
+To test against a local http server standing in for the hub's httpRoot, run this module.
+"""
+__all__ = ["Download", "DownloadScheduler", "getScheduler",
+    "PriorityDisplay", "PriorityCurrent", "PriorityBackfill"]
+
+import heapq
+import http.client
+import itertools
+import os
+import queue
+import threading
+import time
+import urllib.parse
+
+import RO.AddCallback
+import RO.StringUtil
+from RO.Comm.Generic import Timer
+
+PriorityDisplay = 0
+PriorityCurrent = 1
+PriorityBackfill = 2
+
+_ProgressInterval = 0.1 # minimum time between progress callbacks (sec)
+_ChunkSize = 65536 # number of bytes to read from the server at one time
+
+class Download(RO.AddCallback.BaseMixin):
+    """Download a url to a file using a DownloadScheduler.
+
+    Do not construct directly; use DownloadScheduler.getFile.
+
+    Inputs:
+    - scheduler: the DownloadScheduler
+    - fromURL: url of file to download
+    - toPath: full path of destination file
+    - isBinary: ignored; data is always written unchanged (accepted for compatibility with HTTPGet)
+    - overwrite: if True, overwrites the destination file if it exists;
+        otherwise the download fails if the file exists
+    - createDir: if True, creates any required directories;
+        otherwise the download fails if the directory does not exist
+    - doneFunc: function to call when the transfer completes
+    - stateFunc: function to call when state changes, including data received
+        (stateFunc will be called when the transfer ends)
+    - startNow: if True, the transfer is queued immediately;
+        otherwise the transfer remains Queued (but not scheduled) until start is called
+    - dispStr: a string to display while downloading the file;
+        if omitted, fromURL is displayed
+    - timeLim: time limit (sec) for the connection to be idle; if None then the scheduler's time limit
+    - priority: download priority; one of PriorityDisplay, PriorityCurrent or PriorityBackfill
+        (or any other integer; smaller is more urgent)
+
+    Callbacks receive one argument: this object.
+    """
+    # state constants
+    Queued = "Queued"
+    Connecting = "Connecting"
+    Running = "Running"
+    Aborting = "Aborting"
+    Done = "Done"
+    Aborted = "Aborted"
+    Failed = "Failed"
+
+    _AllStates = set((
+        Queued,
+        Connecting,
+        Running,
+        Aborting,
+        Done,
+        Aborted,
+        Failed,
+    ))
+    _AbortableStates = set((Queued, Connecting, Running))
+    _DoneStates = set((Done, Aborted, Failed))
+    _FailedStates = set((Aborted, Failed))
+
+    StateStrMaxLen = max(len(stateStr) for stateStr in _AllStates)
+
+    def __init__(self,
+        scheduler,
+        fromURL,
+        toPath,
+        isBinary = False,
+        overwrite = False,
+        createDir = True,
+        doneFunc = None,
+        stateFunc = None,
+        startNow = True,
+        dispStr = None,
+        timeLim = None,
+        priority = PriorityCurrent,
+    ):
+        self._scheduler = scheduler
+        self.fromURL = fromURL
+        self.toPath = toPath
+        self.isBinary = isBinary
+        self.overwrite = bool(overwrite)
+        self.createDir = createDir
+        self.timeLim = timeLim
+        if dispStr is None:
+            self.dispStr = fromURL
+        else:
+            self.dispStr = dispStr
+        self.priority = priority
+
+        self._state = self.Queued
+        self._errMsg = None
+        self._readBytes = 0
+        self._totBytes = None
+        self._isStarted = False
+        self._abortEvent = threading.Event()
+        # heap entry [priority, sequence number, self] while in the scheduler's queue, else None;
+        # managed by the scheduler
+        self._heapEntry = None
+
+        RO.AddCallback.BaseMixin.__init__(self, stateFunc, callNow=False)
+        self._doneCallbacks = []
+        if doneFunc:
+            self.addDoneCallback(doneFunc)
+
+        if startNow:
+            self.start()
+
+    def addDoneCallback(self, func):
+        """Add a function that will be called when the transfer completes"""
+        self._doneCallbacks.append(func)
+
+    def removeDoneCallback(self, func):
+        """Remove a done callback.
+        """
+        self._doneCallbacks.remove(func)
+
+    def start(self):
+        """Queue the download with the scheduler.
+
+        Unlike HTTPGet.start, it is not an error to call this more than once
+        (so the Downloads window may "start" a download the scheduler has not yet started);
+        the extra calls are ignored.
+        """
+        if self._isStarted or self.isDone:
+            return
+        self._isStarted = True
+        self._scheduler._enqueue(self)
+
+    def abort(self):
+        """Cancel the download and delete the output file.
+
+        If the download is queued it is removed from the queue;
+        if it is running it is stopped as soon as the next chunk of data arrives.
+        Silently does nothing if the download has already finished.
+        """
+        if self.isDone:
+            return
+        self._scheduler._abort(self)
+
+    def setPriority(self, priority):
+        """Set the priority of the download.
+
+        Has no effect on a download that is running or finished.
+        """
+        self._scheduler._setPriority(self, priority)
+
+    @property
+    def errMsg(self):
+        """If the transfer failed, an explanation as a string, else None
+        """
+        return self._errMsg
+
+    @property
+    def state(self):
+        """Returns the current state as a string.
+        """
+        return self._state
+
+    @property
+    def isAbortable(self):
+        """True if the transaction can be aborted
+        """
+        return self._state in self._AbortableStates
+
+    @property
+    def isDone(self):
+        """Return True if the transaction is finished (succeeded, aborted or failed), False otherwise.
+        """
+        return self._state in self._DoneStates
+
+    @property
+    def didFail(self):
+        """Return True if the transaction failed or was aborted
+        """
+        return self._state in self._FailedStates
+
+    @property
+    def readBytes(self):
+        """Bytes read so far
+        """
+        return self._readBytes
+
+    @property
+    def totBytes(self):
+        """Total bytes in file, if known, None otherwise.
+        """
+        return self._totBytes
+
+    def _setState(self, newState, errMsg=None):
+        """Set a new state and call callbacks.
+
+        Do nothing if already done. errMsg is ignored unless newState is Failed.
+        Only call from the main thread.
+        """
+        if self.isDone:
+            return
+        if newState not in self._AllStates:
+            raise RuntimeError("Unknown state %r" % (newState,))
+
+        self._state = newState
+        if newState == self.Failed:
+            self._errMsg = errMsg
+
+        self._doCallbacks()
+        if self.isDone:
+            # use a copy in case a callback deregisters itself
+            for func in self._doneCallbacks[:]:
+                RO.AddCallback.safeCall2(str(self), func, self)
+
+            self._removeAllCallbacks()
+            self._doneCallbacks = []
+
+    def __str__(self):
+        return "%s(%s)" % (self.__class__.__name__, self.fromURL)
+
+
+class _DownloadAborted(Exception):
+    """Raised in a worker thread when a running download is aborted"""
+    pass
+
+
+class DownloadScheduler(object):
+    """Run downloads in priority order using a bounded pool of worker threads
+    that reuse http connections.
+    """
+    PollInterval = 0.05 # interval at which to report the state of running downloads (sec)
+    def __init__(self, maxConnections=4, timeLim=60):
+        """Inputs:
+        - maxConnections: maximum number of simultaneous downloads
+            (and thus the maximum number of connections to any one host)
+        - timeLim: default time limit (sec) for a connection to be idle
+        """
+        if maxConnections < 1:
+            raise ValueError("maxConnections=%r; must be >= 1" % (maxConnections,))
+        self.maxConnections = int(maxConnections)
+        self.timeLim = timeLim
+
+        self._lock = threading.Condition()
+        self._heap = [] # queued downloads: [priority, sequence number, download or None if removed]
+        self._seqCounter = itertools.count()
+        self._numQueued = 0
+        self._numIdleWorkers = 0
+        self._workerList = []
+        self._isShutdown = False
+
+        # events reported by worker threads: (download, newState, errMsg); newState = None for progress
+        self._eventQueue = queue.Queue()
+        self._runningSet = set() # downloads that have been taken by a worker and are not done
+        self._pollTimer = Timer()
+
+    def getFile(self, *args, **kargs):
+        """Create and (by default) queue a download.
+
+        Inputs: the same as for Download (but omit scheduler)
+
+        Returns a Download
+        """
+        return Download(self, *args, **kargs)
+
+    @property
+    def numQueued(self):
+        """Number of downloads waiting for a worker"""
+        return self._numQueued
+
+    @property
+    def numRunning(self):
+        """Number of downloads being transferred (including those being aborted)"""
+        return len(self._runningSet)
+
+    def shutdown(self):
+        """Abort all downloads and stop the worker threads (without waiting for them)
+        """
+        with self._lock:
+            queuedList = [entry[2] for entry in self._heap if entry[2] is not None]
+            runningList = list(self._runningSet)
+        for download in queuedList + runningList:
+            download.abort()
+        with self._lock:
+            self._isShutdown = True
+            self._lock.notify_all()
+        self._poll()
+
+    def _enqueue(self, download):
+        """Add a download to the queue; start a worker thread if needed
+        """
+        with self._lock:
+            if self._isShutdown:
+                raise RuntimeError("Download scheduler has been shut down")
+            self._push(download)
+            if self._numIdleWorkers < self._numQueued and len(self._workerList) < self.maxConnections:
+                worker = threading.Thread(
+                    target = self._work,
+                    name = "DownloadScheduler-%d" % (len(self._workerList) + 1,),
+                )
+                worker.daemon = True
+                self._workerList.append(worker)
+                worker.start()
+            self._lock.notify()
+        if not self._pollTimer.isActive:
+            self._pollTimer.start(self.PollInterval, self._poll)
+
+    def _push(self, download):
+        """Push a download onto the heap; the caller must hold the lock
+        """
+        heapEntry = [download.priority, next(self._seqCounter), download]
+        download._heapEntry = heapEntry
+        heapq.heappush(self._heap, heapEntry)
+        self._numQueued += 1
+
+    def _remove(self, download):
+        """Remove a download from the heap, if present; the caller must hold the lock.
+
+        Return True if the download was removed, False if not queued.
+        The entry is left on the heap but marked as removed (by setting the download to None),
+        which is much faster than removing it.
+        """
+        heapEntry = download._heapEntry
+        if heapEntry is None:
+            return False
+        heapEntry[2] = None
+        download._heapEntry = None
+        self._numQueued -= 1
+        return True
+
+    def _setPriority(self, download, priority):
+        """Change the priority of a download
+        """
+        with self._lock:
+            download.priority = priority
+            if self._remove(download):
+                self._push(download)
+
+    def _abort(self, download):
+        """Abort a download; only call from the main thread
+        """
+        with self._lock:
+            wasQueued = self._remove(download)
+            if not wasQueued:
+                download._abortEvent.set()
+        if wasQueued or not download._isStarted:
+            # not started or still in the queue; no worker has it
+            download._setState(download.Aborted)
+        elif download.state != download.Aborting:
+            download._setState(download.Aborting)
+
+    def _poll(self):
+        """Report events from the worker threads; keep polling while there are downloads
+        """
+        while True:
+            try:
+                download, newState, errMsg = self._eventQueue.get_nowait()
+            except queue.Empty:
+                break
+            if newState is None:
+                if not download.isDone:
+                    download._doCallbacks()
+                continue
+            if newState in download._DoneStates:
+                self._runningSet.discard(download)
+            elif newState == download.Connecting:
+                self._runningSet.add(download)
+            if download.state == download.Aborting and newState not in download._DoneStates:
+                # the worker has not yet noticed the abort
+                continue
+            download._setState(newState, errMsg)
+
+        with self._lock:
+            isBusy = self._numQueued > 0 or bool(self._runningSet) or not self._eventQueue.empty()
+        if isBusy:
+            self._pollTimer.start(self.PollInterval, self._poll)
+
+    def _work(self):
+        """Worker thread: run downloads until the scheduler is shut down
+        """
+        connDict = dict() # dict of (scheme, netloc): http.client.HTTPConnection
+        try:
+            while True:
+                with self._lock:
+                    download = None
+                    self._numIdleWorkers += 1
+                    while not self._isShutdown:
+                        while self._heap and self._heap[0][2] is None:
+                            heapq.heappop(self._heap)
+                        if self._heap:
+                            download = heapq.heappop(self._heap)[2]
+                            download._heapEntry = None
+                            self._numQueued -= 1
+                            break
+                        self._lock.wait()
+                    self._numIdleWorkers -= 1
+                    if download is None:
+                        return
+                    # report Connecting while holding the lock, so _poll knows the download is running
+                    self._eventQueue.put((download, download.Connecting, None))
+                self._runDownload(download, connDict)
+        finally:
+            for conn in connDict.values():
+                conn.close()
+
+    def _runDownload(self, download, connDict):
+        """Transfer one download in a worker thread and report the outcome
+        """
+        createdFile = False
+        try:
+            self._toPrep(download)
+            if download._abortEvent.is_set():
+                raise _DownloadAborted()
+            response = self._request(download, connDict)
+            if response.status != 200:
+                response.read()
+                raise RuntimeError("%s %s" % (response.status, response.reason))
+
+            totBytes = response.getheader("Content-Length")
+            download._totBytes = int(totBytes) if totBytes is not None else None
+            self._eventQueue.put((download, download.Running, None))
+            lastReportTime = time.time()
+            with open(download.toPath, "wb") as toFile:
+                createdFile = True
+                while True:
+                    if download._abortEvent.is_set():
+                        raise _DownloadAborted()
+                    data = response.read(_ChunkSize)
+                    if not data:
+                        break
+                    toFile.write(data)
+                    download._readBytes += len(data)
+                    currTime = time.time()
+                    if currTime - lastReportTime > _ProgressInterval:
+                        self._eventQueue.put((download, None, None))
+                        lastReportTime = currTime
+            if download._totBytes is not None and download._readBytes < download._totBytes:
+                raise RuntimeError("Connection closed after %d of %d bytes" % \
+                    (download._readBytes, download._totBytes))
+        except Exception as e:
+            # the connection may be part way through a response; do not reuse it
+            conn = connDict.pop(self._getConnKey(download.fromURL), None)
+            if conn is not None:
+                conn.close()
+            if createdFile:
+                try:
+                    os.remove(download.toPath)
+                except OSError:
+                    pass
+            if isinstance(e, _DownloadAborted):
+                self._eventQueue.put((download, download.Aborted, None))
+            else:
+                self._eventQueue.put((download, download.Failed, RO.StringUtil.strFromException(e)))
+            return
+        self._eventQueue.put((download, download.Done, None))
+
+    def _getConnKey(self, url):
+        """Return the connection dict key for a url: (scheme, netloc)
+        """
+        urlParts = urllib.parse.urlsplit(url)
+        return (urlParts.scheme.lower(), urlParts.netloc.lower())
+
+    def _request(self, download, connDict):
+        """Send a GET request for a download and return the response
+
+        Reuses this worker's connection to the host, if it has one;
+        if that connection was closed by the server, retries once using a new connection.
+        """
+        urlParts = urllib.parse.urlsplit(download.fromURL)
+        connKey = (urlParts.scheme.lower(), urlParts.netloc.lower())
+        if connKey[0] == "http":
+            connClass = http.client.HTTPConnection
+        elif connKey[0] == "https":
+            connClass = http.client.HTTPSConnection
+        else:
+            raise RuntimeError("Unsupported url %r; must start with http:// or https://" % (download.fromURL,))
+        path = urllib.parse.quote(urlParts.path or "/", safe="/%:@!$&'()*+,;=~")
+        if urlParts.query:
+            path = "%s?%s" % (path, urlParts.query)
+        timeLim = download.timeLim if download.timeLim is not None else self.timeLim
+
+        conn = connDict.get(connKey)
+        isReused = conn is not None
+        if not isReused:
+            conn = connClass(urlParts.netloc, timeout=timeLim)
+            connDict[connKey] = conn
+        else:
+            conn.timeout = timeLim
+            if conn.sock is not None:
+                conn.sock.settimeout(timeLim)
+        try:
+            conn.request("GET", path)
+            return conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+            conn.close()
+            if not isReused:
+                raise
+        # the server closed the idle connection; try once more with a new one
+        conn = connClass(urlParts.netloc, timeout=timeLim)
+        connDict[connKey] = conn
+        conn.request("GET", path)
+        return conn.getresponse()
+
+    def _toPrep(self, download):
+        """Create or verify the existence of the output directory
+        and check if output file already exists.
+
+        Raise RuntimeError if anything is wrong.
+        """
+        if not download.overwrite and os.path.exists(download.toPath):
+            raise RuntimeError("toPath %r already exists" % (download.toPath,))
+
+        toDir = os.path.dirname(download.toPath)
+        if toDir:
+            if not os.path.exists(toDir):
+                if download.createDir:
+                    os.makedirs(toDir, exist_ok=True)
+                else:
+                    raise RuntimeError("directory %r does not exist" % (toDir,))
+            elif not os.path.isdir(toDir):
+                raise RuntimeError("%r is a file, not a directory" % (toDir,))
+
+
+_theScheduler = None
+
+def getScheduler():
+    """Obtain the shared download scheduler (creating it if necessary)
+    """
+    global _theScheduler
+    if _theScheduler is None:
+        _theScheduler = DownloadScheduler()
+    return _theScheduler
+
+
+if __name__ == "__main__":
+    # Download files from a local http server standing in for the hub's httpRoot
+    # and check that a burst of downloads reuses a few connections, that a displayed image
+    # jumps the queue ahead of backfill, and that aborted downloads leave no file behind.
+    # Exits with status 1 if a check fails.
+    import functools
+    import http.server
+    import shutil
+    import socketserver
+    import sys
+    import tempfile
+    import RO.Wdg
+
+    NumFiles = 30
+    FileBytes = 200000
+    NumConnections = 3
+    TimeLimit = 60 # sec
+
+    connSet = set()
+    class HubHTTPHandler(http.server.SimpleHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # support keep-alive, as the hub's server does
+        def handle(self):
+            connSet.add(self.client_address)
+            try:
+                http.server.SimpleHTTPRequestHandler.handle(self)
+            except ConnectionError:
+                # the client aborted the download
+                pass
+        def copyfile(self, source, outputfile):
+            # dribble the data out so the test takes long enough to reorder and abort downloads
+            while True:
+                data = source.read(_ChunkSize)
+                if not data:
+                    break
+                outputfile.write(data)
+                time.sleep(0.02)
+        def log_message(self, *args):
+            pass
+
+    fromDir = tempfile.mkdtemp(prefix="httpRoot")
+    toDir = tempfile.mkdtemp(prefix="downloads")
+    for ii in range(NumFiles):
+        with open(os.path.join(fromDir, "proc-g%04d.fits" % (ii,)), "wb") as f:
+            f.write(os.urandom(FileBytes))
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0),
+        functools.partial(HubHTTPHandler, directory=fromDir))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    httpRoot = "http://127.0.0.1:%d/" % (server.server_address[1],)
+
+    root = RO.Wdg.PythonTk()
+    root.withdraw()
+    scheduler = DownloadScheduler(maxConnections=NumConnections)
+    doneList = []
+    failList = []
+    startTime = time.time()
+
+    def doneFunc(download):
+        doneList.append(download)
+        print("%6.3f %-8s %s %s" % (time.time() - startTime, download.state,
+            download.dispStr, download.errMsg or ""))
+        if len(doneList) == NumFiles:
+            checkResults()
+
+    def checkResults():
+        for download in doneList:
+            fileExists = os.path.exists(download.toPath)
+            if download in abortList:
+                if download.state != download.Aborted:
+                    failList.append("%s was aborted but its state is %s" % (download.dispStr, download.state))
+                if fileExists:
+                    failList.append("%s was aborted but the file exists" % (download.dispStr,))
+            elif download.state != download.Done:
+                failList.append("%s %s: %s" % (download.dispStr, download.state, download.errMsg))
+            elif not fileExists or os.path.getsize(download.toPath) != FileBytes:
+                failList.append("%s is missing or the wrong size" % (download.toPath,))
+        finishedList = [download for download in doneList if download not in abortList]
+        displayInd = finishedList.index(downloadList[-1])
+        print("%d downloads used %d connections; the displayed image finished #%d of %d" % \
+            (NumFiles, len(connSet), displayInd + 1, len(finishedList)))
+        # aborting the running download closes its connection, so one more may be opened
+        maxConnections = NumConnections + 1
+        if len(connSet) > maxConnections:
+            failList.append("used %d connections; expected at most %d" % (len(connSet), maxConnections))
+        # only downloads already running when the image was displayed should finish before it
+        if displayInd > NumConnections:
+            failList.append("the displayed image finished #%d; it should be at most #%d" % \
+                (displayInd + 1, NumConnections + 1))
+        finish()
+
+    def timedOut():
+        failList.append("only %d of %d downloads finished in %s sec" % (len(doneList), NumFiles, TimeLimit))
+        finish()
+
+    def finish():
+        scheduler.shutdown()
+        shutil.rmtree(fromDir)
+        shutil.rmtree(toDir)
+        root.quit()
+
+    downloadList = []
+    for ii in range(NumFiles):
+        fileName = "proc-g%04d.fits" % (ii,)
+        downloadList.append(scheduler.getFile(
+            fromURL = httpRoot + fileName,
+            toPath = os.path.join(toDir, fileName),
+            isBinary = True,
+            doneFunc = doneFunc,
+            dispStr = fileName,
+            priority = PriorityBackfill,
+        ))
+    # a new image is displayed; it should be downloaded next
+    downloadList[-1].setPriority(PriorityDisplay)
+    # abort one queued download and one running download (once it has received some data)
+    abortList = [downloadList[-2], downloadList[0]]
+    downloadList[-2].abort()
+    def abortWhenRunning(download):
+        if download.readBytes > 0:
+            download.abort()
+    downloadList[0].addCallback(abortWhenRunning)
+    root.after(TimeLimit * 1000, timedOut)
+
+    root.mainloop()
+    if failList:
+        print("FAILED:")
+        for msg in failList:
+            print("  " + msg)
+        sys.exit(1)
+    print("All checks passed")
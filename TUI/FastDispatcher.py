@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+"""Keyword dispatcher with an optimized dispatch mode and a callback profiler
+
+FastDispatcher is a drop-in replacement for RO.KeyDispatcher.KeyDispatcher.
+By default it dispatches exactly as KeyDispatcher does.
+
+In optimized mode (optimize=True; TUI sets this from the "Fast Dispatch" preference) dispatch:
+- Looks up the keyword variables for each (actor, keyword) in a precompiled table,
+  which is rebuilt as keyword variables are added or removed.
+  Keywords nobody listens to are dropped after one dictionary lookup.
+- Skips converting the values of a keyword variable when they are the same as the values
+  it was last set to by this dispatcher (as is true of most status keywords while tracking):
+  the previously converted values are reused (each set gets a new copy of the value list,
+  so callbacks that modify the list cannot corrupt the saved values);
+  the variable's message, time stamp and current flag are updated
+  and its callbacks are called as usual.
+
+Warning: optimized mode sets plain RO.KeyVariable.KeyVar objects directly,
+using the private attributes and methods of KeyVar (_valueList, _countValues, _doCallbacks...)
+rather than calling KeyVar.set. It must be checked whenever RO is updated,
+and is disabled if RO's KeyVar lacks the methods it uses.
+
+While profiling (see startProfile) the dispatcher records, for each keyword variable,
+the time spent converting values and the time spent in each callback function.
+Call getProfileReport (e.g. from the Python window) to see which callbacks dominate:
+    import TUI.TUIModel
+    disp = TUI.TUIModel.getModel().dispatcher
+    disp.startProfile()
+    # ...wait a while...
+    print(disp.getProfileReport())
+"""
+__all__ = ["FastDispatcher", "DispatchProfiler"]
+
+import sys
+import time
+import traceback
+import RO.AddCallback
+import RO.KeyDispatcher
+import RO.KeyVariable
+
+# can optimized mode be used with this version of RO?
+_CanOptimize = all(hasattr(RO.KeyVariable.KeyVar, name)
+    for name in ("_countValues", "_convertValueFromList", "_doCallbacks"))
+
+def _funcDescr(func):
+    """Return a description of a callback function, e.g. module.Class.method
+
+    Closures (e.g. the functions made by KeyVar.addIndexedCallback)
+    are described along with the callable objects they call.
+    """
+    if hasattr(func, "__self__") and hasattr(func, "__func__"):
+        # bound method
+        return "%s.%s" % (func.__func__.__module__, func.__func__.__qualname__)
+    qualName = getattr(func, "__qualname__", None)
+    if qualName is None:
+        # callable object
+        return "%s.%s instance" % (type(func).__module__, type(func).__qualname__)
+    descr = "%s.%s" % (getattr(func, "__module__", "?"), qualName)
+    innerDescrList = []
+    for cell in getattr(func, "__closure__", None) or ():
+        try:
+            cellContents = cell.cell_contents
+        except ValueError:
+            continue
+        if callable(cellContents):
+            innerDescrList.append(_funcDescr(cellContents))
+    if innerDescrList:
+        descr = "%s(%s)" % (descr, ", ".join(innerDescrList))
+    return descr
+
+
+class DispatchProfiler(object):
+    """Cumulative time spent handling each keyword variable and callback function
+
+    Each entry is keyed by (keyVar description, item), where item is
+    "set" for the time spent setting the variable (converting values and, for keyword
+    variables that are not plain RO.KeyVariable.KeyVar, calling the callbacks)
+    or a description of a callback function.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear all data"""
+        self.startTime = time.time()
+        self.nMsgs = 0
+        self.dispatchTime = 0.0
+        self.nCnvSkipped = 0
+        self._dataDict = {} # key=(keyVar descr, item); value=[num calls, total time]
+        self._funcDescrDict = {} # cache of callback function descriptions; key=func
+
+    def addDispatch(self, dt):
+        """Record the time to dispatch one message"""
+        self.nMsgs += 1
+        self.dispatchTime += dt
+
+    def addTime(self, keyVar, item, dt):
+        """Record time spent on an item of a keyword variable
+
+        Inputs:
+        - keyVar: keyword variable
+        - item: "set" or a callback function
+        - dt: time spent (sec)
+        """
+        if item != "set":
+            funcDescr = self._funcDescrDict.get(item)
+            if funcDescr is None:
+                funcDescr = _funcDescr(item)
+                self._funcDescrDict[item] = funcDescr
+            item = funcDescr
+        entry = self._dataDict.get((str(keyVar), item))
+        if entry is None:
+            self._dataDict[(str(keyVar), item)] = [1, dt]
+        else:
+            entry[0] += 1
+            entry[1] += dt
+
+    def getData(self):
+        """Return the data as a list of (total time, num calls, keyVar descr, item),
+        sorted by decreasing total time
+        """
+        dataList = [(totTime, nCalls, keyVarDescr, item)
+            for (keyVarDescr, item), (nCalls, totTime) in self._dataDict.items()]
+        dataList.sort(reverse=True)
+        return dataList
+
+    def getReport(self, maxLines=30):
+        """Return a report of where the time is going, as a string
+
+        Inputs:
+        - maxLines: maximum number of keyword variable/callback entries
+        """
+        elapsedTime = time.time() - self.startTime
+        lineList = [
+            "Dispatched %d messages in %.3f sec (%.1f%% of %.1f sec elapsed); %d conversions skipped" % \
+                (self.nMsgs, self.dispatchTime, 100.0 * self.dispatchTime / max(elapsedTime, 1.0e-9),
+                elapsedTime, self.nCnvSkipped),
+            "%10s %8s %10s  %s" % ("Total (ms)", "Calls", "Mean (ms)", "KeyVar: set or callback"),
+        ]
+        for totTime, nCalls, keyVarDescr, item in self.getData()[0:maxLines]:
+            lineList.append("%10.1f %8d %10.3f  %s: %s" % \
+                (totTime * 1000.0, nCalls, totTime * 1000.0 / nCalls, keyVarDescr, item))
+        return "\n".join(lineList)
+
+
+class FastDispatcher(RO.KeyDispatcher.KeyDispatcher):
+    """A keyword dispatcher with an optimized dispatch mode and a callback profiler
+
+    Inputs are the same as for RO.KeyDispatcher.KeyDispatcher, plus:
+    - optimize: use optimized dispatch mode? (see the module documentation);
+        ignored if this version of RO does not support it
+    """
+    def __init__(self,
+        name = "KeyDispatcher",
+        connection = None,
+        logFunc = None,
+        optimize = False,
+    ):
+        self.optimize = False
+        self.profiler = None
+        # key=(actor, keyword) as received; value=tuple of keyword variables
+        self._dispatchTable = {}
+        # key=keyVar; value=(raw values, tuple of converted values, value list) from the most recent set
+        self._rawValueDict = {}
+        self.setOptimize(optimize)
+        RO.KeyDispatcher.KeyDispatcher.__init__(self,
+            name = name,
+            connection = connection,
+            logFunc = logFunc,
+        )
+
+    def addKeyVar(self, keyVar):
+        """Add a keyword variable; see RO.KeyDispatcher.KeyDispatcher.addKeyVar
+        """
+        RO.KeyDispatcher.KeyDispatcher.addKeyVar(self, keyVar)
+        self._dispatchTable = {}
+
+    def removeKeyVar(self, keyVar):
+        """Remove a keyword variable; see RO.KeyDispatcher.KeyDispatcher.removeKeyVar
+        """
+        retVal = RO.KeyDispatcher.KeyDispatcher.removeKeyVar(self, keyVar)
+        self._dispatchTable = {}
+        self._rawValueDict.pop(keyVar, None)
+        return retVal
+
+    def setOptimize(self, optimize):
+        """Enable or disable optimized dispatch mode
+
+        Optimized mode is never enabled if this version of RO does not support it.
+        """
+        self.optimize = bool(optimize) and _CanOptimize
+        self._rawValueDict = {}
+
+    def startProfile(self):
+        """Start (or restart) profiling dispatch; clears existing profile data
+        """
+        self.profiler = DispatchProfiler()
+
+    def stopProfile(self):
+        """Stop profiling dispatch and return the profiler (None if not profiling)
+        """
+        profiler = self.profiler
+        self.profiler = None
+        return profiler
+
+    def getProfileReport(self, maxLines=30):
+        """Return a profile report as a string; see DispatchProfiler.getReport
+        """
+        if self.profiler is None:
+            return "Not profiling; call startProfile first"
+        return self.profiler.getReport(maxLines=maxLines)
+
+    def dispatch(self, msgDict):
+        """Updates the appropriate entries based on the supplied message data.
+
+        See RO.KeyDispatcher.KeyDispatcher.dispatch for details.
+        """
+        if not self.optimize and self.profiler is None:
+            RO.KeyDispatcher.KeyDispatcher.dispatch(self, msgDict)
+            return
+
+        profiler = self.profiler
+        if profiler:
+            startTime = time.time()
+
+        actor = msgDict["actor"]
+        for keywd, valueTuple in msgDict["data"].items():
+            keyVarList = self._dispatchTable.get((actor, keywd))
+            if keyVarList is None:
+                keyVarList = self._getKeyVarList(actor, keywd)
+            for keyVar in keyVarList:
+                try:
+                    self._setKeyVar(keyVar, valueTuple, msgDict)
+                except Exception:
+                    traceback.print_exc(file=sys.stderr)
+
+        if msgDict["cmdr"] == self.connection.cmdr:
+            cmdVar = self.cmdDict.get(msgDict["cmdID"], None)
+            if cmdVar is not None:
+                self._replyCmdVar(cmdVar, msgDict, doLog=False)
+
+        if profiler:
+            profiler.addDispatch(time.time() - startTime)
+
+    def _getKeyVarList(self, actor, keywd):
+        """Return the keyword variables for a given actor and keyword (as received),
+        adding the entry to the dispatch table
+        """
+        if actor.startswith("keys."):
+            keyActor = actor[5:]
+        else:
+            keyActor = actor
+        keyVarList = tuple(self.keyVarListDict.get((keyActor, keywd.lower()), ()))
+        self._dispatchTable[(actor, keywd)] = keyVarList
+        return keyVarList
+
+    def _setKeyVar(self, keyVar, valueTuple, msgDict):
+        """Set a keyword variable from a message, reusing the previously converted values if possible.
+
+        This does the same thing as keyVar.set(valueTuple, msgDict=msgDict);
+        it is only used for plain RO.KeyVariable.KeyVar objects (not subclasses,
+        which may override set).
+        """
+        profiler = self.profiler
+        if type(keyVar) != RO.KeyVariable.KeyVar or not self.optimize:
+            if profiler:
+                startTime = time.time()
+                keyVar.set(valueTuple, msgDict=msgDict)
+                profiler.addTime(keyVar, "set", time.time() - startTime)
+            else:
+                keyVar.set(valueTuple, msgDict=msgDict)
+            return
+
+        if profiler:
+            startTime = time.time()
+        rawEntry = self._rawValueDict.get(keyVar)
+        if rawEntry is not None and rawEntry[2] is keyVar._valueList and rawEntry[0] == valueTuple:
+            # the values have not changed since this dispatcher last set them
+            cnvValueTuple = rawEntry[1]
+            if profiler:
+                profiler.nCnvSkipped += 1
+        else:
+            nout = keyVar._countValues(valueTuple)
+            cnvValueTuple = tuple(keyVar._convertValueFromList(ind, valueTuple) for ind in range(nout))
+        # give the keyword variable (and thus its callbacks) a new list each time
+        keyVar._valueList = list(cnvValueTuple)
+        self._rawValueDict[keyVar] = (valueTuple, cnvValueTuple, keyVar._valueList)
+
+        keyVar._isCurrent = True
+        keyVar._setTime = time.time()
+        keyVar._msgDict = msgDict
+        try:
+            keyVar.lastType = msgDict["msgType"]
+        except KeyError:
+            sys.stderr.write("%s.set warning: 'msgType' missing in msgDict %r" % (keyVar, msgDict))
+            keyVar.lastType = "w"
+        if keyVar.lastType not in RO.KeyVariable.TypeDict:
+            sys.stderr.write("%s.set warning: invalid 'msgType'=%r in msgDict %r" % (keyVar, keyVar.lastType, msgDict))
+            keyVar.lastType = "w"
+
+        if keyVar.doPrint:
+            sys.stderr.write ("%s = %r\n" % (keyVar, keyVar._valueList))
+
+        if not profiler:
+            keyVar._doCallbacks()
+            return
+
+        profiler.addTime(keyVar, "set", time.time() - startTime)
+        if not keyVar._enableCallbacks:
+            return
+        try:
+            keyVar._enableCallbacks = False
+            for func in keyVar._callbacks[:]:
+                startTime = time.time()
+                RO.AddCallback.safeCall2(str(keyVar), func,
+                    keyVar._valueList, isCurrent=keyVar._isCurrent, keyVar=keyVar)
+                profiler.addTime(keyVar, func, time.time() - startTime)
+        finally:
+            keyVar._enableCallbacks = True
+
+
+if __name__ == "__main__":
+    # compare standard and optimized dispatch of typical TCC status while tracking,
+    # in which most keywords repeat the same values
+    import RO.CnvUtil
+    import RO.ParseMsg
+
+    def nullLogFunc(*args, **kargs):
+        pass
+
+    numMsgs = 2000
+    numVars = 60
+    # one keyword changes, the rest repeat
+    msgDictList = [
+        RO.ParseMsg.parseHubMsg("me 0 tcc i %s; Unknown=1" % ("; ".join(
+            "Var%d=%d, 2.0, 3.0" % (varInd, msgInd if varInd == 0 else 1) for varInd in range(numVars)),))
+        for msgInd in range(numMsgs)
+    ]
+
+    def makeDispatcher(optimize):
+        dispatcher = FastDispatcher(logFunc=nullLogFunc, optimize=optimize)
+        varFactory = RO.KeyVariable.KeyVarFactory(
+            actor = "tcc",
+            converters = RO.CnvUtil.asFloatOrNone,
+            nval = 3,
+            dispatcher = dispatcher,
+        )
+        keyVarList = [varFactory("Var%d" % (ind,)) for ind in range(numVars)]
+        for keyVar in keyVarList[0:numVars // 2]:
+            keyVar.addCallback(lambda valueList, isCurrent, keyVar: None)
+        return dispatcher
+
+    for optimize in (False, True):
+        dispatcher = makeDispatcher(optimize)
+        startTime = time.time()
+        for msgDict in msgDictList:
+            dispatcher.dispatch(msgDict)
+        print("optimize=%s: dispatched %d messages in %.3f sec" % (optimize, numMsgs, time.time() - startTime))
+
+    dispatcher = makeDispatcher(True)
+    dispatcher.startProfile()
+    for msgDict in msgDictList:
+        dispatcher.dispatch(msgDict)
+    print()
+    print(dispatcher.getProfileReport(maxLines=5))
@@ -21,18 +21,198 @@ History:
 2014-09-17 ROwen    Modified to use astropy instead of pyfits, if available.
                     Corrected the import of HubModel.
 """
+import collections
 import os
+import threading
+import numpy
 try:
     import astropy.io.fits as pyfits
 except ImportError:
     import pyfits
 import RO.StringUtil
+import TUI.DownloadScheduler
 import TUI.TUIModel
 import TUI.Models.HubModel
 from . import SubFrame
 
 _DebugMem = False # print a message when a file is deleted from disk?
 
+# maximum memory (bytes) for image data read into memory by the FITS cache;
+# the most recently used file is always kept, even if larger than this
+FITSCacheBytes = 100000000
+
+# maximum number of files held by the FITS cache (plenty for prev/next browsing)
+FITSCacheMaxEntries = 30
+
+# maximum number of memory mapped files held by the FITS cache;
+# each keeps its file open (Python's mmap also holds a duplicate file descriptor)
+FITSCacheMaxMapped = 10
+
+# uncompressed files no larger than this (bytes) are read into memory and closed;
+# larger files are memory mapped, so the image data is read as it is used
+FITSCacheCopyBytes = 8000000
+
+# suffixes of compressed FITS files, which cannot be memory mapped
+_CompressedSuffixes = (".gz", ".bz2", ".zip", ".z")
+
+class FITSData(object):
+    """Data read from a FITS file
+    
+    Attributes:
+    - hduList: the pyfits HDU list; if isMapped then it is owned by the FITS cache,
+        which closes it when evicted, else it is already closed but all header and data are loaded
+    - header: header of HDU 0
+    - imArr: image data of HDU 0 (None if there is no data)
+    - mask: data of HDU 1, if it is a uint8 array the same shape as imArr, else None
+    - isMapped: True if the data is memory mapped (and so the file is still open)
+    - nBytes: number of bytes of imArr and mask
+    """
+    def __init__(self, hduList, isMapped):
+        """Inputs:
+        - hduList: the pyfits HDU list
+        - isMapped: True if hduList was opened with memmap=True;
+            if False then all data is read and hduList is closed
+        """
+        self.hduList = hduList
+        self.isMapped = bool(isMapped)
+        self.header = hduList[0].header
+        self.imArr = hduList[0].data
+        self.mask = None
+        if self.imArr is not None and len(hduList) > 1:
+            maskArr = hduList[1].data
+            if maskArr is not None and maskArr.shape == self.imArr.shape and maskArr.dtype == numpy.uint8:
+                self.mask = maskArr
+        self.nBytes = sum(arr.nbytes for arr in (self.imArr, self.mask) if arr is not None)
+        if not self.isMapped:
+            # load the data of every HDU, so the HDU list remains usable once closed
+            for hdu in hduList:
+                hdu.data
+            hduList.close()
+    
+    def close(self):
+        """Close the HDU list"""
+        self.hduList.close()
+
+
+class FITSCache(object):
+    """A least-recently-used cache of FITSData, keyed by local path
+    
+    Cached data is reread if the file's modification time or size changes.
+    Small and compressed files are read into memory and closed;
+    larger uncompressed files are memory mapped and kept open, so the image data is read as it is used.
+    
+    The cache may be used from more than one thread (see ImageLoader);
+    files are read without holding the lock, so a slow read does not block other threads.
+    """
+    def __init__(self, maxBytes, maxEntries, maxMapped, copyBytes):
+        """Inputs:
+        - maxBytes: maximum bytes of image data read into memory (memory mapped data is not counted)
+        - maxEntries: maximum number of files
+        - maxMapped: maximum number of memory mapped files (each of which holds an open file)
+        - copyBytes: uncompressed files no larger than this are read into memory; larger files are memory mapped
+        
+        The most recently used file is always kept, even if it exceeds these limits.
+        """
+        self.maxBytes = int(maxBytes)
+        self.maxEntries = int(maxEntries)
+        self.maxMapped = int(maxMapped)
+        self.copyBytes = int(copyBytes)
+        self.nBytes = 0 # bytes of image data read into memory
+        self.nMapped = 0 # number of memory mapped files
+        # dict of local path: ((mtime, size), FITSData), least recently used first
+        self._dataDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._dataDict)
+    
+    def clear(self):
+        """Remove all entries, closing their HDU lists"""
+        with self._lock:
+            for path in list(self._dataDict.keys()):
+                self._discard(path)
+    
+    def discard(self, path):
+        """Remove the entry for path (if present) and close its HDU list"""
+        with self._lock:
+            self._discard(path)
+    
+    def _discard(self, path):
+        """Remove the entry for path (if present) and close its HDU list; call with the lock held"""
+        statKeyData = self._dataDict.pop(path, None)
+        if statKeyData is not None:
+            fitsData = statKeyData[1]
+            if fitsData.isMapped:
+                self.nMapped -= 1
+            else:
+                self.nBytes -= fitsData.nBytes
+            fitsData.close()
+    
+    def _isFull(self):
+        """Return True if any limit is exceeded; call with the lock held"""
+        return self.nBytes > self.maxBytes \
+            or self.nMapped > self.maxMapped \
+            or len(self._dataDict) > self.maxEntries
+    
+    def get(self, path):
+        """Return FITSData for the file at path, reading it if not cached or changed
+        
+        Raise an exception if the file cannot be read or has no HDUs.
+        """
+        statInfo = os.stat(path)
+        statKey = (statInfo.st_mtime, statInfo.st_size)
+        with self._lock:
+            fitsData = self._getCached(path, statKey)
+        if fitsData is not None:
+            return fitsData
+    
+        isMapped = statInfo.st_size > self.copyBytes and not path.lower().endswith(_CompressedSuffixes)
+        hduList = pyfits.open(path, memmap=isMapped)
+        try:
+            if not hduList:
+                raise RuntimeError("No image data found")
+            fitsData = FITSData(hduList, isMapped=isMapped)
+        except Exception:
+            hduList.close()
+            raise
+
+        with self._lock:
+            # another thread may have read the same file meanwhile; if so, use its data
+            cachedData = self._getCached(path, statKey)
+            if cachedData is not None:
+                fitsData.close()
+                return cachedData
+            self._dataDict[path] = (statKey, fitsData)
+            if fitsData.isMapped:
+                self.nMapped += 1
+            else:
+                self.nBytes += fitsData.nBytes
+            while self._isFull() and len(self._dataDict) > 1:
+                oldPath = next(iter(self._dataDict))
+                self._discard(oldPath)
+        return fitsData
+
+    def _getCached(self, path, statKey):
+        """Return cached FITSData for path if current, else None; call with the lock held
+        
+        Marks the entry as most recently used, or discards it if stale.
+        """
+        statKeyData = self._dataDict.get(path)
+        if statKeyData is None:
+            return None
+        if statKeyData[0] != statKey:
+            self._discard(path)
+            return None
+        self._dataDict.move_to_end(path)
+        return statKeyData[1]
+
+_fitsCache = FITSCache(
+    maxBytes = FITSCacheBytes,
+    maxEntries = FITSCacheMaxEntries,
+    maxMapped = FITSCacheMaxMapped,
+    copyBytes = FITSCacheCopyBytes,
+)
+
 class BasicImage(object):
     """Information about an image.
     
@@ -76,6 +256,7 @@ class BasicImage(object):
         else:
             self.state = self.Downloaded
         self.isInSequence = not isLocal
+        self._download = None # download of the file while it is being fetched, else None
         
         # set local path
         # this split suffices to separate the components because image names are simple
@@ -93,8 +274,9 @@ class BasicImage(object):
     def expire(self):
         """Set state to expired and delete the file from disk if wanted
         
-        Ignored if file is local or state != Downloaded
+        Ignored if file is local or state not Downloaded or Downloading
         
+        If the file is being downloaded, the download is aborted.
         The image file is deleted only if "Keep Guide Images" preference is False
         and the file can be found.
         """
@@ -102,9 +284,17 @@ class BasicImage(object):
             if _DebugMem:
                 print("Would delete %r, but is local" % (self.imageName,))
             return
-        if self.state == self.Downloaded:
+        if self.state == self.Downloading:
+            # set the state first so the aborted download does not report a failure
+            self.state = self.Expired
+            self.fetchCallFunc = None
+            if self._download:
+                self._download.abort()
+                self._download = None
+        elif self.state == self.Downloaded:
             # don't use _setState because no callback wanted and _setState rejects new states once done
             self.state = self.Expired
+            _fitsCache.discard(self.localPath)
             if not self.keepGuideImagesPref.getValue():
                 if os.path.exists(self.localPath):
                     if _DebugMem:
@@ -117,8 +307,13 @@ class BasicImage(object):
         elif _DebugMem:
             print("Would delete %r, but state = %r is not %r" % (self.imageName, self.state, self.Downloaded))
 
-    def fetchFile(self):
-        """Start downloading the file."""
+    def fetchFile(self, priority=TUI.DownloadScheduler.PriorityDisplay):
+        """Start downloading the file.
+        
+        Inputs:
+        - priority: download priority; see TUI.DownloadScheduler.
+            Use PriorityDisplay if the image is to be displayed, else PriorityBackfill.
+        """
         #print "%s fetchFile; isLocal=%s" % (self, self.isLocal)
         if self.isLocal:
             self._setState(self.Downloaded)
@@ -135,7 +330,7 @@ class BasicImage(object):
         self._setState(self.Downloading)
 
         fromURL = "".join(("http://", host, hostRootDir, self.imageName))
-        self.downloadWdg.getFile(
+        self._download = self.downloadWdg.getFile(
             fromURL = fromURL,
             toPath = self.localPath,
             isBinary = True,
@@ -143,27 +338,55 @@ class BasicImage(object):
             createDir = True,
             doneFunc = self._fetchDoneFunc,
             dispStr = self.imageName,
+            priority = priority,
         )
+    
+    def setFetchPriority(self, priority):
+        """Set the download priority of the file, if it is waiting to be downloaded
         
-    def getFITSObj(self):
-        """If the file is available, return a pyfits object,
-        else return None.
+        Inputs:
+        - priority: download priority; see fetchFile
+        """
+        if self._download and not self._download.isDone:
+            self._download.setPriority(priority)
+        
+    def loadFITSData(self):
+        """Read the file (if not already cached) and return a FITSData object
+        
+        Unlike getFITSData, this does not check or change the state,
+        and it raises an exception if the file cannot be read.
+        It is safe to call from a background thread (see ImageLoader).
+        """
+        return _fitsCache.get(self.getLocalPath())
+
+    def getFITSData(self):
+        """If the file is available, return a FITSData object, else return None.
+        
+        The data is cached, so showing the same image again is fast.
         """
         if self.state == self.Downloaded:
             try:
-                fitsIm = pyfits.open(self.getLocalPath())
-                if fitsIm:
-                    return fitsIm
-                
-                self.state = self.FileReadFailed
-                self.errMsg = "No image data found"
-                return None
+                return self.loadFITSData()
             except Exception as e:
                 self.state = self.FileReadFailed
                 self.errMsg = RO.StringUtil.strFromException(e)
 #               sys.stderr.write("Could not read file %r: %s\n" % (self.getLocalPath(), e))
 #               traceback.print_exc(file=sys.stderr)
         return None
+
+    def getFITSObj(self):
+        """If the file is available, return a pyfits object,
+        else return None.
+        
+        The object is owned by the FITS cache; do not close it
+        and do not use it after the image expires.
+        Small files are read into memory, in which case the object is already closed
+        (but its headers and data are all available).
+        """
+        fitsData = self.getFITSData()
+        if fitsData is None:
+            return None
+        return fitsData.hduList
     
     def getLocalPath(self):
         """Return the full local path to the image."""
@@ -182,6 +405,7 @@ class BasicImage(object):
     def _fetchDoneFunc(self, httpGet):
         """Called when image download ends.
         """
+        self._download = None
         if httpGet.state == httpGet.Done:
             self._setState(self.Downloaded)
         else:
@@ -234,8 +458,8 @@ class GuideImage(BasicImage):
             isLocal = isLocal,
         )
 
-    def getFITSObj(self):
-        """Return the pyfits image object, or None if unavailable.
+    def getFITSData(self):
+        """Return a FITSData object, or None if unavailable.
         
         Parse the FITS header, if not already done,
         and set the following attributes:
@@ -244,10 +468,12 @@ class GuideImage(BasicImage):
         - subFrame: a SubFrame object
         - binSubBeg: subframe beginning (binned pixels; 0,0 is lower left corner)
         - binSubSize: subframe size (binned pixels)
+        
+        getFITSObj also sets these attributes, since it calls this method.
         """
-        fitsObj = BasicImage.getFITSObj(self)
-        if fitsObj and not self.parsedFITSHeader:
-            imHdr = fitsObj[0].header
+        fitsData = BasicImage.getFITSData(self)
+        if fitsData and not self.parsedFITSHeader:
+            imHdr = fitsData.header
             self.expTime = imHdr.get("EXPTIME")
             self.binFac = imHdr.get("BINX")
             try:
@@ -256,4 +482,4 @@ class GuideImage(BasicImage):
                 pass
             self.parsedFITSHeader = True
 
-        return fitsObj
+        return fitsData
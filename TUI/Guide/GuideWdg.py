@@ -270,9 +270,11 @@ import RO.StringUtil
 from RO.Comm.Generic import Timer
 import RO.Wdg
 import RO.Wdg.GrayImageDispWdg as GImDisp
+import TUI.DownloadScheduler
 import TUI.TUIModel
 from . import GuideModel
 from . import GuideImage
+from . import ImageLoader
 from . import SubFrame
 from . import SubFrameWdg
 try:
@@ -372,6 +374,70 @@ class CurrCmds(object):
             cmdInfo._clear()
 
 
+class GuideImageWdg(GImDisp.GrayImageWdg):
+    """A gray image widget that can display an image whose display ranges were computed in advance
+
+    Computing the display range is the slowest part of showing an image,
+    so GuideWdg computes it in a background thread; see ImageLoader.
+    """
+    _dataRangeDict = None # dict of range menu item: (data display min, max), or None to let the base class compute it
+
+    def showArr(self, arr, mask=None, dataRangeDict=None):
+        """Specify an array to display.
+
+        Inputs:
+        - arr: an array of data; if None then the display is cleared
+        - mask: an optional bitmask
+        - dataRangeDict: the display range for each range menu item, as returned by
+            ImageLoader.getDataRangeDict for self.stretchExcludeBits; if None then it is computed
+        """
+        if arr is None or dataRangeDict is None:
+            self._dataRangeDict = None
+            GImDisp.GrayImageWdg.showArr(self, arr, mask=mask)
+            return
+
+        self.clear()
+        try:
+            dataArr = numpy.asarray(arr)
+            if dataArr.dtype.name.startswith("complex"):
+                raise TypeError("cannot handle complex data")
+            oldShape = self.savedShape
+            self.dataArr = dataArr
+            self.savedShape = dataArr.shape
+            self.mask = mask
+            self._dataRangeDict = dict(dataRangeDict)
+            self.doRangeMenu(redisplay=False)
+
+            if self.dataArr.shape != oldShape or not self.zoomFac:
+                # unknown zoom or new image is a different size than the old one; zoom to fit
+                self.begIJ = (0,0)
+                self.endIJ = self.dataArr.shape
+                self.setZoomFac(self.getFitZoomFac(), forceRedisplay=True)
+            else:
+                # new image is same size as old one; preserve scroll and zoom
+                self.redisplay()
+        except MemoryError:
+            self.showMsg("Insufficient Memory!", severity=RO.Constants.sevError)
+
+    def doRangeMenu(self, wdg=None, redisplay=True):
+        """Handle new selection from range menu, using the display ranges passed to showArr, if any
+        """
+        if self._dataRangeDict is None or self.dataArr is None:
+            GImDisp.GrayImageWdg.doRangeMenu(self, wdg=wdg, redisplay=redisplay)
+            return
+
+        rangeStr = self.rangeMenuWdg.getString()
+        dataRange = self._dataRangeDict.get(rangeStr)
+        if dataRange is None:
+            # a range menu item ImageLoader does not know about
+            dataRange = ImageLoader.getDataRangeDict(self.dataArr, mask=self.mask,
+                excludeBits=self.stretchExcludeBits, rangeStrList=[rangeStr])[rangeStr]
+            self._dataRangeDict[rangeStr] = dataRange
+        self.dataDispMin, self.dataDispMax = dataRange
+        if redisplay:
+            self.redisplay()
+
+
 class HistoryBtn(RO.Wdg.Button):
     """Arrow button to show the previous or next image in a list
     """
@@ -429,8 +495,7 @@ class GuideWdg(tkinter.Frame):
         self.dragStart = None
         self.dragRect = None
         self.exposing = None # True, False or None if unknown
-        self.currDownload = None # image object being downloaded
-        self.nextDownload = None # next image object to download
+        self.currFetchImObj = None # newest image object being downloaded at display priority
 
         # color prefs
         def getColorPref(prefName, defColor, isMask = False):
@@ -462,6 +527,7 @@ class GuideWdg(tkinter.Frame):
         self.imObjDict = RO.Alg.ReverseOrderedDict()
         self._memDebugDict = {}
         self.dispImObj = None # object data for most recently taken image, or None
+        self.imageLoader = ImageLoader.ImageLoader() # reads images in the background for showImage
         self.ds9Win = None
 
         self.doingCmd = None # (cmdVar, cmdButton, isGuideOn) used for currently executing cmd
@@ -593,7 +659,7 @@ class GuideWdg(tkinter.Frame):
             ),
         )
 
-        self.gim = GImDisp.GrayImageWdg(self,
+        self.gim = GuideImageWdg(self,
             maskInfo = maskInfo,
             helpURL = _HelpPrefix + "Image",
             callFunc = self.enableSubFrameBtns,
@@ -1116,6 +1182,7 @@ class GuideWdg(tkinter.Frame):
         """
         self.boreXY = None
         self.dispImObj = None
+        self.imageLoader.cancel()
         self.gim.clear()
         self.endCtrlClickMode()
         self.endDragMode()
@@ -1846,20 +1913,13 @@ class GuideWdg(tkinter.Frame):
         if self.dispImObj == imObj:
             # something has changed about the current object; update display
             self.showImage(imObj)
-        elif self.showCurrWdg.getBool() and imObj.isDone():
+        elif self.showCurrWdg.getBool() and imObj.isDone() and imObj == self.getNewestImObj():
             # a new image is ready; display it
+            # (older images are downloaded to fill in the history, but are not displayed)
             self.showImage(imObj)
 
-        if self.currDownload and self.currDownload.isDone():
-            # start downloading next image, if any
-            if self.nextDownload:
-                self.currDownload = self.nextDownload
-                self.nextDownload = None
-                if self.currDownload.state == imObj.Ready:
-                    # download not already started, so start it already
-                    self.currDownload.fetchFile()
-            else:
-                self.currDownload = None
+        if imObj == self.currFetchImObj and imObj.isDone():
+            self.currFetchImObj = None
 
     def getExpArgStr(self, inclThresh = True, inclRadMult = False, inclImgFile = True, modOnly = False):
         """Return exposure time, bin factor, etc.
@@ -1961,15 +2021,24 @@ class GuideWdg(tkinter.Frame):
           or None if no image is displayed or displayed image not in history at all
         """
         revHist = list(self.imObjDict.keys())
-        if self.dispImObj is None:
+        # an image being loaded counts as displayed, so history buttons step from it
+        currImObj = self.imageLoader.pendingImObj or self.dispImObj
+        if currImObj is None:
             currImInd = None
         else:
             try:
-                currImInd = revHist.index(self.dispImObj.imageName)
+                currImInd = revHist.index(currImObj.imageName)
             except ValueError:
                 currImInd = None
         return (revHist, currImInd)
 
+    def getNewestImObj(self):
+        """Return the most recent image object in history, or None if history is empty
+        """
+        for imObj in self.imObjDict.values():
+            return imObj
+        return None
+
     def getSelStarArgs(self, posKey, modOnly=False):
         """Get guide command arguments appropriate for the selected star.
 
@@ -2122,11 +2191,30 @@ class GuideWdg(tkinter.Frame):
     def showImage(self, imObj, forceCurr=None):
         """Display an image.
 
+        If the image has been downloaded, it is read and prepared in a background thread
+        and displayed when ready; a later call to showImage supersedes this one.
+
         Inputs:
         - imObj image to display
         - forceCurr force guide params to be set to current value?
             if None then automatically set based on the Current button
         """
+        if imObj.state == imObj.Downloaded:
+            self.imageLoader.load(imObj, self.gim.stretchExcludeBits, self._showLoadedImage, forceCurr)
+        else:
+            self.imageLoader.cancel()
+            self._showLoadedImage(imObj, None, forceCurr)
+
+    def _showLoadedImage(self, imObj, dataRangeDict, forceCurr=None):
+        """Display an image whose data has been loaded (see showImage).
+
+        Inputs:
+        - imObj image to display
+        - dataRangeDict display range for each range menu item, as returned by ImageLoader.getDataRangeDict,
+            or None if unknown
+        - forceCurr force guide params to be set to current value?
+            if None then automatically set based on the Current button
+        """
         self.boreXY = None
         self.endCtrlClickMode()
         self.endDragMode()
@@ -2136,22 +2224,18 @@ class GuideWdg(tkinter.Frame):
             sys.stderr.write("GuideWdg warning: expiring display image that was not in history\n")
             self.dispImObj.expire()
 
-        fitsIm = imObj.getFITSObj() # note: this sets various useful attributes of imObj such as binFac
+        fitsData = imObj.getFITSData() # note: this sets various useful attributes of imObj such as binFac
         mask = None
-        #print "fitsIm=%s, self.gim.ismapped=%s" % (fitsIm, self.gim.winfo_ismapped())
-        if fitsIm:
+        #print "fitsData=%s, self.gim.ismapped=%s" % (fitsData, self.gim.winfo_ismapped())
+        if fitsData:
             #self.statusBar.setMsg("", RO.Constants.sevNormal)
-            imArr = fitsIm[0].data
+            imArr = fitsData.imArr
             if imArr is None:
                 self.gim.showMsg("Image %s has no data in plane 0" % (imObj.imageName,),
                     severity=RO.Constants.sevWarning)
                 return
-            imHdr = fitsIm[0].header
-
-            if len(fitsIm) > 1 and \
-                fitsIm[1].data.shape == imArr.shape and \
-                fitsIm[1].data.dtype == numpy.uint8:
-                mask = fitsIm[1].data
+            imHdr = fitsData.header
+            mask = fitsData.mask
 
         else:
             if imObj.didFail():
@@ -2160,7 +2244,10 @@ class GuideWdg(tkinter.Frame):
                 if (imObj.state == imObj.Ready) and self.gim.winfo_ismapped():
                     # image not downloaded earlier because guide window was hidden at the time
                     # get it now
-                    imObj.fetchFile()
+                    imObj.fetchFile(TUI.DownloadScheduler.PriorityDisplay)
+                elif imObj.state == imObj.Downloading:
+                    # image may be waiting behind other downloads; get it first
+                    imObj.setFetchPriority(TUI.DownloadScheduler.PriorityDisplay)
                 sev = RO.Constants.sevNormal
             self.gim.showMsg(imObj.getStateStr(), sev)
             imArr = None
@@ -2172,7 +2259,7 @@ class GuideWdg(tkinter.Frame):
             imObj.subFrame = None
 
         # display new data
-        self.gim.showArr(imArr, mask = mask)
+        self.gim.showArr(imArr, mask = mask, dataRangeDict = dataRangeDict)
         self.dispImObj = imObj
         self.imNameWdg.set(imObj.imageName)
         self.imNameWdg.xview("end")
@@ -2354,16 +2441,21 @@ class GuideWdg(tkinter.Frame):
         self.addImToHist(imObj)
 
         if self.gim.winfo_ismapped():
-            if not self.currDownload:
-                # nothing being downloaded, start downloading this image
-                self.currDownload = imObj
-                imObj.fetchFile()
-                if (self.dispImObj is None or self.dispImObj.didFail()) and self.showCurrWdg.getBool():
+            # download every image, so the history is complete;
+            # if showing the current image then download this image first
+            # and let older images that are still being downloaded wait
+            showCurr = self.showCurrWdg.getBool()
+            if self.currFetchImObj and (showCurr or self.currFetchImObj != self.dispImObj):
+                self.currFetchImObj.setFetchPriority(TUI.DownloadScheduler.PriorityBackfill)
+                self.currFetchImObj = None
+            if showCurr:
+                self.currFetchImObj = imObj
+                imObj.fetchFile(TUI.DownloadScheduler.PriorityDisplay)
+                if self.dispImObj is None or self.dispImObj.didFail():
                     # nothing already showing so display the "downloading" message for this image
                     self.showImage(imObj)
             else:
-                # queue this up to be downloaded (replacing any image already there)
-                self.nextDownload = imObj
+                imObj.fetchFile(TUI.DownloadScheduler.PriorityBackfill)
         elif self.showCurrWdg.getBool():
             self.showImage(imObj)
 
@@ -2676,6 +2768,7 @@ class GuideWdg(tkinter.Frame):
     def _exitHandler(self):
         """Delete all image files
         """
+        self.imageLoader.shutdown()
         for imObj in self.imObjDict.values():
             imObj.expire()
 
@@ -0,0 +1,140 @@
+"""Load guide images in background threads
+
+Reading a guide image (including decompressing it, if gzipped), extracting the mask,
+parsing the header and computing the display range can take long enough
+to freeze the guide window. ImageLoader does this work in a pool of worker threads
+and reports the result in the Tk event loop, by polling with a Timer,
+so Tk is only used from the main thread.
+
+Only the most recently requested image matters: a new request supersedes the previous one.
+If the previous request has not started it is cancelled; if it is running its result is ignored.
+"""
+import concurrent.futures
+import numpy
+import numpy.ma
+from RO.Comm.Generic import Timer
+
+__all__ = ["ImageLoader", "getDataRangeDict"]
+
+# range menu items of RO.Wdg.GrayImageDispWdg.GrayImageWdg, for which getDataRangeDict computes ranges by default
+RangeMenuItems = ("100%", "99.9%", "99.8%", "99.7%", "99.6%", "99.5%", "99%", "98%", "97%", "96%", "95%")
+
+def getDataRangeDict(dataArr, mask=None, excludeBits=0, rangeStrList=RangeMenuItems):
+    """Return the data display range for each of a list of range menu items
+
+    Inputs:
+    - dataArr: image data
+    - mask: mask array (the same shape as dataArr), or None
+    - excludeBits: omit pixels whose mask has any of these bits set,
+        unless fewer than 100 pixels remain
+    - rangeStrList: range menu items, e.g. "99.5%": the percentage of the data to display
+
+    Returns a dict of range menu item: (data display min, data display max),
+    matching the computation in RO.Wdg.GrayImageDispWdg.GrayImageWdg.doRangeMenu.
+    """
+    dataArr = numpy.asarray(dataArr)
+    unmaskedArr = None
+    if (mask is not None) and excludeBits:
+        unmaskedArr = numpy.ma.array(
+            dataArr,
+            mask = numpy.asarray(mask) & excludeBits,
+            dtype = float,
+        ).compressed()
+        if len(unmaskedArr) < 100:
+            unmaskedArr = None
+    if unmaskedArr is None:
+        unmaskedArr = dataArr.astype(float).ravel()
+    # for the dozen or so ranges wanted, sorting is faster than numpy.partition
+    sortedArr = numpy.sort(unmaskedArr)
+
+    dataLen = len(sortedArr)
+    dataRangeDict = {}
+    for rangeStr in rangeStrList:
+        lowFrac = (1.0 - (float(rangeStr[:-1]) / 100.0)) / 2.0 # ignore % from end
+        highFrac = 1.0 - lowFrac
+        dataRangeDict[rangeStr] = (sortedArr[int(lowFrac * dataLen)], sortedArr[int(highFrac * dataLen) - 1])
+    return dataRangeDict
+
+def _loadImage(imObj, excludeBits):
+    """Read an image and return its data range dict (or None if the image has no data)
+
+    Called in a worker thread; raises an exception if the image cannot be read.
+    """
+    fitsData = imObj.loadFITSData()
+    if fitsData.imArr is None:
+        return None
+    return getDataRangeDict(fitsData.imArr, mask=fitsData.mask, excludeBits=excludeBits)
+
+
+class ImageLoader(object):
+    """Read guide images and compute their display ranges in worker threads
+    """
+    PollInterval = 0.02 # interval at which to check for a finished load (sec)
+    def __init__(self, maxWorkers=2):
+        """Inputs:
+        - maxWorkers: maximum number of worker threads
+        """
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers = maxWorkers,
+            thread_name_prefix = "ImageLoader",
+        )
+        self._pollTimer = Timer()
+        # (future, imObj, callFunc, args) for the pending load, or None if none
+        self._pending = None
+
+    @property
+    def pendingImObj(self):
+        """The image being loaded, or None if none"""
+        if self._pending is None:
+            return None
+        return self._pending[1]
+
+    def cancel(self):
+        """Cancel the pending load, if any; its callback function will not be called
+        """
+        if self._pending is not None:
+            self._pending[0].cancel()
+            self._pending = None
+        self._pollTimer.cancel()
+
+    def load(self, imObj, excludeBits, callFunc, *args):
+        """Start loading an image, superseding the pending load (if any)
+
+        Inputs:
+        - imObj: the image, a GuideImage.BasicImage
+        - excludeBits: mask bits of pixels to omit when computing the display range;
+            see getDataRangeDict
+        - callFunc: function to call in the Tk event loop when the load finishes;
+            it receives (imObj, dataRangeDict, *args), where dataRangeDict is the display range
+            for each range menu item (see getDataRangeDict), or None if the image has no data
+            or could not be read
+            (in which case imObj.getFITSData will report the problem)
+        - *args: additional arguments for callFunc
+        """
+        self.cancel()
+        future = self._executor.submit(_loadImage, imObj, excludeBits)
+        self._pending = (future, imObj, callFunc, args)
+        self._pollTimer.start(self.PollInterval, self._poll)
+
+    def shutdown(self):
+        """Cancel the pending load and stop the worker threads (without waiting for them)
+        """
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _poll(self):
+        """Call the callback function if the pending load is done, else check again later
+        """
+        if self._pending is None:
+            return
+        future, imObj, callFunc, args = self._pending
+        if not future.done():
+            self._pollTimer.start(self.PollInterval, self._poll)
+            return
+
+        self._pending = None
+        try:
+            dataRangeDict = future.result()
+        except Exception:
+            dataRangeDict = None
+        callFunc(imObj, dataRangeDict, *args)
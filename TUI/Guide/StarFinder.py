@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+"""Find and centroid stars in a guide image locally, using numpy.
+
+findStars measures every star in an image in one pass:
+- estimate the background (sky) and noise, globally or in boxes
+- smooth the image with a 3x3 box filter and threshold it
+- label connected groups of detected pixels (using scipy.ndimage if available)
+- measure each group: centroid, amplitude and FWHM from moments computed in a circular aperture
+  around the group (iterated, so the aperture is centered on the star),
+  plus the number of saturated and masked pixels in the aperture
+
+This is much faster than asking the guide camera actor to centroid candidates one at a time,
+but it is not a substitute for the actor's centroid (the focus and pointing scripts
+still need the actor's measurement); use prescreenStarDataList to order candidates
+so that the first centroid command is likely to succeed.
+
+Positions are image positions, as used by the guider and GuideWdg:
+the center of pixel imArr[i, j] is at x = j + 0.5, y = i + 0.5.
+
+The mask is the guide image mask (HDU 1): bit 0 means masked (bad) pixel,
+bit 1 means saturated pixel.
+
+To test offline, run this module with one or more FITS guide image files as arguments
+(e.g. the images named in TUI.Guide.TestData, after downloading them);
+with no arguments, a synthetic image is measured and compared to the known stars.
+"""
+__all__ = ["StarCandidate", "findStars", "readFITS", "prescreenStarDataList", "prescreenWithLocalImage"]
+
+import os
+import sys
+import numpy
+try:
+    import scipy.ndimage as ndimage
+except ImportError:
+    ndimage = None
+
+MaskedBit = 1 << 0
+SaturatedBit = 1 << 1
+
+# FWHM / sigma for a gaussian
+_FWHMPerSigma = 2.0 * numpy.sqrt(2.0 * numpy.log(2.0))
+
+class StarCandidate(object):
+    """Measurements of one star found by findStars
+
+    Attributes:
+    - xyPos: centroid (x, y) (pixels)
+    - sky: background level at the star (ADU/pixel)
+    - ampl: peak value above the background (ADU)
+    - counts: total counts above the background in the centroid aperture (ADU)
+    - fwhm: full width at half maximum, from second moments (pixels)
+    - nPix: number of detected (above threshold) pixels
+    - nSat: number of saturated pixels in the centroid aperture
+    - nMasked: number of masked pixels in the centroid aperture
+    """
+    def __init__(self, xyPos, sky, ampl, counts, fwhm, nPix, nSat=0, nMasked=0):
+        self.xyPos = xyPos
+        self.sky = sky
+        self.ampl = ampl
+        self.counts = counts
+        self.fwhm = fwhm
+        self.nPix = nPix
+        self.nSat = nSat
+        self.nMasked = nMasked
+
+    @property
+    def isSaturated(self):
+        return self.nSat > 0
+
+    def __repr__(self):
+        return "%s(xyPos=(%0.2f, %0.2f), sky=%0.1f, ampl=%0.1f, counts=%0.0f, fwhm=%0.2f, nPix=%d, nSat=%d, nMasked=%d)" % \
+            (self.__class__.__name__, self.xyPos[0], self.xyPos[1], self.sky, self.ampl, self.counts,
+            self.fwhm, self.nPix, self.nSat, self.nMasked)
+
+
+def readFITS(filePath):
+    """Read a guide image FITS file; return (imArr, mask), where mask is None if the file has no mask
+    """
+    try:
+        import astropy.io.fits as pyfits
+    except ImportError:
+        import pyfits
+    with pyfits.open(filePath) as hduList:
+        imArr = numpy.array(hduList[0].data)
+        mask = None
+        if len(hduList) > 1 and hduList[1].data is not None and hduList[1].data.shape == imArr.shape:
+            mask = numpy.array(hduList[1].data, dtype=numpy.uint8)
+    return imArr, mask
+
+def _getBackground(dataArr, goodArr, bkgBoxSize):
+    """Return (background array or scalar, noise (scalar)) using a median and median absolute deviation
+    """
+    goodData = dataArr[goodArr]
+    if goodData.size == 0:
+        return 0.0, 1.0
+    if bkgBoxSize and min(dataArr.shape) >= 2 * bkgBoxSize:
+        # median in boxes; pad to a multiple of the box size with NaN (ignored) pixels
+        nBoxes = [-(-dim // bkgBoxSize) for dim in dataArr.shape]
+        paddedArr = numpy.full([n * bkgBoxSize for n in nBoxes], numpy.nan, dtype=numpy.float32)
+        paddedArr[0:dataArr.shape[0], 0:dataArr.shape[1]] = numpy.where(goodArr, dataArr, numpy.nan)
+        boxArr = paddedArr.reshape(nBoxes[0], bkgBoxSize, nBoxes[1], bkgBoxSize).swapaxes(1, 2)
+        boxMedArr = numpy.nanmedian(boxArr.reshape(nBoxes[0], nBoxes[1], -1), axis=2)
+        boxMedArr = numpy.where(numpy.isfinite(boxMedArr), boxMedArr, numpy.median(goodData))
+        bkg = numpy.repeat(numpy.repeat(boxMedArr, bkgBoxSize, axis=0), bkgBoxSize, axis=1)
+        bkg = bkg[0:dataArr.shape[0], 0:dataArr.shape[1]]
+        resid = goodData - bkg[goodArr]
+    else:
+        bkg = float(numpy.median(goodData))
+        resid = goodData - bkg
+    noise = 1.4826 * float(numpy.median(numpy.abs(resid)))
+    if noise <= 0:
+        noise = float(numpy.std(resid)) or 1.0
+    return bkg, noise
+
+def _boxSmooth3(arr):
+    """Return the 3x3 box mean of a 2-d array (edge pixels are replicated)
+    """
+    padArr = numpy.pad(arr, 1, mode="edge")
+    nRows, nCols = arr.shape
+    sumArr = numpy.zeros(arr.shape, dtype=numpy.float32)
+    for di in range(3):
+        for dj in range(3):
+            sumArr += padArr[di:di + nRows, dj:dj + nCols]
+    return sumArr / 9.0
+
+def _label(detArr):
+    """Label 8-connected groups of True pixels; return (labelArr, number of labels)
+
+    labelArr is 0 for pixels that are not detected, 1...number of labels for groups.
+    """
+    if ndimage is not None:
+        return ndimage.label(detArr, structure=numpy.ones((3, 3), dtype=bool))
+
+    # label propagation on the list of detected pixels (each pixel starts as its own label;
+    # each step gives every pixel the lowest label of its neighbors, then compresses label chains)
+    iArr, jArr = numpy.nonzero(detArr)
+    nDet = len(iArr)
+    labelArr = numpy.zeros(detArr.shape, dtype=numpy.int32)
+    if nDet == 0:
+        return labelArr, 0
+    indArr = numpy.full(detArr.shape, -1, dtype=numpy.int64)
+    indArr[iArr, jArr] = numpy.arange(nDet)
+    fromList = []
+    toList = []
+    for di, dj in ((0, 1), (1, -1), (1, 0), (1, 1)):
+        ni = iArr + di
+        nj = jArr + dj
+        inRange = (ni < detArr.shape[0]) & (nj >= 0) & (nj < detArr.shape[1])
+        nbrInd = numpy.full(nDet, -1, dtype=numpy.int64)
+        nbrInd[inRange] = indArr[ni[inRange], nj[inRange]]
+        isLinked = nbrInd >= 0
+        fromList.append(numpy.nonzero(isLinked)[0])
+        toList.append(nbrInd[isLinked])
+    fromInd = numpy.concatenate(fromList)
+    toInd = numpy.concatenate(toList)
+
+    labels = numpy.arange(nDet)
+    while True:
+        newLabels = labels.copy()
+        numpy.minimum.at(newLabels, fromInd, labels[toInd])
+        numpy.minimum.at(newLabels, toInd, labels[fromInd])
+        newLabels = newLabels[newLabels]
+        if numpy.array_equal(newLabels, labels):
+            break
+        labels = newLabels
+    uniqueLabels, compactLabels = numpy.unique(labels, return_inverse=True)
+    labelArr[iArr, jArr] = compactLabels + 1
+    return labelArr, len(uniqueLabels)
+
+def findStars(
+    imArr,
+    mask = None,
+    thresh = 5.0,
+    minPix = 5,
+    centroidRad = 5.0,
+    bkgBoxSize = None,
+    numIter = 3,
+):
+    """Find stars in an image; return a list of StarCandidate, brightest (most counts) first.
+
+    Inputs:
+    - imArr: image data (a 2-d array)
+    - mask: guide image mask (a uint8 array the same shape as imArr; see module doc string),
+        or None if no mask
+    - thresh: detection threshold, in units of the noise of the smoothed image
+    - minPix: minimum number of detected pixels for a star
+    - centroidRad: radius of the aperture in which the centroid and FWHM are measured (pixels);
+        stars closer than this may be measured together
+    - bkgBoxSize: size of boxes in which to measure the background (pixels);
+        if None then one background level is used for the whole image
+    - numIter: number of times to recenter the centroid aperture
+    """
+    dataArr = numpy.asarray(imArr, dtype=numpy.float32)
+    if dataArr.ndim != 2:
+        raise RuntimeError("imArr must be 2-dimensional; shape=%s" % (dataArr.shape,))
+    if mask is None:
+        mask = numpy.zeros(dataArr.shape, dtype=numpy.uint8)
+    else:
+        mask = numpy.asarray(mask)
+        if mask.shape != dataArr.shape:
+            raise RuntimeError("mask shape=%s != imArr shape=%s" % (mask.shape, dataArr.shape))
+    isMasked = (mask & MaskedBit) != 0
+    isSat = (mask & SaturatedBit) != 0
+
+    bkg, noise = _getBackground(dataArr, ~(isMasked | isSat), bkgBoxSize)
+    bkgArr = numpy.broadcast_to(numpy.asarray(bkg, dtype=numpy.float32), dataArr.shape)
+    residArr = numpy.where(isMasked, 0, dataArr - bkgArr)
+
+    # detect in the smoothed image, whose noise is 1/3 that of the image
+    detArr = (_boxSmooth3(residArr) > thresh * noise / 3.0) | (isSat & ~isMasked)
+    labelArr, nLabels = _label(detArr)
+    if nLabels == 0:
+        return []
+
+    # initial centroids: moments of the detected pixels
+    iArr, jArr = numpy.nonzero(labelArr)
+    labInd = labelArr[iArr, jArr] - 1
+    nPixArr = numpy.bincount(labInd, minlength=nLabels)
+    weightArr = numpy.maximum(residArr[iArr, jArr], 0) + 1.0e-6
+    sumWeight = numpy.bincount(labInd, weightArr, minlength=nLabels)
+    xArr = numpy.bincount(labInd, weightArr * (jArr + 0.5), minlength=nLabels) / sumWeight
+    yArr = numpy.bincount(labInd, weightArr * (iArr + 0.5), minlength=nLabels) / sumWeight
+    keep = nPixArr >= minPix
+    if not numpy.any(keep):
+        return []
+    xArr = xArr[keep]
+    yArr = yArr[keep]
+    nPixArr = nPixArr[keep]
+
+    # refine in a circular aperture around each star, all stars at once:
+    # cutout index arrays have shape (nStars, 2*rad+1, 2*rad+1)
+    intRad = int(numpy.ceil(centroidRad))
+    offArr = numpy.arange(-intRad, intRad + 1)
+    shape = dataArr.shape
+    for iterNum in range(max(1, numIter)):
+        ctrI = numpy.floor(yArr).astype(int)
+        ctrJ = numpy.floor(xArr).astype(int)
+        cutI = ctrI[:, None, None] + offArr[None, :, None]
+        cutJ = ctrJ[:, None, None] + offArr[None, None, :]
+        inImage = (cutI >= 0) & (cutI < shape[0]) & (cutJ >= 0) & (cutJ < shape[1])
+        cutI = numpy.clip(cutI, 0, shape[0] - 1)
+        cutJ = numpy.clip(cutJ, 0, shape[1] - 1)
+        dx = cutJ + 0.5 - xArr[:, None, None]
+        dy = cutI + 0.5 - yArr[:, None, None]
+        inAperture = inImage & (dx**2 + dy**2 <= centroidRad**2)
+        cutResid = residArr[cutI, cutJ]
+        weight = numpy.where(inAperture & ~isMasked[cutI, cutJ], numpy.maximum(cutResid, 0), 0)
+        sumWeight = weight.sum(axis=(1, 2))
+        hasWeight = sumWeight > 0
+        safeSum = numpy.where(hasWeight, sumWeight, 1.0)
+        xShift = (weight * dx).sum(axis=(1, 2)) / safeSum
+        yShift = (weight * dy).sum(axis=(1, 2)) / safeSum
+        xArr = numpy.where(hasWeight, xArr + xShift, xArr)
+        yArr = numpy.where(hasWeight, yArr + yShift, yArr)
+
+    # final moments about the refined centroid
+    dx = cutJ + 0.5 - xArr[:, None, None]
+    dy = cutI + 0.5 - yArr[:, None, None]
+    varArr = ((weight * (dx**2 + dy**2)).sum(axis=(1, 2)) / (2.0 * safeSum))
+    fwhmArr = _FWHMPerSigma * numpy.sqrt(numpy.maximum(varArr, 0))
+    amplArr = numpy.where(inAperture, cutResid, -numpy.inf).max(axis=(1, 2))
+    skyArr = bkgArr[numpy.clip(numpy.floor(yArr).astype(int), 0, shape[0] - 1),
+        numpy.clip(numpy.floor(xArr).astype(int), 0, shape[1] - 1)]
+    nSatArr = (inAperture & isSat[cutI, cutJ]).sum(axis=(1, 2))
+    nMaskedArr = (inAperture & isMasked[cutI, cutJ]).sum(axis=(1, 2))
+
+    starList = [
+        StarCandidate(
+            xyPos = (float(xArr[ind]), float(yArr[ind])),
+            sky = float(skyArr[ind]),
+            ampl = float(amplArr[ind]),
+            counts = float(sumWeight[ind]),
+            fwhm = float(fwhmArr[ind]),
+            nPix = int(nPixArr[ind]),
+            nSat = int(nSatArr[ind]),
+            nMasked = int(nMaskedArr[ind]),
+        ) for ind in numpy.argsort(-sumWeight)
+    ]
+    return starList
+
+def prescreenStarDataList(starDataList, starList, maxAmpl, matchRad):
+    """Remove star keyword data for stars that are clearly unusable in the local copy of the image
+
+    Inputs:
+    - starDataList: list of star keyword data (e.g. from the guide camera actor's findstars command)
+    - starList: list of StarCandidate for the same image, as returned by findStars
+    - maxAmpl: maximum acceptable amplitude (ADU); None if no limit
+    - matchRad: maximum distance between a star in starDataList and a StarCandidate
+        for them to be considered the same star (pixels)
+
+    Returns a new list of star keyword data, in the original (actor's brightness) order,
+    omitting stars matched to a candidate that is saturated or (if maxAmpl not None)
+    whose amplitude is greater than maxAmpl. Stars not matched to any candidate are kept
+    (the actor, not this local measurement, is the final judge).
+    """
+    if not starList:
+        return list(starDataList)
+    candXYArr = numpy.array([cand.xyPos for cand in starList], dtype=float)
+    retList = []
+    for starData in starDataList:
+        starXYPos = starData[2:4]
+        if None not in starXYPos:
+            distSq = ((candXYArr - numpy.array(starXYPos, dtype=float))**2).sum(axis=1)
+            nearInd = int(numpy.argmin(distSq))
+            if distSq[nearInd] <= matchRad**2:
+                cand = starList[nearInd]
+                if cand.isSaturated or (maxAmpl is not None and cand.ampl > maxAmpl):
+                    continue
+        retList.append(starData)
+    return retList
+
+def prescreenWithLocalImage(guideModel, filePath, starDataList, maxAmpl, matchRad):
+    """Remove clearly unusable stars from star keyword data using the local copy of a guide image,
+    if it has been downloaded
+
+    Inputs:
+    - guideModel: guide model for the guide camera actor (a TUI.Guide.GuideModel.Model)
+    - filePath: image file path on the hub, relative to the image root
+        (e.g. concatenate items 2:4 of the guider files keyword)
+    - other inputs: as for prescreenStarDataList
+
+    Returns a new list of star keyword data as returned by prescreenStarDataList,
+    or a copy of starDataList if the image has not been downloaded
+    (e.g. because the guide window is not open) or cannot be read.
+
+    Reading the image and finding stars takes a while, so consider calling this
+    from a background thread (e.g. using ScriptRunner.waitThread); it does not use Tkinter.
+    """
+    localBaseDir = guideModel.ftpSaveToPref.getValue()
+    if not localBaseDir:
+        return list(starDataList)
+    localPath = os.path.join(localBaseDir, *filePath.split("/"))
+    if not os.path.isfile(localPath):
+        return list(starDataList)
+    try:
+        starList = findStars(*readFITS(localPath), centroidRad=matchRad)
+    except Exception as e:
+        # e.g. the file is still being downloaded
+        sys.stderr.write("Could not find stars in %r: %s\n" % (localPath, e))
+        return list(starDataList)
+    return prescreenStarDataList(starDataList, starList, maxAmpl=maxAmpl, matchRad=matchRad)
+
+
+if __name__ == "__main__":
+    import time
+
+    def reportStars(imArr, mask):
+        startTime = time.time()
+        starList = findStars(imArr, mask)
+        print("Found %d stars in %0.1f msec (image shape %s; scipy %s)" % \
+            (len(starList), (time.time() - startTime) * 1000, imArr.shape, "used" if ndimage else "not available"))
+        for cand in starList[0:10]:
+            print("  ", cand)
+        return starList
+
+    if len(sys.argv) > 1:
+        for filePath in sys.argv[1:]:
+            print(filePath)
+            reportStars(*readFITS(filePath))
+    else:
+        rand = numpy.random.RandomState(1)
+        shape = (512, 512)
+        iArr, jArr = numpy.indices(shape)
+        imArr = rand.normal(1000.0, 10.0, shape)
+        mask = numpy.zeros(shape, dtype=numpy.uint8)
+        trueStarList = [((100.3, 200.7), 5000, 3.0), ((400.8, 50.2), 800, 2.5), ((256.0, 256.0), 40000, 4.0)]
+        for (x, y), ampl, fwhm in trueStarList:
+            sigma = fwhm / _FWHMPerSigma
+            imArr += ampl * numpy.exp(-((jArr + 0.5 - x)**2 + (iArr + 0.5 - y)**2) / (2 * sigma**2))
+        mask[imArr > 30000] |= SaturatedBit
+        mask[300:302, 0:512] |= MaskedBit
+        print("True stars: (x, y), ampl, fwhm")
+        for trueStar in trueStarList:
+            print("  ", trueStar)
+        starList = reportStars(imArr, mask)
+
+        starDataList = [["c", ind + 1, xy[0], xy[1]] + [None] * 10 + [ampl] for ind, (xy, ampl, fwhm) in enumerate(trueStarList)]
+        starDataList.sort(key=lambda starData: -starData[14])
+        print("Prescreened stars:", [starData[1] for starData in prescreenStarDataList(starDataList, starList, 30000, 3.0)])
@@ -102,6 +102,7 @@ import RO.DS9
 import RO.KeyVariable
 import RO.SeqUtil
 import RO.StringUtil
+import TUI.PlaySound
 import TUI.TUIModel
 from . import FileGetter
 
@@ -365,6 +366,7 @@ class Model(object):
         instActor = self.instInfo.instActor
 
         self.tuiModel = TUI.TUIModel.getModel()
+        self._wasExpFailed = None # was last exposure state failing or failed? True, False or None if unknown
 
         keyVarFact = RO.KeyVariable.KeyVarFactory(
             actor = self.actor,
@@ -593,13 +595,25 @@ class Model(object):
         return " ".join(outStrList)
 
     def _updExpState(self, expState, isCurrent, keyVar):
-        """Set the durations to None (unknown) if data is from the cache"""
-        if keyVar.isGenuine():
+        """Set the durations to None (unknown) if data is from the cache,
+        else play the exposure failed sound if the exposure just failed.
+
+        The sound is played here rather than by the exposure status widget
+        so it is played even if the instrument's window has never been shown.
+        """
+        if not keyVar.isGenuine():
+            modValues = list(expState)
+            modValues[3] = None
+            modValues[4] = None
+            keyVar._valueList = tuple(modValues)
             return
-        modValues = list(expState)
-        modValues[3] = None
-        modValues[4] = None
-        keyVar._valueList = tuple(modValues)
+        if not isCurrent or not expState[1]:
+            return
+
+        isFailed = expState[1].lower() in ("failing", "failed")
+        if isFailed and self._wasExpFailed is not True:
+            TUI.PlaySound.exposureFailed()
+        self._wasExpFailed = isFailed
 
 
 def formatValList(name, valList, valFmt, numElts=None):
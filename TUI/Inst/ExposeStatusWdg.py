@@ -61,7 +61,6 @@ class ExposeStatusWdg (tkinter.Frame):
         self.expModel = ExposeModel.getModel(instName)
         self.tuiModel = self.expModel.tuiModel
         self.wasExposing = None # was last exposure state integrating or resume? True, False or None if unknown
-        self.wasFailed = None # was last exposure state failed or failing? True, False or None if unknown
         self.minExposureBeginsSoundTime = 0
         gr = RO.Wdg.Gridder(master=self, sticky="w")
 
@@ -184,16 +183,13 @@ class ExposeStatusWdg (tkinter.Frame):
         remTime = remTime or 0.0 # change None to 0.0
         netTime = netTime or 0.0 # change None to 0.0
 
-        isFailed = False
         if lowState in ("failing", "failed"):
             errState = RO.Constants.sevError
-            isFailed = True
         elif lowState in ("paused", "aborting", "aborted"):
             errState = RO.Constants.sevWarning
         else:
             errState = RO.Constants.sevNormal
         self.expStateWdg.set(expStateStr, severity = errState)
-        isNewFailure = isFailed and (self.wasFailed is not True)
 
         isExposing = lowState in ("integrating", "resume")
         
@@ -245,11 +241,7 @@ class ExposeStatusWdg (tkinter.Frame):
                 if self.expModel.instInfo.playExposureEnds:
                     TUI.PlaySound.exposureEnds()
 
-        if isNewFailure:
-            TUI.PlaySound.exposureFailed()
-        
         self.wasExposing = isExposing
-        self.wasFailed = isFailed
         
     def _updSeqState(self, seqState, isCurrent, **kargs):
         """sequence state has changed; seqState is:
@@ -25,6 +25,7 @@ import RO.DS9
 import RO.KeyVariable
 import RO.SeqUtil
 import RO.StringUtil
+import TUI.DownloadScheduler
 import TUI.TUIModel
 import TUI.Models.HubModel
 
@@ -37,7 +38,7 @@ class FileGetter (object):
         self.hubModel = TUI.Models.HubModel.getModel()
         self.tuiModel = TUI.TUIModel.getModel()
         
-        # set of active downloads; each entry is an HTTPGet object
+        # set of active downloads; each entry is a TUI.DownloadScheduler.Download object
         self.activeDownloads = set()
         # queue of pending downloads; each entry is a list of keyword argument dictionaries
         # for the download widget's getFile method (one dict per camera, e.g. red and blue for DIS)
@@ -60,9 +61,6 @@ class FileGetter (object):
         except Exception:
              sys.stderr.write("FileGetter internal error: could not remove completed httpGet from activeDownloads\n")
 
-        # start next download if current set finished
-        self._handlePendingDownloads()
-        
         # display image if display wanted and camera name known and download succeeded
 #         print "viewImageVarCont=%r" % (self.exposeModel.viewImageVarCont.get())
         if self.exposeModel.viewImageVarCont.get() and (camName is not None) and (httpGet.state == httpGet.Done):
@@ -162,7 +160,12 @@ class FileGetter (object):
         self._handlePendingDownloads()
 
     def _handlePendingDownloads(self):
-        """Examine pending downloads and start next download, if appropriate"""
+        """Examine pending downloads and start downloads, as appropriate
+
+        Downloads are run by the shared download scheduler, so there is no need to wait
+        for earlier downloads to finish; instead earlier downloads that are still waiting
+        are demoted to backfill priority (or aborted, if only the most recent image is wanted).
+        """
 #         print "%s._handlePendingDownloads(); there are %s active and %s pending downloads" % \
 #             (self.__class__.__name__, len(self.activeDownloads), len(self.pendingDownloadArgs),)
         getEveryNum = self.exposeModel.getEveryVarCont.get()
@@ -172,18 +175,6 @@ class FileGetter (object):
             self.pendingDownloadArgs.clear()
             return
         
-        if self.activeDownloads:
-            # make sure these are all truly active; this should never happen,
-            # but the consequences are severe so be paranoid
-            trulyActiveDownloads = [dl for dl in self.activeDownloads if not dl.isDone]
-            if len(trulyActiveDownloads) != len(self.activeDownloads):
-#                 print "warning: purging activeDownloads of %d completed downloads" % \
-#                     (len(self.activeDownloads) - len(trulyActiveDownloads))
-                self.activeDownloads = set(trulyActiveDownloads)
-            if self.activeDownloads:
-#                 print "There are %d active downloads; don't start a new one" % (len(self.activeDownloads),)
-                return
-
         argList = []
         if getEveryNum > 0:
             # nToSkip = getEveryNum - 1
@@ -197,17 +188,22 @@ class FileGetter (object):
 #             else:
 #                 print "There are not enough pending downloads yet; waiting"
         elif getEveryNum < 0:
-            # start most recent images; ditch the rest
+            # start most recent images; ditch the rest, including older images that have not started
 #             print "Download last image in pending downloads and clear the rest"
             if self.pendingDownloadArgs:
                 argList = self.pendingDownloadArgs.pop()
                 self.pendingDownloadArgs.clear()
+                for httpGet in list(self.activeDownloads):
+                    if httpGet.state == httpGet.Queued:
+                        httpGet.abort()
+        if not argList:
+            return
+
+        # older images are less urgent than the current image
+        for httpGet in self.activeDownloads:
+            httpGet.setPriority(TUI.DownloadScheduler.PriorityBackfill)
 
         for argDict in argList:
-            httpGet = self.downloadWdg.getFile(**argDict)
+            httpGet = self.downloadWdg.getFile(priority=TUI.DownloadScheduler.PriorityCurrent, **argDict)
             if not httpGet.isDone:
-                try:
-                    self.activeDownloads.add(httpGet)
-                except Exception:
-#                     print "self.activeDownloads=%r" % (self.activeDownloads,)
-                    raise
+                self.activeDownloads.add(httpGet)
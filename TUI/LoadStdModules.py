@@ -1,67 +1,121 @@
+"""Load TUI's standard window modules.
+
+Generated by genLoadStdModules.py; do not edit.
+"""
 import TUI.TUIModel
-import TUI.TUIMenu.AboutWindow
-import TUI.TUIMenu.ConnectWindow
-import TUI.TUIMenu.DownloadsWindow
-import TUI.TUIMenu.LogWindow
-import TUI.TUIMenu.Permissions.PermsWindow
-import TUI.TUIMenu.PreferencesWindow
-import TUI.TUIMenu.PythonWindow
-import TUI.TUIMenu.UsersWindow
-#import TUI.Guide.AgileGuideWindow
-import TUI.Guide.EchelleSlitviewerWindow
-import TUI.Guide.KosmosSlitviewerWindow
-import TUI.Guide.GuideMonitor.GuideMonitorWindow
-import TUI.Guide.NA2GuiderWindow
-import TUI.Guide.TSpecSlitViewerWindow
-#import TUI.Inst.Agile.AgileWindow
-import TUI.Inst.Echelle.EchelleWindow
-import TUI.Inst.NICFPS.NICFPSWindow
-import TUI.Inst.ARCTIC.ARCTICWindow
-import TUI.Inst.Kosmos.KosmosWindow
-import TUI.Inst.TSpec.TSpecWindow
-import TUI.Misc.MessageWindow
-import TUI.Misc.TelMech.EnclosureWindow
-import TUI.Misc.TrussLamps.TrussLampsWindow
-import TUI.TCC.FocalPlaneWindow
-import TUI.TCC.FocusWindow
-import TUI.TCC.MirrorStatusWindow
-import TUI.TCC.NudgerWindow
-import TUI.TCC.OffsetWdg.OffsetWindow
-import TUI.TCC.SkyWindow
-import TUI.TCC.SlewWdg.SlewWindow
-import TUI.TCC.StatusWdg.StatusWindow
+
+# (module name, ((window name, default geometry, default visibility), ...)) for each window module;
+# default visibility is None if the module does not specify it (in which case the window is visible)
+WindowModuleInfo = (
+    ('TUI.TUIMenu.AboutWindow', (
+        ('TUI.About TUI', '', False),
+    )),
+    ('TUI.TUIMenu.ConnectWindow', (
+        ('TUI.Connect', '+30+30', False),
+    )),
+    ('TUI.TUIMenu.DownloadsWindow', (
+        ('TUI.Downloads', '+835+290', False),
+    )),
+    ('TUI.TUIMenu.LogWindow', (
+        ('TUI.Log 1', '736x411+496+534', True),
+        ('TUI.Log 2', '736x411+516+554', False),
+        ('TUI.Log 3', '736x411+536+574', False),
+        ('TUI.Log 4', '736x411+556+594', False),
+        ('TUI.Log 5', '736x411+576+614', False),
+    )),
+    ('TUI.TUIMenu.Permissions.PermsWindow', (
+        ('TUI.Permissions', '180x237+172+722', True),
+    )),
+    ('TUI.TUIMenu.PreferencesWindow', (
+        ('TUI.Preferences', '+62+116', False),
+    )),
+    ('TUI.TUIMenu.PythonWindow', (
+        ('TUI.Python', '+0+507', False),
+    )),
+    ('TUI.TUIMenu.UsersWindow', (
+        ('TUI.Users', '300x125+0+722', False),
+    )),
+#    ('TUI.Guide.AgileGuideWindow', (
+#        ('Guide.Agile Guider', '+452+280', False),
+#    )),
+    ('TUI.Guide.EchelleSlitviewerWindow', (
+        ('Guide.Echelle Slitviewer', '+452+280', False),
+    )),
+    ('TUI.Guide.GuideMonitor.GuideMonitorWindow', (
+        ('Guide.Guide Monitor', '+434+22', False),
+    )),
+    ('TUI.Guide.KosmosSlitviewerWindow', (
+        ('Guide.Kosmos Slitviewer', '+452+280', False),
+    )),
+    ('TUI.Guide.NA2GuiderWindow', (
+        ('Guide.NA2 Guider', '+452+280', False),
+    )),
+    ('TUI.Guide.TSpecSlitViewerWindow', (
+        ('Guide.TSpec Slitviewer', '+452+280', False),
+    )),
+    ('TUI.Inst.ARCTIC.ARCTICWindow', (
+        ('None.ARCTIC Expose', '+452+280', False),
+        ('Inst.ARCTIC', '+676+280', False),
+    )),
+#    ('TUI.Inst.Agile.AgileWindow', (
+#        ('Inst.Agile', '+676+280', False),
+#    )),
+    ('TUI.Inst.Echelle.EchelleWindow', (
+        ('None.Echelle Expose', '+452+280', False),
+        ('Inst.Echelle', '+676+280', False),
+    )),
+    ('TUI.Inst.Kosmos.KosmosWindow', (
+        ('None.Kosmos Expose', '+452+280', False),
+        ('Inst.Kosmos', '+676+280', False),
+    )),
+    ('TUI.Inst.NICFPS.NICFPSWindow', (
+        ('None.NICFPS Expose', '+452+280', False),
+        ('Inst.NICFPS', '+676+280', False),
+    )),
+    ('TUI.Inst.TSpec.TSpecWindow', (
+        ('None.TSpec Expose', '+452+280', False),
+        ('Inst.TSpec', '+676+280', False),
+    )),
+    ('TUI.Misc.MessageWindow', (
+        ('Misc.Message', '390x213+367+334', True),
+    )),
+    ('TUI.Misc.TelMech.EnclosureWindow', (
+        ('Misc.Enclosure', '+676+280', False),
+    )),
+    ('TUI.Misc.TrussLamps.TrussLampsWindow', (
+        ('Misc.Truss Lamps', '+676+280', False),
+    )),
+    ('TUI.TCC.FocalPlaneWindow', (
+        ('TCC.Focal Plane', '201x201+636+22', None),
+    )),
+    ('TUI.TCC.FocusWindow', (
+        ('TCC.Secondary Focus', '+240+507', True),
+    )),
+    ('TUI.TCC.MirrorStatusWindow', (
+        ('TCC.Mirror Status', '+434+22', False),
+    )),
+    ('TUI.TCC.NudgerWindow', (
+        ('TCC.Nudger', '+50+507', False),
+    )),
+    ('TUI.TCC.OffsetWdg.OffsetWindow', (
+        ('TCC.Offset', '+0+507', None),
+    )),
+    ('TUI.TCC.SkyWindow', (
+        ('TCC.Sky', '201x201+434+22', True),
+    )),
+    ('TUI.TCC.SlewWdg.SlewWindow', (
+        ('TCC.Slew', '+0+280', None),
+    )),
+    ('TUI.TCC.StatusWdg.StatusWindow', (
+        ('TCC.Status', '+0+22', None),
+    )),
+)
 
 def loadAll():
+    """Add all standard windows to the TUI model's toplevel set;
+    window modules are only imported if one of their windows should be visible
+    """
     tuiModel = TUI.TUIModel.getModel()
     tlSet = tuiModel.tlSet
-    TUI.TUIMenu.AboutWindow.addWindow(tlSet)
-    TUI.TUIMenu.ConnectWindow.addWindow(tlSet)
-    TUI.TUIMenu.DownloadsWindow.addWindow(tlSet)
-    TUI.TUIMenu.LogWindow.addWindow(tlSet)
-    TUI.TUIMenu.Permissions.PermsWindow.addWindow(tlSet)
-    TUI.TUIMenu.PreferencesWindow.addWindow(tlSet)
-    TUI.TUIMenu.PythonWindow.addWindow(tlSet)
-    TUI.TUIMenu.UsersWindow.addWindow(tlSet)
-    #TUI.Guide.AgileGuideWindow.addWindow(tlSet)
-    TUI.Guide.EchelleSlitviewerWindow.addWindow(tlSet)
-    TUI.Guide.GuideMonitor.GuideMonitorWindow.addWindow(tlSet)
-    TUI.Guide.NA2GuiderWindow.addWindow(tlSet)
-    TUI.Guide.TSpecSlitViewerWindow.addWindow(tlSet)
-    TUI.Guide.KosmosSlitviewerWindow.addWindow(tlSet)
-    #TUI.Inst.Agile.AgileWindow.addWindow(tlSet)
-    TUI.Inst.Echelle.EchelleWindow.addWindow(tlSet)
-    TUI.Inst.NICFPS.NICFPSWindow.addWindow(tlSet)
-    TUI.Inst.ARCTIC.ARCTICWindow.addWindow(tlSet)
-    TUI.Inst.Kosmos.KosmosWindow.addWindow(tlSet)
-    TUI.Inst.TSpec.TSpecWindow.addWindow(tlSet)
-    TUI.Misc.MessageWindow.addWindow(tlSet)
-    TUI.Misc.TelMech.EnclosureWindow.addWindow(tlSet)
-    TUI.Misc.TrussLamps.TrussLampsWindow.addWindow(tlSet)
-    TUI.TCC.FocalPlaneWindow.addWindow(tlSet)
-    TUI.TCC.FocusWindow.addWindow(tlSet)
-    TUI.TCC.MirrorStatusWindow.addWindow(tlSet)
-    TUI.TCC.NudgerWindow.addWindow(tlSet)
-    TUI.TCC.OffsetWdg.OffsetWindow.addWindow(tlSet)
-    TUI.TCC.SkyWindow.addWindow(tlSet)
-    TUI.TCC.SlewWdg.SlewWindow.addWindow(tlSet)
-    TUI.TCC.StatusWdg.StatusWindow.addWindow(tlSet)
+    for modName, windowInfo in WindowModuleInfo:
+        tlSet.addLazyWindows(modName, windowInfo)
@@ -0,0 +1,668 @@
+#!/usr/bin/env python
+"""Persistent on-disk journal of log entries
+
+LogJournal appends every entry logged by a LogSource to a journal directory;
+JournalReader reads entries back by time or position, for log windows that page back
+through earlier messages and for command-line searches (see main).
+
+The journal is a directory of append-only segment files. A new segment is started
+each time TUI starts and whenever the current segment exceeds maxSegmentBytes.
+The oldest segments are deleted when the journal exceeds maxJournalBytes.
+Each segment has a sidecar index file containing the time and byte offset of every
+indexInterval'th record, so a reader can seek to a time without reading the segment.
+Segments are read using mmap, and only the records that are needed are decoded,
+so memory use is bounded no matter how large the journal grows.
+
+Times are TAI, as unix-style seconds (TAI seconds since 1970-01-01 00:00:00),
+so they sort and print the same way as the time stamps in the log window.
+
+File formats (all values are little-endian):
+
+Segment file <SegmentPrefix><UTC date and time><SegmentSuffix>:
+- header: magic b"TUIJ" (4 bytes), version (uint16)
+- records, each of which is:
+    - TAI time (double)
+    - TAI - unix time (float)
+    - cmdID (int64)
+    - severity (int8)
+    - length of actor (uint16)
+    - length of cmdr (uint16); 0xFFFF if cmdr is None
+    - length of message (uint32)
+    - length of command info (uint16); 0 if none
+    - actor, cmdr, message and command info, each encoded as UTF-8;
+      command info (for messages about commands, see TUI.LogSource.CmdInfo) is formatted as:
+      uniqueCmdID cmdr cmdID actor isMine cmdStr
+
+Index file <segment file name><IndexSuffix>:
+- header: magic b"TUIX" (4 bytes), version (uint16), index interval (uint32)
+- entries, each of which is TAI time (double), byte offset (uint64)
+  of a record; the first record of the segment is always indexed.
+
+Command-line usage (e.g. python -m TUI.LogJournal or grepLogJournal.py):
+    [-h] [-d DIR] [-s START] [-e END] [-a ACTOR] [-i] [regex]
+Print journal entries in the specified TAI time range whose message matches regex.
+"""
+import argparse
+import array
+import bisect
+import calendar
+import collections
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+__all__ = ["JournalRecord", "JournalReader", "LogJournal", "formatCmdInfo", "parseCmdInfoStr", "parseTAITime"]
+
+SegmentPrefix = "journal"
+SegmentSuffix = ".tuij"
+IndexSuffix = ".idx"
+
+# default maximum size of one segment file (bytes)
+MaxSegmentBytes = 32000000
+# default maximum size of the whole journal (bytes); the oldest segments are deleted to stay under this
+MaxJournalBytes = 1000000000
+# default number of records per index entry
+IndexInterval = 256
+
+_Version = 1
+_SegmentHeader = struct.Struct("<4sH")
+_SegmentMagic = b"TUIJ"
+_IndexHeader = struct.Struct("<4sHI")
+_IndexMagic = b"TUIX"
+_RecordHeader = struct.Struct("<dfqbHHIH")
+_IndexEntry = struct.Struct("<dQ")
+_NoCmdr = 0xFFFF
+_MaxShortLen = 0xFFFE
+
+def parseTAITime(timeStr):
+    """Parse a TAI date and time string, as shown in the log window, and return TAI (unix-style sec)
+
+    Accepted formats are YYYY-MM-DD, YYYY-MM-DD HH:MM and YYYY-MM-DD HH:MM:SS;
+    "T" may be used instead of a space to separate the date and time.
+
+    Raise ValueError if the string cannot be parsed.
+    """
+    timeStr = timeStr.strip().replace("T", " ")
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return float(calendar.timegm(time.strptime(timeStr, fmt)))
+        except ValueError:
+            pass
+    raise ValueError("Cannot parse %r as YYYY-MM-DD [HH:MM[:SS]]" % (timeStr,))
+
+
+class JournalRecord(collections.namedtuple("JournalRecord",
+    "taiTime taiOffset actor cmdr cmdID severity msgStr cmdInfoStr")):
+    """One log entry read from the journal
+
+    Fields:
+    - taiTime: TAI time at which the entry was logged (unix-style sec)
+    - taiOffset: TAI - unix time (sec) in effect when the entry was logged
+    - actor, cmdr, cmdID, severity, msgStr: the LogEntry fields of the same name
+    - cmdInfoStr: command info, as a string, or None; see parseCmdInfoStr
+    """
+    __slots__ = ()
+
+    @property
+    def unixTime(self):
+        return self.taiTime - self.taiOffset
+
+    def getTAITimeStr(self):
+        """Return the TAI date and time as a string "YYYY-MM-DD HH:MM:SS"
+        """
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(int(math.floor(self.taiTime))))
+
+    def getStr(self):
+        """Return the entry formatted as it is in the log window
+        """
+        return "%s %s\n" % (self.getTAITimeStr(), self.msgStr)
+
+
+def formatCmdInfo(cmdInfo):
+    """Format a TUI.LogSource.CmdInfo as a string for the journal
+    """
+    return "%d %s %d %s %d %s" % (cmdInfo.uniqueCmdID, cmdInfo.cmdr, cmdInfo.cmdID, cmdInfo.actor,
+        cmdInfo.isMine, cmdInfo.cmdStr)
+
+def parseCmdInfoStr(cmdInfoStr):
+    """Parse a command info string from the journal
+
+    Return a dict with keys: uniqueCmdID, cmdr, cmdID, actor, isMine, cmdStr.
+    Raise ValueError if the string cannot be parsed.
+    """
+    uniqueCmdIDStr, cmdr, cmdIDStr, actor, isMineStr, cmdStr = (cmdInfoStr.split(" ", 5) + [""])[0:6]
+    return dict(
+        uniqueCmdID = int(uniqueCmdIDStr),
+        cmdr = cmdr,
+        cmdID = int(cmdIDStr),
+        actor = actor,
+        isMine = bool(int(isMineStr)),
+        cmdStr = cmdStr,
+    )
+
+def _encodeStr(strVal, maxLen):
+    """Encode a string as UTF-8, truncating the result to at most maxLen bytes
+    """
+    return strVal.encode("utf-8", "replace")[0:maxLen]
+
+
+class LogJournal(object):
+    """Append every entry logged by a LogSource to a journal directory
+
+    Entries are written in batches, as the log source reports them. If the journal
+    cannot be written (e.g. the disk is full) then an error is printed to stderr
+    and journaling stops; logging is otherwise unaffected.
+    """
+    def __init__(self,
+        logSource,
+        journalDir,
+        maxSegmentBytes = MaxSegmentBytes,
+        maxJournalBytes = MaxJournalBytes,
+        indexInterval = IndexInterval,
+    ):
+        """Create a LogJournal and start a new segment
+
+        Inputs:
+        - logSource: the log source, a TUI.LogSource.LogSource
+        - journalDir: journal directory; created if it does not exist
+        - maxSegmentBytes: maximum size of a segment file (bytes)
+        - maxJournalBytes: maximum size of the journal (bytes)
+        - indexInterval: number of records per index entry
+
+        Raise OSError if the directory or first segment cannot be created.
+        """
+        self.logSource = logSource
+        self.journalDir = journalDir
+        self.maxSegmentBytes = int(maxSegmentBytes)
+        self.maxJournalBytes = int(maxJournalBytes)
+        self.indexInterval = int(indexInterval)
+        self.segName = None
+        self._segFile = None
+        self._indexFile = None
+        self._segSize = 0
+        self._numSegRecords = 0
+        self._nextSeq = logSource.store.firstSeq
+
+        if not os.path.isdir(self.journalDir):
+            os.makedirs(self.journalDir)
+        self._startSegment(time.time())
+        logSource.addCallback(self._logSourceCallback, callNow=False)
+
+    @property
+    def isOpen(self):
+        return self._segFile is not None
+
+    def close(self):
+        """Stop journaling and close the current segment
+        """
+        self.logSource.removeCallback(self._logSourceCallback, doRaise=False)
+        self._closeFiles()
+
+    def _closeFiles(self):
+        for fileObj in (self._segFile, self._indexFile):
+            if fileObj is not None:
+                try:
+                    fileObj.close()
+                except OSError:
+                    pass
+        self._segFile = None
+        self._indexFile = None
+
+    def _startSegment(self, unixTime):
+        """Close the current segment (if any), purge old segments and start a new segment
+
+        Inputs:
+        - unixTime: time used to name the segment
+        """
+        self._closeFiles()
+        msec = int(unixTime * 1000)
+        while True:
+            dateStr = time.strftime("%Y-%m-%dT%H_%M_%S", time.gmtime(msec // 1000))
+            segName = "%s%s_%03d%s" % (SegmentPrefix, dateStr, msec % 1000, SegmentSuffix)
+            segPath = os.path.join(self.journalDir, segName)
+            if not os.path.exists(segPath):
+                break
+            msec += 1
+        self._purge(extraBytes=self.maxSegmentBytes)
+        segFile = open(segPath, "wb")
+        try:
+            segFile.write(_SegmentHeader.pack(_SegmentMagic, _Version))
+            indexFile = open(segPath + IndexSuffix, "wb")
+            indexFile.write(_IndexHeader.pack(_IndexMagic, _Version, self.indexInterval))
+        except Exception:
+            segFile.close()
+            raise
+        self.segName = segName
+        self._segFile = segFile
+        self._indexFile = indexFile
+        self._segSize = _SegmentHeader.size
+        self._numSegRecords = 0
+
+    def _purge(self, extraBytes):
+        """Delete the oldest segments until the journal plus extraBytes fits in maxJournalBytes
+        """
+        segNameList = getSegmentNames(self.journalDir)
+        sizeList = []
+        for segName in segNameList:
+            segPath = os.path.join(self.journalDir, segName)
+            size = 0
+            for path in (segPath, segPath + IndexSuffix):
+                try:
+                    size += os.path.getsize(path)
+                except OSError:
+                    pass
+            sizeList.append(size)
+        totSize = sum(sizeList) + extraBytes
+        for segName, size in zip(segNameList, sizeList):
+            if totSize <= self.maxJournalBytes:
+                break
+            segPath = os.path.join(self.journalDir, segName)
+            for path in (segPath, segPath + IndexSuffix):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            totSize -= size
+
+    def _logSourceCallback(self, logSource):
+        """Write new entries to the journal
+        """
+        store = logSource.store
+        startSeq = max(self._nextSeq, store.firstSeq)
+        self._nextSeq = store.nextSeq
+        if not self.isOpen or startSeq >= store.nextSeq:
+            return
+
+        try:
+            segBuf = bytearray()
+            indexBuf = bytearray()
+            for seq in range(startSeq, store.nextSeq):
+                if self._segSize >= self.maxSegmentBytes:
+                    self._write(segBuf, indexBuf)
+                    segBuf = bytearray()
+                    indexBuf = bytearray()
+                    self._startSegment(store.getUnixTime(seq))
+
+                taiTime = store.getTAITime(seq)
+                actorBytes = _encodeStr(store.getActor(seq), _MaxShortLen)
+                cmdr = store.getCmdr(seq)
+                if cmdr is None:
+                    cmdrBytes = b""
+                    cmdrLen = _NoCmdr
+                else:
+                    cmdrBytes = _encodeStr(cmdr, _MaxShortLen)
+                    cmdrLen = len(cmdrBytes)
+                msgBytes = _encodeStr(store.getMsgStr(seq), 0xFFFFFFFF)
+                cmdInfo = store.getCmdInfo(seq)
+                if cmdInfo is None:
+                    cmdInfoBytes = b""
+                else:
+                    cmdInfoBytes = _encodeStr(formatCmdInfo(cmdInfo), 0xFFFF)
+
+                if self._numSegRecords % self.indexInterval == 0:
+                    indexBuf += _IndexEntry.pack(taiTime, self._segSize)
+                recHeader = _RecordHeader.pack(
+                    taiTime,
+                    taiTime - store.getUnixTime(seq),
+                    store.getCmdID(seq),
+                    store.getSeverity(seq),
+                    len(actorBytes),
+                    cmdrLen,
+                    len(msgBytes),
+                    len(cmdInfoBytes),
+                )
+                for data in (recHeader, actorBytes, cmdrBytes, msgBytes, cmdInfoBytes):
+                    segBuf += data
+                    self._segSize += len(data)
+                self._numSegRecords += 1
+            self._write(segBuf, indexBuf)
+        except Exception as e:
+            sys.stderr.write("Could not write log journal in %r; journaling stopped: %s\n" % (self.journalDir, e))
+            self._closeFiles()
+
+    def _write(self, segBuf, indexBuf):
+        """Write and flush data to the current segment and index files
+        """
+        if segBuf:
+            self._segFile.write(segBuf)
+            self._segFile.flush()
+        if indexBuf:
+            self._indexFile.write(indexBuf)
+            self._indexFile.flush()
+
+
+def getSegmentNames(journalDir):
+    """Return the names of the segment files in a journal directory, oldest first
+    """
+    try:
+        fileNames = os.listdir(journalDir)
+    except OSError:
+        return []
+    return sorted(name for name in fileNames
+        if name.startswith(SegmentPrefix) and name.endswith(SegmentSuffix))
+
+
+class JournalReader(object):
+    """Read records from a journal directory
+
+    A position in the journal is a tuple: (segment name, byte offset of a record in that segment).
+    Methods that read records return positions that may be used to continue reading
+    in either direction, so a caller may page through the journal without gaps or duplicates.
+
+    The journal may be read while a LogJournal is writing to it.
+    """
+    def __init__(self, journalDir):
+        """Inputs:
+        - journalDir: journal directory
+        """
+        self.journalDir = journalDir
+        # dict of segment name: (cache key, index data); see getSegmentIndex
+        self._indexCache = {}
+
+    def getSegmentNames(self):
+        """Return the names of the segment files, oldest first
+        """
+        segNameList = getSegmentNames(self.journalDir)
+        for segName in set(self._indexCache) - set(segNameList):
+            del self._indexCache[segName]
+        return segNameList
+
+    def getSegmentIndex(self, segName):
+        """Return the index for a segment as (time array, offset array, index interval)
+
+        The index is read from the segment's index file; if that is missing or damaged
+        then the segment is scanned to build the index.
+        """
+        segPath = os.path.join(self.journalDir, segName)
+        indexPath = segPath + IndexSuffix
+        try:
+            cacheKey = ("index", os.path.getsize(indexPath))
+        except OSError:
+            cacheKey = ("scan", os.path.getsize(segPath))
+        cachedData = self._indexCache.get(segName)
+        if cachedData is not None and cachedData[0] == cacheKey:
+            return cachedData[1]
+
+        indexData = None
+        if cacheKey[0] == "index":
+            indexData = self._readIndexFile(indexPath)
+        if indexData is None:
+            timeArr = array.array("d")
+            offsetArr = array.array("Q")
+            for ind, (offset, nextOffset, record) in enumerate(self._iterSegment(segName)):
+                if ind % IndexInterval == 0:
+                    timeArr.append(record.taiTime)
+                    offsetArr.append(offset)
+            indexData = (timeArr, offsetArr, IndexInterval)
+        self._indexCache[segName] = (cacheKey, indexData)
+        return indexData
+
+    def _readIndexFile(self, indexPath):
+        """Read an index file; return (time array, offset array, index interval) or None if invalid
+        """
+        try:
+            with open(indexPath, "rb") as indexFile:
+                data = indexFile.read()
+        except OSError:
+            return None
+        if len(data) < _IndexHeader.size:
+            return None
+        magic, version, indexInterval = _IndexHeader.unpack_from(data, 0)
+        if magic != _IndexMagic or version != _Version or indexInterval < 1:
+            return None
+        timeArr = array.array("d")
+        offsetArr = array.array("Q")
+        endInd = len(data) - ((len(data) - _IndexHeader.size) % _IndexEntry.size)
+        for taiTime, offset in _IndexEntry.iter_unpack(data[_IndexHeader.size:endInd]):
+            timeArr.append(taiTime)
+            offsetArr.append(offset)
+        return (timeArr, offsetArr, indexInterval)
+
+    def _iterSegment(self, segName, startOffset=None, endOffset=None):
+        """Iterate over records in one segment, yielding (offset, next offset, JournalRecord)
+
+        Inputs:
+        - segName: name of segment
+        - startOffset: offset of first record to read; if None then start with the first record
+        - endOffset: stop at this offset; if None then read to the end of the segment
+
+        A truncated final record (e.g. due to a crash) is silently ignored.
+        """
+        segPath = os.path.join(self.journalDir, segName)
+        try:
+            segFile = open(segPath, "rb")
+        except OSError:
+            return
+        with segFile:
+            segSize = os.fstat(segFile.fileno()).st_size
+            if segSize <= _SegmentHeader.size:
+                return
+            with mmap.mmap(segFile.fileno(), 0, access=mmap.ACCESS_READ) as segMap:
+                magic, version = _SegmentHeader.unpack_from(segMap, 0)
+                if magic != _SegmentMagic or version != _Version:
+                    return
+                offset = _SegmentHeader.size if startOffset is None else max(startOffset, _SegmentHeader.size)
+                if endOffset is None or endOffset > segSize:
+                    endOffset = segSize
+                unpackHeader = _RecordHeader.unpack_from
+                headerSize = _RecordHeader.size
+                while offset + headerSize <= endOffset:
+                    taiTime, taiOffset, cmdID, severity, actorLen, cmdrLen, msgLen, cmdInfoLen \
+                        = unpackHeader(segMap, offset)
+                    actorStart = offset + headerSize
+                    cmdrStart = actorStart + actorLen
+                    msgStart = cmdrStart + (0 if cmdrLen == _NoCmdr else cmdrLen)
+                    cmdInfoStart = msgStart + msgLen
+                    nextOffset = cmdInfoStart + cmdInfoLen
+                    if nextOffset > endOffset:
+                        break
+                    if cmdrLen == _NoCmdr:
+                        cmdr = None
+                    else:
+                        cmdr = segMap[cmdrStart:msgStart].decode("utf-8", "replace")
+                    if cmdInfoLen == 0:
+                        cmdInfoStr = None
+                    else:
+                        cmdInfoStr = segMap[cmdInfoStart:nextOffset].decode("utf-8", "replace")
+                    yield offset, nextOffset, JournalRecord(
+                        taiTime = taiTime,
+                        taiOffset = taiOffset,
+                        actor = segMap[actorStart:cmdrStart].decode("utf-8", "replace"),
+                        cmdr = cmdr,
+                        cmdID = cmdID,
+                        severity = severity,
+                        msgStr = segMap[msgStart:cmdInfoStart].decode("utf-8", "replace"),
+                        cmdInfoStr = cmdInfoStr,
+                    )
+                    offset = nextOffset
+
+    def getEndPos(self):
+        """Return the position just past the last record in the journal, or None if the journal is empty
+        """
+        segNameList = self.getSegmentNames()
+        if not segNameList:
+            return None
+        segName = segNameList[-1]
+        return (segName, os.path.getsize(os.path.join(self.journalDir, segName)))
+
+    def findPos(self, taiTime):
+        """Return the position of the first record whose TAI time >= taiTime
+
+        If there is no such record, return the end position (see getEndPos);
+        return None if the journal is empty.
+        """
+        segNameList = self.getSegmentNames()
+        firstTimeList = []
+        for segName in segNameList:
+            timeArr = self.getSegmentIndex(segName)[0]
+            firstTimeList.append(timeArr[0] if timeArr else None)
+        # start with the last segment that begins at or before taiTime
+        startSegInd = 0
+        for segInd, firstTime in enumerate(firstTimeList):
+            if firstTime is not None and firstTime <= taiTime:
+                startSegInd = segInd
+        for segName in segNameList[startSegInd:]:
+            timeArr, offsetArr = self.getSegmentIndex(segName)[0:2]
+            indexInd = max(0, bisect.bisect_right(timeArr, taiTime) - 1)
+            startOffset = offsetArr[indexInd] if offsetArr else None
+            for offset, nextOffset, record in self._iterSegment(segName, startOffset=startOffset):
+                if record.taiTime >= taiTime:
+                    return (segName, offset)
+        return self.getEndPos()
+
+    def readBefore(self, pos, maxRecords):
+        """Read up to maxRecords records that precede a position
+
+        Inputs:
+        - pos: position, e.g. as returned by findPos, getEndPos or a previous readBefore
+        - maxRecords: maximum number of records to read
+
+        Return (records, startPos), where:
+        - records: a list of JournalRecord, oldest first
+        - startPos: position of the first record returned (pos if no records)
+        """
+        segName, endOffset = pos
+        segNameList = self.getSegmentNames()
+        try:
+            segInd = segNameList.index(segName)
+        except ValueError:
+            return [], pos
+        recordLists = []
+        startPos = pos
+        numNeeded = maxRecords
+        while numNeeded > 0 and segInd >= 0:
+            segName = segNameList[segInd]
+            offsetArr, indexInterval = self.getSegmentIndex(segName)[1:3]
+            # skip the index entries needed to read numNeeded records, plus one for good measure
+            if endOffset is None:
+                numIndexed = len(offsetArr)
+            else:
+                numIndexed = bisect.bisect_left(offsetArr, endOffset)
+            startIndexInd = numIndexed - 1 - ((numNeeded + indexInterval - 1) // indexInterval)
+            if startIndexInd > 0:
+                startOffset = offsetArr[startIndexInd]
+            else:
+                startOffset = None
+            segRecords = collections.deque(maxlen=numNeeded)
+            for offset, nextOffset, record in self._iterSegment(segName, startOffset, endOffset):
+                segRecords.append((offset, record))
+            if segRecords:
+                startPos = (segName, segRecords[0][0])
+                recordLists.append([record for offset, record in segRecords])
+                numNeeded -= len(segRecords)
+            if startOffset is not None:
+                break
+            segInd -= 1
+            endOffset = None
+        records = []
+        for recordList in reversed(recordLists):
+            records += recordList
+        return records, startPos
+
+    def readFrom(self, pos, maxRecords):
+        """Read up to maxRecords records starting at a position
+
+        Inputs:
+        - pos: position, e.g. as returned by findPos or a previous readFrom
+        - maxRecords: maximum number of records to read
+
+        Return (records, endPos), where:
+        - records: a list of JournalRecord, oldest first
+        - endPos: position just past the last record returned (pos if no records)
+        """
+        records = []
+        endPos = pos
+        for segName, offset, nextOffset, record in self._iterFrom(pos):
+            if len(records) >= maxRecords:
+                break
+            records.append(record)
+            endPos = (segName, nextOffset)
+        return records, endPos
+
+    def _iterFrom(self, pos):
+        """Iterate over records starting at a position, yielding (segName, offset, next offset, JournalRecord)
+        """
+        segName, startOffset = pos
+        segNameList = self.getSegmentNames()
+        try:
+            segInd = segNameList.index(segName)
+        except ValueError:
+            # segment was purged; start with the oldest segment that remains
+            segInd = 0
+            startOffset = None
+        for segName in segNameList[segInd:]:
+            for offset, nextOffset, record in self._iterSegment(segName, startOffset=startOffset):
+                yield segName, offset, nextOffset, record
+            startOffset = None
+
+    def iterRecords(self, startTime=None, endTime=None):
+        """Iterate over records in a time range, yielding JournalRecord
+
+        Inputs:
+        - startTime: TAI time of earliest record (unix-style sec); if None then start at the beginning
+        - endTime: stop at the first record whose TAI time >= endTime; if None then read to the end
+        """
+        segNameList = self.getSegmentNames()
+        if not segNameList:
+            return
+        if startTime is None:
+            pos = (segNameList[0], None)
+        else:
+            pos = self.findPos(startTime)
+        for segName, offset, nextOffset, record in self._iterFrom(pos):
+            if endTime is not None and record.taiTime >= endTime:
+                break
+            yield record
+
+
+def main(argv=None):
+    """Print journal entries in a time range that match a regular expression
+
+    Inputs:
+    - argv: command-line arguments (excluding the program name); if None then sys.argv[1:] is used
+    """
+    parser = argparse.ArgumentParser(
+        description = "Print log journal entries in a TAI time range that match a regular expression",
+    )
+    parser.add_argument("regex", nargs="?", default=None,
+        help="print entries whose message matches this regular expression")
+    parser.add_argument("-d", "--dir", dest="journalDir",
+        help="journal directory; default is the journal written by TUI")
+    parser.add_argument("-s", "--start", type=parseTAITime,
+        help="TAI date and time of earliest entry, as YYYY-MM-DD [HH:MM[:SS]]")
+    parser.add_argument("-e", "--end", type=parseTAITime,
+        help="TAI date and time after the last entry, as YYYY-MM-DD [HH:MM[:SS]]")
+    parser.add_argument("-a", "--actor", action="append",
+        help="only print entries from this actor (may be repeated)")
+    parser.add_argument("-i", "--ignore-case", dest="ignoreCase", action="store_true",
+        help="ignore case when matching regex")
+    args = parser.parse_args(argv)
+
+    journalDir = args.journalDir
+    if journalDir is None:
+        import TUI.TUIPaths
+        journalDir = TUI.TUIPaths.getLogJournalDir()
+    if not os.path.isdir(journalDir):
+        sys.stderr.write("No log journal at %r\n" % (journalDir,))
+        return 1
+    compiledRegEx = None
+    if args.regex:
+        compiledRegEx = re.compile(args.regex, re.IGNORECASE if args.ignoreCase else 0)
+    actorSet = set(args.actor) if args.actor else None
+
+    reader = JournalReader(journalDir)
+    for record in reader.iterRecords(startTime=args.start, endTime=args.end):
+        if actorSet is not None and record.actor not in actorSet:
+            continue
+        if compiledRegEx is not None and not compiledRegEx.search(record.msgStr):
+            continue
+        sys.stdout.write(record.getStr())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,8 +18,10 @@ History:
                     even if user's clock is keeping TAI or is drifting.
 2014-08-09 ROwen    Added date to the timestamp string, as YYYY-MM-DD followed by a space.
 """
+import array
+import collections.abc
+import math
 import time
-import collections
 
 import RO.AddCallback
 import RO.Astro.Tm
@@ -28,7 +30,7 @@ from RO.TkUtil import Timer
 import TUI.Models.CmdsModel
 import TUI.Version
 
-__all__ = ["LogEntry", "LogSource"]
+__all__ = ["LogEntry", "LogEntryList", "LogSource", "LogStore"]
 
 class CmdInfo(object):
     """Data for synthesized command messages
@@ -69,12 +71,75 @@ class CmdInfo(object):
         return "%s %d %s %s" % (self.cmdr, self.cmdID, self.actor, self.cmdStr)
 
 
+class _TAIClock(object):
+    """Convert unix time to a formatted TAI date and time string.
+
+    The conversion uses the RO.Astro.Tm clock correction, which is sampled at most
+    once every RefreshInterval seconds. Each distinct correction is an "epoch";
+    log entries record the epoch when they are logged, so they can be formatted later
+    (or never) with the correction that was in effect at the time.
+
+    Formatted strings are cached by TAI second, since many entries arrive each second.
+    """
+    RefreshInterval = 60.0
+    MaxCacheSize = 10000
+    def __init__(self):
+        # list of TAI - unix time (sec), indexed by epoch
+        self.offsetList = []
+        self._currEpoch = None
+        self._nextRefreshTime = None
+        self._strCache = {}
+
+    def getEpoch(self, unixTime):
+        """Return the clock correction epoch for the specified unix time (which should be recent)
+        """
+        if self._nextRefreshTime is None or unixTime >= self._nextRefreshTime:
+            offset = RO.Astro.Tm.getCurrPySec(unixTime) - RO.Astro.Tm.getUTCMinusTAI() - unixTime
+            if self._currEpoch is None or offset != self.offsetList[self._currEpoch]:
+                self.offsetList.append(offset)
+                self._currEpoch = len(self.offsetList) - 1
+            self._nextRefreshTime = unixTime + self.RefreshInterval
+        return self._currEpoch
+
+    def getEpochForOffset(self, offset):
+        """Return a clock correction epoch for a known offset (TAI - unix time, in sec)
+
+        Used for entries read back from the log journal, which record the offset that was in effect.
+        Recent epochs are searched first; a new epoch is added if no epoch is within a millisecond.
+        """
+        for epoch in range(len(self.offsetList) - 1, -1, -1):
+            if abs(self.offsetList[epoch] - offset) < 0.001:
+                return epoch
+        self.offsetList.append(offset)
+        return len(self.offsetList) - 1
+
+    def getTAITimeStr(self, unixTime, epoch):
+        """Return TAI date and time as a string "YYYY-MM-DD HH:MM:SS"
+
+        Inputs:
+        - unixTime: unix time (sec)
+        - epoch: clock correction epoch, as returned by getEpoch
+        """
+        taiSec = int(math.floor(unixTime + self.offsetList[epoch]))
+        taiTimeStr = self._strCache.get(taiSec)
+        if taiTimeStr is None:
+            if len(self._strCache) >= self.MaxCacheSize:
+                self._strCache.clear()
+            taiTimeStr = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(taiSec))
+            self._strCache[taiSec] = taiTimeStr
+        return taiTimeStr
+
+_taiClock = _TAIClock()
+
+
 class LogEntry(object):
     """Data for one log entry
     
     Fields include:
     - unixTime: date (unix seconds) that LogEntry was created
-    - taiTimeStr: TAI time as a string HH:MM:SS at which LogEntry was created
+    - clockEpoch: clock correction epoch in effect when the LogEntry was created
+    - taiTimeStr: TAI time as a string YYYY-MM-DD HH:MM:SS at which LogEntry was created;
+      this is computed when first requested
     - msgStr: the message string
     - actor: actor who sent the reply or to whom the command was sent
     - severity: one of the RO.Constants.sevX constants
@@ -92,11 +157,20 @@ class LogEntry(object):
         cmdID = 0,
         tags = (),
         cmdInfo = None,
+        unixTime = None,
+        clockEpoch = None,
     ):
-        self.unixTime = time.time()
-        currPythonSeconds = RO.Astro.Tm.getCurrPySec(self.unixTime)
-        currTAITuple= time.gmtime(currPythonSeconds - RO.Astro.Tm.getUTCMinusTAI())
-        self.taiTimeStr = time.strftime("%Y-%m-%d %H:%M:%S", currTAITuple)
+        """Inputs are the fields described above, except:
+        - unixTime: unix time at which the message was logged; if None then use the current time
+        - clockEpoch: clock correction epoch; if None then use the current epoch
+        """
+        if unixTime is None:
+            unixTime = time.time()
+        if clockEpoch is None:
+            clockEpoch = _taiClock.getEpoch(unixTime)
+        self.unixTime = unixTime
+        self.clockEpoch = clockEpoch
+        self._taiTimeStr = None
         self.msgStr = msgStr
         self.actor = actor
         self.severity = severity
@@ -106,22 +180,438 @@ class LogEntry(object):
         self.cmdInfo = cmdInfo
         self.isKeys = self.actor.startswith("keys") or (self.cmdInfo and self.cmdInfo.actor.startswith("keys"))
 
+    @property
+    def taiTimeStr(self):
+        if self._taiTimeStr is None:
+            self._taiTimeStr = _taiClock.getTAITimeStr(self.unixTime, self.clockEpoch)
+        return self._taiTimeStr
+
     def getStr(self):
         """Return log entry formatted for log window
         """
         return "%s %s\n" % (self.taiTimeStr, self.msgStr)
 
 
+class _InternTable(object):
+    """A table of unique strings, each identified by a small integer index
+
+    Also caches the Tk text tag for each string.
+    """
+    def __init__(self, tagPrefix):
+        """Inputs:
+        - tagPrefix: prefix for the tag; the tag is tagPrefix + strVal.lower()
+        """
+        self.tagPrefix = tagPrefix
+        self.strList = []
+        self.tagList = []
+        self._indDict = {}
+
+    def getInd(self, strVal):
+        """Return the index of strVal, adding it to the table if necessary
+        """
+        ind = self._indDict.get(strVal)
+        if ind is None:
+            ind = len(self.strList)
+            self.strList.append(strVal)
+            self.tagList.append(self.tagPrefix + strVal.lower() if strVal else None)
+            self._indDict[strVal] = ind
+        return ind
+
+    def getIndIfPresent(self, strVal):
+        """Return the index of strVal, or None if not in the table
+        """
+        return self._indDict.get(strVal)
+
+    def __len__(self):
+        return len(self.strList)
+
+
+class _PostingList(object):
+    """Ascending sequence numbers of the log entries that share some property
+
+    Entries are appended at the end and evicted from the start.
+    """
+    __slots__ = ("_seqArr", "_startInd")
+    def __init__(self):
+        self._seqArr = array.array("q")
+        self._startInd = 0
+
+    def append(self, seq):
+        self._seqArr.append(seq)
+
+    def popFirst(self, seq):
+        """Remove the first sequence number, if it is seq
+        """
+        if self._startInd < len(self._seqArr) and self._seqArr[self._startInd] == seq:
+            self._startInd += 1
+            if self._startInd >= 1024 and 2 * self._startInd >= len(self._seqArr):
+                del self._seqArr[:self._startInd]
+                self._startInd = 0
+
+    def getSeqs(self):
+        """Return the sequence numbers, as an array
+        """
+        return self._seqArr[self._startInd:]
+
+    def __len__(self):
+        return len(self._seqArr) - self._startInd
+
+
+class LogStore(object):
+    """Compact repository of log data, held as columns in preallocated ring buffers
+
+    Each entry is identified by a sequence number: 0 for the first entry ever added,
+    incrementing by one for each new entry. Only the most recent maxEntries entries are retained;
+    the sequence numbers of retained entries are range(firstSeq, nextSeq).
+
+    Actor and commander strings are interned (each entry stores a small index),
+    severity, cmdID, unixTime and clock correction epoch are stored in typed arrays, and message strings
+    are held in a preallocated list of slots that is shared by all entries.
+    CmdInfo objects are rare, so they are kept in a dict indexed by slot.
+
+    LogEntry objects are only created on request, by getEntry.
+
+    Posting lists (the sequence numbers of retained entries, by actor, commander, severity and cmdID)
+    are updated as entries are added and evicted, so the getSeqsFor... methods can answer
+    common filter questions without examining every entry.
+    """
+    def __init__(self, maxEntries, actorTagPrefix="act_", cmdrTagPrefix="cmdr_"):
+        """Inputs:
+        - maxEntries: the maximum number of entries saved (older entries are overwritten)
+        - actorTagPrefix: prefix for actor tags
+        - cmdrTagPrefix: prefix for commander tags
+        """
+        self.maxEntries = int(maxEntries)
+        if self.maxEntries < 1:
+            raise ValueError("maxEntries=%r; must be positive" % (maxEntries,))
+        self.firstSeq = 0
+        self.nextSeq = 0
+        self.actorTable = _InternTable(actorTagPrefix)
+        self.cmdrTable = _InternTable(cmdrTagPrefix)
+
+        self._unixTimeArr = array.array("d", [0.0]) * self.maxEntries
+        self._clockEpochArr = array.array("l", [0]) * self.maxEntries
+        self._severityArr = array.array("b", [0]) * self.maxEntries
+        self._cmdIDArr = array.array("q", [0]) * self.maxEntries
+        self._actorIndArr = array.array("l", [0]) * self.maxEntries
+        self._cmdrIndArr = array.array("l", [0]) * self.maxEntries
+        self._msgStrList = [None] * self.maxEntries
+        # dict of slot: CmdInfo, for the few entries that have one
+        self._cmdInfoDict = {}
+        self._clearPostings()
+
+    def __len__(self):
+        return self.nextSeq - self.firstSeq
+
+    def _clearPostings(self):
+        """Clear all posting lists
+        """
+        # posting lists for actor (including the actor of cmdInfo), indexed by actor index
+        self._actorPostingList = []
+        # posting lists for cmdr, indexed by cmdr index
+        self._cmdrPostingList = []
+        # dict of severity: posting list
+        self._severityPostingDict = {}
+        # dict of cmdID: posting list; unused cmdIDs are deleted
+        self._cmdIDPostingDict = {}
+
+    def _getPosting(self, postingList, ind):
+        """Return postingList[ind], extending postingList as needed
+        """
+        while len(postingList) <= ind:
+            postingList.append(_PostingList())
+        return postingList[ind]
+
+    def _evictFirst(self):
+        """Remove the oldest entry from the posting lists and increment firstSeq
+        """
+        seq = self.firstSeq
+        slot = seq % self.maxEntries
+        actorInd = self._actorIndArr[slot]
+        self._actorPostingList[actorInd].popFirst(seq)
+        cmdInfo = self._cmdInfoDict.pop(slot, None)
+        if cmdInfo is not None:
+            cmdActorInd = self.actorTable.getInd(cmdInfo.actor)
+            if cmdActorInd != actorInd:
+                self._actorPostingList[cmdActorInd].popFirst(seq)
+        self._cmdrPostingList[self._cmdrIndArr[slot]].popFirst(seq)
+        self._severityPostingDict[self._severityArr[slot]].popFirst(seq)
+        cmdID = self._cmdIDArr[slot]
+        cmdIDPosting = self._cmdIDPostingDict[cmdID]
+        cmdIDPosting.popFirst(seq)
+        if not cmdIDPosting:
+            del self._cmdIDPostingDict[cmdID]
+        self._msgStrList[slot] = None
+        self.firstSeq = seq + 1
+
+    def append(self,
+        msgStr,
+        severity,
+        actor,
+        cmdr,
+        cmdID,
+        cmdInfo = None,
+        unixTime = None,
+        taiOffset = None,
+    ):
+        """Add an entry, overwriting the oldest entry if full, and return its sequence number.
+
+        Inputs are the same as the LogEntry fields of the same name, plus:
+        - taiOffset: TAI - unix time (sec) in effect when the entry was logged;
+            if None then the current clock correction is used (the normal case for new entries)
+        If unixTime is None then the current time is used.
+        """
+        if unixTime is None:
+            unixTime = time.time()
+        if taiOffset is None:
+            clockEpoch = _taiClock.getEpoch(unixTime)
+        else:
+            clockEpoch = _taiClock.getEpochForOffset(taiOffset)
+        if self.nextSeq - self.firstSeq >= self.maxEntries:
+            self._evictFirst()
+        seq = self.nextSeq
+        slot = seq % self.maxEntries
+        cmdID = int(cmdID)
+        actorInd = self.actorTable.getInd(actor)
+        cmdrInd = self.cmdrTable.getInd(cmdr)
+        self._unixTimeArr[slot] = unixTime
+        self._clockEpochArr[slot] = clockEpoch
+        self._severityArr[slot] = severity
+        self._cmdIDArr[slot] = cmdID
+        self._actorIndArr[slot] = actorInd
+        self._cmdrIndArr[slot] = cmdrInd
+        self._msgStrList[slot] = msgStr
+
+        self._getPosting(self._actorPostingList, actorInd).append(seq)
+        if cmdInfo is not None:
+            self._cmdInfoDict[slot] = cmdInfo
+            cmdActorInd = self.actorTable.getInd(cmdInfo.actor)
+            if cmdActorInd != actorInd:
+                self._getPosting(self._actorPostingList, cmdActorInd).append(seq)
+        self._getPosting(self._cmdrPostingList, cmdrInd).append(seq)
+        severityPosting = self._severityPostingDict.get(severity)
+        if severityPosting is None:
+            severityPosting = self._severityPostingDict[severity] = _PostingList()
+        severityPosting.append(seq)
+        cmdIDPosting = self._cmdIDPostingDict.get(cmdID)
+        if cmdIDPosting is None:
+            cmdIDPosting = self._cmdIDPostingDict[cmdID] = _PostingList()
+        cmdIDPosting.append(seq)
+
+        self.nextSeq = seq + 1
+        return seq
+
+    def clear(self):
+        """Remove all entries (sequence numbers continue to increase)
+        """
+        self._msgStrList = [None] * self.maxEntries
+        self._cmdInfoDict = {}
+        self._clearPostings()
+        self.firstSeq = self.nextSeq
+
+    def getSeqsForActors(self, actors):
+        """Return the set of sequence numbers of entries from or commands to any of the specified actors
+
+        Inputs:
+        - actors: a collection of actor names (case matters)
+        """
+        seqSet = set()
+        for actor in actors:
+            actorInd = self.actorTable.getIndIfPresent(actor)
+            if actorInd is not None and actorInd < len(self._actorPostingList):
+                seqSet.update(self._actorPostingList[actorInd].getSeqs())
+        return seqSet
+
+    def isForActors(self, seq, actors):
+        """Return True if an entry is from, or is a command to, any of the specified actors
+
+        This is the test for one entry that matches getSeqsForActors.
+
+        Inputs:
+        - seq: sequence number
+        - actors: a collection of actor names (case matters); a set is fastest
+        """
+        slot = self.getSlot(seq)
+        if self.actorTable.strList[self._actorIndArr[slot]] in actors:
+            return True
+        cmdInfo = self._cmdInfoDict.get(slot)
+        return cmdInfo is not None and cmdInfo.actor in actors
+
+    def getSeqsForCmdrs(self, cmdrs):
+        """Return the set of sequence numbers of entries for any of the specified commanders
+
+        Inputs:
+        - cmdrs: a collection of commanders (case matters)
+        """
+        seqSet = set()
+        for cmdr in cmdrs:
+            cmdrInd = self.cmdrTable.getIndIfPresent(cmdr)
+            if cmdrInd is not None and cmdrInd < len(self._cmdrPostingList):
+                seqSet.update(self._cmdrPostingList[cmdrInd].getSeqs())
+        return seqSet
+
+    def getSeqsForCmdIDs(self, cmdIDs):
+        """Return the set of sequence numbers of entries with any of the specified command IDs
+        """
+        seqSet = set()
+        for cmdID in cmdIDs:
+            cmdIDPosting = self._cmdIDPostingDict.get(cmdID)
+            if cmdIDPosting is not None:
+                seqSet.update(cmdIDPosting.getSeqs())
+        return seqSet
+
+    def getSeqsForSeverity(self, minSeverity):
+        """Return the set of sequence numbers of entries whose severity >= minSeverity
+        """
+        seqSet = set()
+        for severity, severityPosting in self._severityPostingDict.items():
+            if severity >= minSeverity:
+                seqSet.update(severityPosting.getSeqs())
+        return seqSet
+
+    def getSlot(self, seq):
+        """Return the ring buffer slot for a given sequence number.
+
+        Raise IndexError if the entry is no longer (or not yet) available.
+        """
+        if not (self.firstSeq <= seq < self.nextSeq):
+            raise IndexError("seq=%r not in range [%s, %s)" % (seq, self.firstSeq, self.nextSeq))
+        return seq % self.maxEntries
+
+    def getActor(self, seq):
+        return self.actorTable.strList[self._actorIndArr[self.getSlot(seq)]]
+
+    def getCmdr(self, seq):
+        return self.cmdrTable.strList[self._cmdrIndArr[self.getSlot(seq)]]
+
+    def getCmdID(self, seq):
+        return self._cmdIDArr[self.getSlot(seq)]
+
+    def getCmdInfo(self, seq):
+        return self._cmdInfoDict.get(self.getSlot(seq))
+
+    def getIsKeys(self, seq):
+        """Return True if the entry is a command to, or output from, the keys actor
+        """
+        slot = self.getSlot(seq)
+        if self.actorTable.strList[self._actorIndArr[slot]].startswith("keys"):
+            return True
+        cmdInfo = self._cmdInfoDict.get(slot)
+        return bool(cmdInfo and cmdInfo.actor.startswith("keys"))
+
+    def getMsgStr(self, seq):
+        return self._msgStrList[self.getSlot(seq)]
+
+    def getSeverity(self, seq):
+        return self._severityArr[self.getSlot(seq)]
+
+    def getUnixTime(self, seq):
+        return self._unixTimeArr[self.getSlot(seq)]
+
+    def getTAITime(self, seq):
+        """Return the TAI time of an entry as unix-style seconds (unix time + clock correction)
+        """
+        slot = self.getSlot(seq)
+        return self._unixTimeArr[slot] + _taiClock.offsetList[self._clockEpochArr[slot]]
+
+    def getTAITimeStr(self, seq):
+        """Return the TAI date and time of an entry as a string YYYY-MM-DD HH:MM:SS
+        """
+        slot = self.getSlot(seq)
+        return _taiClock.getTAITimeStr(self._unixTimeArr[slot], self._clockEpochArr[slot])
+
+    def getStr(self, seq):
+        """Return an entry formatted for a log window; the same as getEntry(seq).getStr()
+        """
+        slot = self.getSlot(seq)
+        return "%s %s\n" % (
+            _taiClock.getTAITimeStr(self._unixTimeArr[slot], self._clockEpochArr[slot]),
+            self._msgStrList[slot],
+        )
+
+    def getTags(self, seq):
+        """Return the list of Tk text tags for an entry
+        """
+        slot = self.getSlot(seq)
+        return [tag for tag in (
+            self.cmdrTable.tagList[self._cmdrIndArr[slot]],
+            self.actorTable.tagList[self._actorIndArr[slot]],
+        ) if tag]
+
+    def getEntry(self, seq):
+        """Return a new LogEntry for the specified sequence number.
+
+        Raise IndexError if the entry is not available.
+        """
+        slot = self.getSlot(seq)
+        cmdrInd = self._cmdrIndArr[slot]
+        actorInd = self._actorIndArr[slot]
+        return LogEntry(
+            msgStr = self._msgStrList[slot],
+            severity = self._severityArr[slot],
+            actor = self.actorTable.strList[actorInd],
+            cmdr = self.cmdrTable.strList[cmdrInd],
+            cmdID = self._cmdIDArr[slot],
+            tags = [tag for tag in (self.cmdrTable.tagList[cmdrInd], self.actorTable.tagList[actorInd]) if tag],
+            cmdInfo = self._cmdInfoDict.get(slot),
+            unixTime = self._unixTimeArr[slot],
+            clockEpoch = self._clockEpochArr[slot],
+        )
+
+
+class LogEntryList(collections.abc.Sequence):
+    """A read-only sequence of LogEntry objects backed by a LogStore.
+
+    Entries are created on demand, oldest first, so this may be used where a list
+    or deque of LogEntry objects was used before.
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, ind):
+        firstSeq = self.store.firstSeq
+        numEntries = self.store.nextSeq - firstSeq
+        if isinstance(ind, slice):
+            return [self.store.getEntry(firstSeq + i) for i in range(*ind.indices(numEntries))]
+        if ind < 0:
+            ind += numEntries
+        if not (0 <= ind < numEntries):
+            raise IndexError("index %r out of range" % (ind,))
+        return self.store.getEntry(firstSeq + ind)
+
+    def __iter__(self):
+        store = self.store
+        for seq in range(store.firstSeq, store.nextSeq):
+            yield store.getEntry(seq)
+
+    def __reversed__(self):
+        store = self.store
+        for seq in range(store.nextSeq - 1, store.firstSeq - 1, -1):
+            yield store.getEntry(seq)
+
+
+
 class LogSource(RO.AddCallback.BaseMixin):
     """Repository of messages from the dispatcher, designed for logging. A singleton.
     
     Supports callbacks via the standard interface (RO.AddCallback), including:
     - addCallback(func, callNow): register a callback function;
-      whenever a log entry is added the function will be called with this LogSource as the sole argument
+      whenever log entries are added the function will be called with this LogSource as the sole argument.
+      If batchInterval is 0 then callbacks are called for each new entry; otherwise new entries
+      are collected and callbacks are called at most once per batchInterval, for all new entries.
+      In either case newSeqRange contains the sequence numbers of the new entries.
     
     Useful attributes:
-    - entryList: an ordered collection of LogEntry objects
+    - entryList: an ordered collection of LogEntry objects (a LogEntryList, oldest first);
+      entries are created on demand from the underlying LogStore
     - lastEntry: the last entry added; None until the first entry is added
+    - newSeqRange: a range of sequence numbers of the entries being reported to callbacks
+      (entries that were added and evicted before being reported are omitted)
+    - newEntries: a list of LogEntry objects for newSeqRange
+    - store: the LogStore that holds the data
     
     Each LogEntry has the following tags:
     - act_<LogEntry.actor>
@@ -129,12 +619,14 @@ class LogSource(RO.AddCallback.BaseMixin):
     """
     ActorTagPrefix = "act_"
     CmdrTagPrefix = "cmdr_"
-    def __new__(cls, dispatcher, maxEntries=40000):
+    def __new__(cls, dispatcher, maxEntries=40000, batchInterval=0):
         """Construct the singleton LogSource if not already constructed
         
         Inputs:
         - dispatcher: message dispatcher; an instance of RO.KeyDispatcher.KeyDispatcher
         - maxEntries: the maximum number of entries saved (older entries are removed)
+        - batchInterval: interval (sec) at which to report new entries to callbacks;
+          0 to report each entry as it is added (see setBatchInterval)
         """
         if hasattr(cls, 'self'):
             return cls.self
@@ -143,12 +635,23 @@ class LogSource(RO.AddCallback.BaseMixin):
         self = cls.self
 
         RO.AddCallback.BaseMixin.__init__(self)
-        self.entryList = collections.deque()
+        self.maxEntries = int(maxEntries)
+        self.store = LogStore(
+            maxEntries = self.maxEntries,
+            actorTagPrefix = self.ActorTagPrefix,
+            cmdrTagPrefix = self.CmdrTagPrefix,
+        )
+        self.entryList = LogEntryList(self.store)
+        self._lastEntry = None
+        self.batchInterval = float(batchInterval)
+        self.newSeqRange = range(0, 0)
+        # sequence number of the first entry not yet reported to callbacks
+        self._nextReportSeq = 0
+        self._reportTimer = Timer()
+        self._reportPending = False
         # dictionary of hub unique command ID: CmdInfo
         # used to keep track of running commands so I can turn cmds.CmdDone into real information
         self.cmdDict = {}
-        self.lastEntry = None
-        self.maxEntries = int(maxEntries)
         self.dispatcher = dispatcher
         self.dispatcher.setLogFunc(self.logMsg)
         self.cmdsModel = None
@@ -159,6 +662,43 @@ class LogSource(RO.AddCallback.BaseMixin):
         # if I set the model here immediately I get infinite recursion
         Timer(0.001, self._doRegister)
     
+    @property
+    def lastEntry(self):
+        """The most recently added LogEntry, or None if no entries have been added
+        """
+        if self._lastEntry is None and len(self.store) > 0:
+            self._lastEntry = self.store.getEntry(self.store.nextSeq - 1)
+        return self._lastEntry
+
+    @property
+    def newEntries(self):
+        """A list of LogEntry objects for newSeqRange
+        """
+        return [self.store.getEntry(seq) for seq in self.newSeqRange]
+
+    def setBatchInterval(self, batchInterval):
+        """Set the interval at which new entries are reported to callbacks
+
+        Inputs:
+        - batchInterval: interval (sec); 0 to report each entry as it is added
+        """
+        self.batchInterval = float(batchInterval)
+        if self.batchInterval <= 0:
+            self._reportNewEntries()
+
+    def _reportNewEntries(self):
+        """Report all entries that have not yet been reported to the callbacks
+        """
+        if self._reportPending:
+            self._reportTimer.cancel()
+            self._reportPending = False
+        startSeq = max(self._nextReportSeq, self.store.firstSeq)
+        self._nextReportSeq = self.store.nextSeq
+        if startSeq >= self.store.nextSeq:
+            return
+        self.newSeqRange = range(startSeq, self.store.nextSeq)
+        self._doCallbacks()
+
     def _doRegister(self):
         if not self.cmdsModel:
             self.cmdsModel = TUI.Models.CmdsModel.getModel()
@@ -210,7 +750,7 @@ class LogSource(RO.AddCallback.BaseMixin):
             cmdInfo = cmdInfo,
         )
 
-    def logEntryFromLogMsg(self,
+    def logMsg(self,
         msgStr,
         severity=RO.Constants.sevNormal,
         actor = TUI.Version.ApplicationName,
@@ -218,7 +758,10 @@ class LogSource(RO.AddCallback.BaseMixin):
         cmdID = 0,
         cmdInfo = None,
     ):
-        """Create a LogEntry from log message information.
+        """Add a log message to the repository.
+        
+        Warning: this function is designed as a callback from the dispatcher and only affects LogSource
+        and its clients (mostly log windows). The public function to log messages is tuiModel.logMsg.
         
         Inputs:
         - msgStr: message to display; a final \n is appended
@@ -228,10 +771,6 @@ class LogSource(RO.AddCallback.BaseMixin):
         - cmdID: command ID (an integer)
         - cmdInfo: CmdInfo object (only for synthesized command log entries)
         """
-        # strip keys. from keys.<actor>
-#         if actor and actor.startswith("keys."):
-#             actor = actor[5:]
-
         # demote severity of normal messages from cmds actor to debug
         if actor == "cmds" and severity == RO.Constants.sevNormal:
             severity = RO.Constants.sevDebug
@@ -240,51 +779,17 @@ class LogSource(RO.AddCallback.BaseMixin):
         if cmdr is None:
             cmdr = self.dispatcher.connection.getCmdr()
 
-        tags = []
-        if cmdr:
-            tags.append(self.CmdrTagPrefix + cmdr.lower())
-        if actor:
-            tags.append(self.ActorTagPrefix + actor.lower())
-        return LogEntry(
+        self.store.append(
             msgStr = msgStr,
             severity = severity,
             actor = actor,
             cmdr = cmdr,
             cmdID = cmdID,
-            tags = tags,
             cmdInfo = cmdInfo,
         )
-
-    def logMsg(self,
-        msgStr,
-        severity=RO.Constants.sevNormal,
-        actor = TUI.Version.ApplicationName,
-        cmdr = None,
-        cmdID = 0,
-        cmdInfo = None,
-    ):
-        """Add a log message to the repository.
-        
-        Warning: this function is designed as a callback from the dispatcher and only affects LogSource
-        and its clients (mostly log windows). The public function to log messages is tuiModel.logMsg.
-        
-        Inputs:
-        - msgStr: message to display; a final \n is appended
-        - severity: message severity (an RO.Constants.sevX constant)
-        - actor: name of actor; defaults to TUI
-        - cmdr: commander; defaults to self
-        - cmdID: command ID (an integer)
-        - cmdInfo: CmdInfo object (only for synthesized command log entries)
-        """
-        self.lastEntry = self.logEntryFromLogMsg(
-            msgStr = msgStr,
-            severity = severity,
-            actor = actor,
-            cmdr = cmdr,
-            cmdID = cmdID,
-            cmdInfo = cmdInfo,
-        )
-        self.entryList.append(self.lastEntry)
-        if len(self.entryList) > self.maxEntries:
-            self.entryList.popleft()
-        self._doCallbacks()
+        self._lastEntry = None
+        if self.batchInterval <= 0:
+            self._reportNewEntries()
+        elif not self._reportPending:
+            self._reportPending = True
+            self._reportTimer.start(self.batchInterval, self._reportNewEntries)
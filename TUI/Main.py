@@ -66,6 +66,8 @@ import time
 import traceback
 import tkinter
 
+_StartTime = time.time()
+
 ## Initiate Tk toplevel before importing matplotlib
 root = tkinter.Tk()
 
@@ -89,8 +91,10 @@ else:
     RO.Comm.Generic.setFramework("tk")
 
 import TUI.BackgroundTasks
+import TUI.Inst.ExposeModel
 import TUI.LoadStdModules
 import TUI.MenuBar
+import TUI.StartupProfiler
 import TUI.TUIPaths
 import TUI.TUIModel
 import TUI.WindowModuleUtil
@@ -228,9 +232,20 @@ def runTUI():
     tuiModel.logMsg(
         "TUI Version %s: ready to connect" % (TUI.Version.VersionName,)
     )
+    root.update_idletasks()
     startTimeStr = time.strftime("%Y-%m-%dT%H:%M:%S")
     platformStr = TUI.TUIModel.getPlatform()
-    sys.stdout.write("TUI %s running on %s started %s\n" % (TUI.Version.VersionName, platformStr, startTimeStr))
+    sys.stdout.write("TUI %s running on %s started %s in %.2f sec\n" % \
+        (TUI.Version.VersionName, platformStr, startTimeStr, time.time() - _StartTime))
+
+    # if profiling startup (tui.py --profile-startup), record that TUI is ready
+    startupProfiler = TUI.StartupProfiler.getProfiler()
+    if startupProfiler:
+        startupProfiler.setReady(tuiModel)
+
+    # hidden windows are built when first shown, but the exposure models must run without them
+    # (to automatically download images and play the exposure failed sound)
+    list(TUI.Inst.ExposeModel.modelIter())
 
     if UseTwisted:
         reactor.run()
@@ -29,18 +29,27 @@ import os
 import tkinter
 import tkinter.filedialog
 import RO.Alg
+from TUI.Base.ScriptIndex import getScriptIndex
 from TUI.Base.ScriptLoader import getScriptDirs, ScriptLoader
 
 __all__ = ["getScriptMenu"]
 
+_ScriptIndex = getScriptIndex()
+
 def getScriptMenu(master):
     scriptDirs = getScriptDirs()
     
     rootNode = _RootNode(master=master, label="", pathList=scriptDirs)
     rootNode.checkMenu(recurse=True)
+    _ScriptIndex.startBackgroundRefresh()
     
     return rootNode.menu
 
+def _isSameList(listA, listB):
+    """Return True if two lists contain the same objects (by identity) in the same order
+    """
+    return len(listA) == len(listB) and all(a is b for a, b in zip(listA, listB))
+
 class _MenuNode:
     """Menu and related information about sub-menu of the Scripts menu
 
@@ -68,6 +77,8 @@ class _MenuNode:
         self.itemDict = {}
         self.subDict = RO.Alg.ListDict()
         self.subNodeList = []
+        # script index listings from which the menu was built (one per entry in pathList)
+        self.listingList = []
 
         self._setMenu()
     
@@ -85,45 +96,33 @@ class _MenuNode:
     def checkMenu(self, recurse=True):
         """Check contents of menu and rebuild if anything has changed.
         Return True if anything rebuilt.
+
+        Directory contents come from the script index, so this does not read
+        any directory that has already been listed (the index is refreshed in the background);
+        only sub-menus whose directories have changed are rebuilt.
         """
 #       print "%s checkMenu" % (self,)
-        newItemDict = {}
-        newSubDict = RO.Alg.ListDict()
         didRebuild = False
-        
-        for path in self.pathList:
-            for baseName in os.listdir(path):
-                # reject files that would be invisible on unix
-                # and any directories named __pycache__.
-                if baseName.startswith("."):
-                    continue
-                elif baseName == "__pycache__":
-                    continue
-        
-                baseBody, baseExt = os.path.splitext(baseName)
-        
-                fullPath = os.path.normpath(os.path.join(path, baseName))
-                
-                if os.path.isfile(fullPath) and baseExt.lower() == ".py":
-#                   print "checkMenu newItem[%r] = %r" % (baseBody, fullPath)
-                    newItemDict[baseBody] = fullPath
-                
-                elif os.path.isdir(fullPath) and baseExt.lower() != ".py":
-#                   print "checkMenu newSubDir[%r] = %r" % (baseBody, fullPath)
+
+        listingList = [_ScriptIndex.getListing(path) for path in self.pathList]
+        if not _isSameList(listingList, self.listingList):
+            self.listingList = listingList
+            newItemDict = {}
+            newSubDict = RO.Alg.ListDict()
+            for listing in listingList:
+                newItemDict.update(listing.itemDict)
+                for baseName, fullPath in listing.subDict.items():
                     newSubDict[baseName] = fullPath
-                
-#               else:
-#                   print "checkMenu ignoring %r = %r" % (baseName, fullPath)
-        
-        if (self.itemDict != newItemDict) or (self.subDict != newSubDict):
-            didRebuild = True
-            # rebuild contents
-#           print "checkMenu rebuild contents"
-            self.itemDict = newItemDict
-            self.subDict = newSubDict
-            self.menu.delete(0, "end")
-            self.subNodeList = []
-            self._fillMenu()
+
+            if (self.itemDict != newItemDict) or (self.subDict != newSubDict):
+                didRebuild = True
+                # rebuild contents
+#               print "checkMenu rebuild contents"
+                self.itemDict = newItemDict
+                self.subDict = newSubDict
+                self.menu.delete(0, "end")
+                self.subNodeList = []
+                self._fillMenu()
 #       else:
 #           print "checkMenu do not rebuild contents"
 
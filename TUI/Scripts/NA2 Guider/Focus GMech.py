@@ -68,35 +68,13 @@ class ScriptClass(OffsetGuiderFocusScript):
         self.centerFocPosWdg.set(currFocus)
         self.sr.showMsg("")
 
-    def waitSetFocus(self, focPos, doBacklashComp=False):
-        """Adjust focus.
+    def getSetFocusCmdDict(self, focPos):
+        """Return a dict of actor and cmdStr for a command to set gmech focus
 
-        To use: yield waitSetFocus(...)
-        
         Inputs:
-        - focPos: new focus position in um
-        - doBacklashComp: if True, perform backlash compensation
+        - focPos: focus position (um)
         """
-        sr = self.sr
-
-        focPos = float(focPos)
-        focusActor = "gmech"
-        
-        # to try to eliminate the backlash in the secondary mirror drive move back 1/2 the
-        # distance between the start and end position from the bestEstFocPos
-        if doBacklashComp and self.BacklashComp:
-            backlashFocPos = focPos - (abs(self.BacklashComp) * self.focDir)
-            sr.showMsg("Backlash comp: moving focus to %0.0f %s" % (backlashFocPos, MicronStr))
-            yield sr.waitCmd(
-               actor = focusActor,
-               cmdStr = "focus %0.0f" % (backlashFocPos,),
-            )
-            yield sr.waitMS(self.FocusWaitMS)
-        
-        # move to desired focus position
-        sr.showMsg("Moving focus to %0.0f %s" % (focPos, MicronStr))
-        yield sr.waitCmd(
-           actor = focusActor,
-           cmdStr = "focus %0.0f" % (focPos,),
+        return dict(
+            actor = "gmech",
+            cmdStr = "focus %0.0f" % (focPos,),
         )
-        yield sr.waitMS(self.FocusWaitMS)
@@ -67,8 +67,11 @@ import RO.Wdg
 import TUI.TUIModel
 import TUI.TCC.TCCModel
 import TUI.TCC.UserModel
+import TUI.TCC.SlewPlanner
+import TUI.TCC.SlewWdg.AxisWrapWdg
 import TUI.Inst.ExposeModel
 import TUI.Guide.GuideModel
+import TUI.Guide.StarFinder
 
 MeanLat = 32.780361 # latitude of telescope (deg)
 
@@ -186,6 +189,7 @@ class ScriptClass(object):
         sr.master.winfo_toplevel().resizable(True, True)
         sr.debug = Debug
         self.azAltList = None
+        self.lastPhysPos = None # az, alt, rot of most recent star (deg), as estimated by the slew planner
         self._nextPointTimer = Timer()
         self._gridDirs = getGridDirs()
         self.tccModel = TUI.TCC.TCCModel.getModel()
@@ -336,6 +340,15 @@ class ScriptClass(object):
         )
         ctrlGr.gridWdg(self.centroidRadWdg.label, self.centroidRadWdg, "arcsec")
 
+        self.azWrapWdg = RO.Wdg.OptionMenu(
+            master = ctrlFrame,
+            items = ("Default",) + TUI.TCC.SlewWdg.AxisWrapWdg.AxisWrapWdg.WrapOptions,
+            defValue = "Default",
+            helpText = "azimuth wrap preference for slews to stars (Default: TCC's, or Nearest if Plan Route)",
+            helpURL = self.helpURL,
+        )
+        ctrlGr.gridWdg("Az Wrap", self.azWrapWdg)
+
 
         # grid full-width widgets below the other controls
         # (trying to do this before starting the 2nd colum results in widgets that are too narrow)
@@ -352,6 +365,15 @@ class ScriptClass(object):
         )
         self.attendedModeWdg.grid(row=0, column=0, sticky="")
 
+        self.planRouteWdg = RO.Wdg.Checkbutton(
+            master = btnFrame,
+            text = "Plan Route",
+            defValue = True,
+            helpText = "measure stars in the order that minimizes slew time (else grid order)?",
+            helpURL = self.helpURL,
+        )
+        self.planRouteWdg.grid(row=0, column=1, sticky="")
+
         self.skipCurrStarWdg = RO.Wdg.Button(
             master = btnFrame,
             text = "Skip Current Star",
@@ -359,7 +381,7 @@ class ScriptClass(object):
             helpText = "press to skip the current star",
             helpURL = self.helpURL,
         )
-        self.skipCurrStarWdg.grid(row=0, column=1, sticky="")
+        self.skipCurrStarWdg.grid(row=0, column=2, sticky="")
 
         self.retryMissingWdg = RO.Wdg.Button(
             master = btnFrame,
@@ -368,8 +390,8 @@ class ScriptClass(object):
             helpText = "press to retry all missing stars except stars to skip",
             helpURL = self.helpURL,
         )
-        self.retryMissingWdg.grid(row=0, column=2, sticky="")
-        for i in range(3):
+        self.retryMissingWdg.grid(row=0, column=3, sticky="")
+        for i in range(4):
             btnFrame.grid_columnconfigure(i, weight=1)
 
         ctrlGr.gridWdg(False, btnFrame, colSpan=8, sticky="ew")
@@ -521,6 +543,8 @@ class ScriptClass(object):
 
         # can only change grids if not executing (one grid must be used for the whole run)
         self.gridWdg.setEnable(not isExecuting)
+        self.planRouteWdg.setEnable(not isExecuting)
+        self.azWrapWdg.setEnable(not isExecuting)
 
         # can only skip current star if executing (nothing to skip, otherwise)
         self.skipCurrStarWdg.setEnable(isExecuting)
@@ -673,6 +697,7 @@ class ScriptClass(object):
         self.binFactor = None
         self.window = None # LL pixel is 0, UL pixel is included
         self.currStarNum = 0
+        self.lastPhysPos = None
         self.numStarsWritten = 0 # number of star data items written to output
         for wdg in (self.missingStarsWdg, self.starsToSkipWdg, self.starsToRetryWdg, self.dataIDWdg):
             wdg.set("")
@@ -742,7 +767,11 @@ class ScriptClass(object):
                 ptDataFile.write("\n")
             ptDataFile.flush()
 
-            for starNum in self.starNumIter():
+            if self.planRouteWdg.getBool():
+                starNumIter = self.plannedStarNumIter()
+            else:
+                starNumIter = self.starNumIter()
+            for starNum in starNumIter:
                 if starNum is None:
                     # pausing
                     yield
@@ -818,6 +847,80 @@ class ScriptClass(object):
                 else:
                     raise
 
+    def getAzWrap(self):
+        """Return the azimuth wrap preference for slews to stars, or None to use the TCC's default
+
+        If Az Wrap is Default and Plan Route is checked then return "Nearest",
+        so the wrap the route planner assumes matches the wrap the TCC uses.
+        """
+        azWrap = self.azWrapWdg.getString()
+        if azWrap != "Default":
+            return azWrap
+        if self.planRouteWdg.getBool():
+            return "Nearest"
+        return None
+
+    def plannedStarNumIter(self):
+        """Return number of next star to measure (starNum = grid index + 1), in the order that minimizes slew time
+
+        Like starNumIter, but stars to retry are not measured first; instead the remaining stars
+        (including stars to retry) are measured in the order planned by TUI.TCC.SlewPlanner,
+        starting from the current telescope position. The route is planned again
+        whenever stars are added to the stars to skip or stars to retry.
+        """
+        planner = TUI.TCC.SlewPlanner.SlewPlanner(
+            azAltArr = numpy.column_stack((self.azAltList["az"], self.azAltList["alt"])),
+            axisLimList = TUI.TCC.SlewPlanner.getAxisLimList(self.tccModel),
+            azWrap = self.getAzWrap(),
+            rotType = self.rotTypeWdg.getString(),
+        )
+        pendingIndSet = set(range(len(self.azAltList))) # indices of stars not yet tried
+        route = []
+        while True:
+            skipStarSet = self.starsToSkipWdg.intSet
+            for starNum in sorted(skipStarSet):
+                if starNum - 1 in pendingIndSet:
+                    pendingIndSet.remove(starNum - 1)
+                    self.sr.showMsg("Skipping star %d" % (starNum,))
+                    self.missingStarsWdg.addInt(starNum)
+            retryStarSet = self.starsToRetryWdg.intSet - skipStarSet
+            indSet = pendingIndSet | set(starNum - 1 for starNum in retryStarSet)
+            if not indSet:
+                hasMissingStars = bool(self.missingStarsWdg.intSet - self.starsToSkipWdg.intSet)
+                if not self.attendedModeWdg.getBool() and hasMissingStars:
+                    yield self.sr.waitPause("Some stars missing; paused to allow retry",
+                        severity=RO.Constants.sevWarning)
+                    continue
+                return
+
+            if set(route) != indSet:
+                currPos = self.getCurrPhysPos()
+                route = planner.planRoute(indSet, currPos=currPos)
+                self.sr.showMsg("Planned route through %d stars; estimated slew time %0.0f sec" % \
+                    (len(route), planner.getRouteTime(route, currPos=currPos)), isTemp=True)
+            ind = route.pop(0)
+            pendingIndSet.discard(ind)
+            nextStarNum = ind + 1
+            if nextStarNum in retryStarSet:
+                self.starsToRetryWdg.removeInt(nextStarNum)
+            currPos = self.getCurrPhysPos()
+            self.lastPhysPos = planner.getPhysPos(ind, currAz=currPos[0] if currPos else planner.azArr[ind])
+            yield nextStarNum
+
+    def getCurrPhysPos(self):
+        """Return the current az, alt, rot (deg) for planning slews, or None if unknown
+
+        Az and alt are the actual axis positions reported by the TCC, if known;
+        the rotator position is the slew planner's estimate for the most recent star
+        (the planner only estimates the rotator angle relative to the sky).
+        """
+        lastRot = self.lastPhysPos[2] if self.lastPhysPos else 0.0
+        if not self.sr.debug:
+            axePos, isCurrent = self.tccModel.axePos.get()
+            if isCurrent and None not in axePos[0:2]:
+                return (axePos[0], axePos[1], lastRot)
+        return self.lastPhysPos
+
     def updBinFactor(self, *args, **kargs):
         """Called when the user changes the bin factor"""
         newBinFactor = self.binFactorWdg.getNum()
@@ -951,6 +1054,19 @@ class ScriptClass(object):
         if self.maxFindAmpl is None:
             raise RuntimeError("Find disabled; maxFindAmpl=None")
         
+        if not self.sr.debug:
+            # skip stars that are clearly unusable in the local copy of the image (if any),
+            # to avoid centroid commands that will fail; read the image in a background thread
+            yield self.sr.waitThread(
+                TUI.Guide.StarFinder.prescreenWithLocalImage,
+                guideModel = self.guideModel,
+                filePath = filePath,
+                starDataList = starDataList,
+                maxAmpl = self.maxFindAmpl,
+                matchRad = self.centroidRadPix,
+            )
+            starDataList = self.sr.value
+
         for starData in starDataList:
             starXYPos = starData[2:4]
             starAmpl = starData[14]
@@ -1009,6 +1125,8 @@ class ScriptClass(object):
             minMag = self.getEntryNum(self.minMagWdg)
             maxMag = self.getEntryNum(self.maxMagWdg)
             rotType = self.rotTypeWdg.getString()
+            azWrap = self.getAzWrap()
+            azWrapStr = "/azwrap=%s" % (azWrap,) if azWrap else ""
 
             # tell the world, but don't wait for this command to finish
             sr.startCmd(
@@ -1022,8 +1140,8 @@ class ScriptClass(object):
             # use checkFail=False for all commands so the script can continue with the next star
             yield sr.waitCmd(
                 actor = "tcc",
-                cmdStr = "track %0.7f, %0.7f obs/pterr/rottype=%s/rotang=0/magRange=(%s, %s)" % \
-                    (az, alt, rotType, minMag, maxMag),
+                cmdStr = "track %0.7f, %0.7f obs/pterr/rottype=%s/rotang=0/magRange=(%s, %s)%s" % \
+                    (az, alt, rotType, minMag, maxMag, azWrapStr),
                 keyVars = (self.tccModel.ptRefStar,),
                 checkFail = False,
             )
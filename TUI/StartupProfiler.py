@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""Profile TUI startup: time to import each module, time to load each window module,
+time until TUI is ready to connect and time until the first hub connection.
+
+Run TUI with startup profiling from the command line:
+    tui.py --profile-startup[=reportPath] [--startup-budget=sec]
+- --profile-startup: profile startup; the report is written to reportPath (default: stdout)
+    when TUI is ready to connect and again when it first connects to the hub.
+- --startup-budget=sec: for offline checks: quit as soon as TUI is ready to connect
+    (without connecting) and exit with status 1 if that took longer than sec seconds.
+
+Import times are measured by wrapping the built-in __import__ function,
+so they include all modules imported by import statements (including TUI.Main,
+Tk, matplotlib and numpy), but not modules imported by importlib.import_module
+(window modules loaded by TUI.WindowModuleUtil.LazyToplevelSet are timed by that class).
+The "cumulative" time of an import includes the modules it imports; "self" time excludes them.
+
+This module must not import anything heavy, since it is imported before profiling starts.
+"""
+__all__ = ["StartupProfiler", "getProfiler", "runTUIWithProfile"]
+
+import builtins
+import importlib.util
+import sys
+import time
+
+_theProfiler = None
+
+def getProfiler():
+    """Return the startup profiler, or None if not profiling startup
+    """
+    return _theProfiler
+
+
+class _ImportInfo(object):
+    """Timing information for one imported module
+    """
+    __slots__ = ("name", "cumTime", "selfTime", "childTime")
+    def __init__(self, name):
+        self.name = name
+        self.cumTime = 0.0
+        self.selfTime = 0.0
+        self.childTime = 0.0
+
+
+class StartupProfiler(object):
+    """Record TUI startup times
+
+    Inputs:
+    - reportPath: path of report file; if None then the report is written to stdout
+    - budget: maximum acceptable time (sec) from start until TUI is ready to connect;
+        if not None then TUI is stopped as soon as it is ready
+        and exitStatus is set to 1 if the budget is exceeded
+    - maxImports: maximum number of imports listed in the report
+    """
+    def __init__(self, reportPath=None, budget=None, maxImports=40):
+        self.startTime = time.time()
+        self.reportPath = reportPath
+        self.budget = None if budget is None else float(budget)
+        self.maxImports = int(maxImports)
+        self.readyTime = None
+        self.connectTime = None
+        self.exitStatus = 0
+        self.importInfoList = []
+        self.windowLoadTimeDict = {}
+        self._importStack = []
+        self._origImport = None
+        self._tuiModel = None
+
+    def install(self):
+        """Start timing imports
+        """
+        if self._origImport is not None:
+            return
+        self._origImport = builtins.__import__
+        builtins.__import__ = self._timedImport
+
+    def uninstall(self):
+        """Stop timing imports
+        """
+        if self._origImport is None:
+            return
+        builtins.__import__ = self._origImport
+        self._origImport = None
+
+    def _timedImport(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """A replacement for builtins.__import__ that times new imports
+        """
+        origImport = self._origImport
+        if origImport is None:
+            # no longer installed (e.g. a saved reference)
+            return builtins.__import__(name, globals, locals, fromlist, level)
+        fullName = name
+        if level > 0:
+            try:
+                fullName = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                pass
+        if fullName in sys.modules:
+            return origImport(name, globals, locals, fromlist, level)
+
+        importInfo = _ImportInfo(fullName)
+        self._importStack.append(importInfo)
+        startTime = time.time()
+        try:
+            return origImport(name, globals, locals, fromlist, level)
+        finally:
+            importInfo.cumTime = time.time() - startTime
+            importInfo.selfTime = importInfo.cumTime - importInfo.childTime
+            self._importStack.pop()
+            if self._importStack:
+                self._importStack[-1].childTime += importInfo.cumTime
+            self.importInfoList.append(importInfo)
+
+    def setReady(self, tuiModel):
+        """Call when TUI is ready to connect; writes the report
+        and (if there is a budget) stops TUI
+
+        Inputs:
+        - tuiModel: the TUI model
+        """
+        from RO.TkUtil import Timer
+
+        self.readyTime = time.time() - self.startTime
+        self._tuiModel = tuiModel
+        self.uninstall()
+        self.windowLoadTimeDict = dict(getattr(tuiModel.tlSet, "loadTimeDict", {}))
+        if self.budget is not None:
+            if self.readyTime > self.budget:
+                self.exitStatus = 1
+            self.writeReport()
+            Timer(0, self._quit)
+            return
+        self.writeReport()
+        tuiModel.getConnection().addStateCallback(self._connStateCallback)
+
+    def _connStateCallback(self, conn):
+        """Record the time of the first hub connection and write the report again
+        """
+        if self.connectTime is not None or not conn.isConnected:
+            return
+        self.connectTime = time.time() - self.startTime
+        self.windowLoadTimeDict = dict(getattr(self._tuiModel.tlSet, "loadTimeDict", {}))
+        self.writeReport()
+
+    def _quit(self):
+        """Stop TUI's event loop
+        """
+        if hasattr(self._tuiModel, "reactor"):
+            self._tuiModel.reactor.stop()
+        else:
+            self._tuiModel.tkRoot.quit()
+
+    def getReport(self):
+        """Return the report as a string
+        """
+        lineList = ["TUI startup profile"]
+        if self.readyTime is None:
+            lineList.append("Not yet ready to connect")
+        else:
+            budgetStr = ""
+            if self.budget is not None:
+                budgetStr = "; budget %.2f sec: %s" % (self.budget, "EXCEEDED" if self.exitStatus else "OK")
+            lineList.append("Ready to connect %.2f sec after start%s" % (self.readyTime, budgetStr))
+        if self.connectTime is None:
+            lineList.append("Not yet connected to the hub")
+        else:
+            lineList.append("First hub connection %.2f sec after start" % (self.connectTime,))
+
+        lineList += [
+            "",
+            "Imported %d modules in %.2f sec (sum of self times)" % \
+                (len(self.importInfoList), sum(info.selfTime for info in self.importInfoList)),
+            "%15s %10s  %s" % ("Cumulative (ms)", "Self (ms)", "Module"),
+        ]
+        sortedInfoList = sorted(self.importInfoList, key=lambda info: info.cumTime, reverse=True)
+        for info in sortedInfoList[0:self.maxImports]:
+            lineList.append("%15.1f %10.1f  %s" % (info.cumTime * 1000, info.selfTime * 1000, info.name))
+
+        lineList += [
+            "",
+            "Loaded %d window modules" % (len(self.windowLoadTimeDict),),
+            "%15s %15s  %s" % ("Import (ms)", "addWindow (ms)", "Module"),
+        ]
+        for modName, (importTime, addWindowTime) in sorted(self.windowLoadTimeDict.items(),
+            key=lambda item: sum(item[1]), reverse=True):
+            lineList.append("%15.1f %15.1f  %s" % (importTime * 1000, addWindowTime * 1000, modName))
+        return "\n".join(lineList) + "\n"
+
+    def writeReport(self):
+        """Write the report to reportPath (or stdout if None)
+        """
+        report = self.getReport()
+        if self.reportPath is None:
+            sys.__stdout__.write(report)
+            sys.__stdout__.flush()
+            return
+        try:
+            with open(self.reportPath, "w") as outFile:
+                outFile.write(report)
+        except Exception as e:
+            sys.stderr.write("Could not write startup profile %r: %s\n" % (self.reportPath, e))
+
+
+def runTUIWithProfile(argList=None):
+    """Run TUI, profiling startup; return the exit status (nonzero if the startup budget was exceeded)
+
+    Inputs:
+    - argList: command-line arguments (not including the program name); see module doc string.
+        If None then sys.argv[1:] is used.
+    """
+    global _theProfiler
+    if argList is None:
+        argList = sys.argv[1:]
+    reportPath = None
+    budget = None
+    for arg in argList:
+        if arg.startswith("--profile-startup"):
+            if "=" in arg:
+                reportPath = arg.split("=", 1)[1] or None
+        elif arg.startswith("--startup-budget="):
+            budget = float(arg.split("=", 1)[1])
+        else:
+            raise RuntimeError("Unknown argument %r" % (arg,))
+
+    _theProfiler = StartupProfiler(reportPath=reportPath, budget=budget)
+    _theProfiler.install()
+    import TUI.Main
+    TUI.Main.runTUI()
+    return _theProfiler.exitStatus
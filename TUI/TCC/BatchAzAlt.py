@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""Compute the current topocentric az/alt of many TelTarget objects at once.
+
+TelTarget.getAzAlt performs a full coordinate conversion for one object,
+including computing the precession/nutation matrix, Earth's position and velocity
+and the sidereal time, all of which are the same for every object.
+BatchAzAlt packs the objects of a catalog into numpy arrays once
+(converting each to ICRS at epoch 2000, which does not change with time)
+and then converts them all to topocentric az/alt using numpy array math,
+computing the object-independent data once per call.
+
+The object-independent apparent geocentric data (RO.Astro.Cnv.AppGeoData)
+is shared by all instances and only recomputed when the date changes
+by more than _AppGeoDataMaxAge; it changes slowly enough that
+this makes no visible difference on the sky display.
+
+The same approximations are made as by TelTarget.getAzAlt
+(e.g. Observed and Mount positions are treated as Topocentric).
+"""
+__all__ = ["BatchAzAlt"]
+
+import numpy
+import RO.Astro.Cnv
+import RO.Astro.Sph
+import RO.Astro.Tm
+import RO.CoordSys
+import RO.MathUtil
+
+# maximum age of cached AppGeoData (days)
+_AppGeoDataMaxAge = 0.01
+
+# (UTC MJD, AppGeoData) of the most recently computed AppGeoData, or None;
+# replaced (never modified) so it may be safely used by several threads
+_AppGeoDataCache = None
+
+def getAppGeoData(utcDays):
+    """Return an RO.Astro.Cnv.AppGeoData for the given date,
+    using a cached value if its date is close enough.
+
+    Inputs:
+    - utcDays: date (UTC MJD)
+    """
+    global _AppGeoDataCache
+    cachedData = _AppGeoDataCache
+    if cachedData is not None and abs(cachedData[0] - utcDays) < _AppGeoDataMaxAge:
+        return cachedData[1]
+    agData = RO.Astro.Cnv.AppGeoData(RO.Astro.Tm.epJFromMJD(utcDays))
+    _AppGeoDataCache = (utcDays, agData)
+    return agData
+
+
+class BatchAzAlt(object):
+    """Compute the current az/alt of a list of objects.
+
+    Inputs:
+    - objList: a sequence of objects; each should be a TUI.TCC.TelTarget.TelTarget,
+        but any object with a getAzAlt method is accepted (getAzAlt is called for every
+        object that is not a TelTarget)
+    - obsData: observer data, an RO.Astro.Cnv.ObserverData
+
+    The objects are read once, when this object is constructed,
+    so do not modify the objects afterwards.
+    """
+    def __init__(self, objList, obsData):
+        self.objList = objList
+        self.obsData = obsData
+        self.nObj = len(objList)
+
+        # objects whose position is converted from ICRS:
+        # indices and cartesian ICRS position (au) and velocity (au/year) at epoch 2000
+        icrsIndList = []
+        icrsPList = []
+        icrsVList = []
+        # objects with a fixed apparent geocentric position:
+        # indices and cartesian position (au)
+        geoIndList = []
+        geoPList = []
+        # objects with a fixed topocentric position:
+        # indices and az, alt (deg)
+        topoIndList = []
+        topoPosList = []
+        # objects that are not TelTargets: indices
+        otherIndList = []
+
+        for ind, obj in enumerate(objList):
+            if not hasattr(obj, "approxCSys"):
+                otherIndList.append(ind)
+                continue
+            if obj.csysConst is None:
+                continue
+
+            csys = obj.csysConst.name()
+            try:
+                if csys == RO.CoordSys.Topocentric and obj.dateFloat is None:
+                    # a fixed az/alt
+                    topoIndList.append(ind)
+                    topoPosList.append(obj.posDeg)
+                    continue
+
+                p, v, atInf = RO.Astro.Sph.ccFromSCPV(obj.posDeg, obj.pm, obj.parlax, obj.radVel)
+                if csys == RO.CoordSys.Geocentric and obj.dateFloat is None:
+                    # a fixed current apparent geocentric position
+                    geoIndList.append(ind)
+                    geoPList.append(p)
+                    continue
+
+                icrsP, icrsV = RO.Astro.Cnv.coordConv(
+                    p, v, csys, obj.dateFloat, RO.CoordSys.ICRS, 2000.0, self.obsData,
+                )
+            except (ValueError, ArithmeticError):
+                # e.g. invalid position; never displayed
+                continue
+            icrsIndList.append(ind)
+            icrsPList.append(icrsP)
+            icrsVList.append(icrsV)
+
+        self._icrsInd = numpy.array(icrsIndList, dtype=int)
+        self._icrsP = numpy.array(icrsPList, dtype=float).reshape(-1, 3)
+        self._icrsV = numpy.array(icrsVList, dtype=float).reshape(-1, 3)
+        self._geoInd = numpy.array(geoIndList, dtype=int)
+        self._geoP = numpy.array(geoPList, dtype=float).reshape(-1, 3)
+        self._topoInd = numpy.array(topoIndList, dtype=int)
+        self._topoPos = numpy.array(topoPosList, dtype=float).reshape(-1, 2)
+        self._otherInd = otherIndList
+
+    def getAzAlt(self, utcDays=None):
+        """Return the az/alt of all objects as an n x 2 numpy array (deg);
+        az, alt are NaN for objects whose position is unknown or invalid.
+
+        Inputs:
+        - utcDays: date (UTC MJD); if None then the current date is used
+        """
+        if utcDays is None:
+            utcDays = RO.Astro.Tm.utcFromPySec()
+        azAltArr = numpy.empty((self.nObj, 2), dtype=float)
+        azAltArr[:] = numpy.nan
+
+        if len(self._icrsInd) + len(self._geoInd) > 0:
+            geoP = numpy.concatenate((
+                self._geoFromICRS(self._icrsP, self._icrsV, getAppGeoData(utcDays)),
+                self._geoP,
+            ))
+            last = RO.Astro.Tm.lastFromUT1(utcDays, self.obsData.longitude)
+            azAltArr[numpy.concatenate((self._icrsInd, self._geoInd))] = self._azAltFromGeo(geoP, last)
+
+        azAltArr[self._topoInd] = self._topoPos
+
+        for ind in self._otherInd:
+            azAlt = self.objList[ind].getAzAlt()
+            if azAlt is not None:
+                azAltArr[ind] = azAlt[0:2]
+
+        return azAltArr
+
+    def _geoFromICRS(self, icrsP, icrsV, agData):
+        """Convert ICRS positions to apparent geocentric positions;
+        a vectorized version of RO.Astro.Cnv.geoFromICRS.
+
+        Inputs:
+        - icrsP: ICRS cartesian positions (au), an n x 3 array
+        - icrsV: ICRS cartesian velocities (au/year), an n x 3 array
+        - agData: an RO.Astro.Cnv.AppGeoData
+
+        Returns apparent geocentric cartesian positions (au), an n x 3 array
+        """
+        p2 = icrsP + icrsV * agData.dtPM - agData.bPos
+        p2Mag = numpy.sqrt(numpy.sum(p2**2, axis=1))
+        dot2 = numpy.dot(p2, agData.bVelC) / p2Mag
+        vfac = p2Mag * (1.0 + dot2 / (1.0 + agData.bGamma))
+        p3 = ((p2 * agData.bGamma) + (vfac[:, numpy.newaxis] * agData.bVelC)) / (1.0 + dot2)[:, numpy.newaxis]
+        return numpy.dot(p3, numpy.transpose(agData.pnMat))
+
+    def _azAltFromGeo(self, geoP, last):
+        """Convert apparent geocentric positions to topocentric az/alt;
+        a vectorized version of RO.Astro.Cnv.topoFromGeo followed by RO.Astro.Sph.scFromCC.
+
+        Inputs:
+        - geoP: apparent geocentric cartesian positions (au), an n x 3 array
+        - last: local apparent sidereal time (deg)
+
+        Returns az, alt (deg), an n x 2 array
+        """
+        obsData = self.obsData
+        sinLAST = RO.MathUtil.sind(last)
+        cosLAST = RO.MathUtil.cosd(last)
+        posB = numpy.column_stack((
+             cosLAST * geoP[:, 0] + sinLAST * geoP[:, 1],
+            -sinLAST * geoP[:, 0] + cosLAST * geoP[:, 1],
+             geoP[:, 2],
+        )) - obsData.p
+
+        # diurnal aberration
+        bMag = numpy.sqrt(numpy.sum(posB**2, axis=1))
+        diurAbScaleCorr = 1.0 - (obsData.diurAbVecMag * posB[:, 1] / bMag)
+        posC = posB * diurAbScaleCorr[:, numpy.newaxis]
+        posC[:, 1] += obsData.diurAbVecMag * bMag * diurAbScaleCorr
+
+        # HA/Dec to az/alt
+        sinLat = RO.MathUtil.sind(obsData.latitude)
+        cosLat = RO.MathUtil.cosd(obsData.latitude)
+        x = sinLat * posC[:, 0] - cosLat * posC[:, 2]
+        y = posC[:, 1]
+        z = cosLat * posC[:, 0] + sinLat * posC[:, 2]
+
+        az = numpy.degrees(numpy.arctan2(y, x)) % 360.0
+        alt = numpy.degrees(numpy.arctan2(z, numpy.hypot(x, y)))
+        return numpy.column_stack((az, alt))
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    from TUI.TCC.TelTarget import TelTarget
+
+    numObj = 10000
+    objList = [
+        TelTarget({
+            "CSys": RO.CoordSys.FK5,
+            "ObjPos": ("%.5f" % random.uniform(0, 24), "%.5f" % random.uniform(-90, 90)),
+            "PM": ("%.2f" % random.uniform(-100, 100), "%.2f" % random.uniform(-100, 100)),
+        }) for ind in range(numObj)
+    ]
+    utcDays = RO.Astro.Tm.utcFromPySec()
+
+    startTime = time.time()
+    batchAzAlt = BatchAzAlt(objList, TelTarget.ObsData)
+    packTime = time.time() - startTime
+    startTime = time.time()
+    azAltArr = batchAzAlt.getAzAlt(utcDays)
+    batchTime = time.time() - startTime
+    print("%d objects: pack in %.3f sec; compute az/alt in %.4f sec" % (numObj, packTime, batchTime))
+
+    numTest = 500
+    maxErr = 0.0
+    startTime = time.time()
+    for obj, azAlt in zip(objList[0:numTest], azAltArr):
+        scalarAzAlt = RO.Astro.Sph.coordConv(
+            fromPos = obj.posDeg,
+            fromSys = obj.csysConst.name(),
+            fromDate = obj.dateFloat,
+            toSys = RO.CoordSys.Topocentric,
+            toDate = utcDays,
+            obsData = TelTarget.ObsData,
+            fromPM = obj.pm,
+        )[0]
+        maxErr = max(maxErr, RO.Astro.Sph.angSep(azAlt, scalarAzAlt))
+    scalarTime = time.time() - startTime
+    print("compute az/alt one object at a time: %.4f sec per %d objects" % (scalarTime * numObj / numTest, numObj))
+    print("maximum difference = %.2g arcsec" % (maxErr * 3600.0,))
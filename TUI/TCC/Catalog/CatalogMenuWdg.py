@@ -25,6 +25,7 @@ History:
 2011-06-16 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
 2012-07-10 ROwen    Removed use of update_idletasks.
 """
+import concurrent.futures
 import os
 import sys
 import tkinter
@@ -40,6 +41,7 @@ from . import ParseCat
 
 _NItems = 20    # number of items in partial menu
 _MaxItems = 25  # max # of items in a menu
+_PollInterval = 0.05 # interval at which to check if a catalog has been parsed (sec)
 
 class CatalogMenuWdg(tkinter.Frame):
     """Display a catalog pop-up menu.
@@ -62,6 +64,11 @@ class CatalogMenuWdg(tkinter.Frame):
         tkinter.Frame.__init__(self, master)
         self.callFunc = callFunc
         self._catParser = ParseCat.CatalogParser()
+        # parse catalogs in a background thread, so large catalogs do not freeze the display
+        self._parseExecutor = concurrent.futures.ThreadPoolExecutor(
+            max_workers = 1,
+            thread_name_prefix = "CatalogParser",
+        )
         userModel = TUI.TCC.UserModel.getModel()
         self.userCatDict = userModel.userCatDict
         self.statusBar = statusBar
@@ -138,11 +145,25 @@ class CatalogMenuWdg(tkinter.Frame):
         # in case a Tcl object was returned...
         catFile = RO.CnvUtil.asStr(catFile)
         
-        # parse the catalog file
+        # parse the catalog file in a background thread
         # print "loading catalog %r" % (catFile,)
         self.showMsg("Loading file %s" % (catFile,))
+        future = self._parseExecutor.submit(self._catParser.parseCatData, catFile)
+        RO.TkUtil.Timer(_PollInterval, self._finishOpen, future, catFile)
+
+    def _finishOpen(self, future, catFile):
+        """Finish opening a catalog once it has been parsed
+        
+        Inputs:
+        - future: a concurrent.futures.Future whose result is the output of ParseCat.parseCatData
+        - catFile: path to the catalog file
+        """
+        if not future.done():
+            RO.TkUtil.Timer(_PollInterval, self._finishOpen, future, catFile)
+            return
         try:
-            objCat, errList = self._catParser.parseCat(catFile)
+            catName, objList, catOptions, errList = future.result()
+            objCat = self._catParser.makeCatalog(catName, objList, catOptions)
         except Exception as e:
             self.showMsg(
                 msgStr = "Could not load %s: %s" % (catFile, e),
@@ -150,8 +171,6 @@ class CatalogMenuWdg(tkinter.Frame):
             )
             return
         
-        catName = objCat.name
-        
         # report errors, if any
         if errList:
             _CatalogErrBox(self, catFile, errList)
@@ -23,7 +23,6 @@ History:
 """
 import os.path
 import re
-import tkinter
 from . import GetString
 import RO.Alg
 import RO.CnvUtil
@@ -31,9 +30,8 @@ import RO.OS
 import RO.SeqUtil
 import RO.StringUtil
 import RO.ParseMsg.ParseData as ParseData
-import TUI.TCC.UserModel
 import TUI.TCC.TelTarget
-import TUI.TCC.SlewWdg.InputWdg
+import TUI.TCC.SlewWdg.InputChecker
 
 def listGet(aList, ind, defValue=None):
     try:
@@ -56,32 +54,22 @@ class CatalogParser(object):
     """Object that will read in object catalogs, expand abbreviations,
     correct case and check limits.
     
-    Warning: uses a (hidden) Tkinter widget to perform value checking
-    and abbreviation expansion. Thus:
-    - Do not call from a background thread.
-    - Before calling you should already have created a root widget.
-    """
-    def __init__(self):
-        # get a local tcc user model and use to create a slew input widget
-        # that I can safely set without affecting other widgets
-        userModel = TUI.TCC.UserModel._Model()
-        tl = tkinter.Toplevel()
-        tl.withdraw()
-        self._slewInputWdg = TUI.TCC.SlewWdg.InputWdg.InputWdg(
-            master = tl,
-            userModel = userModel,
-        )
-        self._slewInputWdg.pack()
+    Values are checked using the same rules as the slew input widget
+    (see TUI.TCC.SlewWdg.InputChecker), but no widgets are used,
+    so parseCatData may be called from a background thread.
+    However, parseCat creates a TUI.TCC.TelTarget.Catalog, which checks its display color using Tk,
+    so call parseCat (or makeCatalog) from the main thread.
 
-        defValueDict = self._slewInputWdg.getDefValueDict()
-        defValueDict.update(_CatOptionDict)
-        #print defValueDict
+    Inputs:
+    - tccModel: TCC model, for the mount az/alt limits; if None then the global model is used
+    """
+    def __init__(self, tccModel=None):
+        self._inputChecker = TUI.TCC.SlewWdg.InputChecker.InputChecker(tccModel)
         self._keyMatcher = RO.Alg.MatchList(
-            valueList = list(defValueDict.keys()),
+            valueList = list(TUI.TCC.SlewWdg.InputChecker.InputKeys) + list(_CatOptionDict.keys()),
             abbrevOK = True,
             ignoreCase = True,
         )
-        self._catOptions = _CatOptionDict
     
     def parseCat(self, filePath):
         """Parse a catalog given its full file path.
@@ -91,12 +79,38 @@ class CatalogParser(object):
         - errList: a list of (line, errMsg) tuples, one per rejected line of object data
         
         Raises RuntimeError if the file cannot be read or a default is invalid.
+        """
+        catName, objList, catOptions, errList = self.parseCatData(filePath)
+        return self.makeCatalog(catName, objList, catOptions), errList
+    
+    def makeCatalog(self, catName, objList, catOptions):
+        """Make a catalog from the data returned by parseCatData.
         
-        Uses universal newline support (new in Python 2.3) if possible.
+        Returns the catalog as a TUI.TCC.TelTarget.Catalog
         """
-#       print "parseCat(%r)" % (filePath,)
+#       print "makeCatalog: catOptions =", catOptions
+        return TUI.TCC.TelTarget.Catalog (
+            name = catName,
+            objList = objList,
+        **catOptions)
+    
+    def parseCatData(self, filePath):
+        """Parse a catalog given its full file path, without creating a catalog.
+        
+        Safe to call from a background thread.
+        
+        Returns four items:
+        - catName: the catalog name
+        - objList: a list of objects, each a TUI.TCC.TelTarget.TelTarget
+        - catOptions: a dict of catalog options (keyword arguments for TUI.TCC.TelTarget.Catalog)
+        - errList: a list of (line, errMsg) tuples, one per rejected line of object data
+        
+        Raises RuntimeError if the file cannot be read or a default is invalid.
+        """
+#       print "parseCatData(%r)" % (filePath,)
         fp = RO.OS.openUniv(filePath)
         catName = os.path.basename(filePath)
+        catOptions = _CatOptionDict.copy()
 
         defOptionDict = self._keyMatcher.matchKeys({
             "CSys": "FK5",
@@ -105,7 +119,6 @@ class CatalogParser(object):
         errList = []
         objList = []
         
-        # save checkWdg data, then use try/finally to restore no matter what
         ii = 0
         for line in fp:
             ii += 1
@@ -145,7 +158,7 @@ class CatalogParser(object):
                     
                     # merge new defaults into existing defaults
                     # and check the result
-                    self._combineDicts(defOptionDict, optDict)
+                    self._combineDicts(defOptionDict, optDict, catOptions)
                 else:
                     # a line of data
                     # the data dictionary starts with the current defaults
@@ -159,7 +172,7 @@ class CatalogParser(object):
 
                     # merge new data with a copy of the defaults
                     # and check the result
-                    self._combineDicts(dataDict, optDict)
+                    self._combineDicts(dataDict, optDict, catOptions)
                     
                     objList.append(TUI.TCC.TelTarget.TelTarget(dataDict))
             except Exception as e:
@@ -169,20 +182,15 @@ class CatalogParser(object):
                     errList.append((line, RO.StringUtil.strFromException(e)))
         
         # convert catalog options as appropriate
-        self._catOptions["doDisplay"] = RO.CnvUtil.asBool(self._catOptions["doDisplay"])
+        catOptions["doDisplay"] = RO.CnvUtil.asBool(catOptions["doDisplay"])
 
-        # create catalog
-#       print "parseCat: catOptions =", self._catOptions
-        objCat = TUI.TCC.TelTarget.Catalog (
-            name = catName,
-            objList = objList,
-        **self._catOptions)
-#       print "parseCat returning (%r, %r)" % (objCat, errList)
-        return objCat, errList
+#       print "parseCatData returning %d objects and %d errors" % (len(objList), len(errList))
+        return catName, objList, catOptions, errList
     
-    def _combineDicts(self, defDict, newDict):
+    def _combineDicts(self, defDict, newDict, catOptions):
         """Combine a new dictionary into an existing default dictionary.
         The default dictionary is modified; newDict is not.
+        Catalog options found in newDict are moved to catOptions.
         
         It is assumed that defDict already has been key-matched
         (expanding abbreviations and correcting case).
@@ -221,29 +229,20 @@ class CatalogParser(object):
         # extract catalog options, if present
         for key in _CatOptionDict:
             if key in defDict:
-                self._catOptions[key] = defDict.pop(key)[0]
+                catOptions[key] = defDict.pop(key)[0]
         
         # check the new dictionary
         self._checkValueDict(defDict)
     
     def _checkValueDict(self, valueDict):
-        """Check valudDict.
+        """Check valueDict.
 
-        Raise ValueError if valueDict has unknown keys
-        or a value would be out of bounds.
+        Raise ValueError if a value is invalid or out of bounds.
         """
-        self._entryErrMsg = None
-        self._slewInputWdg.setValueDict(valueDict)
-        if self._entryErrMsg:
-            raise ValueError(self._entryErrMsg)
-    
-    def _handleEntryError(self, evt):
-        """Handle entry errors by recording the message."""
-        msgStr = evt.widget.getEntryError()
-        if msgStr:
-            self._entryErrMsg = msgStr
+        self._inputChecker.checkValueDict(valueDict)
 
 if __name__ == "__main__":
+    import tkinter
     root = tkinter.Tk()
     tuiModel = TUI.TUIModel.getModel(True)
     catParser = CatalogParser()
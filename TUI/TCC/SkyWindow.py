@@ -44,7 +44,9 @@ History:
 2012-07-09 ROwen    Modified to use RO.TkUtil.Timer.
 """
 import math
+import time
 import tkinter
+import numpy
 import RO.CanvasUtil
 import RO.CnvUtil
 import RO.MathUtil
@@ -72,6 +74,13 @@ _HelpURL = "Telescope/SkyWin.html"
 # constants regarding redraw of catalog objects
 _CatRedrawDelay = 5.0
 
+# size of the cells of the catalog object position index (pixels)
+_IndexCellSize = 8
+
+# size of the cells used to cull catalog objects that are too dense to see (pixels);
+# at most one object is drawn per cell
+_CullCellSize = 2
+
 def xyDegFromAzAlt (azAlt):
     """converts a point from az,alt degrees (0 south, 90 east)
     to x,y degrees (x east, y north)
@@ -110,6 +119,116 @@ class AzAltTarget(object):
     def __str__(self):
         return "%r %7.2f, %5.2f Mount" % (self.name, self.posAzAlt[0], self.posAzAlt[1])
 
+class PixPosIndex(object):
+    """A spatial index of catalog objects by pixel position, for finding the nearest object
+    and for culling objects that are too close together to be seen.
+
+    Objects are binned into square cells of size cellSize;
+    finding the nearest object within a small distance only examines nearby cells.
+
+    Inputs:
+    - pixPosArr: pixel positions of the objects, an n x 2 numpy array
+    - objList: the objects, in the same order as pixPosArr
+    - catIndList: index of each object in its catalog, in the same order as pixPosArr
+    - cellSize: size of index cells (pixels)
+    - cullCellSize: objects are culled so at most one of them is drawn
+        in each square cell of this size (pixels)
+    
+    If constructed with no arguments, the index is empty.
+    """
+    def __init__(self, pixPosArr=None, objList=(), catIndList=(), cellSize=_IndexCellSize, cullCellSize=_CullCellSize):
+        if pixPosArr is None:
+            pixPosArr = numpy.zeros((0, 2), dtype=float)
+        self.pixPosArr = pixPosArr
+        self.objList = objList
+        self.catIndList = catIndList
+        self.cellSize = float(cellSize)
+
+        self._cellDict = {}  # key=(x cell, y cell), value=list of object indices
+        cellArr = numpy.floor(pixPosArr / self.cellSize).astype(int)
+        for ind, cell in enumerate(map(tuple, cellArr.tolist())):
+            self._cellDict.setdefault(cell, []).append(ind)
+
+        # indices of objects to draw (the first object in each cull cell)
+        cullCellArr = numpy.floor(pixPosArr / float(cullCellSize)).astype(int)
+        dum, drawInds = numpy.unique(cullCellArr, axis=0, return_index=True)
+        self.drawInds = numpy.sort(drawInds)
+
+    def __len__(self):
+        return len(self.objList)
+
+    def getDrawList(self):
+        """Return a list of (catalog index, pixel position) of objects to draw,
+        omitting objects that are too close to another object to be seen.
+        """
+        return [(self.catIndList[ind], pixPos) for ind, pixPos in zip(
+            self.drawInds.tolist(),
+            self.pixPosArr[self.drawInds].tolist(),
+        )]
+
+    def findNearest(self, xyPix, maxDistSq=9.0e99):
+        """Find the object nearest to xyPix whose squared distance is less than maxDistSq pixels^2.
+        
+        Returns (squared distance, object), or (None, None) if no object is close enough.
+        """
+        if len(self.objList) == 0:
+            return (None, None)
+        cellRad = int(math.ceil(math.sqrt(maxDistSq) / self.cellSize))
+        if (2 * cellRad + 1)**2 < len(self._cellDict):
+            # search nearby cells
+            xCell = int(math.floor(xyPix[0] / self.cellSize))
+            yCell = int(math.floor(xyPix[1] / self.cellSize))
+            indList = []
+            for x in range(xCell - cellRad, xCell + cellRad + 1):
+                for y in range(yCell - cellRad, yCell + cellRad + 1):
+                    indList += self._cellDict.get((x, y), [])
+            if not indList:
+                return (None, None)
+            inds = numpy.array(indList, dtype=int)
+        else:
+            # search everything
+            inds = numpy.arange(len(self.objList))
+        distSqArr = numpy.sum((self.pixPosArr[inds] - xyPix)**2, axis=1)
+        minInd = numpy.argmin(distSqArr)
+        minDistSq = distSqArr[minInd]
+        if minDistSq >= maxDistSq:
+            return (None, None)
+        return (float(minDistSq), self.objList[inds[minInd]])
+
+
+class CatRedrawStats(object):
+    """Counters and timers for redrawing catalog objects on the sky display.
+    
+    Attributes:
+    - nRedraws: number of catalog redraws
+    - computeTime: total time spent computing object positions (sec);
+        this work is done in a background thread
+    - drawTime: total time spent updating the canvas (sec)
+    - nCreated: number of canvas items created
+    - nMoved: number of canvas items moved
+    - nUnchanged: number of canvas items left alone (moved by a pixel or less)
+    - nDeleted: number of canvas items deleted individually
+        (e.g. for objects that have set); items deleted en masse
+        (e.g. when the window is resized) are not counted
+    """
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Reset all counters and timers to zero"""
+        self.nRedraws = 0
+        self.computeTime = 0.0
+        self.drawTime = 0.0
+        self.nCreated = 0
+        self.nMoved = 0
+        self.nUnchanged = 0
+        self.nDeleted = 0
+
+    def __str__(self):
+        return "%d redraws: compute %.3f sec, draw %.3f sec; items: %d created, %d moved, %d unchanged, %d deleted" % \
+            (self.nRedraws, self.computeTime, self.drawTime, self.nCreated, self.nMoved, self.nUnchanged, self.nDeleted)
+
+
 class SkyWdg (tkinter.Frame):
     TELCURRENT = "telCurrent"
     TELTARGET = "telTarget"
@@ -176,11 +295,13 @@ class SkyWdg (tkinter.Frame):
         
         # various dictionaries whose keys are catalog name
         # note: if a catalog is deleted, it is removed from catDict
-        # and catPixPosObjDict, but not necessarily the others
+        # and catPixIndexDict, but not necessarily the others
         self.catDict = {}   # key=catalog name, value = catalog
         self.catRedrawTimerDict = {}    # key=catalog name, value = tk after id
         self.catColorDict = {}  # key=catalog name, value = color
-        self.catPixPosObjDict = {}  # key=catalog name, value = list of (pix pos, obj) pairs
+        self.catPixIndexDict = {}  # key=catalog name, value = PixPosIndex of objects above the horizon
+        self.catItemDict = {}  # key=catalog name, value = dict of catalog index: (canvas item ID, x, y)
+        self.catRedrawStats = CatRedrawStats()
         self.catSRDict = {} # key=catalog name, value = scriptrunner script to redisplay catalog
 
         self.telCurrent = None
@@ -349,7 +470,8 @@ class SkyWdg (tkinter.Frame):
             self.removeCatalogByName(catName)
         
         self.catDict[catName] = catalog
-        self.catPixPosObjDict[catName] = []
+        self.catPixIndexDict[catName] = PixPosIndex()
+        self.catItemDict[catName] = {}
         self.catRedrawTimerDict[catName] = Timer()
         self.catColorDict[catName] = catalog.getDispColor()
         
@@ -359,7 +481,8 @@ class SkyWdg (tkinter.Frame):
             catTag = "cat_%s" % (catName,)
             
             if not catalog.getDoDisplay():
-                self.catPixPosObjDict[catName] = []
+                self.catPixIndexDict[catName] = PixPosIndex()
+                self.catItemDict[catName] = {}
                 self.cnv.delete(catTag)
                 return
     
@@ -371,27 +494,52 @@ class SkyWdg (tkinter.Frame):
                 self.catColorDict[catName] = color
                 
 #           print "compute %s thread starting" % catName
-            yield sr.waitThread(_UpdateCatalog, catalog.objList, self.center, self.azAltScale)
-            pixPosObjList = sr.value
+            startTime = time.time()
+            yield sr.waitThread(_UpdateCatalog, catalog, self.center, self.azAltScale)
+            pixIndex = sr.value
+            stats = self.catRedrawStats
+            stats.nRedraws += 1
+            stats.computeTime += time.time() - startTime
 #           print "compute %s thread done" % catName
 
+            # update the canvas: move existing items (if they moved by more than a pixel),
+            # create items for new objects and delete items for objects no longer drawn
+            startTime = time.time()
             catName = catalog.name
             catTag = "cat_%s" % (catName,)
-    
-            self.catPixPosObjDict[catName] = []
-            self.cnv.delete(catTag)
-    
             color = catalog.getDispColor()      
             rad = 2 # for now, eventually may wish to vary by magnitude or window size or...?
-            for pixPos, obj in pixPosObjList:
-                self.cnv.create_oval(
-                    pixPos[0] - rad,     pixPos[1] - rad,
-                    pixPos[0] + rad + 1, pixPos[1] + rad + 1,
-                    tag = (SkyWdg.CATOBJECT, catTag),
-                    fill = color,
-                    outline = color,
-                )
-            self.catPixPosObjDict[catName] = pixPosObjList
+            oldItemDict = self.catItemDict.get(catName, {})
+            itemDict = {}
+            for catInd, (x, y) in pixIndex.getDrawList():
+                itemInfo = oldItemDict.pop(catInd, None)
+                if itemInfo is None:
+                    itemID = self.cnv.create_oval(
+                        x - rad,     y - rad,
+                        x + rad + 1, y + rad + 1,
+                        tag = (SkyWdg.CATOBJECT, catTag),
+                        fill = color,
+                        outline = color,
+                    )
+                    itemDict[catInd] = (itemID, x, y)
+                    stats.nCreated += 1
+                elif (x - itemInfo[1])**2 + (y - itemInfo[2])**2 > 1.0:
+                    itemID = itemInfo[0]
+                    self.cnv.coords(itemID,
+                        x - rad,     y - rad,
+                        x + rad + 1, y + rad + 1,
+                    )
+                    itemDict[catInd] = (itemID, x, y)
+                    stats.nMoved += 1
+                else:
+                    itemDict[catInd] = itemInfo
+                    stats.nUnchanged += 1
+            for itemInfo in oldItemDict.values():
+                self.cnv.delete(itemInfo[0])
+            stats.nDeleted += len(oldItemDict)
+            self.catItemDict[catName] = itemDict
+            self.catPixIndexDict[catName] = pixIndex
+            stats.drawTime += time.time() - startTime
             
             self.catRedrawTimerDict[catName].start(_CatRedrawDelay, self._drawCatalog, catalog)
         
@@ -432,7 +580,7 @@ class SkyWdg (tkinter.Frame):
         timer.cancel()
         
         # delete entry in other catalog dictionaries
-        for catDict in self.catPixPosObjDict, self.catColorDict:
+        for catDict in self.catPixIndexDict, self.catItemDict, self.catColorDict:
             try:
                 del catDict[catName]
             except KeyError:
@@ -444,12 +592,11 @@ class SkyWdg (tkinter.Frame):
         Returns the catalog object, or None if none found"""
         minStar = None
         minDistSq = maxDistSq
-        for pixPosCatObjList in self.catPixPosObjDict.values():
-            for objPixPos, catObj in pixPosCatObjList:
-                distSq = (objPixPos[0] - xyPix[0])**2 + (objPixPos[1] - xyPix[1])**2
-                if distSq < minDistSq:
-                    minStar = catObj
-                    minDistSq = distSq
+        for pixIndex in self.catPixIndexDict.values():
+            distSq, catObj = pixIndex.findNearest(xyPix, minDistSq)
+            if catObj is not None:
+                minStar = catObj
+                minDistSq = distSq
         return minStar
     
     def pixFromAzAlt(self, azAlt):
@@ -511,6 +658,7 @@ class SkyWdg (tkinter.Frame):
 #       self._printInfo()
         # clear canvas
         self.cnv.delete('all')
+        self.catItemDict = {}
         
         # draw everything
         self._drawGrid()
@@ -523,7 +671,8 @@ class SkyWdg (tkinter.Frame):
     def _drawAllCatalogs(self):
         """Draw all objects in all catalogs, erasing all stars first.
         """
-        self.catPixPosObjDict = {}
+        self.catPixIndexDict = {}
+        self.catItemDict = {}
         self.cnv.delete(SkyWdg.CATOBJECT)
         for catalog in self.catDict.values():
             self._drawCatalog(catalog)
@@ -644,25 +793,26 @@ class SkyWdg (tkinter.Frame):
         self._telPotentialAnimTimer.start(_CatRedrawDelay, self._drawTelPotential)
 
 
-def _UpdateCatalog(objList, center, azAltScale):
-    """Returns a list of [pixPos, obj] for the specified catalog.
+def _UpdateCatalog(catalog, center, azAltScale):
+    """Returns a PixPosIndex of the objects in the specified catalog that are above the horizon.
     Can be run as a background thread.
     """
-    pixPosObjList = []
-    for catObj in objList:
-        azAlt = catObj.getAzAlt()
-        if azAlt[1] < 0:
-            continue
-        
-        xyDeg = xyDegFromAzAlt(azAlt)
-        pixPos = (
-            center[0] - (xyDeg[0] * azAltScale),
-            center[1] - (xyDeg[1] * azAltScale),
-        )
-
-        pixPosObjList.append((pixPos, catObj))
-
-    return pixPosObjList
+    azAltArr = catalog.getAzAltArr()
+    with numpy.errstate(invalid="ignore"):
+        visInds = numpy.nonzero(azAltArr[:, 1] >= 0)[0]
+    azAltArr = azAltArr[visInds]
+    
+    # vectorized version of xyDegFromAzAlt
+    theta = numpy.radians(azAltArr[:, 0] - 90.0)
+    r = 90.0 - azAltArr[:, 1]
+    pixPosArr = numpy.column_stack((
+        center[0] - (r * numpy.cos(theta) * azAltScale),
+        center[1] - (r * numpy.sin(theta) * azAltScale),
+    ))
+
+    objList = catalog.objList
+    catIndList = visInds.tolist()
+    return PixPosIndex(pixPosArr, [objList[ind] for ind in catIndList], catIndList)
 
 if __name__ == '__main__':
     import random
@@ -683,6 +833,21 @@ if __name__ == '__main__':
     catalog = TelTarget.Catalog("randCat", objList)
     testFrame.addCatalog(catalog)
 
+    # create a catalog of 5000 stars at random FK5 positions, which move
+    fk5ObjList = [
+        TelTarget.TelTarget({
+            "CSys": "FK5",
+            "ObjPos": ("%.4f" % (random.random() * 24.0), "%.4f" % ((random.random() - 0.5) * 180.0)),
+        }) for ind in range(5000)
+    ]
+    fk5Catalog = TelTarget.Catalog("fk5Cat", fk5ObjList, dispColor="blue")
+    testFrame.addCatalog(fk5Catalog)
+    
+    def printStats():
+        print(testFrame.catRedrawStats)
+        Timer(30.0, printStats)
+    Timer(30.0, printStats)
+
     dataDict = {
         "AxePos": objList[0].getAzAlt() + ("NaN",),
         "TCCPos": objList[1].getAzAlt() + ("NaN",),
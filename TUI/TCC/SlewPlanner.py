@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""Plan the order in which to slew to a set of az/alt positions, to minimize total slew time.
+
+Used by the Pointing Data script to order the stars of a pointing grid.
+
+The slew time between two positions is estimated as the longest of the az, alt and rotator
+move times, each computed for a trapezoidal velocity profile from the axis velocity
+and acceleration limits (settling time and jerk limits are ignored).
+Azimuth is placed on the wrap the TCC would choose (given the az wrap preference
+of AxisWrapWdg) and the rotator is placed on its middle wrap.
+
+The route is planned with a nearest-neighbor tour improved by 2-opt
+(reversing segments of the route while that shortens it).
+
+Azimuth is in TCC convention (0 = S, 90 = E).
+"""
+__all__ = ["AxisLim", "SlewPlanner", "getAxisLimList", "DefAxisLimList"]
+
+import math
+
+import numpy
+
+from . import TelConst
+
+class AxisLim(object):
+    """Position, velocity and acceleration limits of one axis
+
+    Inputs:
+    - minPos, maxPos: position limits (deg)
+    - vel: maximum velocity (deg/sec)
+    - accel: maximum acceleration (deg/sec^2)
+    """
+    def __init__(self, minPos, maxPos, vel, accel):
+        self.minPos = float(minPos)
+        self.maxPos = float(maxPos)
+        self.vel = float(vel)
+        self.accel = float(accel)
+
+    def getSlewTime(self, dist):
+        """Return the time to move a given distance (sec), starting and ending at rest
+
+        Inputs:
+        - dist: distance (deg); may be an array
+        """
+        dist = numpy.abs(dist)
+        # distance needed to reach full velocity and stop again
+        rampDist = self.vel**2 / self.accel
+        return numpy.where(
+            dist < rampDist,
+            2.0 * numpy.sqrt(dist / self.accel),
+            (dist / self.vel) + (self.vel / self.accel),
+        )
+
+    def __repr__(self):
+        return "AxisLim(%s, %s, %s, %s)" % (self.minPos, self.maxPos, self.vel, self.accel)
+
+# rough limits for az, alt and rot, used for any axis whose limits the TCC has not reported
+DefAxisLimList = (
+    AxisLim(-180.0, 540.0, 1.5, 0.5),
+    AxisLim(6.0, 90.0, 1.5, 0.5),
+    AxisLim(-180.0, 180.0, 2.0, 1.0),
+)
+
+def getAxisLimList(tccModel):
+    """Return a list of AxisLim for az, alt and rot from the TCC's AzLim, AltLim and RotLim keywords
+
+    Inputs:
+    - tccModel: the TCC model (TUI.TCC.TCCModel.Model)
+
+    Limits from DefAxisLimList are used for any axis whose limits are not current.
+    """
+    axisLimList = []
+    for keyVar, defAxisLim in zip((tccModel.azLim, tccModel.altLim, tccModel.rotLim), DefAxisLimList):
+        valList, isCurrent = keyVar.get()
+        limList = valList[0:4]
+        if isCurrent and None not in limList and limList[2] > 0 and limList[3] > 0:
+            axisLimList.append(AxisLim(*limList))
+        else:
+            axisLimList.append(defAxisLim)
+    return axisLimList
+
+def _getParallacticAngle(az, alt, lat=TelConst.Latitude):
+    """Return the parallactic angle (deg) at az/alt (deg, TCC convention); az and alt may be arrays
+    """
+    azN = numpy.radians(180.0 - numpy.asarray(az, dtype=float)) # az from N through E
+    alt = numpy.radians(alt)
+    lat = math.radians(lat)
+    sinDec = numpy.sin(lat) * numpy.sin(alt) + numpy.cos(lat) * numpy.cos(alt) * numpy.cos(azN)
+    cosDec = numpy.sqrt(numpy.maximum(1.0 - sinDec**2, 0.0))
+    sinHACosDec = -numpy.sin(azN) * numpy.cos(alt)
+    cosHACosDec = (numpy.sin(alt) - numpy.sin(lat) * sinDec) / math.cos(lat)
+    return numpy.degrees(numpy.arctan2(
+        sinHACosDec,
+        math.tan(lat) * cosDec**2 - sinDec * cosHACosDec,
+    ))
+
+def _getWrappedPos(pos, axisLim, wrap, currPos=None):
+    """Return pos + n*360 chosen by a wrap preference, as the TCC would
+
+    Inputs:
+    - pos: desired position (deg); may be an array
+    - axisLim: AxisLim for the axis
+    - wrap: wrap preference: one of "Nearest", "Negative", "Middle" or "Positive"
+    - currPos: current position of axis (deg); required if wrap is "Nearest";
+        may be an array that broadcasts with pos
+
+    If no wrap of pos is within the axis limits then pos wrapped into [-180, 180) is returned.
+    """
+    pos = numpy.asarray(pos, dtype=float)
+    minN = numpy.ceil((axisLim.minPos - pos) / 360.0)
+    maxN = numpy.floor((axisLim.maxPos - pos) / 360.0)
+    if wrap == "Negative":
+        n = minN
+    elif wrap == "Positive":
+        n = maxN
+    else:
+        if wrap == "Middle":
+            refPos = (axisLim.minPos + axisLim.maxPos) / 2.0
+        elif wrap == "Nearest":
+            if currPos is None:
+                raise RuntimeError("Nearest wrap requires the current position")
+            refPos = currPos
+        else:
+            raise RuntimeError("Unknown wrap %r" % (wrap,))
+        n = numpy.clip(numpy.round((refPos - pos) / 360.0), minN, maxN)
+    return numpy.where(minN <= maxN, pos + n * 360.0, numpy.mod(pos + 180.0, 360.0) - 180.0)
+
+
+class SlewPlanner(object):
+    """Plan a minimum-slew-time route through a set of az/alt positions
+
+    Inputs:
+    - azAltArr: az, alt of each position (deg); an array of shape [N, 2]
+    - axisLimList: AxisLim for az, alt and rot (see getAxisLimList)
+    - azWrap: azimuth wrap preference: one of "Nearest", "Negative", "Middle" or "Positive"
+        (see TUI.TCC.SlewWdg.AxisWrapWdg); must match the wrap used to slew
+    - rotType: rotation type: one of "Object", "Horizon", "Mount" or "None";
+        the rotator is only modelled as moving for "Object",
+        for which its angle is estimated as the parallactic angle
+    """
+    def __init__(self, azAltArr, axisLimList=DefAxisLimList, azWrap="Nearest", rotType="Mount"):
+        azAltArr = numpy.asarray(azAltArr, dtype=float)
+        self.numPos = len(azAltArr)
+        self.axisLimList = axisLimList
+        self.azWrap = azWrap
+        self.azArr = azAltArr[:, 0]
+        self.altArr = azAltArr[:, 1]
+        if rotType.lower() == "object":
+            rotArr = _getParallacticAngle(self.azArr, self.altArr)
+        else:
+            rotArr = numpy.zeros(self.numPos)
+        self.rotArr = _getWrappedPos(rotArr, axisLimList[2], "Middle")
+        if azWrap != "Nearest":
+            self.azArr = _getWrappedPos(self.azArr, axisLimList[0], azWrap)
+
+        # matrix of slew times between each pair of positions
+        if azWrap == "Nearest":
+            azDistArr = numpy.abs(numpy.mod(self.azArr[:, numpy.newaxis] - self.azArr + 180.0, 360.0) - 180.0)
+        else:
+            azDistArr = self.azArr[:, numpy.newaxis] - self.azArr
+        self.slewTimeArr = self._getSlewTime(
+            azDistArr,
+            self.altArr[:, numpy.newaxis] - self.altArr,
+            self.rotArr[:, numpy.newaxis] - self.rotArr,
+        )
+
+    def _getSlewTime(self, azDist, altDist, rotDist):
+        """Return slew time (sec) for the given distance along each axis (deg); inputs may be arrays
+        """
+        return numpy.maximum.reduce([axisLim.getSlewTime(dist)
+            for axisLim, dist in zip(self.axisLimList, (azDist, altDist, rotDist))])
+
+    def getPhysPos(self, ind, currAz=None):
+        """Return the az, alt, rot (deg) the telescope would move to for a position
+
+        Inputs:
+        - ind: index of position
+        - currAz: current azimuth (deg); required if the azimuth wrap is "Nearest"
+        """
+        if self.azWrap == "Nearest":
+            az = float(_getWrappedPos(self.azArr[ind], self.axisLimList[0], "Nearest", currAz))
+        else:
+            az = self.azArr[ind]
+        return (az, self.altArr[ind], self.rotArr[ind])
+
+    def _getStartTimeArr(self, currPos):
+        """Return an array of slew time from currPos (az, alt, rot) to each position
+        """
+        if self.azWrap == "Nearest":
+            azArr = _getWrappedPos(self.azArr, self.axisLimList[0], "Nearest", currPos[0])
+        else:
+            azArr = self.azArr
+        return self._getSlewTime(azArr - currPos[0], self.altArr - currPos[1], self.rotArr - currPos[2])
+
+    def planRoute(self, indList, currPos=None, maxPasses=50):
+        """Return indList reordered to minimize estimated total slew time
+
+        Inputs:
+        - indList: indices of positions to visit
+        - currPos: current az, alt, rot (deg); if None then the route may start anywhere
+        - maxPasses: maximum number of 2-opt improvement passes
+        """
+        indArr = numpy.array(sorted(set(indList)), dtype=int)
+        numInd = len(indArr)
+        if numInd < 2:
+            return [int(ind) for ind in indArr]
+
+        # augment the slew time matrix with a start node (the current position)
+        # and a free end node, so the route is an open path from the current position
+        startNode = numInd
+        endNode = numInd + 1
+        timeArr = numpy.zeros([numInd + 2, numInd + 2])
+        timeArr[0:numInd, 0:numInd] = self.slewTimeArr[numpy.ix_(indArr, indArr)]
+        if currPos is not None:
+            startTimeArr = self._getStartTimeArr(currPos)[indArr]
+            timeArr[startNode, 0:numInd] = startTimeArr
+            timeArr[0:numInd, startNode] = startTimeArr
+
+        # nearest neighbor tour
+        route = [startNode]
+        isVisited = numpy.zeros(numInd, dtype=bool)
+        for i in range(numInd):
+            slewTimes = numpy.where(isVisited, numpy.inf, timeArr[route[-1], 0:numInd])
+            nextNode = int(numpy.argmin(slewTimes))
+            isVisited[nextNode] = True
+            route.append(nextNode)
+        route.append(endNode)
+        route = numpy.array(route)
+
+        # 2-opt: reverse route[i:j+1] if that shortens the route; the start and end nodes stay put
+        for passInd in range(maxPasses):
+            didImprove = False
+            for i in range(1, numInd):
+                jArr = numpy.arange(i + 1, numInd + 1)
+                prevNode = route[i - 1]
+                firstNode = route[i]
+                deltaArr = timeArr[prevNode, route[jArr]] + timeArr[firstNode, route[jArr + 1]] \
+                    - timeArr[prevNode, firstNode] - timeArr[route[jArr], route[jArr + 1]]
+                bestInd = numpy.argmin(deltaArr)
+                if deltaArr[bestInd] < -1.0e-6:
+                    j = jArr[bestInd]
+                    route[i:j+1] = route[i:j+1][::-1].copy()
+                    didImprove = True
+            if not didImprove:
+                break
+        return [int(indArr[node]) for node in route[1:-1]]
+
+    def getRouteTime(self, route, currPos=None):
+        """Return the estimated total slew time (sec) for a route
+
+        Inputs:
+        - route: indices of positions, in the order visited
+        - currPos: current az, alt, rot (deg); if None then the time to reach the first position is omitted
+
+        Azimuth wrap is followed from position to position, so this is more accurate than
+        the estimate planRoute uses for the "Nearest" wrap near the azimuth limits.
+        """
+        totTime = 0.0
+        for ind in route:
+            if currPos is None:
+                currPos = self.getPhysPos(ind, currAz=self.azArr[ind])
+                continue
+            physPos = self.getPhysPos(ind, currAz=currPos[0])
+            totTime += float(self._getSlewTime(*[physPos[i] - currPos[i] for i in range(3)]))
+            currPos = physPos
+        return totTime
+
+
+if __name__ == "__main__":
+    import glob
+    import os
+    import time
+    import TUI.TUIPaths
+
+    for gridPath in sorted(glob.glob(os.path.join(TUI.TUIPaths.getResourceDir("Grids"), "*.dat"))):
+        azAltArr = numpy.loadtxt(gridPath, comments=("!", "#"))
+        for rotType in ("Mount", "Object"):
+            planner = SlewPlanner(azAltArr, rotType=rotType)
+            startPos = planner.getPhysPos(0, currAz=0.0)
+            startTime = time.time()
+            route = planner.planRoute(list(range(len(azAltArr))), currPos=startPos)
+            planTime = time.time() - startTime
+            print("%s, rot type %s: slew time in grid order %0.0f sec; planned %0.0f sec (planning took %0.3f sec)" % \
+                (os.path.basename(gridPath), rotType,
+                planner.getRouteTime(list(range(len(azAltArr))), currPos=startPos),
+                planner.getRouteTime(route, currPos=startPos), planTime))
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""Check slew input value dictionaries without using any widgets.
+
+InputChecker applies the same rules as the slew input widget (InputWdg.InputWdg)
+applies when a value dictionary is set: known keys (which may be abbreviated),
+the right number of values for each key, menu items (which may be abbreviated
+and are not case sensitive), number formats and ranges, including
+object position ranges that depend on the coordinate system.
+
+Unlike the widget it needs no Tk root, so it may be used from a background thread,
+and it is much faster.
+
+Error messages are prefixed by the name of the offending item, e.g.
+"RotAngle too large: 400.0 > 360".
+"""
+__all__ = ["InputChecker"]
+
+import RO.Alg
+import RO.CoordSys
+import RO.MathUtil
+import RO.SeqUtil
+import RO.StringUtil
+import TUI.TCC.TCCModel
+
+# the following must match the corresponding widgets in this package
+CoordSysItems = (
+    RO.CoordSys.ICRS,
+    RO.CoordSys.FK5,
+    RO.CoordSys.FK4,
+    RO.CoordSys.Galactic,
+    RO.CoordSys.Geocentric,
+    RO.CoordSys.Topocentric,
+    RO.CoordSys.Observed,
+    RO.CoordSys.Mount,
+)
+DefCoordSys = RO.CoordSys.FK5
+RotTypeItems = ("Object", "Horizon", "Mount", "None")
+WrapItems = ("Nearest", "Negative", "Middle", "Positive")
+KeepNames = ("Arc", "Boresight", "GCorr", "Calib")
+KeepNegStr = "No"
+_StdRotLim = (-360, 360)
+
+# keys of the slew input widget's value dictionary, in the order the widget sets them
+# (CSys must be first, since the range of ObjPos depends on it)
+InputKeys = (
+    "CSys", "Date", "ObjPos", "Name", "RotAngle", "RotType",
+    "Magnitude", "PM", "Px", "Distance", "Rv",
+    "ScanVelocity", "Keep", "AzWrap", "RotWrap",
+)
+
+
+class _FloatItem(object):
+    """Check one or more floating point values (strings or numbers)
+
+    Inputs:
+    - minValue: minimum value, or None if no limit
+    - maxValue: maximum value, or None if no limit
+    - nValues: number of values
+    """
+    def __init__(self, minValue=None, maxValue=None, nValues=1):
+        self.minValue = minValue
+        self.maxValue = maxValue
+        self.nValues = nValues
+
+    def numFromStr(self, strVal):
+        return RO.StringUtil.floatFromStr(strVal, allowExp=False)
+
+    def check(self, name, valList):
+        """Raise ValueError if valList has the wrong length or any value is invalid or out of range
+
+        Inputs:
+        - name: name of item (for error messages)
+        - valList: list of values
+        """
+        if len(valList) != self.nValues:
+            raise ValueError("%s has %d elements; %d needed" % (name, len(valList), self.nValues))
+        for val in valList:
+            self.checkValue(name, val, self.minValue, self.maxValue)
+
+    def checkValue(self, name, val, minValue, maxValue):
+        """Raise ValueError if val is invalid or out of range; "" and None are acceptable
+
+        Inputs:
+        - name: name of item (for error messages)
+        - val: value (a string or number)
+        - minValue, maxValue: range; None for no limit
+        """
+        if val in (None, ""):
+            return
+        if RO.SeqUtil.isString(val):
+            if minValue is not None and minValue >= 0 and "-" in val:
+                raise ValueError("%s - forbidden; min val = %s" % (name, minValue))
+            if maxValue is not None and maxValue < 0 and "-" not in val:
+                raise ValueError("%s - required; max val = %s" % (name, maxValue))
+            numVal = self.numFromStr(val)
+        else:
+            numVal = val
+        RO.MathUtil.checkRange(numVal, minValue, maxValue, name)
+
+
+class _DMSItem(_FloatItem):
+    """Check one or more sexagesimal values (strings or numbers, e.g. "-12:34:56.7")
+    """
+    def numFromStr(self, strVal):
+        return RO.StringUtil.degFromDMSStr(strVal)
+
+
+class _MenuItem(object):
+    """Check a value that must match one item of a menu
+    (which may be abbreviated and is not case sensitive)
+
+    Inputs:
+    - items: menu items
+    """
+    def __init__(self, items):
+        self._matchList = RO.Alg.MatchList(valueList=items, abbrevOK=True, ignoreCase=True)
+
+    def expand(self, val):
+        """Return the menu item matching val; raise ValueError if no unique match"""
+        return self._matchList.getUniqueMatch(val)
+
+    def check(self, name, valList):
+        if len(valList) != 1:
+            raise ValueError("%s has %d elements; 1 needed" % (name, len(valList)))
+        try:
+            self.expand(valList[0])
+        except (ValueError, AttributeError):
+            raise ValueError("%s %r invalid" % (name, valList[0]))
+
+
+class _BoolNegItem(object):
+    """Check a list of option names, each of which may be prefixed with negStr
+    (names may be abbreviated and are not case sensitive)
+
+    Inputs:
+    - names: option names
+    - negStr: prefix to negate an option
+    """
+    def __init__(self, names, negStr):
+        self._matchList = RO.Alg.MatchList(valueList=names, abbrevOK=True, ignoreCase=True)
+        self._negStr = negStr
+
+    def check(self, name, valList):
+        lowerNegStr = self._negStr.lower()
+        for val in valList:
+            optName = val
+            if val.lower().startswith(lowerNegStr):
+                optName = val[len(lowerNegStr):]
+            try:
+                self._matchList.getUniqueMatch(optName)
+            except ValueError as e:
+                raise ValueError("%s %s" % (name, RO.StringUtil.strFromException(e)))
+
+
+class _StrItem(object):
+    """Check a single string value (any string is acceptable)"""
+    def check(self, name, valList):
+        if len(valList) != 1:
+            raise ValueError("%s has %d elements; 1 needed" % (name, len(valList)))
+
+
+class InputChecker(object):
+    """Check slew input value dictionaries, as InputWdg.InputWdg.setValueDict would.
+
+    Inputs:
+    - tccModel: TCC model, for the mount az/alt limits; if None then the global model is used
+    """
+    def __init__(self, tccModel=None):
+        self._tccModel = tccModel or TUI.TCC.TCCModel.getModel()
+        self._csysItem = _MenuItem(CoordSysItems)
+        self._objPosItem = _DMSItem()
+        self._itemDict = {
+            "Date": _FloatItem(0.0, 3000.0),
+            "Name": _StrItem(),
+            "RotAngle": _FloatItem(*_StdRotLim),
+            "RotType": _MenuItem(RotTypeItems),
+            "Magnitude": _FloatItem(-999, 999),
+            "PM": _FloatItem(-9.9e99, 9.9e99, nValues=2),
+            "Px": _FloatItem(0.0, 9.9e99),
+            "Distance": _FloatItem(0.0, 9.9e99),
+            "Rv": _FloatItem(-9.9e99, 9.9e99),
+            "ScanVelocity": _FloatItem(nValues=2),
+            "Keep": _BoolNegItem(KeepNames, KeepNegStr),
+            "AzWrap": _MenuItem(WrapItems),
+            "RotWrap": _MenuItem(WrapItems),
+        }
+        self.keyMatcher = RO.Alg.MatchList(valueList=InputKeys, abbrevOK=True, ignoreCase=True)
+
+    def expandCoordSys(self, csys):
+        """Return the full name of a coordinate system (which may be abbreviated);
+        raise ValueError if it is not a known coordinate system.
+        """
+        try:
+            return self._csysItem.expand(csys)
+        except (ValueError, AttributeError):
+            raise ValueError("CSys %r invalid" % (csys,))
+
+    def getObjPosRange(self, csys):
+        """Return the range of object position for a coordinate system
+        as ((min pos1, max pos1), (min pos2, max pos2)),
+        where pos1 is in hours for RA/Dec coordinate systems, else degrees.
+        Mount limits are from the TCC model; they are None if unknown.
+        """
+        csys = self.expandCoordSys(csys)
+        if csys in RO.CoordSys.AzAlt:
+            if csys == RO.CoordSys.Mount:
+                azLim = self._tccModel.azLim.get()[0]
+                altLim = self._tccModel.altLim.get()[0]
+                return (tuple(azLim[0:2]), tuple(altLim[0:2]))
+            return ((0, 360), (0, 90))
+        elif RO.CoordSys.getSysConst(csys).eqInHours():
+            return ((0, 24), (-90, 90))
+        return ((0, 360), (-90, 90))
+
+    def checkValueDict(self, valueDict):
+        """Check a value dictionary whose keys have already been matched (see keyMatcher).
+
+        Items may be omitted (the slew input widget would use the default,
+        e.g. DefCoordSys for CSys);
+        unknown keys are ignored, as they are by the widget.
+        Except for ObjPos (which must be a pair), a value may be a single value
+        or a sequence with the right number of values.
+
+        Raise ValueError if any value is invalid.
+        """
+        csys = RO.SeqUtil.asSequence(valueDict.get("CSys", DefCoordSys))
+        if len(csys) != 1:
+            raise ValueError("CSys has %d elements; 1 needed" % (len(csys),))
+        posRanges = self.getObjPosRange(csys[0])
+
+        objPos = valueDict.get("ObjPos")
+        if objPos is not None:
+            objPos = RO.SeqUtil.asSequence(objPos)
+            if len(objPos) != 2:
+                raise ValueError("ObjPos has %d elements; 2 needed" % (len(objPos),))
+            for pos, posRange in zip(objPos, posRanges):
+                self._objPosItem.checkValue("ObjPos", pos, *posRange)
+
+        for name, item in self._itemDict.items():
+            vals = valueDict.get(name)
+            if vals is not None:
+                item.check(name, RO.SeqUtil.asSequence(vals))
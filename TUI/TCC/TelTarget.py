@@ -26,6 +26,7 @@ import RO.CoordSys
 import RO.MathUtil
 import RO.TkUtil
 from . import TelConst
+from .BatchAzAlt import BatchAzAlt
 
 # default color for displaying catalog objects
 _DefColor = 'black'
@@ -186,6 +187,7 @@ class Catalog(RO.AddCallback.BaseMixin):
         if not RO.SeqUtil.isSequence(objList):
             raise RuntimeError("objList=%r; must be a sequence" % objList)
         self.objList = objList
+        self._batchAzAlt = None
 
         self.setDoDisplay(doDisplay)
         self.setDispColor(dispColor)
@@ -193,6 +195,19 @@ class Catalog(RO.AddCallback.BaseMixin):
         if callFunc:
             self.addCallback(callFunc)
     
+    def getAzAltArr(self):
+        """Return the current (az, alt) of all objects, in degrees,
+        as an n x 2 numpy array in the same order as the object list.
+        Objects whose position is unknown have az, alt = NaN.
+        
+        Much faster than calling getAzAlt for each object. Safe to call from a background thread.
+        """
+        batchAzAlt = self._batchAzAlt
+        if batchAzAlt is None:
+            batchAzAlt = BatchAzAlt(self.objList, TelTarget.ObsData)
+            self._batchAzAlt = batchAzAlt
+        return batchAzAlt.getAzAlt()
+    
     def getDispColor(self):
         """Returns the desired display color.
         """
@@ -4,12 +4,14 @@
 2005-07-08 ROwen
 2010-03-10 ROwen    Added WindowName
 """
+import tkinter
 import RO.Alg
-import RO.Wdg.HTTPGetWdg
+import RO.Constants
+import RO.Wdg
+import TUI.DownloadScheduler
 import TUI.Version
 
 _MaxLines = 100
-_MaxTransfers = 5
 
 WindowName = "%s.Downloads" % (TUI.Version.ApplicationName,)
 
@@ -18,10 +20,224 @@ def addWindow(tlSet, visible=False):
         name = WindowName,
         defGeom = "+835+290",
         wdgFunc = RO.Alg.GenericCallback(
-            RO.Wdg.HTTPGetWdg.HTTPGetWdg,
-            maxTransfers = _MaxTransfers,
+            DownloadsWdg,
             maxLines = _MaxLines,
             helpURL = "TUIMenu/DownloadsWin.html",
         ),
         visible = visible,
     )
+
+
+class DownloadsWdg(tkinter.Frame):
+    """Display and abort downloads run by the shared download scheduler
+    (TUI.DownloadScheduler.getScheduler).
+
+    The scheduler limits the number of simultaneous downloads and starts them in priority order,
+    so unlike RO.Wdg.HTTPGetWdg this widget has no queue of its own: it only displays downloads.
+
+    Inputs:
+    - master: master widget
+    - maxLines: the maximum number of lines to display in the log window;
+        extra lines are removed, unless the download is still queued or running
+    - helpURL: the URL of a help page; it may include anchors for:
+      - "LogDisplay" for the log display area
+      - "From" for the From field of the details display
+      - "To" for the To field of the details display
+      - "State" for the State field of the details display
+      - "Abort" for the abort button in the details display
+    - **kargs: additional keyword arguments for Frame
+    """
+    def __init__(self,
+        master,
+        maxLines = 500,
+        helpURL = None,
+    **kargs):
+        tkinter.Frame.__init__(self, master, **kargs)
+        self.scheduler = TUI.DownloadScheduler.getScheduler()
+        self.maxLines = int(maxLines)
+        self.dispList = [] # displayed downloads, one per line of self.text
+        self.selDownload = None # selected download, whose details are shown; None if none
+
+        self.yscroll = tkinter.Scrollbar(
+            self,
+            orient = "vertical",
+        )
+        self.text = RO.Wdg.Text(
+            master = self,
+            yscrollcommand = self.yscroll.set,
+            wrap = "none",
+            height = 4,
+            width = 50,
+            readOnly = True,
+            helpURL = helpURL and helpURL + "#LogDisplay",
+        )
+        self.yscroll.configure(command=self.text.yview)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.yscroll.grid(row=0, column=1, sticky="ns")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        detFrame = tkinter.Frame(self)
+        gr = RO.Wdg.Gridder(detFrame, sticky="ew")
+        self.fromWdg = RO.Wdg.StrEntry(
+            master = detFrame,
+            readOnly = True,
+            helpURL = helpURL and helpURL + "#From",
+            borderwidth = 0,
+        )
+        gr.gridWdg("From", self.fromWdg, colSpan=3)
+        self.toWdg = RO.Wdg.StrEntry(
+            master = detFrame,
+            readOnly = True,
+            helpURL = helpURL and helpURL + "#To",
+            borderwidth = 0,
+        )
+        gr.gridWdg("To", self.toWdg, colSpan=2)
+        self.stateWdg = RO.Wdg.StrEntry(
+            master = detFrame,
+            readOnly = True,
+            helpURL = helpURL and helpURL + "#State",
+            borderwidth = 0,
+        )
+        gr.gridWdg("State", self.stateWdg, colSpan=2)
+        self.abortWdg = RO.Wdg.Button(
+            master = detFrame,
+            text = "Abort",
+            command = self._abort,
+            helpURL = helpURL and helpURL + "#Abort",
+        )
+        self.abortWdg.grid(row=1, column=2, rowspan=2, sticky="s")
+        detFrame.columnconfigure(1, weight=1)
+        detFrame.grid(row=1, column=0, columnspan=2, sticky="ew")
+
+        self.text.bind("<ButtonPress-1>", self._selectEvt)
+        self.text.bind("<B1-Motion>", self._selectEvt)
+        self._updDetailStatus()
+
+    def getFile(self, *args, **kargs):
+        """Get a file
+
+        Inputs: the same as for TUI.DownloadScheduler.Download (omitting scheduler), including:
+        - priority: download priority; one of TUI.DownloadScheduler.PriorityDisplay,
+            PriorityCurrent (the default) or PriorityBackfill
+
+        Returns a TUI.DownloadScheduler.Download object
+        """
+        download = self.scheduler.getFile(*args, **kargs)
+        self._showDownload(download)
+        return download
+
+    def _showDownload(self, download):
+        """Append a line for a download to the display and remove old lines if necessary
+        """
+        doAutoSelect = not self.dispList or self.selDownload in (self.dispList[-1], None)
+        if self.dispList:
+            self.text.insert("end", "\n")
+        stateLabel = RO.Wdg.StrLabel(self.text, anchor="w", width=download.StateStrMaxLen)
+        self.text.window_create("end", window=stateLabel)
+        self.text.insert("end", download.dispStr)
+        self.dispList.append(download)
+        download.addCallback(
+            RO.Alg.GenericCallback(self._stateCallback, stateLabel),
+            callNow = True,
+        )
+
+        # remove old lines, but only for downloads that are finished
+        ind = 0
+        selInd = None
+        while max(self.maxLines, ind) < len(self.dispList):
+            if not self.dispList[ind].isDone:
+                ind += 1
+                continue
+            if self.dispList[ind] == self.selDownload:
+                selInd = ind
+            del self.dispList[ind]
+            self.text.delete("%d.0" % (ind+1,), "%d.0" % (ind+2,))
+
+        # if the selected download was removed, select the next one
+        if doAutoSelect:
+            self._selectInd(-1)
+            self.text.see("end")
+        elif selInd is not None:
+            self._selectInd(selInd)
+
+    def _abort(self):
+        """Abort the selected download (if any)
+        """
+        if self.selDownload:
+            self.selDownload.abort()
+
+    def _selectEvt(self, evt):
+        """Show details for the download on the line under the mouse
+        """
+        indStr = self.text.index("@%d,%d" % (evt.x, evt.y))
+        self._selectInd(int(indStr.split(".")[0]) - 1)
+        return "break"
+
+    def _selectInd(self, ind):
+        """Select the download at self.dispList[ind] and show its details;
+        if ind is out of range then deselect all and show no details
+        """
+        self.text.tag_remove("sel", "1.0", "end")
+        try:
+            self.selDownload = self.dispList[ind]
+        except IndexError:
+            self.selDownload = None
+        else:
+            lineNum = (ind % len(self.dispList)) + 1
+            self.text.tag_add("sel", "%d.0" % (lineNum,), "%d.0 lineend" % (lineNum,))
+        self._updDetailStatus()
+
+    def _stateCallback(self, stateLabel, download):
+        """Download state callback
+        """
+        state = download.state
+        if state == download.Running:
+            if download.totBytes:
+                stateLabel.set("%3d %%" % (int(round(100 * download.readBytes / float(download.totBytes))),))
+            else:
+                stateLabel.set("%d kB" % (download.readBytes // 1024,))
+        else:
+            stateLabel.set(state, severity=self._getSeverity(download))
+
+        if download == self.selDownload:
+            self._updDetailStatus()
+
+    def _getSeverity(self, download):
+        """Return the severity with which to display the state of a download
+        """
+        if download.state == download.Failed:
+            return RO.Constants.sevError
+        elif download.state in (download.Aborting, download.Aborted):
+            return RO.Constants.sevWarning
+        return RO.Constants.sevNormal
+
+    def _updDetailStatus(self):
+        """Show the details of self.selDownload
+        """
+        download = self.selDownload
+        if not download:
+            self.fromWdg.set("")
+            self.toWdg.set("")
+            self.stateWdg.set("")
+            self.abortWdg.grid_remove()
+            return
+
+        if download.isAbortable:
+            self.abortWdg.grid()
+        else:
+            self.abortWdg.grid_remove()
+
+        state = download.state
+        if state == download.Running:
+            if download.totBytes:
+                stateStr = "read %s of %s bytes" % (download.readBytes, download.totBytes)
+            else:
+                stateStr = "read %s bytes" % (download.readBytes,)
+        elif state == download.Failed:
+            stateStr = "Failed: %s" % (download.errMsg,)
+        else:
+            stateStr = state
+        self.stateWdg.set(stateStr, severity=self._getSeverity(download))
+        self.fromWdg.set(download.dispStr)
+        self.toWdg.set(download.toPath)
@@ -1,15 +1,16 @@
 #!/usr/bin/env python
-"""Specialized version of RO.Wdg.LogWdg that adds nice filtering and text highlighting.
+"""Log window that adds nice filtering and text highlighting.
+
+The log is displayed using TUI.Base.VirtualLogWdg, which only renders the visible lines,
+so filtering, searching and highlighting remain fast even for very long logs.
+
+If the log journal is available (see TUI.LogJournal), the Earlier and Later buttons page
+through messages saved in the journal, including messages from earlier sessions,
+one page of up to maxLines entries at a time; the Live button returns to the current log.
 
 To do:
 - Use automatic pink background for entry widgets to indicate if the value has been applied.
 
-Known Issues:
-- This log may hold more data than logSource (because it truncates excess data separately from logSource),
-  but that extra data is fragile: you will lose it if you change the filter.
-- Uses Python to check regular expressions for highlighting, even though tcl implements them;
-  thus differences in Python and tcl's implementation of regular expression may result in subtle bugs.
-
 History:
 History:
 2003-12-17 ROwen    Added addWindow and renamed to UsersWindow.py.
@@ -69,13 +70,17 @@ History:
 2012-11-29 ROwen    Fix spelling of Run_Commands (the s was missing).
 2015-11-05 ROwen    Ditched obsolete "except (SystemExit, KeyboardInterrupt): raise" code
 """
-import bisect
+import collections
+import heapq
 import re
 import tkinter
 import RO.Alg
 import RO.StringUtil
 import RO.TkUtil
 import RO.Wdg
+import TUI.Base.VirtualLogWdg
+import TUI.LogJournal
+import TUI.LogSource
 import TUI.Models.HubModel
 import TUI.TUIModel
 import TUI.PlaySound
@@ -113,18 +118,24 @@ ShowTag = "showtag"
 ActorTagPrefix = "act_"
 CmdrTagPrefix = "cmdr_"
 
+# a page of log entries read from the log journal:
+# - store: a TUI.LogSource.LogStore containing the entries
+# - startPos: journal position of the first entry
+# - endPos: journal position just past the last entry
+HistoryPage = collections.namedtuple("HistoryPage", "store startPos endPos")
+
 class RegExpInfo(object):
     """Object holding a regular expression
     and associated tags.
 
-    Checks the regular expression and raises RuntimeError if invalid.
+    Compiles the regular expression (ignoring case) and raises RuntimeError if invalid.
     """
     def __init__(self, regExp, tag, lineTag):
         self.regExp = regExp
         self.tag = tag
         self.lineTag = lineTag
         try:
-            re.compile(regExp)
+            self.compiledRegExp = re.compile(regExp, re.IGNORECASE)
         except re.error:
             raise RuntimeError("invalid regular expression %r" % (regExp,))
 
@@ -132,6 +143,51 @@ class RegExpInfo(object):
         return "RegExpInfo(regExp=%r, tag=%r, lineTag=%r)" % \
             (self.regExp, self.tag, self.lineTag)
 
+class HighlightEngine(object):
+    """Compute and cache the highlight tags for log entries
+
+    Each log entry is matched once (when it arrives or is first rendered or searched)
+    and the resulting tag spans are cached by sequence number. Thus refiltering, scrolling
+    and showing the next or previous highlight do not rematch entries.
+
+    Call with a sequence number to obtain the tag spans for that entry;
+    this is suitable as the lineTagFunc of TUI.Base.VirtualLogWdg.VirtualLogWdg.
+    """
+    def __init__(self, store, lineTagFunc):
+        """Inputs:
+        - store: the log store, a TUI.LogSource.LogStore
+        - lineTagFunc: a function that accepts two arguments: a sequence number and the line string
+            (as returned by store.getStr) and returns a collection of (tag, startChar, endChar);
+            see TUI.Base.VirtualLogWdg.VirtualLogWdg.setLineTagFunc for details
+        """
+        self.store = store
+        self.lineTagFunc = lineTagFunc
+        # dict of sequence number: tuple of (tag, startChar, endChar)
+        self._tagSpanDict = {}
+        # heap of the sequence numbers in _tagSpanDict; entries are cached in roughly increasing order
+        # (but not strictly, e.g. when scrolling back), so a heap finds the oldest cheaply
+        self._seqHeap = []
+
+    def __call__(self, seq):
+        tagSpans = self._tagSpanDict.get(seq)
+        if tagSpans is None:
+            tagSpans = tuple(self.lineTagFunc(seq, self.store.getStr(seq)))
+            self._purge()
+            self._tagSpanDict[seq] = tagSpans
+            heapq.heappush(self._seqHeap, seq)
+        return tagSpans
+
+    def _purge(self):
+        """Remove cached data for entries that are no longer in the store
+
+        The cost is proportional to the number of entries removed.
+        """
+        firstSeq = self.store.firstSeq
+        seqHeap = self._seqHeap
+        while seqHeap and seqHeap[0] < firstSeq:
+            del self._tagSpanDict[heapq.heappop(seqHeap)]
+
+
 class TUILogWdg(tkinter.Frame):
     """A log widget that displays messages from the hub
 
@@ -143,6 +199,10 @@ class TUILogWdg(tkinter.Frame):
     and return True if the entry is to be shown, False otherwise.
     The doc string may be None or a brief one-line description of the filter
     (long or multi-line doc strings will result in garbage in the status bar).
+    A filter function may also have a getSeqs attribute: a function that takes a TUI.LogSource.LogStore
+    and returns the set of sequence numbers of the entries to be shown. If present, it is used
+    to filter the whole log (typically using the store's posting lists), rather than calling
+    the filter function for every entry.
     """
     def __init__(self,
         master,
@@ -163,6 +223,14 @@ class TUILogWdg(tkinter.Frame):
         tuiModel = TUI.TUIModel.getModel()
         self.dispatcher = tuiModel.dispatcher
         self.logSource = tuiModel.logSource
+        # log store whose entries are displayed: logSource.store or the store of historyPage
+        self.viewStore = self.logSource.store
+        # page of entries from the log journal being displayed, or None if showing the current log
+        self.historyPage = None
+        self.journalReader = None
+        if tuiModel.logJournal is not None:
+            self.journalReader = TUI.LogJournal.JournalReader(tuiModel.logJournal.journalDir)
+        self.maxLines = maxLines
         self.highlightRegExpInfo = None
         self.highlightTag = None
         self.isConnected = False
@@ -175,8 +243,8 @@ class TUILogWdg(tkinter.Frame):
         self.miscFilterFunc = lambda x: False
         # highlightAllFunc(): clear existing highlighting and apply desired highlighting to all existing text
         self.highlightAllFunc = lambda: None
-        # highlightLastFunc(): apply highlighting to last line of text and play sound if appropriate
-        self.highlightLastFunc = lambda: None
+        # highlightLastFunc(seqList): play sound if appropriate for newly added log entries
+        self.highlightLastFunc = lambda seqList: None
 
         row = 0
 
@@ -412,11 +480,47 @@ class TUILogWdg(tkinter.Frame):
         self.highlightFrame.grid(row=0, column=ctrlCol2, sticky="w")
         ctrlCol2 += 1
 
-        self.ctrlFrame2.grid(row=row, column=0, sticky="w")
+        self.ctrlFrame2.grid_columnconfigure(ctrlCol2, weight=1)
+        ctrlCol2 += 1
+
+        self.historyFrame = tkinter.Frame(self.ctrlFrame2)
+
+        self.earlierWdg = RO.Wdg.Button(
+            self.historyFrame,
+            text = "Earlier",
+            callFunc = self.doShowEarlier,
+            helpText = "show the previous page of messages from the log journal",
+            helpURL = HelpURL,
+        )
+        self.earlierWdg.pack(side="left")
+
+        self.laterWdg = RO.Wdg.Button(
+            self.historyFrame,
+            text = "Later",
+            callFunc = self.doShowLater,
+            helpText = "show the next page of messages from the log journal",
+            helpURL = HelpURL,
+        )
+        self.laterWdg.pack(side="left")
+
+        self.liveWdg = RO.Wdg.Button(
+            self.historyFrame,
+            text = "Live",
+            callFunc = self.doShowLive,
+            helpText = "show current messages",
+            helpURL = HelpURL,
+        )
+        self.liveWdg.pack(side="left")
+
+        self.historyFrame.grid(row=0, column=ctrlCol2, sticky="e")
+        ctrlCol2 += 1
+
+        self.ctrlFrame2.grid(row=row, column=0, sticky="ew")
         row += 1
 
-        self.logWdg = RO.Wdg.LogWdg(
+        self.logWdg = TUI.Base.VirtualLogWdg.VirtualLogWdg(
             self,
+            store = self.viewStore,
             maxLines = maxLines,
             helpURL = HelpURL,
         )
@@ -473,6 +577,7 @@ class TUILogWdg(tkinter.Frame):
         self.logWdg.text.tag_configure(ShowTag, elide=False)
         self.logWdg.text.tag_raise("sel")
 
+        self._updHistoryWdg()
         self.updateSeverity()
         self.doFilterOnOff()
         self.doShowHideAdvanced()
@@ -485,10 +590,14 @@ class TUILogWdg(tkinter.Frame):
         self.bind("<Unmap>", self.mapOrUnmap)
         self.bind("<Map>", self.mapOrUnmap)
 
-    def appendLogEntry(self, logEntry):
-        outStr = logEntry.getStr()
-        self.logWdg.addOutput(outStr, tags=logEntry.tags, severity=logEntry.severity)
-        self.highlightLastFunc()
+    def appendSeqs(self, seqList):
+        """Append log entries to the display
+
+        Inputs:
+        - seqList: sequence numbers of entries in self.viewStore, in increasing order
+        """
+        self.highlightLastFunc(seqList)
+        self.logWdg.appendSeqs(seqList)
 
     def applyFilter(self, wdg=None):
         """Apply current filter settings.
@@ -512,32 +621,11 @@ class TUILogWdg(tkinter.Frame):
             TUI.PlaySound.cmdFailed()
         self.miscFilterFunc = miscFilterFunc
 
-        retainScrollPos = not self.logWdg.isScrolledToEnd()
-        if retainScrollPos:
-            # "linestart" helps a problem wereby if the text widget has not been selected
-            # then the result is in the middle of a line; the resulting index when this problem occurs
-            # may not be perfect but it appears to be good enough
-            midLineIndex = self.logWdg.text.index("@0,%d linestart" % (self.logWdg.winfo_height() / 2))
-            midLineDateStr = self.logWdg.text.get(midLineIndex, "%s + 8 chars" % midLineIndex)
-#             print "retainScrollPos: midLineIndex=%s, midLineDateStr=%s" % (midLineIndex, midLineDateStr)
-
-        self.logWdg.clearOutput()
-        # this is inefficient; logWdg does a lot of processing that is unnecessary
-        # when inserting a lot of lines at once; add an insertMany method to avoid this
-        strTagsSevList = [(logEntry.getStr(), logEntry.tags, logEntry.severity)
-            for logEntry in self.logSource.entryList
-            if self.sevFilterFunc(logEntry) or self.miscFilterFunc(logEntry)]
-        self.logWdg.addOutputList(strTagsSevList)
-
-        if retainScrollPos:
-            strList = [strTagsSev[0] for strTagsSev in strTagsSevList]
-            ind = bisect.bisect(strList, midLineDateStr)
-            # indicate result in "lines from the end" so the reference is valid
-            # even if the data is truncated (as it often will be)
-            linesFromEnd = len(strList) - ind
-            self.logWdg.text.see("end - %d lines" % (linesFromEnd,))
-
-        self.highlightAllFunc()
+        # if not scrolled to the end then keep showing the same entry at the top (or the next one shown)
+        topSeq = None
+        if not self.logWdg.isScrolledToEnd():
+            topSeq = self.logWdg.getTopSeq()
+        self.logWdg.setSeqs(sorted(self.getFilteredSeqs()), topSeq=topSeq)
 
     def clearHighlight(self, showMsg=True):
         """Remove all highlighting"""
@@ -546,8 +634,7 @@ class TUILogWdg(tkinter.Frame):
                 "Removing highlight",
                 isTemp = True,
             )
-        self.logWdg.text.tag_remove(HighlightTag, "0.0", "end")
-        self.logWdg.text.tag_remove(HighlightTextTag, "0.0", "end")
+        self.logWdg.setLineTagFunc(None, removeTags=(HighlightTag, HighlightTextTag))
 
     def compileRegExp(self, regExp, flags):
         """Attempt to compile the regular expression.
@@ -568,6 +655,9 @@ class TUILogWdg(tkinter.Frame):
 
         A filter function accepts one argument: a logEntry.
         It returns True if the logEntry is to be displayed, False otherwise.
+        Filter functions may also have these attributes, to filter without making log entries:
+        - getSeqs(store): return the set of sequence numbers of entries in the store that pass the filter
+        - matchSeq(store, seq): return True if the entry with the specified sequence number passes the filter
 
         The result of the filter function is ORed with the results of self.sevFilterFunc.
 
@@ -581,6 +671,8 @@ class TUILogWdg(tkinter.Frame):
 
         def nullFunc(logEntry):
             return False
+        nullFunc.getSeqs = lambda store: set()
+        nullFunc.matchSeq = lambda store, seq: False
 
         if not filterEnabled:
             return nullFunc
@@ -596,6 +688,8 @@ class TUILogWdg(tkinter.Frame):
                 return (logEntry.actor == actor) \
                     or (logEntry.cmdInfo and (logEntry.cmdInfo.actor == actor))
             filterFunc.__doc__ = "actor=%s" % (actor,)
+            filterFunc.getSeqs = lambda store: store.getSeqsForActors([actor])
+            filterFunc.matchSeq = lambda store, seq: store.isForActors(seq, (actor,))
             return filterFunc
 
         elif filterCat == "Actors":
@@ -608,6 +702,8 @@ class TUILogWdg(tkinter.Frame):
                 return (logEntry.actor in actorSet) \
                     or (logEntry.cmdInfo and (logEntry.cmdInfo.actor in actorSet))
             filterFunc.__doc__ = "actor in %s" % (actorSet,)
+            filterFunc.getSeqs = lambda store: store.getSeqsForActors(actorSet)
+            filterFunc.matchSeq = lambda store, seq: store.isForActors(seq, actorSet)
             return filterFunc
 
         elif filterCat == "Text":
@@ -622,6 +718,11 @@ class TUILogWdg(tkinter.Frame):
             def filterFunc(logEntry, compiledRegEx=compiledRegEx):
                 return compiledRegEx.search(logEntry.msgStr)
             filterFunc.__doc__ = "text contains %s" % (regExp)
+            def getSeqs(store, compiledRegEx=compiledRegEx):
+                return set(seq for seq in range(store.firstSeq, store.nextSeq)
+                    if compiledRegEx.search(store.getMsgStr(seq)))
+            filterFunc.getSeqs = getSeqs
+            filterFunc.matchSeq = lambda store, seq: compiledRegEx.search(store.getMsgStr(seq)) is not None
             return filterFunc
 
         elif filterCat == "Commands":
@@ -631,6 +732,15 @@ class TUILogWdg(tkinter.Frame):
                     and logEntry.cmdInfo \
                     and not logEntry.isKeys
             filterFunc.__doc__ = "most commands"
+            def getSeqs(store):
+                return set(seq for seq in store.getSeqsForCmdrs(self._getCommandCmdrs(store))
+                    if store.getCmdInfo(seq) and not store.getIsKeys(seq))
+            filterFunc.getSeqs = getSeqs
+            def matchSeq(store, seq):
+                return self._isCommandCmdr(store.getCmdr(seq)) \
+                    and store.getCmdInfo(seq) is not None \
+                    and not store.getIsKeys(seq)
+            filterFunc.matchSeq = matchSeq
             return filterFunc
 
         elif filterCat == "Commands and Replies":
@@ -640,6 +750,15 @@ class TUILogWdg(tkinter.Frame):
                     and (logEntry.severity > RO.Constants.sevDebug) \
                     and not logEntry.isKeys
             filterFunc.__doc__ = "most commands and replies"
+            def getSeqs(store):
+                return set(seq for seq in store.getSeqsForCmdrs(self._getCommandCmdrs(store))
+                    if (store.getSeverity(seq) > RO.Constants.sevDebug) and not store.getIsKeys(seq))
+            filterFunc.getSeqs = getSeqs
+            def matchSeq(store, seq):
+                return self._isCommandCmdr(store.getCmdr(seq)) \
+                    and (store.getSeverity(seq) > RO.Constants.sevDebug) \
+                    and not store.getIsKeys(seq)
+            filterFunc.matchSeq = matchSeq
             return filterFunc
 
         elif filterCat == "My Commands and Replies":
@@ -651,6 +770,23 @@ class TUILogWdg(tkinter.Frame):
                     and not logEntry.isKeys \
                     and ((logEntry.cmdInfo is None) or (logEntry.cmdInfo.isMine))
             filterFunc.__doc__ = "my commands and replies"
+            def getSeqs(store, cmdr=cmdr):
+                seqSet = set()
+                for seq in store.getSeqsForCmdrs([cmdr]):
+                    if (store.getSeverity(seq) <= RO.Constants.sevDebug) or store.getIsKeys(seq):
+                        continue
+                    cmdInfo = store.getCmdInfo(seq)
+                    if (cmdInfo is None) or cmdInfo.isMine:
+                        seqSet.add(seq)
+                return seqSet
+            filterFunc.getSeqs = getSeqs
+            def matchSeq(store, seq, cmdr=cmdr):
+                if (store.getCmdr(seq) != cmdr) or (store.getSeverity(seq) <= RO.Constants.sevDebug) \
+                    or store.getIsKeys(seq):
+                    return False
+                cmdInfo = store.getCmdInfo(seq)
+                return (cmdInfo is None) or cmdInfo.isMine
+            filterFunc.matchSeq = matchSeq
             return filterFunc
 
         elif filterCat == "Custom":
@@ -710,7 +846,7 @@ class TUILogWdg(tkinter.Frame):
         Note that dispatching the command automatically logs it.
         """
         self.dispatchCmd(cmdStr)
-        self.logWdg.text.see("end")
+        self.logWdg.scrollToEnd()
 
         defActor = self.defActorWdg.getString()
         if not defActor:
@@ -767,7 +903,7 @@ class TUILogWdg(tkinter.Frame):
         """Show appropriate highlight widgets and apply appropriate function
         """
         self.highlightAllFunc = lambda: None
-        self.highlightLastFunc = lambda: None
+        self.highlightLastFunc = lambda seqList: None
         highlightCat = self.highlightMenu.getString()
         highlightEnabled = self.highlightOnOffWdg.getBool()
         #print "doHighlight; cat=%r; enabled=%r" % (highlightCat, highlightEnabled)
@@ -875,12 +1011,12 @@ class TUILogWdg(tkinter.Frame):
     def doSearchBackwards(self, evt=None):
         """Search backwards for search string"""
         searchStr = self.findEntry.get()
-        self.logWdg.search(searchStr, backwards=True, noCase=True, regExp=True)
+        self.logWdg.search(searchStr, backwards=True, noCase=True)
 
     def doSearchForwards(self, evt=None):
         """Search backwards for search string"""
         searchStr = self.findEntry.get()
-        self.logWdg.search(searchStr, backwards=False, noCase=True, regExp=True)
+        self.logWdg.search(searchStr, backwards=False, noCase=True)
 
     def doShowHideAdvanced(self, wdg=None):
         if self.highlightOnOffWdg.getBool():
@@ -890,34 +1026,58 @@ class TUILogWdg(tkinter.Frame):
             self.highlightFrame.grid_remove()
             self.doHighlight()
 
-    def doShowNextHighlight(self, wdg=None):
-        self.logWdg.findTag(HighlightTag, backwards=False, doWrap=False)
-
-    def doShowPrevHighlight(self, wdg=None):
-        self.logWdg.findTag(HighlightTag, backwards=True, doWrap=False)
+    def doShowEarlier(self, wdg=None):
+        """Show the page of journaled log entries just before the entries being displayed
+        """
+        if self.journalReader is None:
+            return
+        if self.historyPage is not None:
+            pos = self.historyPage.startPos
+        else:
+            liveStore = self.logSource.store
+            if len(liveStore) > 0:
+                pos = self.journalReader.findPos(liveStore.getTAITime(liveStore.firstSeq))
+            else:
+                pos = self.journalReader.getEndPos()
+        records = []
+        if pos is not None:
+            records, startPos = self.journalReader.readBefore(pos, self.maxLines)
+        if not records:
+            self.statusBar.setMsg("No earlier messages in the log journal", isTemp = True)
+            self.bell()
+            return
+        self._showHistoryPage(records, startPos=startPos, endPos=pos)
 
-    def findRegExp(self, regExpInfo, removeTags=True, elide=False, startInd="1.0"):
-        """Find and tag all lines containing text that matches regExp.
+    def doShowLater(self, wdg=None):
+        """Show the page of journaled log entries just after the entries being displayed
 
-        Returns the number of matches.
+        Show the current log instead if the next page reaches the entries in the current log.
+        """
+        if self.historyPage is None:
+            return
+        records, endPos = self.journalReader.readFrom(self.historyPage.endPos, self.maxLines)
+        liveStore = self.logSource.store
+        if len(liveStore) > 0:
+            liveStartTime = liveStore.getTAITime(liveStore.firstSeq)
+            records = [record for record in records if record.taiTime < liveStartTime]
+        if not records:
+            self.doShowLive()
+            return
+        self._showHistoryPage(records, startPos=self.historyPage.endPos, endPos=endPos)
 
-        This is just self.text.findAll with a particular set of options.
+    def doShowLive(self, wdg=None):
+        """Show the current log
         """
-        #print "findRegExp(regExpInfo=%r, removeTags=%r, elide=%r, startInd=%r)" % (regExpInfo, removeTags, elide, startInd)
-
-        # Warning: you must modify this to call findAll from "after"
-        # if this function is called from a variable trace (e.g. an Entry callFunc).
-        # Otherwise the count variable is not updated
-        # and the routine raises RuntimeError.
-        return self.logWdg.findAll(
-            searchStr = regExpInfo.regExp,
-            tag = regExpInfo.tag,
-            lineTag = regExpInfo.lineTag,
-            removeTags = removeTags,
-            noCase = True,
-            regExp = True,
-            startInd = startInd,
-        )
+        if self.historyPage is None:
+            return
+        self.historyPage = None
+        self._setViewStore(self.logSource.store)
+
+    def doShowNextHighlight(self, wdg=None):
+        self.logWdg.findLineTag(HighlightTag, backwards=False)
+
+    def doShowPrevHighlight(self, wdg=None):
+        self.logWdg.findLineTag(HighlightTag, backwards=True)
 
     def getActors(self, regExpList):
         """Return a sorted list of actor based on a set of actor name regular expressions.
@@ -956,6 +1116,23 @@ class TUILogWdg(tkinter.Frame):
         actors.sort()
         return actors
 
+    def getFilteredSeqs(self):
+        """Return the set of sequence numbers of log entries that pass the current filter
+
+        Uses the getSeqs attribute of the filter functions, if present,
+        else calls the filter function for each entry.
+        """
+        store = self.viewStore
+        seqSet = set()
+        for filterFunc in (self.sevFilterFunc, self.miscFilterFunc):
+            getSeqs = getattr(filterFunc, "getSeqs", None)
+            if getSeqs is not None:
+                seqSet |= getSeqs(store)
+            else:
+                seqSet |= set(seq for seq in range(store.firstSeq, store.nextSeq)
+                    if seq not in seqSet and filterFunc(store.getEntry(seq)))
+        return seqSet
+
     def getFilterSeverityDescr(self, appendAnd=True):
         """Return a description of the currently selected filter severity
 
@@ -999,39 +1176,55 @@ class TUILogWdg(tkinter.Frame):
                 isTemp = True,
             )
 
-        tags = [ActorTagPrefix + actor.lower() for actor in actors]
+        tagSet = set(ActorTagPrefix + actor.lower() for actor in actors)
+        store = self.viewStore
 
-        def highlightAllFunc(tags=tags):
-            self.clearHighlight()
-            for tag in tags:
-                tagRanges = self.logWdg.text.tag_ranges(tag)
-                if len(tagRanges) > 1:
-                    self.logWdg.text.tag_add(HighlightTag, *tagRanges)
-
-        def highlightLastFunc(tags=tags):
-            for tag in tags:
-                tagRanges = self.logWdg.text.tag_prevrange(tag, "end")
-                if tagRanges:
-                    self.logWdg.text.tag_add(HighlightTag, *tagRanges)
-                    if self.doPlayHighlightSound():
-                        TUI.PlaySound.logHighlightedText()
-                    return # no need to test more tags and must not play the sound again
+        def lineTagFunc(seq, lineStr, tagSet=tagSet):
+            if tagSet.intersection(store.getTags(seq)):
+                return [(HighlightTag, None, None)]
+            return []
 
-        self.highlightAllFunc = highlightAllFunc
-        self.highlightLastFunc = highlightLastFunc
-        self.highlightAllFunc()
+        self.setHighlightLineTagFunc(lineTagFunc)
 
     def highlightRegExp(self, regExpInfo):
         """Create highlight functions based on a RegExpInfo object
         and apply highlighting to all existing text.
         """
-        def highlightAllFunc(regExpInfo=regExpInfo):
-            self.clearHighlight()
-            self.findRegExp(regExpInfo, removeTags=False)
+        compiledRegExp = regExpInfo.compiledRegExp
+
+        def lineTagFunc(seq, lineStr, compiledRegExp=compiledRegExp, regExpInfo=regExpInfo):
+            if regExpInfo.tag:
+                tagSpanList = [(regExpInfo.tag, match.start(), match.end())
+                    for match in compiledRegExp.finditer(lineStr)]
+                isMatch = bool(tagSpanList)
+            else:
+                tagSpanList = []
+                isMatch = compiledRegExp.search(lineStr) is not None
+            if isMatch and regExpInfo.lineTag:
+                tagSpanList.append((regExpInfo.lineTag, None, None))
+            return tagSpanList
+
+        self.setHighlightLineTagFunc(lineTagFunc)
+
+    def setHighlightLineTagFunc(self, lineTagFunc):
+        """Set highlight functions based on a line tag function and apply highlighting to all existing text.
 
-        def highlightLastFunc(regExpInfo=regExpInfo):
-            nFound = self.findRegExp(regExpInfo, removeTags = False, startInd = "end - 2 lines")
-            if nFound > 0 and self.doPlayHighlightSound():
+        Inputs:
+        - lineTagFunc: a function that returns highlight tags for a log entry;
+            see HighlightEngine for details
+        """
+        highlightEngine = HighlightEngine(store=self.viewStore, lineTagFunc=lineTagFunc)
+
+        def highlightAllFunc(highlightEngine=highlightEngine):
+            self.logWdg.setLineTagFunc(highlightEngine, removeTags=(HighlightTag, HighlightTextTag))
+
+        def highlightLastFunc(seqList, highlightEngine=highlightEngine):
+            # match new entries now, even if not displayed, so they need never be matched again
+            foundMatch = False
+            for seq in seqList:
+                if highlightEngine(seq):
+                    foundMatch = True
+            if foundMatch and self.doPlayHighlightSound():
                 TUI.PlaySound.logHighlightedText()
 
         self.highlightAllFunc = highlightAllFunc
@@ -1039,16 +1232,32 @@ class TUILogWdg(tkinter.Frame):
         self.highlightAllFunc()
 
     def logSourceCallback(self, logSource):
-        """Log a message from the log source
+        """Log new messages from the log source
 
         Inputs:
-        - logEntry: a TUI.Models.LogSource.LogEntry object
+        - logSource: the log source, a TUI.LogSource.LogSource;
+            the new entries are those in logSource.newSeqRange
         """
-        logEntry = logSource.lastEntry
-        if not logEntry:
+        if self.historyPage is not None:
             return
-        if self.sevFilterFunc(logEntry) or self.miscFilterFunc(logEntry):
-            self.appendLogEntry(logEntry)
+        store = logSource.store
+        sevMatchSeq = self._getMatchSeq(self.sevFilterFunc)
+        miscMatchSeq = self._getMatchSeq(self.miscFilterFunc)
+        seqList = [seq for seq in logSource.newSeqRange
+            if sevMatchSeq(store, seq) or miscMatchSeq(store, seq)]
+        if seqList:
+            self.appendSeqs(seqList)
+
+    def _getMatchSeq(self, filterFunc):
+        """Return filterFunc.matchSeq, or an equivalent function if filterFunc has none (e.g. a Custom filter)
+
+        Unlike calling filterFunc, matchSeq usually needs no LogEntry.
+        """
+        matchSeq = getattr(filterFunc, "matchSeq", None)
+        if matchSeq is None:
+            def matchSeq(store, seq, filterFunc=filterFunc):
+                return filterFunc(store.getEntry(seq))
+        return matchSeq
 
     def mapOrUnmap(self, evt=None):
         """Called when the window is mapped or unmapped
@@ -1080,14 +1289,76 @@ class TUILogWdg(tkinter.Frame):
         if sevName == "none":
             def filterFunc(logEntry):
                 return False
+            filterFunc.getSeqs = lambda store: set()
+            filterFunc.matchSeq = lambda store, seq: False
         else:
             minSeverity = RO.Constants.NameSevDict[sevName]
             def filterFunc(logEntry, minSeverity=minSeverity):
                 return logEntry.severity >= minSeverity
             filterFunc.__doc__ = "severity >= %s" % (sevName,)
+            filterFunc.getSeqs = lambda store: store.getSeqsForSeverity(minSeverity)
+            filterFunc.matchSeq = lambda store, seq: store.getSeverity(seq) >= minSeverity
         self.sevFilterFunc = filterFunc
         self.applyFilter()
 
+    def _setViewStore(self, store):
+        """Display the entries in a different log store, applying the current filter and highlighting
+        """
+        self.viewStore = store
+        self.logWdg.setStore(store)
+        self.doHighlight()
+        self.applyFilter()
+        self._updHistoryWdg()
+
+    def _showHistoryPage(self, records, startPos, endPos):
+        """Display a page of entries from the log journal
+
+        Inputs:
+        - records: entries to display, a list of TUI.LogJournal.JournalRecord
+        - startPos: journal position of the first record
+        - endPos: journal position just past the last record
+        """
+        store = TUI.LogSource.LogStore(
+            maxEntries = len(records),
+            actorTagPrefix = ActorTagPrefix,
+            cmdrTagPrefix = CmdrTagPrefix,
+        )
+        for record in records:
+            cmdInfo = None
+            if record.cmdInfoStr:
+                try:
+                    cmdInfoDict = TUI.LogJournal.parseCmdInfoStr(record.cmdInfoStr)
+                    isMine = cmdInfoDict.pop("isMine")
+                    cmdInfo = TUI.LogSource.CmdInfo(
+                        myCmdr = cmdInfoDict["cmdr"] if isMine else None,
+                        **cmdInfoDict
+                    )
+                except ValueError:
+                    pass
+            store.append(
+                msgStr = record.msgStr,
+                severity = record.severity,
+                actor = record.actor,
+                cmdr = record.cmdr,
+                cmdID = record.cmdID,
+                cmdInfo = cmdInfo,
+                unixTime = record.unixTime,
+                taiOffset = record.taiOffset,
+            )
+        self.historyPage = HistoryPage(store=store, startPos=startPos, endPos=endPos)
+        self._setViewStore(store)
+        self.statusBar.setMsg(
+            "Showing log journal from %s to %s" % (records[0].getTAITimeStr(), records[-1].getTAITimeStr()),
+            isTemp = True,
+        )
+
+    def _updHistoryWdg(self):
+        """Enable or disable the Earlier, Later and Live buttons
+        """
+        self.earlierWdg.setEnable(self.journalReader is not None)
+        self.laterWdg.setEnable(self.historyPage is not None)
+        self.liveWdg.setEnable(self.historyPage is not None)
+
     def _actorsCallback(self, actors, isCurrent, keyVar=None):
         """Actor keyword callback.
         """
@@ -1104,6 +1375,18 @@ class TUILogWdg(tkinter.Frame):
         self.filterActorWdg.setItems(blankAndActors, isCurrent = isCurrent)
         self.highlightActorWdg.setItems(blankAndActors, isCurrent = isCurrent)
 
+    def _getCommandCmdrs(self, store):
+        """Return the commanders whose commands are shown by the "Commands" filters
+
+        This excludes commanders that start with "." (actors) and MN01 (the site monitor).
+        """
+        return [cmdr for cmdr in store.cmdrTable.strList if self._isCommandCmdr(cmdr)]
+
+    def _isCommandCmdr(self, cmdr):
+        """Return True if commands from this commander are shown by the "Commands" filters
+        """
+        return bool(cmdr) and cmdr[0] != "." and not cmdr.startswith("MN01")
+
     def _cmdCallback(self, msgType, msgDict, cmdVar):
         """Command callback; called when a command finishes.
         """
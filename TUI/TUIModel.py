@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 """An object that models the overall state of TUI.
 Includes the following items:
-- dispatcher: the keyword dispatcher (RO.KeyDispatcher.KeyDispatcher)
+- dispatcher: the keyword dispatcher (TUI.FastDispatcher.FastDispatcher,
+    a subclass of RO.KeyDispatcher.KeyDispatcher)
     note: the network connection is dispatcher.connection
 - prefs: the application preferences (TUI.TUIPrefs.TUIPrefs)
-- tlSet: the set of toplevels (windows) (RO.Wdg.ToplevelSet)
+- tlSet: the set of toplevels (windows) (TUI.WindowModuleUtil.LazyToplevelSet,
+    a subclass of RO.Wdg.ToplevelSet)
 - tkRoot: the root application window (Tkinter.Toplevel);
     mostly used when one to execute some Tkinter command
     (all of which require an arbitrary Tkinter object)
@@ -56,7 +58,6 @@ import traceback
 import RO.Comm
 import RO.Comm.HubConnection
 import RO.Constants
-import RO.KeyDispatcher
 import RO.Alg
 import RO.OS
 import RO.TkUtil
@@ -65,9 +66,14 @@ import tkinter
 import TUI.TUIPaths
 import TUI.TUIPrefs
 import TUI.Version
+from . import FastDispatcher
+from . import LogJournal
 from . import LogSource
+from . import WindowModuleUtil
 
 MaxLogWindows = 5
+# interval (sec) at which new log entries are reported to log windows
+LogBatchInterval = 0.05
 
 _theModel = None
 
@@ -101,22 +107,34 @@ class _Model (object):
             )
 
         # keyword dispatcher
-        self.dispatcher = RO.KeyDispatcher.KeyDispatcher(
+        self.dispatcher = FastDispatcher.FastDispatcher(
             connection = connection,
         )
 
         # log source
-        self.logSource = LogSource.LogSource(self.dispatcher)
+        self.logSource = LogSource.LogSource(self.dispatcher, batchInterval=LogBatchInterval)
         if testMode:
             def logToStdOut(logSource):
-                print(logSource.lastEntry.getStr(), end=' ')
+                for logEntry in logSource.newEntries:
+                    print(logEntry.getStr(), end=' ')
             self.logSource.addCallback(logToStdOut)
+
+        # log journal: a copy of the log on disk, so log windows can show earlier messages
+        self.logJournal = None
+        if not testMode:
+            try:
+                self.logJournal = LogJournal.LogJournal(self.logSource, TUI.TUIPaths.getLogJournalDir())
+            except Exception as e:
+                sys.stderr.write("Could not open log journal; log will not be saved: %s\n" % (e,))
         
         # function to log a message
         self.logFunc = self.logSource.logMsg
     
         # TUI preferences
         self.prefs = TUI.TUIPrefs.TUIPrefs()
+        def updFastDispatch(optimize, prefVar=None):
+            self.dispatcher.setOptimize(optimize)
+        self.prefs.getPrefVar("Fast Dispatch").addCallback(updFastDispatch, callNow=True)
 
         # Dict of saved user-specified configurations for various instruments and other systems.
         # Keys are sysName: config
@@ -127,7 +145,7 @@ class _Model (object):
         
         # TUI window (topLevel) set;
         # this starts out empty; others add windows to it
-        self.tlSet = RO.Wdg.ToplevelSet(
+        self.tlSet = WindowModuleUtil.LazyToplevelSet(
             fileName = TUI.TUIPaths.getGeomFile(),
             createFile = True,  # create file if it doesn't exist
         )
@@ -85,6 +85,26 @@ def getUserPresetsFile():
     fileName = "%s%sUserPresets.json" % (RO.OS.getPrefsPrefix(), TUI.Version.ApplicationName)
     return os.path.join(prefsDir, fileName)
 
+def getScriptCacheDir():
+    """Return the directory for compiled user scripts (see TUI.Base.ScriptCache).
+    """
+    prefsDir = RO.OS.getPrefsDirs(inclNone=True)[0]
+    if prefsDir is None:
+        raise RuntimeError("Cannot determine prefs dir")
+    dirName = "%s%sScriptCache" % (RO.OS.getPrefsPrefix(), TUI.Version.ApplicationName)
+    return os.path.join(prefsDir, dirName)
+
+def getLogJournalDir():
+    """Return the directory for the log journal (see TUI.LogJournal).
+
+    This is subdirectory "journal" of the directory in which runTUIWithLog writes its log files.
+    """
+    docsDir = RO.OS.getDocsDir()
+    if not docsDir:
+        raise RuntimeError("Cannot determine documents dir")
+    logDirName = "%s_logs" % (TUI.Version.ApplicationName.lower(),)
+    return os.path.join(docsDir, logDirName, "journal")
+
 def getResourceDir(*args):
     """Return the resource directory for a specified resource.
     Input:
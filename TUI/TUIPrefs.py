@@ -105,6 +105,13 @@ class TUIPrefs(PrefVar.PrefSet):
                 partialPattern = r"^[-_.a-zA-Z0-9]*( +[0-9]*)?$",
                 editWidth=24,
             ),
+            PrefVar.BoolPrefVar(
+                name = "Fast Dispatch",
+                category = "Connection",
+                defValue = False,
+                helpText = "Skip converting keyword values that have not changed? (experimental)",
+                helpURL = _HelpURL + "#Connection:FastDispatch",
+            ),
             
             PrefVar.BoolPrefVar(
                 name = "Seq By File",
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
-"""Utilities to find and load TUI windows modules.
+"""Utilities to find and load TUI windows modules,
+including LazyToplevelSet, which loads window modules when their windows are first wanted.
 
 2005-08-08 ROwen
 2006-10-25 ROwen    Minor clarifications of logFunc in a doc string.
@@ -7,11 +8,14 @@
 2011-09-09 ROwen    Modified to restore working directory.
                     Modified to run paths through normpath to make the code more robust.
 """
+import importlib
 import os
 import sys
+import time
 import traceback
 import RO.Constants
 import RO.OS
+import RO.Wdg
 
 def findWindowsModules(
     path,
@@ -49,7 +53,7 @@ def findWindowsModules(
         # use decorate/sort/undecorate pattern
         decList = [(not wmPath.startswith(loadFirst), wmPath) for wmPath in windowModulePathList]
         decList.sort()
-        windowModulePathList = zip(*decList)[1]
+        windowModulePathList = list(zip(*decList))[1]
 
     for windowModulePath in windowModulePathList:
         # generate the module name:
@@ -110,3 +114,126 @@ def loadWindows(
                 logFunc(errMsg, severity=RO.Constants.sevError)
             sys.stderr.write(errMsg + "\n")
             traceback.print_exc(file=sys.stderr)
+
+
+class _UnbuiltToplevel(object):
+    """The saved geometry, visibility and state of a lazy window that has not been built,
+    with the methods RO.Wdg.ToplevelSet.writeGeomVisFile needs
+    """
+    def __init__(self, tlSet, name):
+        self._tlSet = tlSet
+        self._name = name
+
+    def getGeometry(self):
+        return self._tlSet.getDesGeom(self._name)
+
+    def getVisible(self):
+        return False
+
+    def getDoSaveState(self):
+        return bool(self._tlSet.fileState.get(self._name))
+
+    def getStateIsDefault(self):
+        return self._tlSet.fileState[self._name], False
+
+
+class LazyToplevelSet(RO.Wdg.ToplevelSet):
+    """A ToplevelSet that can put off importing a window module and building its windows
+    until one of them is wanted (e.g. by makeVisible or getToplevel).
+
+    Register window modules with addLazyWindows. Windows that have not been built
+    are included by getNames (e.g. so they appear in menus)
+    and their saved geometry is preserved by writeGeomVisFile.
+
+    Inputs are the same as for RO.Wdg.ToplevelSet.
+    """
+    def __init__(self, *args, **kargs):
+        # dict of window name: name of module whose addWindow function creates the window,
+        # for windows that have not been built
+        self._lazyModuleDict = {}
+        self._isWritingGeom = False
+        # dict of module name: (import time, addWindow time) (sec) for each module loaded by loadLazyModule
+        self.loadTimeDict = {}
+        RO.Wdg.ToplevelSet.__init__(self, *args, **kargs)
+
+    def addLazyWindows(self, moduleName, windowInfo):
+        """Add the windows of a window module, without importing the module
+        unless one of its windows should be visible now.
+
+        Inputs:
+        - moduleName: full name of window module, e.g. "TUI.TCC.SkyWindow";
+            the module's addWindow(tlSet) function must create the windows described by windowInfo
+        - windowInfo: (name, defGeom, defVisible) for each window the module creates,
+            as the module passes them to createToplevel (defVisible is None if not specified)
+        """
+        for name, defGeom, defVisible in windowInfo:
+            if defGeom:
+                self.defGeomDict[name] = defGeom
+            if defVisible is not None:
+                self.defVisDict[name] = bool(defVisible)
+            self._lazyModuleDict[name] = moduleName
+        for name, defGeom, defVisible in windowInfo:
+            if self.getDesVisible(name):
+                self.loadLazyModule(moduleName)
+                return
+
+    def getLazyModuleNames(self):
+        """Return the names of window modules that have not been loaded, in the order they were added
+        """
+        return list(dict.fromkeys(self._lazyModuleDict.values()))
+
+    def loadAllLazyModules(self):
+        """Load all window modules that have not been loaded, thus building every window
+        """
+        for moduleName in self.getLazyModuleNames():
+            self.loadLazyModule(moduleName)
+
+    def loadLazyModule(self, moduleName):
+        """Import a window module and call its addWindow function, replacing its unbuilt windows.
+
+        Errors are printed to stderr, since they should not prevent loading other windows.
+        """
+        for name in [name for name, modName in self._lazyModuleDict.items() if modName == moduleName]:
+            del self._lazyModuleDict[name]
+        try:
+            startTime = time.time()
+            module = importlib.import_module(moduleName)
+            importTime = time.time()
+            module.addWindow(self)
+            self.loadTimeDict[moduleName] = (importTime - startTime, time.time() - importTime)
+        except Exception as e:
+            sys.stderr.write("%s.addWindow failed: %s\n" % (moduleName, e))
+            traceback.print_exc(file=sys.stderr)
+
+    def getNames(self, prefix=""):
+        """Return all window names of windows that start with the specified prefix
+        (or all names if prefix omitted), including windows that have not been built.
+
+        The names are in alphabetical order, ignoring case.
+        The list includes toplevels that have been destroyed.
+        """
+        nameList = sorted(set(self.tlDict.keys()) | set(self._lazyModuleDict.keys()), key=lambda s: s.lower())
+        if not prefix:
+            return nameList
+        return [name for name in nameList if name.startswith(prefix)]
+
+    def getToplevel(self, name):
+        """Return the named Toplevel, or None if it does not exist.
+
+        If the window has not been built, its module is loaded first.
+        """
+        if name in self._lazyModuleDict:
+            if self._isWritingGeom:
+                return _UnbuiltToplevel(self, name)
+            self.loadLazyModule(self._lazyModuleDict[name])
+        return RO.Wdg.ToplevelSet.getToplevel(self, name)
+
+    def writeGeomVisFile(self, *args, **kargs):
+        """Write toplevel geometry and visibility to a file, without building any windows;
+        see RO.Wdg.ToplevelSet.writeGeomVisFile for details.
+        """
+        self._isWritingGeom = True
+        try:
+            RO.Wdg.ToplevelSet.writeGeomVisFile(self, *args, **kargs)
+        finally:
+            self._isWritingGeom = False
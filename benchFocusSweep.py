@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Benchmark focus sweeps with and without overlapped (pipelined) focus moves.
+
+Location is everything:
+This script's directory is automatically added to sys.path,
+so having this script in the same directory as RO and TUI
+makes those packages available without setting PYTHONPATH.
+
+Usage: benchFocusSweep.py [--numPos=N] [--focusWaitMS=N] [--shutterCloseMS=N]
+
+- --numPos=N: number of focus positions per sweep (default 9)
+- --focusWaitMS=N: time to wait after each focus move (BaseFocusScript.FocusWaitMS; default 1000)
+- --shutterCloseMS=N: simulated time from the start of each exposure to shutter close
+    (BaseFocusScript.DebugShutterCloseMS; default 500)
+
+Runs a slitviewer focus script in debug mode (no hub connection is made;
+each simulated command takes 1 second), sweeping focus once with "Overlap Focus Moves" off
+and once with it on, and reports the time taken by each sweep.
+"""
+import sys
+import time
+
+import RO.ScriptRunner
+import RO.Wdg
+import TUI.TUIModel
+import TUI.Base.BaseFocusScript
+
+NumPos = 9
+ResultDict = {} # dict of doPipeline: sweep duration (sec)
+
+class BenchScript(TUI.Base.BaseFocusScript.SlitviewerFocusScript):
+    def __init__(self, sr):
+        TUI.Base.BaseFocusScript.SlitviewerFocusScript.__init__(self,
+            sr = sr,
+            gcamActor = "dcam",
+            instName = "DIS",
+            imageViewerTLName = None,
+            defBoreXY = [None, 0.0],
+            debug = True,
+        )
+
+    def run(self, sr):
+        """Sweep focus without and with pipelining
+        """
+        self.initAll()
+        self.getInstInfo()
+        self.numFocusPosWdg.set(NumPos)
+        self.moveBestFocus.setBool(False)
+        for ii, wdg in enumerate(self.starPosWdgSet):
+            wdg.set(200 + ii)
+        self.recordUserParams(doStarPos=True)
+        for doPipeline in (False, True):
+            self.pipelineSweepWdg.setBool(doPipeline)
+            startTime = time.time()
+            yield self.waitFocusSweep()
+            ResultDict[doPipeline] = time.time() - startTime
+
+    def end(self, sr):
+        pass
+
+
+if __name__ == "__main__":
+    for opt in sys.argv[1:]:
+        if opt.startswith("--numPos="):
+            NumPos = int(opt.split("=", 1)[1])
+        elif opt.startswith("--focusWaitMS="):
+            BenchScript.FocusWaitMS = int(opt.split("=", 1)[1])
+        elif opt.startswith("--shutterCloseMS="):
+            BenchScript.DebugShutterCloseMS = int(opt.split("=", 1)[1])
+        else:
+            sys.exit("Unknown option %r\n%s" % (opt, __doc__))
+
+    root = RO.Wdg.PythonTk()
+    tuiModel = TUI.TUIModel.getModel(True)
+    frame = RO.Wdg.Toplevel(master=root, title="benchFocusSweep")
+
+    def stateFunc(sr):
+        if not sr.isDone():
+            return
+        if sr.didFail():
+            print("Sweep failed: %s" % (sr.getFullState()[-1],))
+        else:
+            print("Sweep of %d focus positions; focus wait %s msec; shutter closes after %s msec" % \
+                (NumPos, BenchScript.FocusWaitMS, BenchScript.DebugShutterCloseMS))
+            for doPipeline, desc in ((False, "serial"), (True, "pipelined")):
+                duration = ResultDict[doPipeline]
+                print("%10s: %6.2f sec = %5.2f sec/position" % (desc, duration, duration / NumPos))
+            print("Speedup: %0.2f" % (ResultDict[False] / ResultDict[True],))
+        root.quit()
+
+    sr = RO.ScriptRunner.ScriptRunner(
+        master = frame,
+        name = "benchFocusSweep",
+        dispatcher = tuiModel.dispatcher,
+        scriptClass = BenchScript,
+        stateFunc = stateFunc,
+        startNow = True,
+    )
+    root.mainloop()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Benchmark TUI by replaying recorded hub traffic through the standard windows.
+
+Location is everything:
+This script's directory is automatically added to sys.path,
+so having this script in the same directory as RO and TUI
+makes those packages available without setting PYTHONPATH.
+
+Usage: benchHubTraffic.py [recording] [--speed=N] [--show] [--verbose]
+
+- recording: a recording made with TUI.Base.HubTraffic.HubRecorder;
+    if omitted, a synthetic recording of the TCC slewing and then tracking is used
+- --speed=N: replay N times faster than recorded; 0 (the default) for as fast as possible
+- --show: show all windows (by default only windows that are shown at startup are visible,
+    though all windows are created and update from the replayed data)
+- --verbose: print the log (TUI prints every message to stdout in test mode)
+
+Creates the TUI model in test mode (no hub connection is made), loads all windows
+in TUI.LoadStdModules.loadAll(), replays the recording and reports
+dispatch throughput, Tk event loop latency and memory use.
+"""
+import os
+import random
+import sys
+import tempfile
+
+import RO.Wdg
+import TUI.TUIModel
+import TUI.LoadStdModules
+import TUI.Base.HubTraffic
+
+def makeSyntheticMsgList(duration=120.0, seed=1):
+    """Return a list of (time (sec), line) resembling hub traffic while the TCC slews, then tracks.
+
+    Inputs:
+    - duration: duration of traffic (sec)
+    - seed: random number seed
+    """
+    rand = random.Random(seed)
+    cmdr = ".tcc"
+    msgList = []
+
+    def addMsg(msgTime, dataStr, actor="tcc", msgCode="i"):
+        msgList.append((msgTime, "%s 0 %s %s %s" % (cmdr, actor, msgCode, dataStr)))
+
+    addMsg(0.0, "Inst=DIS; IPConfig=TTF; ObjSys=FK5, 2000.0; RotType=Obj; "
+        "ObjName='synthetic target'; SecFocus=570; GCFocus=-300; "
+        "AzLim=-180, 540, 0, 3, 4; AltLim=6, 90, 0, 3, 4; RotLim=-360, 360, 0, 3, 4")
+    addMsg(0.0, "AxisCmdState=Slewing, Slewing, Slewing; AxisErrCode='', '', ''; SlewDuration=20.0")
+    az, alt, rot = 120.0, 60.0, 10.0
+    msgTime = 0.0
+    while msgTime < duration:
+        msgTime += 1.0
+        if msgTime == 20.0:
+            addMsg(msgTime, "SlewEnd; AxisCmdState=Tracking, Tracking, Tracking; AxisErrCode='', '', ''")
+        az += 0.004
+        alt += 0.002
+        rot += 0.001
+        addMsg(msgTime, "TAI=%.2f" % (4.9e9 + msgTime,))
+        addMsg(msgTime, "ObjNetPos=%.6f, 0.000010, %.2f, %.6f, 0.000005, %.2f; TCCPos=%.4f, %.4f, %.4f; AxePos=%.4f, %.4f, %.4f" % (
+            az, 4.9e9 + msgTime, alt, 4.9e9 + msgTime, az, alt, rot,
+            az + rand.gauss(0, 0.001), alt + rand.gauss(0, 0.001), rot + rand.gauss(0, 0.001)))
+        for axisName, pos in (("Az", az), ("Alt", alt), ("Rot", rot)):
+            addMsg(msgTime, "%sStat=%.4f, 0.00001, %.2f, 0x0" % (axisName, pos, 4.9e9 + msgTime))
+        addMsg(msgTime + 0.5, "SecOrient=%.2f, %.2f, %.2f, %.2f, %.2f" % tuple(rand.gauss(0, 10) for ii in range(5)),
+            actor="keys.tcc")
+        if int(msgTime) % 10 == 0:
+            addMsg(msgTime, "SecFocus=%.1f" % (570 + rand.gauss(0, 5),))
+    msgList.sort(key=lambda msg: msg[0])
+    return msgList
+
+if __name__ == "__main__":
+    argList = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    optList = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    speed = 0
+    doShow = False
+    verbose = False
+    for opt in optList:
+        if opt.startswith("--speed="):
+            speed = float(opt.split("=", 1)[1])
+        elif opt == "--show":
+            doShow = True
+        elif opt == "--verbose":
+            verbose = True
+        else:
+            sys.exit("Unknown option %r\n%s" % (opt, __doc__))
+
+    if argList:
+        msgList = TUI.Base.HubTraffic.readRecording(argList[0])
+    else:
+        # round trip through a file, to exercise the recording format
+        fd, filePath = tempfile.mkstemp(suffix=".hub.gz", prefix="benchHubTraffic")
+        os.close(fd)
+        try:
+            TUI.Base.HubTraffic.writeRecording(filePath, makeSyntheticMsgList())
+            msgList = TUI.Base.HubTraffic.readRecording(filePath)
+        finally:
+            os.remove(filePath)
+    print("Replaying %d lines spanning %.1f sec at speed %s" % \
+        (len(msgList), msgList[-1][0] if msgList else 0, speed or "max"))
+
+    root = RO.Wdg.PythonTk()
+    root.withdraw()
+    tuiModel = TUI.TUIModel.getModel(True)
+    TUI.LoadStdModules.loadAll()
+    # build every window, including those that start hidden
+    tuiModel.tlSet.loadAllLazyModules()
+    if doShow:
+        for tlName in tuiModel.tlSet.getNames():
+            tuiModel.tlSet.makeVisible(tlName)
+    root.update()
+
+    realStdOut = sys.stdout
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+
+    def reportAndQuit(replayer):
+        sys.stdout = realStdOut
+        print(replayer.stats.getReport())
+        root.quit()
+
+    replayer = TUI.Base.HubTraffic.HubReplayer(msgList, speed=speed, callFunc=reportAndQuit)
+    replayer.start()
+    root.mainloop()
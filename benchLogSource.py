@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""Benchmark TUI.LogSource: memory use and ingest rate of the log repository.
+
+Location is everything:
+This script's directory is automatically added to sys.path,
+so having this script in the same directory as RO and TUI
+makes those packages available without setting PYTHONPATH.
+
+Usage: benchLogSource.py [numEntries]
+
+Reports:
+- memory used by LogStore compared to a deque of LogEntry objects
+- ingest rate of LogSource.logMsg, with and without eager timestamp formatting
+- time to refilter the whole log by scanning every LogEntry (as the log window used to)
+  and by using the LogStore posting lists
+
+Messages are logged through LogSource.logMsg, just as the dispatcher logs hub replies,
+but no Tk event loop is run and no log windows are created.
+"""
+import collections
+import random
+import sys
+import time
+import tracemalloc
+
+import RO.Astro.Tm
+import RO.Comm.HubConnection
+import RO.Constants
+import RO.KeyDispatcher
+import RO.Wdg
+import TUI.LogSource
+
+Actors = ("tcc", "gcam", "ecam", "dis", "disExpose", "hub", "keys.tcc", "cmds")
+Cmdrs = (".tcc", "TU01.me", "UW02.other", "MN01.monitor")
+Severities = (RO.Constants.sevDebug, RO.Constants.sevNormal, RO.Constants.sevNormal, RO.Constants.sevWarning)
+
+def makeMsgArgList(numEntries, seed=1):
+    """Return a list of (msgStr, severity, actor, cmdr, cmdID) tuples resembling hub traffic
+    """
+    rand = random.Random(seed)
+    argList = []
+    for ii in range(numEntries):
+        actor = rand.choice(Actors)
+        cmdr = rand.choice(Cmdrs)
+        cmdID = rand.randint(0, 2000)
+        msgStr = "%s %d %s i AxePos=%.5f, %.5f, %.5f; TCCPos=%.5f, %.5f, %.5f" % (
+            cmdr, cmdID, actor,
+            rand.uniform(-180, 360), rand.uniform(0, 90), rand.uniform(-180, 180),
+            rand.uniform(-180, 360), rand.uniform(0, 90), rand.uniform(-180, 180),
+        )
+        argList.append((msgStr, rand.choice(Severities), actor, cmdr, cmdID))
+    return argList
+
+def measureMemory(func):
+    """Call func() and return (result, bytes allocated and still in use)
+    """
+    tracemalloc.start()
+    try:
+        startSize = tracemalloc.get_traced_memory()[0]
+        result = func()
+        endSize = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, endSize - startSize
+
+def benchMemory(argList):
+    """Compare memory used by a deque of LogEntry objects to a LogStore
+    """
+    numEntries = len(argList)
+
+    def fillDeque():
+        entryDeque = collections.deque()
+        for msgStr, severity, actor, cmdr, cmdID in argList:
+            entryDeque.append(TUI.LogSource.LogEntry(
+                msgStr = msgStr,
+                severity = severity,
+                actor = actor,
+                cmdr = cmdr,
+                cmdID = cmdID,
+                tags = ["cmdr_" + cmdr.lower(), "act_" + actor.lower()],
+            ))
+        return entryDeque
+
+    def fillStore():
+        store = TUI.LogSource.LogStore(maxEntries = numEntries)
+        for msgStr, severity, actor, cmdr, cmdID in argList:
+            store.append(msgStr=msgStr, severity=severity, actor=actor, cmdr=cmdr, cmdID=cmdID)
+        return store
+
+    # message strings are shared by both representations; do not count them
+    entryDeque, dequeBytes = measureMemory(fillDeque)
+    store, storeBytes = measureMemory(fillStore)
+    print("Memory for %d entries:" % (numEntries,))
+    print("  deque of LogEntry: %8.2f MB (%5.0f bytes/entry)" % (dequeBytes / 1e6, dequeBytes / numEntries))
+    print("  LogStore:          %8.2f MB (%5.0f bytes/entry)" % (storeBytes / 1e6, storeBytes / numEntries))
+    del entryDeque, store
+
+def benchIngest(logSource, argList, eagerFormat=False):
+    """Measure the rate at which LogSource.logMsg accepts messages
+
+    Inputs:
+    - logSource: the log source
+    - argList: list of arguments for logMsg, as returned by makeMsgArgList
+    - eagerFormat: if True, also format the TAI timestamp of each message the way LogEntry
+        used to when it was constructed; this gives the ingest rate before timestamps were lazy
+    """
+    startTime = time.time()
+    for msgStr, severity, actor, cmdr, cmdID in argList:
+        logSource.logMsg(msgStr=msgStr, severity=severity, actor=actor, cmdr=cmdr, cmdID=cmdID)
+        if eagerFormat:
+            currPythonSeconds = RO.Astro.Tm.getCurrPySec(time.time())
+            currTAITuple = time.gmtime(currPythonSeconds - RO.Astro.Tm.getUTCMinusTAI())
+            time.strftime("%Y-%m-%d %H:%M:%S", currTAITuple)
+    duration = time.time() - startTime
+    print("Ingest via LogSource.logMsg%s: %d entries in %.3f sec = %.0f entries/sec" % \
+        (" with eager timestamps" if eagerFormat else "", len(argList), duration, len(argList) / duration))
+
+def benchIterate(logSource):
+    """Measure the time to iterate over LogSource.entryList and format every entry
+    """
+    startTime = time.time()
+    numEntries = 0
+    for logEntry in logSource.entryList:
+        logEntry.getStr()
+        numEntries += 1
+    duration = time.time() - startTime
+    print("Iterate and format entryList: %d entries in %.3f sec" % (numEntries, duration))
+
+def timeCall(func, *args):
+    """Call func(*args) and return (result, duration in seconds)
+    """
+    startTime = time.time()
+    result = func(*args)
+    return result, time.time() - startTime
+
+def benchFilter(logSource):
+    """Compare refiltering the whole log by scanning LogEntry objects to using posting lists
+    """
+    store = logSource.store
+    myCmdr = "TU01.me"
+    actorSet = set(("tcc", "gcam"))
+
+    def scan(filterFunc):
+        return set(seq for seq, logEntry in zip(range(store.firstSeq, store.nextSeq), logSource.entryList)
+            if filterFunc(logEntry))
+
+    def getMySeqs():
+        return set(seq for seq in store.getSeqsForCmdrs([myCmdr])
+            if store.getSeverity(seq) > RO.Constants.sevDebug and not store.getIsKeys(seq)
+            and (store.getCmdInfo(seq) is None or store.getCmdInfo(seq).isMine))
+
+    testList = (
+        ("severity >= warning",
+            lambda x: x.severity >= RO.Constants.sevWarning,
+            lambda: store.getSeqsForSeverity(RO.Constants.sevWarning)),
+        ("actor=tcc",
+            lambda x: x.actor == "tcc" or (x.cmdInfo and x.cmdInfo.actor == "tcc"),
+            lambda: store.getSeqsForActors(["tcc"])),
+        ("actor in %s" % (sorted(actorSet),),
+            lambda x: x.actor in actorSet or (x.cmdInfo and x.cmdInfo.actor in actorSet),
+            lambda: store.getSeqsForActors(actorSet)),
+        ("my commands and replies",
+            lambda x: x.cmdr == myCmdr and x.severity > RO.Constants.sevDebug and not x.isKeys \
+                and (x.cmdInfo is None or x.cmdInfo.isMine),
+            getMySeqs),
+    )
+    print("Refilter %d entries: scan LogEntry objects vs. posting lists" % (len(store),))
+    for descr, filterFunc, getSeqs in testList:
+        scanSeqs, scanDuration = timeCall(scan, filterFunc)
+        postingSeqs, postingDuration = timeCall(getSeqs)
+        if scanSeqs != postingSeqs:
+            raise RuntimeError("%s: posting lists found %d entries; scanning found %d" % \
+                (descr, len(postingSeqs), len(scanSeqs)))
+        print("  %-30s %6d entries: scan %8.1f ms; posting lists %8.1f ms" % \
+            (descr, len(scanSeqs), scanDuration * 1000, postingDuration * 1000))
+
+if __name__ == "__main__":
+    numEntries = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+    root = RO.Wdg.PythonTk()
+    root.withdraw()
+    dispatcher = RO.KeyDispatcher.KeyDispatcher(
+        connection = RO.Comm.HubConnection.NullConnection(),
+    )
+    logSource = TUI.LogSource.LogSource(dispatcher, maxEntries=numEntries)
+
+    argList = makeMsgArgList(numEntries)
+    benchMemory(argList)
+    benchIngest(logSource, argList, eagerFormat=True)
+    benchIngest(logSource, argList)
+    benchIterate(logSource)
+    benchFilter(logSource)
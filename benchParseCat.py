@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""Benchmark TUI.TCC.Catalog.ParseCat: time to parse a synthetic object catalog.
+
+Location is everything:
+This script's directory is automatically added to sys.path,
+so having this script in the same directory as RO and TUI
+makes those packages available without setting PYTHONPATH.
+
+Usage: benchParseCat.py [numObjects [--compare]]
+
+Writes a catalog of numObjects objects (default 10000) in a variety of coordinate systems,
+with a variety of options and about 1% bad lines, then reports the time to parse it
+in the main thread and in a background thread.
+
+With --compare, the catalog is also parsed the way it used to be: checking each object
+by setting its values into a hidden slew input widget. The results of the two parsers are compared
+and the time for each is reported. This requires a display.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tkinter
+
+import RO.Wdg
+import TUI.TUIModel
+import TUI.TCC.UserModel
+import TUI.TCC.Catalog.ParseCat
+import TUI.TCC.SlewWdg.InputWdg
+
+def writeCatalog(filePath, numObjects, seed=1):
+    """Write a synthetic catalog with numObjects objects
+    """
+    rand = random.Random(seed)
+    with open(filePath, "w") as outFile:
+        outFile.write("# synthetic catalog for benchParseCat\n")
+        outFile.write("dispColor=blue\n")
+        for ii in range(numObjects):
+            if ii % 1000 == 0:
+                csys = rand.choice(("FK5", "ICRS", "Geo", "FK4"))
+                outFile.write("CSys=%s; RotType=Obj\n" % (csys,))
+            kind = rand.random()
+            if kind < 0.5:
+                outFile.write("star%05d %d:%02d:%04.1f %+d:%02d:%04.1f\n" % (
+                    ii, rand.randint(0, 23), rand.randint(0, 59), rand.uniform(0, 59.9),
+                    rand.randint(-89, 89), rand.randint(0, 59), rand.uniform(0, 59.9)))
+            elif kind < 0.7:
+                outFile.write('"star %05d" %.5f %.5f Mag=%.1f; PM=%.2f, %.2f; Rv=%.1f\n' % (
+                    ii, rand.uniform(0, 24), rand.uniform(-90, 90), rand.uniform(-2, 20),
+                    rand.uniform(-10, 10), rand.uniform(-10, 10), rand.uniform(-300, 300)))
+            elif kind < 0.8:
+                outFile.write("azalt%05d %.3f %.3f CSys=Topo; RotAng=%.1f; RotType=Hor\n" % (
+                    ii, rand.uniform(0, 360), rand.uniform(15, 90), rand.uniform(-180, 180)))
+            elif kind < 0.9:
+                outFile.write("keep%05d %.3f %.3f CSys=FK4; Date=%.1f; Keep=Arc, NoCalib; AzWrap=Neg\n" % (
+                    ii, rand.uniform(0, 24), rand.uniform(-90, 90), rand.uniform(1950, 2050)))
+            elif kind < 0.99:
+                outFile.write("drift%05d %.4f %.4f ScanVel=%.1f, %.1f; Distance=%.1f\n" % (
+                    ii, rand.uniform(0, 24), rand.uniform(-90, 90),
+                    rand.uniform(-100, 100), rand.uniform(-100, 100), rand.uniform(1, 1000)))
+            else:
+                # bad lines
+                outFile.write(rand.choice((
+                    "bad%05d 25:00:00 10:00:00\n",
+                    "bad%05d 10:00:00 95:00:00\n",
+                    "bad%05d 10 20 RotType=Sideways\n",
+                    "bad%05d 10 20 RotAng=400\n",
+                    "bad%05d 10 20 Bogus=1\n",
+                )) % (ii,))
+
+
+class WdgChecker(object):
+    """Check value dictionaries the way CatalogParser used to:
+    by setting them into a hidden slew input widget.
+    """
+    def __init__(self):
+        userModel = TUI.TCC.UserModel._Model()
+        tl = tkinter.Toplevel()
+        tl.withdraw()
+        self.inputWdg = TUI.TCC.SlewWdg.InputWdg.InputWdg(
+            master = tl,
+            userModel = userModel,
+        )
+        self.inputWdg.pack()
+
+    def checkValueDict(self, valueDict):
+        self.inputWdg.setValueDict(valueDict)
+
+
+def timeParse(catParser, filePath):
+    """Parse a catalog and return (catName, objList, catOptions, errList), duration (sec)
+    """
+    startTime = time.time()
+    result = catParser.parseCatData(filePath)
+    return result, time.time() - startTime
+
+def timeParseInThread(catParser, filePath):
+    """Parse a catalog in a background thread while the Tk event loop runs;
+    return (number of objects, duration in seconds, number of Tk events handled)
+    """
+    resultList = []
+    def parse():
+        resultList.append(catParser.parseCatData(filePath))
+    startTime = time.time()
+    thread = threading.Thread(target=parse)
+    thread.start()
+    nEvents = 0
+    while thread.is_alive():
+        root.update()
+        nEvents += 1
+        time.sleep(0.001)
+    return len(resultList[0][1]), time.time() - startTime, nEvents
+
+if __name__ == "__main__":
+    numObjects = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    doCompare = "--compare" in sys.argv[2:]
+    root = RO.Wdg.PythonTk()
+    root.withdraw()
+    tuiModel = TUI.TUIModel.getModel(True)
+
+    fd, filePath = tempfile.mkstemp(suffix=".txt", prefix="benchParseCat")
+    os.close(fd)
+    try:
+        writeCatalog(filePath, numObjects)
+        catParser = TUI.TCC.Catalog.ParseCat.CatalogParser()
+        (catName, objList, catOptions, errList), duration = timeParse(catParser, filePath)
+        print("Parse %d objects: %d accepted, %d rejected in %.3f sec = %.0f objects/sec" % \
+            (numObjects, len(objList), len(errList), duration, numObjects / duration))
+
+        nObj, duration, nEvents = timeParseInThread(catParser, filePath)
+        print("Parse in a background thread: %d objects in %.3f sec; Tk handled %d event loop passes meanwhile" % \
+            (nObj, duration, nEvents))
+
+        if doCompare:
+            oldParser = TUI.TCC.Catalog.ParseCat.CatalogParser()
+            oldParser._inputChecker = WdgChecker()
+            (oldCatName, oldObjList, oldCatOptions, oldErrList), oldDuration = timeParse(oldParser, filePath)
+            print("Parse using a hidden slew input widget: %d accepted, %d rejected in %.3f sec = %.0f objects/sec" % \
+                (len(oldObjList), len(oldErrList), oldDuration, numObjects / oldDuration))
+            print("Speedup: %.1f" % (oldDuration / duration,))
+
+            objStrList = [str(obj) for obj in objList]
+            oldObjStrList = [str(obj) for obj in oldObjList]
+            if objStrList != oldObjStrList:
+                print("Error: the accepted objects differ")
+            errLines = [line for line, errMsg in errList]
+            oldErrLines = [line for line, errMsg in oldErrList]
+            if errLines != oldErrLines:
+                print("Error: the rejected lines differ:")
+                for line in sorted(set(errLines) ^ set(oldErrLines)):
+                    print("  %s" % (line,))
+            if catOptions != oldCatOptions:
+                print("Error: catalog options differ: %r != %r" % (catOptions, oldCatOptions))
+    finally:
+        os.remove(filePath)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""Benchmark and check TUI.Base.PolyFit.polyfitw against the normal-equation version it replaced.
+
+Location is everything:
+This script's directory is automatically added to sys.path,
+so having this script in the same directory as RO and TUI
+makes those packages available without setting PYTHONPATH.
+
+Usage: benchPolyfitw.py [numFits]
+
+Fits numFits (default 2000) synthetic focus sweeps (FWHM vs. focus in um, 5-15 points each),
+one at a time with the old and new polyfitw and all at once with the new polyfitw (batched),
+and reports the time taken by each.
+
+Also checks accuracy, and exits with status 1 if a check fails:
+- on sweeps centered near focus 0 (where the old version is accurate) the two versions must agree
+- on sweeps with large focus offsets, the new version must recover the coefficients of noiseless data
+- batched fits must match individual fits
+"""
+import sys
+import time
+
+import numpy
+
+from TUI.Base.PolyFit import polyfitw
+
+def oldPolyfitw(x, y, w, ndegree, return_fit=False):
+    """The version of polyfitw that TUI.Base.PolyFit.polyfitw replaced, for reference
+    """
+    n = min(len(x), len(y)) # size = smaller of x,y
+    m = ndegree + 1             # number of elements in coeff vector
+    a = numpy.zeros((m,m), float)  # least square matrix, weighted matrix
+    b = numpy.zeros(m, float)  # will contain sum w*y*x^j
+    z = numpy.ones(n, float)   # basis vector for constant term
+
+    a[0,0] = numpy.sum(w)
+    b[0] = numpy.sum(w*y)
+
+    for p in range(1, 2*ndegree+1):      # power loop
+        z = z*x # z is now x^p
+        if (p < m):  b[p] = numpy.sum(w*y*z)  # b is sum w*y*x^j
+        sum = numpy.sum(w*z)
+        for j in range(max(0,(p-ndegree)), min(ndegree,p)+1):
+            a[j,p-j] = sum
+
+    a = numpy.linalg.inv(a)
+    c = numpy.dot(b, a)
+    if not return_fit:
+        return c         # exit if only fit coefficients are wanted
+
+    # compute optional output parameters.
+    yfit = numpy.zeros(n, float)+c[0]  # one-sigma error estimates, init
+    for k in range(1, ndegree +1):
+        yfit = yfit + c[k]*(x**k)  # sum basis vectors
+    var = numpy.sum((yfit-y)**2 )/(n-m)  # variance estimate, unbiased
+    sigma = numpy.sqrt(var)
+    yband = numpy.zeros(n, float) + a[0,0]
+    z = numpy.ones(n, float)
+    for p in range(1,2*ndegree+1):      # compute correlated error estimates on y
+        z = z*x      # z is now x^p
+        sum = 0.
+        for j in range(max(0, (p - ndegree)), min(ndegree, p)+1):
+            sum = sum + a[j,p-j]
+        yband = yband + sum * z      # add in all the error sources
+    yband = yband*var
+    yband = numpy.sqrt(yband)
+    return c, yfit, yband, sigma, a
+
+def makeSweeps(numFits, numPos, centerFoc, rand, noise=0.1):
+    """Return focus, FWHM and weight arrays of shape [numFits, numPos] for synthetic focus sweeps
+    """
+    focusRange = rand.uniform(100.0, 400.0, size=(numFits, 1))
+    focArr = centerFoc + focusRange * numpy.linspace(-0.5, 0.5, numPos)[numpy.newaxis, :]
+    bestFocArr = centerFoc + rand.uniform(-50.0, 50.0, size=(numFits, 1))
+    fwhmArr = 1.0 + 0.0001 * (focArr - bestFocArr)**2 + rand.normal(0.0, noise, size=focArr.shape)
+    weightArr = rand.uniform(0.5, 1.5, size=focArr.shape)
+    return focArr, fwhmArr, weightArr
+
+def relErr(val, refVal):
+    """Return max |val - refVal| / max |refVal|
+    """
+    return numpy.max(numpy.abs(numpy.asarray(val) - refVal)) / max(numpy.max(numpy.abs(refVal)), 1.0e-300)
+
+def checkAccuracy(rand):
+    """Run the accuracy checks; return a list of failure messages
+    """
+    failList = []
+
+    # old and new agree where the old version is accurate
+    maxErrDict = {}
+    for numPos in range(4, 16):
+        focArr, fwhmArr, weightArr = makeSweeps(50, numPos, 0.0, rand)
+        for x, y, w in zip(focArr, fwhmArr, weightArr):
+            oldOut = oldPolyfitw(x, y, w, 2, True)
+            newOut = polyfitw(x, y, w, 2, True)
+            for name, oldVal, newVal in zip(("c", "yfit", "yband", "sigma", "a"), oldOut, newOut):
+                maxErrDict[name] = max(maxErrDict.get(name, 0.0), relErr(newVal, oldVal))
+    for name, maxErr in sorted(maxErrDict.items()):
+        print("old vs. new, focus near 0: max relative difference in %-5s = %0.2g" % (name, maxErr))
+        if maxErr > 1.0e-8:
+            failList.append("old and new %s differ by %0.2g" % (name, maxErr))
+
+    # new recovers noiseless coefficients with large focus offsets
+    for centerFoc in (1.0e3, 1.0e4, 1.0e5):
+        focArr, fwhmArr, weightArr = makeSweeps(50, 9, centerFoc, rand, noise=0.0)
+        oldErr = newErr = 0.0
+        for x, y, w in zip(focArr, fwhmArr, weightArr):
+            refC = numpy.polynomial.polynomial.polyfit(x - centerFoc, y, 2)
+            refBestFoc = centerFoc - refC[1] / (2.0 * refC[2])
+            for func in (oldPolyfitw, polyfitw):
+                try:
+                    c, yfit = func(x, y, w, 2, True)[0:2]
+                    err = max(relErr(yfit, y), abs(-c[1] / (2.0 * c[2]) - refBestFoc) / centerFoc)
+                except numpy.linalg.LinAlgError:
+                    err = numpy.inf
+                if func is polyfitw:
+                    newErr = max(newErr, err)
+                else:
+                    oldErr = max(oldErr, err)
+        print("noiseless fits, focus near %0.0e: max relative error old = %0.2g, new = %0.2g" % \
+            (centerFoc, oldErr, newErr))
+        if newErr > 1.0e-9:
+            failList.append("new fit error %0.2g with focus near %0.0e" % (newErr, centerFoc))
+
+    # batched fits match individual fits
+    focArr, fwhmArr, weightArr = makeSweeps(100, 7, 3000.0, rand)
+    batchOut = polyfitw(focArr, fwhmArr, weightArr, 2, True)
+    for ind, (x, y, w) in enumerate(zip(focArr, fwhmArr, weightArr)):
+        for name, batchVal, val in zip(("c", "yfit", "yband", "sigma", "a"), batchOut, polyfitw(x, y, w, 2, True)):
+            if relErr(batchVal[ind], val) > 1.0e-12:
+                failList.append("batched %s differs for fit %d" % (name, ind))
+    return failList
+
+def bench(numFits, rand):
+    """Time old, new and batched fits
+    """
+    for numPos in (5, 15):
+        focArr, fwhmArr, weightArr = makeSweeps(numFits, numPos, 3000.0, rand)
+        timeDict = {}
+        for desc, func in (("old", oldPolyfitw), ("new", polyfitw)):
+            startTime = time.time()
+            for x, y, w in zip(focArr, fwhmArr, weightArr):
+                func(x, y, w, 2, True)
+            timeDict[desc] = time.time() - startTime
+        startTime = time.time()
+        polyfitw(focArr, fwhmArr, weightArr, 2, True)
+        timeDict["batched"] = time.time() - startTime
+        for desc in ("old", "new", "batched"):
+            print("%d fits of %2d points, %-7s: %7.1f usec/fit" % \
+                (numFits, numPos, desc, timeDict[desc] * 1.0e6 / numFits))
+
+
+if __name__ == "__main__":
+    numFits = 2000
+    if len(sys.argv) > 1:
+        numFits = int(sys.argv[1])
+    rand = numpy.random.RandomState(1)
+    failList = checkAccuracy(rand)
+    bench(numFits, rand)
+    if failList:
+        print("FAILED:")
+        for msg in failList:
+            print("  " + msg)
+        sys.exit(1)
+    print("All accuracy checks passed")
@@ -10,42 +10,93 @@ at startup) and potentialy simplifies distribution
 as prebuilt packages by allowing TUI's python code
 to be run from a zip file.
 
+LoadStdModules does not import the window modules;
+it lists each module with the windows its addWindow function creates,
+so loadAll can register the windows with the LazyToplevelSet
+and only load the modules whose windows are wanted.
+To find the windows, this script imports each module
+and calls its addWindow function with a toplevel set that records
+the windows (so it requires all of TUI's dependencies, but no windows are built).
+
 On the down side, one must remember to run this file
 and thus regenerate LoadStdModules whenever the list
-of TUI's standard windows modules changes.
+of TUI's standard windows modules changes
+(or a window module's window names or default geometry or visibility change).
 
 History:
 2005-08-01 ROwen
 2005-08-08 ROwen    Modified to use TUI.WindowModuleUtil
 2005-09-22 ROwen    Modified to not use TUI.TUIPaths.
 """
+import importlib
 import os
 import TUI
 import TUI.WindowModuleUtil
 
-# get location to look for standard windows
-tuiPath = os.path.dirname(TUI.__file__)
-
-modNames = list(TUI.WindowModuleUtil.findWindowsModules(
-    path = tuiPath,
-    isPackage = True,
-    loadFirst="TUIMenu",
-))
-modFilePath = os.path.join(tuiPath, "LoadStdModules.py")
-#modFile = file(modFilePath, "w")
-modFile = open(modFilePath, 'w')
-try:
-    modFile.write("import TUI.TUIModel\n")
-    for modName in modNames:
-        modFile.write("import %s\n" % modName)
-
-    modFile.write("""
+# window modules that are not loaded (they are listed, but commented out)
+ExcludeModules = (
+    "TUI.Guide.AgileGuideWindow",
+    "TUI.Inst.Agile.AgileWindow",
+)
+
+class RecordingToplevelSet(object):
+    """Record the windows a window module's addWindow function creates
+    """
+    def __init__(self):
+        self.windowInfoList = []
+
+    def createToplevel(self, name, master=None, defGeom="", defVisible=None, **kargs):
+        if defVisible is None:
+            defVisible = kargs.get("visible", None)
+        self.windowInfoList.append((name, defGeom, defVisible))
+
+def getWindowInfo(modName):
+    """Return a list of (name, defGeom, defVisible) for each window a window module creates
+    """
+    module = importlib.import_module(modName)
+    tlSet = RecordingToplevelSet()
+    module.addWindow(tlSet)
+    return tlSet.windowInfoList
+
+if __name__ == "__main__":
+    # get location to look for standard windows
+    tuiPath = os.path.dirname(TUI.__file__)
+
+    modNames = list(TUI.WindowModuleUtil.findWindowsModules(
+        path = tuiPath,
+        isPackage = True,
+        loadFirst="TUIMenu",
+    ))
+    modFilePath = os.path.join(tuiPath, "LoadStdModules.py")
+    #modFile = file(modFilePath, "w")
+    modFile = open(modFilePath, 'w')
+    try:
+        modFile.write('''"""Load TUI's standard window modules.
+
+Generated by genLoadStdModules.py; do not edit.
+"""
+import TUI.TUIModel
+
+# (module name, ((window name, default geometry, default visibility), ...)) for each window module;
+# default visibility is None if the module does not specify it (in which case the window is visible)
+WindowModuleInfo = (
+''')
+        for modName in modNames:
+            prefixStr = "#" if modName in ExcludeModules else ""
+            modFile.write("%s    (%r, (\n" % (prefixStr, modName))
+            for windowInfo in getWindowInfo(modName):
+                modFile.write("%s        %r,\n" % (prefixStr, windowInfo))
+            modFile.write("%s    )),\n" % (prefixStr,))
+        modFile.write(''')
+
 def loadAll():
+    """Add all standard windows to the TUI model's toplevel set;
+    window modules are only imported if one of their windows should be visible
+    """
     tuiModel = TUI.TUIModel.getModel()
     tlSet = tuiModel.tlSet
-""")
-    for modName in modNames:
-        modFile.write("    %s.addWindow(tlSet)\n" % modName)
-    
-finally:
-    modFile.close()
\ No newline at end of file
+    for modName, windowInfo in WindowModuleInfo:
+        tlSet.addLazyWindows(modName, windowInfo)
+''')
+    finally:
+        modFile.close()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""Print messages from the TUI log journal that are in a TAI time range and match a regular expression.
+
+Location is everything:
+This script's directory is automatically added to sys.path,
+so having this script in the same directory as RO and TUI
+makes those packages available without setting PYTHONPATH.
+
+Usage: grepLogJournal.py [-h] [-d DIR] [-s START] [-e END] [-a ACTOR] [-i] [regex]
+for example:
+    grepLogJournal.py -s "2015-03-01 02:00" -e "2015-03-01 03:00" -a tcc "Track"
+
+Only the parts of the journal in the requested time range are read.
+"""
+import sys
+
+import TUI.LogJournal
+
+sys.exit(TUI.LogJournal.main())
@@ -21,7 +21,16 @@ History:
 2014-04-25 ROwen    Modified to put the log files in a subdirectory
                     and to start the log with a timestamp and TUI version.
 2014-11-13 ROwen    Modified log file name format to eliminate colons.
+
+To profile startup (see TUI.StartupProfiler): tui.py --profile-startup[=reportPath] [--startup-budget=sec]
 """
-import TUI.Main
-TUI.Main.runTUIWithLog()
+import sys
+
+if any(arg.startswith("--profile-startup") for arg in sys.argv[1:]):
+    # profile startup: import TUI.Main after installing the import timer
+    import TUI.StartupProfiler
+    sys.exit(TUI.StartupProfiler.runTUIWithProfile(sys.argv[1:]))
+else:
+    import TUI.Main
+    TUI.Main.runTUIWithLog()
 